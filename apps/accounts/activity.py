@@ -0,0 +1,82 @@
+"""
+Activity timeline feed.
+
+Each library event a patron should see on their dashboard becomes one
+``ActivityEntry`` row when it happens. Model signals in ``signals`` cover
+ordinary saves; the circulation services, which change loans and
+reservations with bulk UPDATEs, record their own entries. The builders
+below take already-loaded rows, so recording never issues extra lookups
+for titles, and ``backfill_activity`` reuses them for historical rows.
+"""
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from .models import ActivityEntry
+
+TIMELINE_LENGTH = 4
+
+
+def _title(title, length=30):
+    return Truncator(title or '').chars(length)
+
+
+def loan_returned(loan, title):
+    return ActivityEntry(
+        user_id=loan.user_id, kind='loan_returned', object_id=loan.pk,
+        description=f'Returned "{_title(title)}"',
+        timestamp=loan.return_date or loan.created_at,
+    )
+
+
+def library_visit(attendance, user_id):
+    return ActivityEntry(
+        user_id=user_id, kind='library_visit', object_id=attendance.pk,
+        description=f'Checked in at {timezone.localtime(attendance.check_in).strftime("%I:%M %p")}',
+        timestamp=attendance.check_in,
+    )
+
+
+def reservation_closed(reservation, title, now=None):
+    """Entry for a reservation that was just fulfilled or cancelled."""
+    return ActivityEntry(
+        user_id=reservation.user_id, kind=f'reservation_{reservation.status}', object_id=reservation.pk,
+        description=f'"{_title(title)}"',
+        timestamp=now or reservation.updated_at or timezone.now(),
+    )
+
+
+def fine_paid(fine, user_id, title):
+    return ActivityEntry(
+        user_id=user_id, kind='fine_paid', object_id=fine.pk,
+        description=f'Paid ₦{fine.amount} for "{_title(title, 25)}"',
+        timestamp=fine.paid_date or timezone.now(),
+    )
+
+
+def event_registration(registration, title):
+    return ActivityEntry(
+        user_id=registration.user_id, kind='event_registration', object_id=registration.pk,
+        description=f'Registered for "{_title(title)}"',
+        timestamp=registration.created_at,
+    )
+
+
+def ebook_access(permission, title):
+    return ActivityEntry(
+        user_id=permission.user_id, kind='ebook_access', object_id=permission.pk,
+        description=f'Access granted to "{_title(title, 25)}"',
+        timestamp=permission.granted_at,
+    )
+
+
+def record(entries, batch_size=None):
+    """Insert ``entries``, skipping entries without a user and events already recorded."""
+    entries = [entry for entry in entries if entry.user_id]
+    if entries:
+        ActivityEntry.objects.bulk_create(entries, batch_size=batch_size, ignore_conflicts=True)
+    return len(entries)
+
+
+def recent(user, limit=TIMELINE_LENGTH):
+    """The latest ``limit`` entries of ``user``, newest first."""
+    return list(ActivityEntry.objects.filter(user=user).order_by('-timestamp', '-id')[:limit])
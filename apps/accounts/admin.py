@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
-from .models import LibraryUser, StudyRoom, StudyRoomBooking
+from .models import ActivityEntry, LibraryUser, StudyRoom, StudyRoomBooking
 from config.admin_mixins import BaseAdminMixin, ExportMixin
 from config.bulk_actions import (
     bulk_activate_users, bulk_deactivate_users,
@@ -47,7 +47,7 @@ class LibraryUserAdmin(BaseAdminMixin, ExportMixin, UserAdmin):
 
     def active_loans(self, obj):
         """Display count of active loans."""
-        return obj.loans.filter(status='active').count()
+        return obj.loans.open().count()
     active_loans.short_description = 'Active Loans'
 
     def get_list_display(self, request):
@@ -126,3 +126,12 @@ class StudyRoomBookingAdmin(BaseAdminMixin, ExportMixin, admin.ModelAdmin):
         updated = queryset.filter(status__in=['pending', 'confirmed']).update(status='cancelled')
         self.message_user(request, f'{updated} bookings cancelled successfully.')
     cancel_bookings.short_description = "Cancel selected bookings"
+
+
+@admin.register(ActivityEntry)
+class ActivityEntryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'kind', 'description', 'timestamp']
+    list_filter = ['kind']
+    search_fields = ['user__username', 'description']
+    raw_id_fields = ['user']
+    date_hierarchy = 'timestamp'
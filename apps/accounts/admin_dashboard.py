@@ -0,0 +1,300 @@
+"""
+Data behind the admin dashboard.
+
+The page renders from three things that do not grow with the database:
+``tabs()``, the static description of every app and model tab, built once
+per process; ``snapshot()``, the headline and per-model counts, cached for
+``SNAPSHOT_TIMEOUT`` seconds; and ``recent_actions()``, a short cached feed.
+Table rows are fetched per model from ``admin_dashboard_items`` one keyset
+page at a time, so nothing on the first render depends on row counts.
+"""
+import datetime
+from collections import namedtuple
+from decimal import Decimal
+from functools import lru_cache
+
+from django.apps import apps as django_apps
+from django.contrib import admin
+from django.core.cache import cache
+from django.db import models
+from django.db.models import Count, Q
+from django.urls import NoReverseMatch, reverse
+from django.utils import dateformat, timezone
+
+SNAPSHOT_KEY = 'admin_dashboard_snapshot'
+SNAPSHOT_TIMEOUT = 5 * 60
+RECENT_ACTIONS_KEY = 'admin_dashboard_recent_actions'
+RECENT_ACTIONS_TIMEOUT = 60
+PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+# ``related`` lists extra select_related paths for columns whose __str__ follows relations
+ModelTab = namedtuple(
+    'ModelTab', 'object_name name icon fields search_fields add admin_url related', defaults=(True, None, ()),
+)
+
+TABS = [
+    ('accounts', 'Accounts', 'people', [
+        ModelTab('LibraryUser', 'Library Users', 'people',
+                 ['username', 'first_name', 'last_name', 'email', 'membership_type', 'is_active'],
+                 ['username', 'first_name', 'last_name', 'email']),
+        ModelTab('StudyRoom', 'Study Rooms', 'house-door',
+                 ['name', 'room_type', 'capacity', 'is_active'], ['name', 'room_type']),
+        ModelTab('StudyRoomBooking', 'Study Room Bookings', 'calendar-check',
+                 ['user', 'room', 'date', 'status'], ['user__username', 'room__name']),
+    ]),
+    ('catalog', 'Catalog', 'book', [
+        ModelTab('Book', 'Books', 'book',
+                 ['title', 'isbn', 'publisher', 'publication_date', 'pages'], ['title', 'isbn', 'publisher__name']),
+        ModelTab('BookCopy', 'Book Copies', 'book-half',
+                 ['book', 'barcode', 'condition', 'status'], ['book__title', 'barcode']),
+        ModelTab('Author', 'Authors', 'person', ['name', 'bio'], ['name']),
+        ModelTab('Publisher', 'Publishers', 'building', ['name', 'address', 'website'], ['name']),
+        ModelTab('Faculty', 'Faculties', 'building', ['name', 'description', 'code'], ['name', 'code']),
+        ModelTab('Department', 'Departments', 'diagram-3', ['name', 'faculty', 'code'], ['name', 'faculty__name']),
+        ModelTab('Topic', 'Topics', 'tags', ['name', 'department', 'code'], ['name', 'department__name'],
+                 related=('department__faculty',)),
+        ModelTab('Genre', 'Genres', 'tag', ['name', 'description'], ['name']),
+    ]),
+    ('circulation', 'Circulation', 'arrow-left-right', [
+        ModelTab('Loan', 'Loans', 'arrow-left-right',
+                 ['user', 'book_copy', 'loan_date', 'due_date', 'status'], ['user__username', 'book_copy__book__title'],
+                 add=False, related=('book_copy__book',)),
+        ModelTab('Reservation', 'Reservations', 'bookmark',
+                 ['user', 'book', 'reservation_date', 'status'], ['user__username', 'book__title'], add=False),
+        ModelTab('LoanRequest', 'Loan Requests', 'clipboard-check',
+                 ['user', 'book_copy', 'request_date', 'status'], ['user__username', 'book_copy__book__title'],
+                 add=False, related=('book_copy__book',)),
+        ModelTab('Fine', 'Fines', 'cash',
+                 ['loan', 'amount', 'reason', 'status'], ['loan__user__username', 'amount'],
+                 add=False, related=('loan__user', 'loan__book_copy__book')),
+        ModelTab('Attendance', 'Attendance', 'person-check',
+                 ['user', 'full_name', 'check_in', 'check_out', 'status'], ['full_name', 'user__username']),
+    ]),
+    ('blog', 'Blog', 'newspaper', [
+        ModelTab('BlogPost', 'Blog Posts', 'newspaper',
+                 ['title', 'author', 'published_date', 'status'], ['title', 'author__username']),
+        ModelTab('StaticPage', 'Static Pages', 'file-text', ['title', 'slug', 'is_active'], ['title', 'slug']),
+        ModelTab('FeaturedContent', 'Featured Content', 'star', ['title', 'is_active', 'order'], ['title']),
+        ModelTab('News', 'News', 'megaphone',
+                 ['title', 'author', 'published_date', 'status'], ['title', 'author__username']),
+    ]),
+    ('events', 'Events', 'calendar-event', [
+        ModelTab('Event', 'Events', 'calendar-event',
+                 ['title', 'date', 'time', 'location', 'organizer'], ['title', 'organizer__username']),
+        ModelTab('EventRegistration', 'Event Registrations', 'person-plus',
+                 ['event', 'user'], ['event__title', 'user__username'], add=False),
+    ]),
+    ('repository', 'Repository', 'file-earmark', [
+        ModelTab('Collection', 'Collections', 'collection',
+                 ['name', 'description', 'curator'], ['name', 'curator__username']),
+        ModelTab('EBook', 'eBooks', 'file-earmark',
+                 ['title', 'authors', 'upload_date', 'access_level', 'uploaded_by'], ['title', 'uploaded_by__username']),
+        ModelTab('EBookPermissionRequest', 'eBook Permission Requests', 'clipboard-check',
+                 ['ebook', 'user', 'status', 'requested_at'], ['ebook__title', 'user__username'],
+                 add=False, admin_url='repository:review_requests'),
+        ModelTab('EBookPermission', 'eBook Permissions', 'shield-check',
+                 ['ebook', 'user', 'granted', 'granted_by', 'granted_at'], ['ebook__title', 'user__username']),
+    ]),
+]
+
+
+def _url(name):
+    try:
+        return reverse(name)
+    except NoReverseMatch:
+        return None
+
+
+def _actions(model_class):
+    """``(name, description)`` of the custom actions of the model's registered admin."""
+    model_admin = admin.site._registry.get(model_class)
+    actions = []
+    for action in getattr(model_admin, 'actions', None) or ():
+        if action == 'delete_selected':
+            continue
+        method = action if callable(action) else getattr(model_admin, action, None)
+        if method is not None and hasattr(method, 'short_description'):
+            actions.append({'name': getattr(method, '__name__', str(action)), 'description': method.short_description})
+    return actions
+
+
+def get_tab(app_label, object_name):
+    """Return ``(model_class, ModelTab)`` for a dashboard tab, or ``None``."""
+    for label, _, _, model_tabs in TABS:
+        if label != app_label:
+            continue
+        for tab in model_tabs:
+            if tab.object_name == object_name:
+                try:
+                    return django_apps.get_model(app_label, object_name), tab
+                except LookupError:
+                    return None
+    return None
+
+
+@lru_cache(maxsize=None)
+def tabs():
+    """Static app/model tab descriptions; URLs and actions resolved once per process."""
+    app_list = []
+    for app_label, name, icon, model_tabs in TABS:
+        model_list = []
+        for tab in model_tabs:
+            found = get_tab(app_label, tab.object_name)
+            if found is None:
+                continue
+            model_class = found[0]
+            prefix = f'admin:{app_label}_{tab.object_name.lower()}'
+            model_list.append({
+                'name': tab.name,
+                'object_name': tab.object_name,
+                'key': f'{app_label}.{tab.object_name}',
+                'icon': tab.icon,
+                'fields': tab.fields,
+                'admin_url': _url(tab.admin_url or f'{prefix}_changelist'),
+                'add_url': _url(f'{prefix}_add') if tab.add else None,
+                'items_url': reverse('accounts:admin_dashboard_items', args=[app_label, tab.object_name]),
+                'actions': _actions(model_class),
+            })
+        app_list.append({'name': name, 'app_label': app_label, 'icon': icon, 'models': model_list})
+    return app_list
+
+
+def compute_snapshot():
+    """Count everything the dashboard shows, with one query per table."""
+    from apps.accounts.models import LibraryUser
+    from apps.catalog.models import Book
+    from apps.circulation.models import Loan, Reservation
+    from apps.events.models import Event
+    from apps.repository.models import EBook
+
+    snapshot = LibraryUser.objects.aggregate(
+        total_users=Count('pk'),
+        active_users=Count('pk', filter=Q(is_active=True)),
+        staff_users=Count('pk', filter=Q(membership_type='staff', is_staff_approved=True)),
+        faculty_users=Count('pk', filter=Q(membership_type='faculty')),
+        student_users=Count('pk', filter=Q(membership_type='student')),
+    )
+    snapshot.update(Loan.objects.open().aggregate(
+        active_loans=Count('pk'),
+        overdue_loans=Count('pk', filter=Q(status='overdue')),
+    ))
+    snapshot['total_books'] = Book.objects.active().count()
+    snapshot['document_count'] = EBook.objects.count()
+    snapshot['event_count'] = Event.objects.count()
+    snapshot['pending_reservations'] = Reservation.objects.filter(status='active').count()
+
+    counts = {}
+    for app_label, _, _, model_tabs in TABS:
+        for tab in model_tabs:
+            found = get_tab(app_label, tab.object_name)
+            if found is not None:
+                counts[f'{app_label}.{tab.object_name}'] = found[0]._default_manager.count()
+    snapshot['model_counts'] = counts
+    snapshot['taken_at'] = timezone.now()
+    return snapshot
+
+
+def snapshot():
+    """The cached counts snapshot, recomputed at most every ``SNAPSHOT_TIMEOUT`` seconds."""
+    result = cache.get(SNAPSHOT_KEY)
+    if result is None:
+        result = compute_snapshot()
+        cache.set(SNAPSHOT_KEY, result, SNAPSHOT_TIMEOUT)
+    return result
+
+
+def invalidate():
+    """Drop the snapshot and recent actions after the dashboard changes data."""
+    cache.delete_many([SNAPSHOT_KEY, RECENT_ACTIONS_KEY])
+
+
+def recent_actions():
+    """Latest registrations, loans and uploads, newest first, cached briefly."""
+    actions = cache.get(RECENT_ACTIONS_KEY)
+    if actions is not None:
+        return actions
+
+    from apps.accounts.models import LibraryUser
+    from apps.circulation.models import Loan
+    from apps.repository.models import EBook
+
+    actions = [
+        {
+            'description': f'New user registered: {user.get_full_name() or user.username}',
+            'timestamp': user.date_joined,
+            'get_admin_url': reverse('admin:accounts_libraryuser_change', args=[user.id]),
+            'get_icon': 'person-plus',
+        }
+        for user in LibraryUser.objects.order_by('-date_joined')[:3]
+    ]
+    actions += [
+        {
+            'description': f'Book loan: {loan.book_copy.book.title[:30]}...',
+            'timestamp': loan.created_at,
+            'get_admin_url': reverse('admin:circulation_loan_change', args=[loan.id]),
+            'get_icon': 'book',
+        }
+        for loan in Loan.objects.select_related('book_copy__book').order_by('-created_at')[:2]
+    ]
+    actions += [
+        {
+            'description': f'eBook uploaded: {doc.title[:30]}...',
+            'timestamp': doc.upload_date,
+            'get_admin_url': reverse('admin:repository_ebook_change', args=[doc.id]),
+            'get_icon': 'file-earmark',
+        }
+        for doc in EBook.objects.order_by('-upload_date')[:2]
+    ]
+    actions.sort(key=lambda action: action['timestamp'], reverse=True)
+    cache.set(RECENT_ACTIONS_KEY, actions, RECENT_ACTIONS_TIMEOUT)
+    return actions
+
+
+def _display(item, name):
+    """JSON-ready display value of field ``name`` on ``item``."""
+    field = item._meta.get_field(name)
+    if field.choices:
+        return getattr(item, f'get_{name}_display')()
+    value = getattr(item, name)
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, models.Model):
+        get_full_name = getattr(value, 'get_full_name', None)
+        return (get_full_name() or value.get_username()) if get_full_name else str(value)
+    if isinstance(value, datetime.datetime):
+        return dateformat.format(timezone.localtime(value) if timezone.is_aware(value) else value, 'M d, Y H:i')
+    if isinstance(value, datetime.date):
+        return dateformat.format(value, 'M d, Y')
+    if isinstance(value, datetime.time):
+        return value.strftime('%H:%M')
+    if isinstance(value, Decimal):
+        return str(value)
+    return str(value)
+
+
+def page(model_class, tab, search='', cursor=None, page_size=PAGE_SIZE):
+    """
+    One keyset page of ``model_class`` rows, newest first.
+
+    Returns ``(rows, next_cursor)`` where each row is ``{'id', 'values'}``
+    with one display value per ``tab.fields`` column.
+    """
+    related = [
+        name for name in tab.fields
+        if model_class._meta.get_field(name).many_to_one or model_class._meta.get_field(name).one_to_one
+    ]
+    queryset = model_class._default_manager.select_related(*related, *tab.related).order_by('-pk')
+    if search:
+        condition = Q()
+        for field in tab.search_fields:
+            condition |= Q(**{f'{field}__icontains': search})
+        queryset = queryset.filter(condition)
+    if cursor is not None:
+        queryset = queryset.filter(pk__lt=cursor)
+
+    items = list(queryset[:page_size + 1])
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    rows = [{'id': item.pk, 'values': [_display(item, name) for name in tab.fields]} for item in items]
+    return rows, (items[-1].pk if has_more else None)
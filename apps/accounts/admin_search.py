@@ -0,0 +1,231 @@
+"""
+Cross-model search for the admin dashboard.
+
+Every model with a dashboard tab is mirrored into ``AdminSearchEntry``, one
+``(model, object_id, text)`` row per object built from the tab's
+``search_fields``. Signals in ``signals`` refresh rows after each save or
+delete commits, outside the transaction that made the change; saving an
+object that other rows' text is drawn from (a book's title, a user's
+username) refreshes those rows too. ``rebuild_admin_search`` repopulates
+the table after bulk updates.
+On SQLite the rows feed an external-content FTS5 table, so one MATCH query
+ranks hits across all models at once and a window function keeps the best
+few of each. Other backends fall back to ``icontains`` over the same rows.
+"""
+import re
+from collections import defaultdict
+from functools import cache
+from urllib.parse import urlencode
+
+from django.db import connection
+from django.urls import NoReverseMatch, reverse
+
+from apps.catalog.search import MARK_END, MARK_START, build_match
+from . import admin_dashboard
+from .models import AdminSearchEntry
+
+FTS_TABLE = 'accounts_adminsearchentry_fts'
+ENTRY_TABLE = 'accounts_adminsearchentry'
+SEPARATOR = ' · '
+PER_MODEL = 5
+BATCH_SIZE = 500
+
+_WORD_RE = re.compile(r'\w+')
+
+SEARCH_SQL = f"""
+    WITH hits AS (
+        SELECT e.model, e.object_id, e.text, {FTS_TABLE}.rank AS rank,
+               snippet({FTS_TABLE}, 0, %s, %s, '…', 12) AS snippet
+        FROM {FTS_TABLE}
+        JOIN {ENTRY_TABLE} e ON e.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH %s
+    ), ranked AS (
+        SELECT model, object_id, text, snippet,
+               ROW_NUMBER() OVER (PARTITION BY model ORDER BY rank) AS position,
+               COUNT(*) OVER (PARTITION BY model) AS total,
+               MIN(rank) OVER (PARTITION BY model) AS best
+        FROM hits
+    )
+    SELECT model, object_id, text, snippet, total
+    FROM ranked
+    WHERE position <= %s
+    ORDER BY best, model, position
+"""
+
+_available = None
+
+
+def is_available():
+    """Return True when the FTS5 table exists on the current database."""
+    global _available
+    if _available is None:
+        if connection.vendor != 'sqlite':
+            _available = False
+        else:
+            _available = FTS_TABLE in connection.introspection.table_names()
+    return _available
+
+
+def label(model_class):
+    return f'{model_class._meta.app_label}.{model_class._meta.object_name}'
+
+
+def indexed_models():
+    """``(model_class, ModelTab)`` for every dashboard tab."""
+    found = (
+        admin_dashboard.get_tab(app_label, tab.object_name)
+        for app_label, _, _, model_tabs in admin_dashboard.TABS
+        for tab in model_tabs
+    )
+    return [item for item in found if item is not None]
+
+
+@cache
+def dependents():
+    """
+    ``{model: [(indexed model, tab, lookup path, fields)]}`` for search fields that follow relations.
+
+    Indexed rows whose lookup path leads to a saved ``model`` object take
+    text from its ``fields``, so they are refreshed when those change.
+    """
+    found = defaultdict(dict)
+    tabs = dict(indexed_models())
+    for model_class, tab in tabs.items():
+        for search_field in tab.search_fields:
+            names = search_field.split('__')
+            model = model_class
+            for depth, name in enumerate(names[:-1], 1):
+                field = model._meta.get_field(name)
+                if not field.is_relation:
+                    break
+                model = field.related_model
+                found[model].setdefault((model_class, '__'.join(names[:depth])), set()).add(names[depth])
+    return {
+        model: [(model_class, tabs[model_class], path, frozenset(fields)) for (model_class, path), fields in paths.items()]
+        for model, paths in found.items()
+    }
+
+
+def _entries(model_class, tab, pks=None, **filters):
+    """Build unsaved entries; to-many search fields are merged into one row per object."""
+    queryset = model_class._default_manager.order_by().filter(**filters)
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    texts = {}
+    for pk, *values in queryset.values_list('pk', *tab.search_fields):
+        parts = texts.setdefault(pk, [])
+        for value in values:
+            value = str(value) if value is not None else ''
+            if value and value not in parts:
+                parts.append(value)
+    name = label(model_class)
+    return [
+        AdminSearchEntry(model=name, object_id=pk, text=SEPARATOR.join(parts))
+        for pk, parts in texts.items()
+    ]
+
+
+def _upsert(entries):
+    AdminSearchEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, update_conflicts=True,
+        unique_fields=['model', 'object_id'], update_fields=['text', 'updated_at'],
+    )
+
+
+def index(model_class, pks):
+    """(Re)index the given objects of ``model_class`` if it has a dashboard tab."""
+    found = admin_dashboard.get_tab(model_class._meta.app_label, model_class._meta.object_name)
+    if found is None:
+        return
+    _upsert(_entries(model_class, found[1], pks))
+
+
+def index_dependents(model_class, pk, update_fields=None):
+    """Reindex the rows whose text is drawn from the ``model_class`` object ``pk``."""
+    for dependent, tab, path, fields in dependents().get(model_class, ()):
+        if update_fields is None or fields & set(update_fields):
+            _upsert(_entries(dependent, tab, **{path: pk}))
+
+
+def remove(model_class, pks):
+    AdminSearchEntry.objects.filter(model=label(model_class), object_id__in=list(pks)).delete()
+
+
+def rebuild():
+    """Repopulate the whole index from the dashboard models. Returns the row count."""
+    AdminSearchEntry.objects.all().delete()
+    total = 0
+    for model_class, tab in indexed_models():
+        entries = _entries(model_class, tab)
+        _upsert(entries)
+        total += len(entries)
+    if is_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def _rows(words, per_model):
+    """``(model, object_id, text, snippet, total)`` rows, best groups first."""
+    if is_available():
+        with connection.cursor() as cursor:
+            cursor.execute(SEARCH_SQL, [
+                MARK_START, MARK_END, build_match([(None, [word], True) for word in words]), per_model,
+            ])
+            return cursor.fetchall()
+
+    queryset = AdminSearchEntry.objects.order_by('model', '-object_id')
+    for word in words:
+        queryset = queryset.filter(text__icontains=word)
+    grouped = {}
+    for model, object_id, text in queryset.values_list('model', 'object_id', 'text'):
+        grouped.setdefault(model, []).append((model, object_id, text, text))
+    return [
+        row + (len(group),)
+        for group in sorted(grouped.values(), key=len, reverse=True)
+        for row in group[:per_model]
+    ]
+
+
+def _change_url(model_name, object_id):
+    app_label, object_name = model_name.split('.')
+    try:
+        return reverse(f'admin:{app_label}_{object_name.lower()}_change', args=[object_id])
+    except NoReverseMatch:
+        return None
+
+
+def search(text, per_model=PER_MODEL):
+    """
+    Hits for ``text`` grouped by model, best-matching model first.
+
+    Each group is ``{'key', 'name', 'icon', 'count', 'more_url', 'hits'}``;
+    ``more_url`` drills down into the model's changelist search and each hit
+    is ``{'id', 'label', 'snippet', 'url'}`` (pass snippets through
+    ``catalog.search.highlight()``).
+    """
+    words = _WORD_RE.findall(text or '')
+    if not words:
+        return []
+    tabs = {model['key']: model for app in admin_dashboard.tabs() for model in app['models']}
+    groups = {}
+    for model, object_id, entry_text, snippet, total in _rows(words, per_model):
+        tab = tabs.get(model)
+        if tab is None:
+            continue
+        group = groups.get(model)
+        if group is None:
+            more_url = tab['admin_url']
+            if more_url:
+                more_url = f"{more_url}?{urlencode({'q': ' '.join(words)})}"
+            group = groups[model] = {
+                'key': model, 'name': tab['name'], 'icon': tab['icon'],
+                'count': total, 'more_url': more_url, 'hits': [],
+            }
+        group['hits'].append({
+            'id': object_id,
+            'label': entry_text.split(SEPARATOR, 1)[0],
+            'snippet': snippet,
+            'url': _change_url(model, object_id),
+        })
+    return list(groups.values())
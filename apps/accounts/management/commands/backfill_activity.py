@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.accounts import activity
+from apps.accounts.models import LibraryUser
+from apps.circulation.models import Attendance, Fine, Loan, Reservation
+from apps.events.models import EventRegistration
+from apps.repository.models import EBookPermission
+
+BATCH_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = 'Populate the activity timeline from existing loans, visits, reservations, fines and registrations'
+
+    def record(self, label, entries):
+        batch, total = [], 0
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) == BATCH_SIZE:
+                total += activity.record(batch)
+                batch = []
+        total += activity.record(batch)
+        self.stdout.write(f'{label}: {total}')
+
+    def handle(self, *args, **options):
+        self.record('Returned loans', (
+            activity.loan_returned(loan, loan.book_copy.book.title)
+            for loan in Loan.objects.filter(status='returned')
+            .select_related('book_copy__book').iterator(chunk_size=BATCH_SIZE)
+        ))
+
+        # Visitors without a linked account are matched on their registration number
+        numbers = {}
+        for pk, student_id, faculty_id in LibraryUser.objects.filter(
+            Q(student_id__gt='') | Q(faculty_id__gt='')
+        ).values_list('pk', 'student_id', 'faculty_id'):
+            for number in (student_id, faculty_id):
+                if number:
+                    numbers.setdefault(number, pk)
+        self.record('Library visits', (
+            activity.library_visit(visit, visit.user_id or numbers.get(visit.registration_number))
+            for visit in Attendance.objects.iterator(chunk_size=BATCH_SIZE)
+        ))
+
+        self.record('Reservations', (
+            activity.reservation_closed(reservation, reservation.book.title)
+            for reservation in Reservation.objects.filter(status__in=('fulfilled', 'cancelled'))
+            .select_related('book').iterator(chunk_size=BATCH_SIZE)
+        ))
+        self.record('Paid fines', (
+            activity.fine_paid(fine, fine.loan.user_id, fine.loan.book_copy.book.title)
+            for fine in Fine.objects.filter(status='paid')
+            .select_related('loan__book_copy__book').iterator(chunk_size=BATCH_SIZE)
+        ))
+        self.record('Event registrations', (
+            activity.event_registration(registration, registration.event.title)
+            for registration in EventRegistration.objects.select_related('event').iterator(chunk_size=BATCH_SIZE)
+        ))
+        self.record('eBook permissions', (
+            activity.ebook_access(permission, permission.ebook.title)
+            for permission in EBookPermission.objects.filter(granted=True, ebook__isnull=False)
+            .select_related('ebook').iterator(chunk_size=BATCH_SIZE)
+        ))
+        self.stdout.write(self.style.SUCCESS('Activity timeline backfilled'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.accounts import admin_search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the admin dashboard search index for every dashboard model'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding admin search index...')
+        count = admin_search.rebuild()
+        if not admin_search.is_available():
+            self.stdout.write(self.style.WARNING('Full-text search requires SQLite with FTS5; using fallback lookups'))
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} objects'))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Date and time when the record was created')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Date and time when the record was last updated')),
+                ('kind', models.CharField(choices=[('loan_returned', 'Book Returned'), ('library_visit', 'Library Visit'), ('reservation_fulfilled', 'Reservation fulfilled'), ('reservation_cancelled', 'Reservation cancelled'), ('fine_paid', 'Fine Paid'), ('event_registration', 'Event Registration'), ('ebook_access', 'eBook Access Granted')], help_text='Type of event', max_length=30)),
+                ('object_id', models.PositiveBigIntegerField(help_text='Primary key of the row the event happened to')),
+                ('description', models.CharField(help_text='Rendered timeline text', max_length=255)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now, help_text='When the event happened')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Activity Entry',
+                'verbose_name_plural': 'Activity Entries',
+                'ordering': ['-timestamp', '-id'],
+                'indexes': [models.Index(fields=['user', 'timestamp'], name='accounts_ac_user_id_237a1d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_activity_per_event')],
+            },
+        ),
+    ]
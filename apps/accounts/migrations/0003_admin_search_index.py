@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:17
+
+from django.db import migrations, models
+
+FTS_TABLE = 'accounts_adminsearchentry_fts'
+ENTRY_TABLE = 'accounts_adminsearchentry'
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"text, content='{ENTRY_TABLE}', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    # External-content FTS: triggers keep it in step with every write
+    schema_editor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {ENTRY_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END
+    """)
+    schema_editor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {ENTRY_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+    """)
+    schema_editor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF text ON {ENTRY_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END
+    """)
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for suffix in ('ai', 'ad', 'au'):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_activity_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdminSearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Date and time when the record was created')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Date and time when the record was last updated')),
+                ('model', models.CharField(help_text='app_label.ModelName of the indexed row', max_length=100)),
+                ('object_id', models.PositiveBigIntegerField(help_text='Primary key of the indexed row')),
+                ('text', models.TextField(help_text='Searchable text')),
+            ],
+            options={
+                'verbose_name': 'Admin Search Entry',
+                'verbose_name_plural': 'Admin Search Entries',
+                'constraints': [models.UniqueConstraint(fields=('model', 'object_id'), name='unique_admin_search_entry')],
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
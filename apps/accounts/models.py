@@ -249,4 +249,85 @@ class StudyRoomBooking(BaseModel):
         verbose_name = "Study Room Booking"
         verbose_name_plural = "Study Room Bookings"
         ordering = ['date', 'start_time']
-        unique_together = ('room', 'date', 'start_time')  # Prevent double booking same time slot
\ No newline at end of file
+        unique_together = ('room', 'date', 'start_time')  # Prevent double booking same time slot
+
+class ActivityEntry(BaseModel):
+    """
+    One line of a user's activity timeline.
+
+    Entries are append-only and written when the event happens, with the
+    display text already rendered, so a timeline is a single indexed query.
+    ``(kind, object_id)`` is unique, which makes recording an event twice a no-op.
+    """
+    KIND_CHOICES = [
+        ('loan_returned', 'Book Returned'),
+        ('library_visit', 'Library Visit'),
+        ('reservation_fulfilled', 'Reservation fulfilled'),
+        ('reservation_cancelled', 'Reservation cancelled'),
+        ('fine_paid', 'Fine Paid'),
+        ('event_registration', 'Event Registration'),
+        ('ebook_access', 'eBook Access Granted'),
+    ]
+    ICONS = {
+        'loan_returned': ('bi-check-circle', 'bg-success'),
+        'library_visit': ('bi-clock', 'bg-info'),
+        'reservation_fulfilled': ('bi-bookmark', 'bg-primary'),
+        'reservation_cancelled': ('bi-x-circle', 'bg-warning'),
+        'fine_paid': ('bi-credit-card', 'bg-warning'),
+        'event_registration': ('bi-calendar-event', 'bg-info'),
+        'ebook_access': ('bi-file-earmark-check', 'bg-success'),
+    }
+
+    user = models.ForeignKey(LibraryUser, on_delete=models.CASCADE, related_name='activity')
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES, help_text="Type of event")
+    object_id = models.PositiveBigIntegerField(help_text="Primary key of the row the event happened to")
+    description = models.CharField(max_length=255, help_text="Rendered timeline text")
+    timestamp = models.DateTimeField(default=timezone.now, help_text="When the event happened")
+
+    @property
+    def title(self):
+        return self.get_kind_display()
+
+    @property
+    def icon(self):
+        return self.ICONS[self.kind][0]
+
+    @property
+    def icon_bg(self):
+        return self.ICONS[self.kind][1]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.get_kind_display()}"
+
+    class Meta:
+        verbose_name = "Activity Entry"
+        verbose_name_plural = "Activity Entries"
+        ordering = ['-timestamp', '-id']
+        indexes = [
+            models.Index(fields=['user', 'timestamp']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_activity_per_event'),
+        ]
+
+
+class AdminSearchEntry(BaseModel):
+    """
+    One searchable row of the admin dashboard's cross-model search.
+
+    ``text`` holds the row's searchable columns; on SQLite an FTS5 table
+    (``accounts_adminsearchentry_fts``) mirrors it through triggers.
+    """
+    model = models.CharField(max_length=100, help_text="app_label.ModelName of the indexed row")
+    object_id = models.PositiveBigIntegerField(help_text="Primary key of the indexed row")
+    text = models.TextField(help_text="Searchable text")
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}"
+
+    class Meta:
+        verbose_name = "Admin Search Entry"
+        verbose_name_plural = "Admin Search Entries"
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id'], name='unique_admin_search_entry'),
+        ]
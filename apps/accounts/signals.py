@@ -0,0 +1,90 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.catalog.models import BookCopy
+from apps.circulation.models import Attendance, Fine, Loan, Reservation
+from apps.events.models import EventRegistration
+from apps.repository.models import EBookPermission
+from . import activity, admin_search
+from .models import LibraryUser
+
+
+@receiver(post_save, sender=Loan)
+def record_loan_return(sender, instance, raw=False, **kwargs):
+    """Add returns saved outside the circulation services to the timeline."""
+    if not raw and instance.status == 'returned':
+        title = BookCopy.objects.filter(pk=instance.book_copy_id).values_list('book__title', flat=True).first()
+        activity.record([activity.loan_returned(instance, title)])
+
+
+@receiver(post_save, sender=Attendance)
+def record_library_visit(sender, instance, created, raw=False, **kwargs):
+    """Add check-ins to the timeline of the visitor's account, if they have one."""
+    if raw or not created:
+        return
+    user_id = instance.user_id
+    if user_id is None and instance.registration_number:
+        number = instance.registration_number
+        user_id = LibraryUser.objects.filter(
+            Q(student_id=number) | Q(faculty_id=number)
+        ).values_list('pk', flat=True).first()
+    if user_id is not None:
+        activity.record([activity.library_visit(instance, user_id)])
+
+
+@receiver(post_save, sender=Reservation)
+def record_reservation_closed(sender, instance, raw=False, **kwargs):
+    if not raw and instance.status in ('fulfilled', 'cancelled'):
+        activity.record([activity.reservation_closed(instance, instance.book.title)])
+
+
+@receiver(post_save, sender=Fine)
+def record_fine_payment(sender, instance, raw=False, **kwargs):
+    if not raw and instance.status == 'paid':
+        user_id, title = Loan.objects.filter(pk=instance.loan_id).values_list(
+            'user_id', 'book_copy__book__title'
+        ).first() or (None, None)
+        activity.record([activity.fine_paid(instance, user_id, title)])
+
+
+@receiver(post_save, sender=EventRegistration)
+def record_event_registration(sender, instance, created, raw=False, **kwargs):
+    if not raw and created:
+        activity.record([activity.event_registration(instance, instance.event.title)])
+
+
+@receiver(post_save, sender=EBookPermission)
+def record_ebook_access(sender, instance, raw=False, **kwargs):
+    if not raw and instance.granted and instance.ebook_id:
+        activity.record([activity.ebook_access(instance, instance.ebook.title)])
+
+
+def _index_admin_search(sender, instance, raw=False, **kwargs):
+    """Refresh the admin search entry of a saved dashboard object once the save commits."""
+    if not raw:
+        transaction.on_commit(partial(admin_search.index, sender, [instance.pk]), robust=True)
+
+
+def _remove_admin_search(sender, instance, **kwargs):
+    transaction.on_commit(partial(admin_search.remove, sender, [instance.pk]), robust=True)
+
+
+def _index_admin_search_dependents(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Refresh the entries that show text from a saved object, such as a book's loans."""
+    if not raw:
+        transaction.on_commit(
+            partial(admin_search.index_dependents, sender, instance.pk, update_fields), robust=True,
+        )
+
+
+for _model, _tab in admin_search.indexed_models():
+    post_save.connect(_index_admin_search, sender=_model, dispatch_uid=f'admin_search_{_model.__name__}_save')
+    post_delete.connect(_remove_admin_search, sender=_model, dispatch_uid=f'admin_search_{_model.__name__}_delete')
+for _model in admin_search.dependents():
+    post_save.connect(
+        _index_admin_search_dependents, sender=_model, dispatch_uid=f'admin_search_{_model.__name__}_dependents',
+    )
@@ -1,3 +1,220 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.catalog.models import Book, BookCopy, Publisher
+from apps.circulation import services
+from apps.circulation.models import Attendance, Fine, Loan, Reservation
+from . import activity, admin_search
+from .models import ActivityEntry, AdminSearchEntry, LibraryUser
+
+
+class ActivityFeedTest(TestCase):
+    """Tests for the activity timeline feed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        publisher = Publisher.objects.create(name='Northern Press')
+        cls.book = Book.objects.create(
+            title='Things Fall Apart', isbn='9780000000001', publisher=publisher,
+            publication_date=date(1958, 1, 1), pages=209,
+        )
+        cls.copies = [
+            BookCopy.objects.create(book=cls.book, barcode=f'C{i}', acquisition_date=date(2020, 1, 1), location='A1')
+            for i in range(1, 4)
+        ]
+        cls.patron = LibraryUser.objects.create_user(
+            'patron', password='pass', membership_type='student', student_id='UM/001',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_events_are_recorded_once(self):
+        now = timezone.now()
+        overdue = services.checkout(self.copies[0], self.patron, now=now - timedelta(days=30))
+        loans = [services.checkout(copy, self.patron, now=now) for copy in self.copies[1:]]
+        services.return_loan(overdue, now=now - timedelta(hours=3))
+        services.batch_return([copy.barcode for copy in self.copies[1:]], now=now - timedelta(hours=2))
+
+        fine = Fine.objects.get(loan=overdue)
+        fine.status, fine.paid_date = 'paid', now - timedelta(hours=1)
+        fine.save()
+        fine.save()
+        Attendance.objects.create(registration_number='UM/001', full_name='Patron', check_in=now)
+        Reservation.objects.create(user=self.patron, book=self.book, status='cancelled', expiry_date=now)
+
+        kinds = list(ActivityEntry.objects.filter(user=self.patron).values_list('kind', flat=True))
+        self.assertEqual(sorted(kinds), sorted([
+            'loan_returned', 'loan_returned', 'loan_returned', 'fine_paid', 'library_visit', 'reservation_cancelled',
+        ]))
+        self.assertEqual(
+            set(ActivityEntry.objects.filter(kind='loan_returned').values_list('object_id', flat=True)),
+            {overdue.pk} | {loan.pk for loan in loans},
+        )
+
+        with self.assertNumQueries(1):
+            timeline = activity.recent(self.patron)
+        self.assertEqual([entry.kind for entry in timeline][:2], ['reservation_cancelled', 'library_visit'])
+        self.assertEqual(timeline[2].description, 'Paid ₦15.00 for "Things Fall Apart"')
+
+    def test_account_activity_page_is_paginated(self):
+        now = timezone.now()
+        activity.record(
+            ActivityEntry(
+                user=self.patron, kind='library_visit', object_id=i,
+                description=f'Visit {i}', timestamp=now - timedelta(hours=i),
+            )
+            for i in range(25)
+        )
+        self.client.force_login(self.patron)
+        response = self.client.get('/accounts/account-activity/', {'page': 2})
+        page = response.context['activity_page']
+        self.assertEqual((page.number, len(page)), (2, 5))
+        self.assertEqual(page[0].description, 'Visit 20')
+
+
+class AdminDashboardTest(TestCase):
+    """Tests for the cached admin dashboard and its per-model endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = LibraryUser.objects.create_superuser('admin', 'admin@test.com', 'pass')
+        cls.publisher = Publisher.objects.create(name='Northern Press')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client.force_login(self.admin)
+
+    def add_books(self, count, start=0):
+        Book.objects.bulk_create([
+            Book(title=f'Book {i}', isbn=f'978{i:010}', publisher=self.publisher,
+                 publication_date=date(2000, 1, 1), pages=100)
+            for i in range(start, start + count)
+        ])
+
+    def test_render_does_not_grow_with_rows(self):
+        self.add_books(3)
+        response = self.client.get('/accounts/admin-dashboard/')
+        catalog = next(app for app in response.context['app_list'] if app['app_label'] == 'catalog')
+        self.assertEqual(catalog['models'][0]['count'], 3)
+
+        with CaptureQueriesContext(connection) as cached:
+            self.client.get('/accounts/admin-dashboard/')
+        self.assertFalse(any('catalog_book' in query['sql'] for query in cached.captured_queries))
+
+        # Counts and recent actions are served from the cache
+        self.add_books(30, start=3)
+        with self.assertNumQueries(len(cached)):
+            response = self.client.get('/accounts/admin-dashboard/')
+        self.assertEqual(response.context['book_count'], 3)
+
+        cache.clear()
+        self.assertEqual(self.client.get('/accounts/admin-dashboard/').context['book_count'], 33)
+
+    def test_items_are_keyset_paginated(self):
+        self.add_books(12)
+        response = self.client.get('/accounts/admin-dashboard/catalog/Book/items/', {'page_size': 5})
+        titles = [row['values'][0] for row in response.json()['results']]
+        data = response.json()
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            titles += [row['values'][0] for row in data['results']]
+        self.assertEqual(titles, [f'Book {i}' for i in reversed(range(12))])
+        self.assertEqual(response.json()['results'][0]['values'][2], 'Northern Press')
+
+        data = self.client.get('/accounts/admin-dashboard/catalog/Book/items/', {'search': 'Book 1'}).json()
+        self.assertEqual([row['values'][0] for row in data['results']], ['Book 11', 'Book 10', 'Book 1'])
+        self.assertEqual(self.client.get('/accounts/admin-dashboard/catalog/Nope/items/').status_code, 404)
+
+    def test_requires_superuser(self):
+        patron = LibraryUser.objects.create_user('patron', password='pass', membership_type='student')
+        self.client.force_login(patron)
+        self.assertEqual(self.client.get('/accounts/admin-dashboard/catalog/Book/items/').status_code, 302)
+
+
+class AdminSearchTest(TestCase):
+    """Tests for the cross-model admin search index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = LibraryUser.objects.create_superuser('admin', 'admin@test.com', 'pass')
+        cls.publisher = Publisher.objects.create(name='Northern Press')
+        for i in range(7):
+            Book.objects.create(title=f'Northern Lights {i}', isbn=f'978{i:010}', publisher=cls.publisher,
+                                publication_date=date(2000, 1, 1), pages=100)
+        LibraryUser.objects.create_user('northerner', password='pass', membership_type='student')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client.force_login(self.admin)
+
+    def test_signals_keep_entries_current(self):
+        book = Book.objects.get(title='Northern Lights 0')
+        self.assertFalse(AdminSearchEntry.objects.filter(model='catalog.Book', object_id=book.pk).exists())
+        admin_search.index(Book, [book.pk])
+        entry = AdminSearchEntry.objects.get(model='catalog.Book', object_id=book.pk)
+        self.assertEqual(entry.text, f'Northern Lights 0 · {book.isbn} · Northern Press')
+
+        book.title = 'Southern Cross'
+        with self.captureOnCommitCallbacks(execute=True):
+            book.save()
+        self.assertEqual(admin_search.search('southern')[0]['hits'][0]['id'], book.pk)
+        self.assertFalse(any(hit['id'] == book.pk for group in admin_search.search('lights') for hit in group['hits']))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book.delete()
+        self.assertFalse(AdminSearchEntry.objects.filter(model='catalog.Book', object_id=book.pk).exists())
+        self.assertEqual(admin_search.search('southern'), [])
+
+    def test_related_saves_refresh_dependent_entries(self):
+        book = Book.objects.get(title='Northern Lights 0')
+        user = LibraryUser.objects.get(username='northerner')
+        copy = BookCopy.objects.create(book=book, barcode='N0', acquisition_date=date(2020, 1, 1), location='A1')
+        with self.captureOnCommitCallbacks(execute=True):
+            loan = Loan.objects.create(user=user, book_copy=copy, due_date=timezone.now())
+            fine = Fine.objects.create(loan=loan, amount=2, reason='Late')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book.title = 'Southern Cross'
+            book.save()
+            user.username = 'southerner'
+            user.save()
+        entry = AdminSearchEntry.objects.get(model='circulation.Loan', object_id=loan.pk)
+        self.assertEqual(entry.text, 'southerner · Southern Cross')
+        self.assertEqual(AdminSearchEntry.objects.get(model='circulation.Fine', object_id=fine.pk).text, 'southerner · 2.00')
+
+        # Saves that touch no searched column refresh only the object's own entry
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            user.save(update_fields=['last_login'])
+        self.assertEqual(len([query for query in queries.captured_queries if 'adminsearchentry' in query['sql']]), 1)
+
+    def test_search_groups_hits_per_model_in_one_query(self):
+        admin_search.rebuild()
+        with self.assertNumQueries(1):
+            groups = admin_search.search('north', per_model=5)
+        by_model = {group['key']: group for group in groups}
+        self.assertEqual(set(by_model), {'catalog.Book', 'catalog.Publisher', 'accounts.LibraryUser'})
+        books = by_model['catalog.Book']
+        self.assertEqual((books['count'], len(books['hits'])), (7, 5))
+        self.assertIn('?q=north', books['more_url'])
+        self.assertTrue(books['hits'][0]['url'].startswith('/admin/catalog/book/'))
+
+    def test_rebuild_and_endpoint(self):
+        self.assertEqual(admin_search.search('northern'), [])
+        self.assertEqual(admin_search.rebuild(), AdminSearchEntry.objects.count())
+
+        data = self.client.get('/accounts/admin-dashboard/search/', {'q': 'northern press'}).json()
+        publisher = next(group for group in data['groups'] if group['key'] == 'catalog.Publisher')
+        self.assertIn('<mark>Northern</mark>', publisher['hits'][0]['snippet'])
 
-# Create your tests here.
+        patron = LibraryUser.objects.get(username='northerner')
+        self.client.force_login(patron)
+        self.assertEqual(self.client.get('/accounts/admin-dashboard/search/', {'q': 'x'}).status_code, 302)
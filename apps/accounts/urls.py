@@ -12,6 +12,8 @@ urlpatterns = [
     path('register/staff/', views.staff_register_view, name='staff_register'),
     path('dashboard/', views.dashboard_view, name='dashboard'),
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-dashboard/search/', views.admin_dashboard_search, name='admin_dashboard_search'),
+    path('admin-dashboard/<str:app_label>/<str:model_name>/items/', views.admin_dashboard_items, name='admin_dashboard_items'),
     path('execute-action/', views.execute_action, name='execute_action'),
     path('import-data/<str:app_label>/<str:model_name>/', views.import_data_view, name='import_data'),
     path('export-data/<str:app_label>/<str:model_name>/', views.export_data_view, name='export_data'),
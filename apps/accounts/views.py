@@ -10,9 +10,14 @@ from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
 from datetime import datetime, time
-from .models import LibraryUser, StudyRoom, StudyRoomBooking
+from . import activity
+from . import admin_dashboard as admin_dashboard_data
+from . import admin_search
+from .models import ActivityEntry, LibraryUser, StudyRoom, StudyRoomBooking
 from .forms import LibraryUserCreationForm, LibraryUserChangeForm
+from apps.analytics import popularity
 from apps.catalog.models import Book, Genre
+from apps.catalog.search import highlight
 from apps.events.models import Event
 from apps.repository.models import EBook
 from django.apps import apps as django_apps
@@ -26,104 +31,10 @@ except (LookupError, ModuleNotFoundError):
 
 def generate_recent_activity(user):
     """Generate recent activity timeline for the user dashboard."""
-    from apps.circulation.models import Attendance, Fine
-    from apps.events.models import EventRegistration
-    from apps.repository.models import EBookPermission
-    from django.utils import timezone
-    from datetime import timedelta
-
-    activities = []
-
-    # Get recent loans (returned books)
-    recent_loans = user.loans.filter(status='returned').order_by('-return_date')[:2]
-    for loan in recent_loans:
-        activities.append({
-            'icon': 'bi-check-circle',
-            'icon_bg': 'bg-success',
-            'title': 'Book Returned',
-            'description': f'Returned "{loan.book_copy.book.title[:30]}..."',
-            'timestamp': loan.return_date or loan.created_at,
-            'time_ago': _get_time_ago(loan.return_date or loan.created_at),
-        })
-
-    # Get recent check-ins
-    recent_attendance = Attendance.objects.filter(
-        Q(user=user) | Q(registration_number=user.student_id) | Q(registration_number=user.faculty_id)
-    ).order_by('-check_in')[:2]
-    for attendance in recent_attendance:
-        activities.append({
-            'icon': 'bi-clock',
-            'icon_bg': 'bg-info',
-            'title': 'Library Visit',
-            'description': f'Checked in at {attendance.check_in.strftime("%I:%M %p")}',
-            'timestamp': attendance.check_in,
-            'time_ago': _get_time_ago(attendance.check_in),
-        })
-
-    # Get recent reservations
-    recent_reservations = user.reservations.filter(status__in=['fulfilled', 'cancelled']).order_by('-updated_at')[:2]
-    for reservation in recent_reservations:
-        status_text = 'Reservation fulfilled' if reservation.status == 'fulfilled' else 'Reservation cancelled'
-        activities.append({
-            'icon': 'bi-bookmark' if reservation.status == 'fulfilled' else 'bi-x-circle',
-            'icon_bg': 'bg-primary' if reservation.status == 'fulfilled' else 'bg-warning',
-            'title': status_text,
-            'description': f'"{reservation.book.title[:30]}..."',
-            'timestamp': reservation.updated_at,
-            'time_ago': _get_time_ago(reservation.updated_at),
-        })
-
-    # Get recent fines paid
-    recent_fines = Fine.objects.filter(
-        loan__user=user,
-        status='paid'
-    ).order_by('-paid_date')[:2]
-    for fine in recent_fines:
-        activities.append({
-            'icon': 'bi-credit-card',
-            'icon_bg': 'bg-warning',
-            'title': 'Fine Paid',
-            'description': f'Paid ₦{fine.amount} for "{fine.loan.book_copy.book.title[:25]}..."',
-            'timestamp': fine.paid_date,
-            'time_ago': _get_time_ago(fine.paid_date),
-        })
-
-    # Get recent event registrations
-    try:
-        recent_events = EventRegistration.objects.filter(user=user).order_by('-created_at')[:2]
-        for event_reg in recent_events:
-            activities.append({
-                'icon': 'bi-calendar-event',
-                'icon_bg': 'bg-info',
-                'title': 'Event Registration',
-                'description': f'Registered for "{event_reg.event.title[:30]}..."',
-                'timestamp': event_reg.created_at,
-                'time_ago': _get_time_ago(event_reg.created_at),
-            })
-    except:
-        pass  # Events app might not be available
-
-    # Get recent eBook permissions
-    try:
-        recent_permissions = EBookPermission.objects.filter(
-            user=user,
-            granted=True
-        ).order_by('-granted_at')[:1]
-        for perm in recent_permissions:
-            activities.append({
-                'icon': 'bi-file-earmark-check',
-                'icon_bg': 'bg-success',
-                'title': 'eBook Access Granted',
-                'description': f'Access granted to "{perm.ebook.title[:25]}..."',
-                'timestamp': perm.granted_at,
-                'time_ago': _get_time_ago(perm.granted_at),
-            })
-    except:
-        pass  # Repository app might not be available
-
-    # Sort activities by timestamp (most recent first) and limit to 4
-    activities.sort(key=lambda x: x['timestamp'], reverse=True)
-    return activities[:4]
+    entries = activity.recent(user)
+    for entry in entries:
+        entry.time_ago = _get_time_ago(entry.timestamp)
+    return entries
 
 
 def _get_time_ago(timestamp):
@@ -257,30 +168,26 @@ def dashboard_view(request):
         return redirect('circulation:staff_dashboard')
     else:
         # Patron dashboard
-        from django.db.models import Count, Sum, Q
-        from datetime import datetime
-        from apps.circulation.models import Attendance, Fine
+        from django.db.models import Q
+        from apps.circulation import summary as circulation_summary
+        from apps.circulation.models import Attendance
 
         # Get current date info
         today = timezone.now().date()
         current_month = today.month
         current_year = today.year
 
-        # Calculate dynamic statistics
-        total_read_books = user.loans.filter(status='returned').count()
+        # Loan, reservation and fine counts (cached per user)
+        summary = circulation_summary.get(user)
+        total_read_books = summary.returned_loans
 
         # Books read this month (loans created this month)
-        books_this_month = user.loans.filter(
-            loan_date__year=current_year,
-            loan_date__month=current_month
-        ).count()
+        books_this_month = summary.loans_this_month
 
         # Reading goal - default to 12 books per year, 1 per month
         monthly_goal = 1
         annual_goal = 12
-        books_this_year = user.loans.filter(
-            loan_date__year=current_year
-        ).count()
+        books_this_year = summary.loans_this_year
 
         # Days visited this month
         days_visited_this_month = Attendance.objects.filter(
@@ -290,28 +197,22 @@ def dashboard_view(request):
         ).dates('check_in', 'day').count()
 
         # Calculate renewal rate (simplified - could be enhanced with actual renewal tracking)
-        total_loans = user.loans.count()
+        total_loans = summary.total_loans
         renewal_rate = 85  # Default, could calculate from loan history if renewal tracking exists
 
         # Recent fines total
-        recent_fines_total = Fine.objects.filter(
-            loan__user=user,
-            status='unpaid'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-
-        # Notifications count (pending reservations + overdue loans + unpaid fines)
-        notifications_count = (
-            user.reservations.filter(status='active').count() +
-            user.loans.filter(status='active', due_date__lt=today).count() +
-            Fine.objects.filter(loan__user=user, status='unpaid').count()
-        )
+        recent_fines_total = summary.unpaid_total
+
+        # Notifications count (reservations + overdue loans + unpaid fines)
+        notifications_count = summary.notifications
 
         # Generate recent activity
         recent_activity = generate_recent_activity(user)
 
         context = {
             'user': user,
-            'current_loans': user.loans.filter(status='active')[:5],
+            'summary': summary,
+            'current_loans': user.loans.open()[:5],
             'reservations': user.reservations.filter(status='active')[:5],
             'recent_fines': user.loans.filter(fines__status='unpaid').distinct()[:5],
             'total_read_books': total_read_books,
@@ -332,12 +233,11 @@ def dashboard_view(request):
 def admin_dashboard(request):
     """Comprehensive admin dashboard with full CRUD functionality for all models."""
     from django.apps import apps as django_apps
-    from django.core.paginator import Paginator
-    from django.db.models import Q
     from django.forms import modelform_factory
 
     # Handle CRUD operations
     if request.method == 'POST':
+        admin_dashboard_data.invalidate()
         action = request.POST.get('action')
         app_label = request.POST.get('app_label')
         model_name = request.POST.get('model_name')
@@ -419,513 +319,83 @@ def admin_dashboard(request):
             return redirect('accounts:admin_dashboard')
 
     # Pending staff approvals
-    pending_staff = LibraryUser.objects.filter(
+    pending_staff = list(LibraryUser.objects.filter(
         membership_type='staff',
         is_staff_approved=False,
         is_active=False
-    )
-
-    # Recent user registrations
-    recent_users = LibraryUser.objects.order_by('-date_joined')[:10]
-
-    # User statistics
-    total_users = LibraryUser.objects.count()
-    active_users = LibraryUser.objects.filter(is_active=True).count()
-    staff_users = LibraryUser.objects.filter(membership_type='staff', is_staff_approved=True).count()
-    faculty_users = LibraryUser.objects.filter(membership_type='faculty').count()
-    student_users = LibraryUser.objects.filter(membership_type='student').count()
-
-    # System stats
-    from apps.catalog.models import Book
-    from apps.circulation.models import Loan, Reservation, Fine
-    from apps.repository.models import EBook
-    from apps.events.models import Event
-    total_books = Book.objects.active().count()
-    document_count = EBook.objects.count()
-    event_count = Event.objects.count()
-    active_loans = Loan.objects.filter(status='active').count()
-    overdue_loans = Loan.objects.filter(status='active', due_date__lt=timezone.now().date()).count()
-    pending_reservations = Reservation.objects.filter(status='pending').count()
-
-    # System status
-    storage_usage = "65%"  # Mock value - could calculate actual storage usage
-
-    # Recent activity (enhanced with actual data)
-    recent_actions = []
-    try:
-        # Recent user registrations
-        for user in LibraryUser.objects.order_by('-date_joined')[:3]:
-            recent_actions.append({
-                'description': f'New user registered: {user.get_full_name()}',
-                'timestamp': user.date_joined,
-                'get_admin_url': reverse('admin:accounts_libraryuser_change', args=[user.id]),
-                'get_icon': 'person-plus'
-            })
-
-        # Recent loans
-        for loan in Loan.objects.order_by('-created_at')[:2]:
-            recent_actions.append({
-                'description': f'Book loan: {loan.book_copy.book.title[:30]}...',
-                'timestamp': loan.created_at,
-                'get_admin_url': reverse('admin:circulation_loan_change', args=[loan.id]),
-                'get_icon': 'book'
-            })
-
-        # Recent documents
-        for doc in EBook.objects.order_by('-upload_date')[:2]:
-            recent_actions.append({
-                'description': f'eBook uploaded: {doc.title[:30]}...',
-                'timestamp': doc.upload_date,
-                'get_admin_url': reverse('admin:repository_ebook_change', args=[doc.id]),
-                'get_icon': 'file-earmark'
-            })
-    except:
-        # Fallback to mock data
-        recent_actions = [
-            {'description': 'New user registered', 'timestamp': timezone.now() - timezone.timedelta(minutes=15), 'get_admin_url': '#', 'get_icon': 'person-plus'},
-            {'description': 'Book loan processed', 'timestamp': timezone.now() - timezone.timedelta(hours=1), 'get_admin_url': '#', 'get_icon': 'book'},
-        ]
-
-    # Import all models for comprehensive management
-    from apps.blog.models import BlogPost, StaticPage, FeaturedContent, News
-    from apps.catalog.models import Author, Publisher, Faculty, Department, Topic, Genre, BookCopy
-    from apps.circulation.models import Reservation, Fine, LoanRequest, Attendance
-    from apps.events.models import Event, EventRegistration
-    from apps.repository.models import Collection, EBook
-
-    # Get search and pagination parameters
-    search_query = request.GET.get('search', '')
-    page_number = request.GET.get('page', 1)
-    items_per_page = 10
-
-    # Build app list with full CRUD data
-    app_list = []
-
-    # Helper function to get admin actions
-    def get_admin_actions(admin_class):
-        """Extract custom actions from admin class."""
-        actions = []
-        if hasattr(admin_class, 'actions'):
-            for action in admin_class.actions:
-                # Skip default delete action
-                if action == 'delete_selected':
-                    continue
-                
-                # Handle both function references and string names
-                if callable(action):
-                    # action is already a function
-                    action_method = action
-                    action_name = getattr(action, '__name__', str(action))
-                else:
-                    # action is a string, get the method
-                    action_method = getattr(admin_class, action, None)
-                    action_name = action
-                
-                # Check if the action method has short_description
-                if action_method and hasattr(action_method, 'short_description'):
-                    actions.append({
-                        'name': action_name,
-                        'description': action_method.short_description,
-                        'method': action_method
-                    })
-        return actions
-
-    # Accounts app
-    from .admin import LibraryUserAdmin, StudyRoomAdmin, StudyRoomBookingAdmin
-    accounts_models = [
-        {
-            'name': 'Library Users',
-            'object_name': 'LibraryUser',
-            'count': LibraryUser.objects.count(),
-            'admin_url': reverse('admin:accounts_libraryuser_changelist'),
-            'add_url': reverse('admin:accounts_libraryuser_add'),
-            'icon': 'people',
-            'fields': ['username', 'first_name', 'last_name', 'email', 'membership_type', 'is_active'],
-            'actions': get_admin_actions(LibraryUserAdmin),
-            'items': _get_paginated_items(LibraryUser, search_query, page_number, items_per_page, ['username', 'first_name', 'last_name', 'email'])
-        },
-        {
-            'name': 'Study Rooms',
-            'object_name': 'StudyRoom',
-            'count': StudyRoom.objects.count(),
-            'admin_url': reverse('admin:accounts_studyroom_changelist'),
-            'add_url': reverse('admin:accounts_studyroom_add'),
-            'icon': 'house-door',
-            'fields': ['name', 'room_type', 'capacity', 'is_active'],
-            'actions': get_admin_actions(StudyRoomAdmin),
-            'items': _get_paginated_items(StudyRoom, search_query, page_number, items_per_page, ['name', 'room_type'])
-        },
-        {
-            'name': 'Study Room Bookings',
-            'object_name': 'StudyRoomBooking',
-            'count': StudyRoomBooking.objects.count(),
-            'admin_url': reverse('admin:accounts_studyroombooking_changelist'),
-            'add_url': reverse('admin:accounts_studyroombooking_add'),
-            'icon': 'calendar-check',
-            'fields': ['user', 'room', 'date', 'status'],
-            'actions': get_admin_actions(StudyRoomBookingAdmin),
-            'items': _get_paginated_items(StudyRoomBooking, search_query, page_number, items_per_page, ['user__username', 'room__name'])
-        },
-    ]
-    app_list.append({'name': 'Accounts', 'app_label': 'accounts', 'models': accounts_models, 'icon': 'people'})
-
-    # Catalog app
-    from apps.catalog.admin import BookAdmin, BookCopyAdmin, AuthorAdmin, PublisherAdmin, FacultyAdmin, DepartmentAdmin, TopicAdmin, GenreAdmin
-    catalog_models = [
-        {
-            'name': 'Books',
-            'object_name': 'Book',
-            'count': Book.objects.count(),
-            'admin_url': reverse('admin:catalog_book_changelist'),
-            'add_url': reverse('admin:catalog_book_add'),
-            'icon': 'book',
-            'fields': ['title', 'isbn', 'publisher', 'publication_date', 'pages'],
-            'actions': get_admin_actions(BookAdmin),
-            'items': _get_paginated_items(Book, search_query, page_number, items_per_page, ['title', 'isbn', 'publisher__name'])
-        },
-        {
-            'name': 'Book Copies',
-            'object_name': 'BookCopy',
-            'count': BookCopy.objects.count(),
-            'admin_url': reverse('admin:catalog_bookcopy_changelist'),
-            'add_url': reverse('admin:catalog_bookcopy_add'),
-            'icon': 'book-half',
-            'fields': ['book', 'barcode', 'condition', 'status'],
-            'actions': get_admin_actions(BookCopyAdmin),
-            'items': _get_paginated_items(BookCopy, search_query, page_number, items_per_page, ['book__title', 'barcode'])
-        },
-        {
-            'name': 'Authors',
-            'object_name': 'Author',
-            'count': Author.objects.count(),
-            'admin_url': reverse('admin:catalog_author_changelist'),
-            'add_url': reverse('admin:catalog_author_add'),
-            'icon': 'person',
-            'fields': ['name', 'bio'],
-            'actions': get_admin_actions(AuthorAdmin),
-            'items': _get_paginated_items(Author, search_query, page_number, items_per_page, ['name'])
-        },
-        {
-            'name': 'Publishers',
-            'object_name': 'Publisher',
-            'count': Publisher.objects.count(),
-            'admin_url': reverse('admin:catalog_publisher_changelist'),
-            'add_url': reverse('admin:catalog_publisher_add'),
-            'icon': 'building',
-            'fields': ['name', 'address', 'website'],
-            'actions': get_admin_actions(PublisherAdmin),
-            'items': _get_paginated_items(Publisher, search_query, page_number, items_per_page, ['name'])
-        },
-        {
-            'name': 'Faculties',
-            'object_name': 'Faculty',
-            'count': Faculty.objects.count(),
-            'admin_url': reverse('admin:catalog_faculty_changelist'),
-            'add_url': reverse('admin:catalog_faculty_add'),
-            'icon': 'building',
-            'fields': ['name', 'description', 'code'],
-            'actions': get_admin_actions(FacultyAdmin),
-            'items': _get_paginated_items(Faculty, search_query, page_number, items_per_page, ['name', 'code'])
-        },
-        {
-            'name': 'Departments',
-            'object_name': 'Department',
-            'count': Department.objects.count(),
-            'admin_url': reverse('admin:catalog_department_changelist'),
-            'add_url': reverse('admin:catalog_department_add'),
-            'icon': 'diagram-3',
-            'fields': ['name', 'faculty', 'code'],
-            'actions': get_admin_actions(DepartmentAdmin),
-            'items': _get_paginated_items(Department, search_query, page_number, items_per_page, ['name', 'faculty__name'])
-        },
-        {
-            'name': 'Topics',
-            'object_name': 'Topic',
-            'count': Topic.objects.count(),
-            'admin_url': reverse('admin:catalog_topic_changelist'),
-            'add_url': reverse('admin:catalog_topic_add'),
-            'icon': 'tags',
-            'fields': ['name', 'department', 'code'],
-            'actions': get_admin_actions(TopicAdmin),
-            'items': _get_paginated_items(Topic, search_query, page_number, items_per_page, ['name', 'department__name'])
-        },
-        {
-            'name': 'Genres',
-            'object_name': 'Genre',
-            'count': Genre.objects.count(),
-            'admin_url': reverse('admin:catalog_genre_changelist'),
-            'add_url': reverse('admin:catalog_genre_add'),
-            'icon': 'tag',
-            'fields': ['name', 'description'],
-            'actions': get_admin_actions(GenreAdmin),
-            'items': _get_paginated_items(Genre, search_query, page_number, items_per_page, ['name'])
-        },
-    ]
-    app_list.append({'name': 'Catalog', 'app_label': 'catalog', 'models': catalog_models, 'icon': 'book'})
-
-    # Circulation app
-    from apps.circulation.admin import LoanAdmin, ReservationAdmin, FineAdmin, LoanRequestAdmin, AttendanceAdmin
-    circulation_models = [
-        {
-            'name': 'Loans',
-            'object_name': 'Loan',
-            'count': Loan.objects.count(),
-            'admin_url': reverse('admin:circulation_loan_changelist'),
-            'add_url': None,
-            'icon': 'arrow-left-right',
-            'fields': ['user', 'book_copy', 'loan_date', 'due_date', 'status'],
-            'actions': get_admin_actions(LoanAdmin),
-            'items': _get_paginated_items(Loan, search_query, page_number, items_per_page, ['user__username', 'book_copy__book__title'])
-        },
-        {
-            'name': 'Reservations',
-            'object_name': 'Reservation',
-            'count': Reservation.objects.count(),
-            'admin_url': reverse('admin:circulation_reservation_changelist'),
-            'add_url': None,
-            'icon': 'bookmark',
-            'fields': ['user', 'book', 'reservation_date', 'status'],
-            'actions': get_admin_actions(ReservationAdmin),
-            'items': _get_paginated_items(Reservation, search_query, page_number, items_per_page, ['user__username', 'book__title'])
-        },
-        {
-            'name': 'Loan Requests',
-            'object_name': 'LoanRequest',
-            'count': LoanRequest.objects.count(),
-            'admin_url': reverse('admin:circulation_loanrequest_changelist'),
-            'add_url': None,
-            'icon': 'clipboard-check',
-            'fields': ['user', 'book_copy', 'request_date', 'status'],
-            'actions': get_admin_actions(LoanRequestAdmin),
-            'items': _get_paginated_items(LoanRequest, search_query, page_number, items_per_page, ['user__username', 'book_copy__book__title'])
-        },
-        {
-            'name': 'Fines',
-            'object_name': 'Fine',
-            'count': Fine.objects.count(),
-            'admin_url': reverse('admin:circulation_fine_changelist'),
-            'add_url': None,
-            'icon': 'cash',
-            'fields': ['loan', 'amount', 'reason', 'status'],
-            'actions': get_admin_actions(FineAdmin),
-            'items': _get_paginated_items(Fine, search_query, page_number, items_per_page, ['loan__user__username', 'amount'])
-        },
-        {
-            'name': 'Attendance',
-            'object_name': 'Attendance',
-            'count': Attendance.objects.count(),
-            'admin_url': reverse('admin:circulation_attendance_changelist'),
-            'add_url': reverse('admin:circulation_attendance_add'),
-            'icon': 'person-check',
-            'fields': ['user', 'full_name', 'check_in', 'check_out', 'status'],
-            'actions': get_admin_actions(AttendanceAdmin),
-            'items': _get_paginated_items(Attendance, search_query, page_number, items_per_page, ['full_name', 'user__username'])
-        },
-    ]
-    app_list.append({'name': 'Circulation', 'app_label': 'circulation', 'models': circulation_models, 'icon': 'arrow-left-right'})
-
-    # Blog app
-    blog_models = []
-    if BlogPost:
-        blog_models.append({
-            'name': 'Blog Posts',
-            'object_name': 'BlogPost',
-            'count': BlogPost.objects.count(),
-            'admin_url': reverse('admin:blog_blogpost_changelist'),
-            'add_url': reverse('admin:blog_blogpost_add'),
-            'icon': 'newspaper',
-            'fields': ['title', 'author', 'published_date', 'status'],
-            'items': _get_paginated_items(BlogPost, search_query, page_number, items_per_page, ['title', 'author__username'])
-        })
-    blog_models.extend([
-        {
-            'name': 'Static Pages',
-            'object_name': 'StaticPage',
-            'count': StaticPage.objects.count(),
-            'admin_url': reverse('admin:blog_staticpage_changelist'),
-            'add_url': reverse('admin:blog_staticpage_add'),
-            'icon': 'file-text',
-            'fields': ['title', 'slug', 'is_active'],
-            'items': _get_paginated_items(StaticPage, search_query, page_number, items_per_page, ['title', 'slug'])
-        },
-        {
-            'name': 'Featured Content',
-            'object_name': 'FeaturedContent',
-            'count': FeaturedContent.objects.count(),
-            'admin_url': reverse('admin:blog_featuredcontent_changelist'),
-            'add_url': reverse('admin:blog_featuredcontent_add'),
-            'icon': 'star',
-            'fields': ['title', 'is_active', 'order'],
-            'items': _get_paginated_items(FeaturedContent, search_query, page_number, items_per_page, ['title'])
-        },
-        {
-            'name': 'News',
-            'object_name': 'News',
-            'count': News.objects.count(),
-            'admin_url': reverse('admin:blog_news_changelist'),
-            'add_url': reverse('admin:blog_news_add'),
-            'icon': 'megaphone',
-            'fields': ['title', 'author', 'published_date', 'status'],
-            'items': _get_paginated_items(News, search_query, page_number, items_per_page, ['title', 'author__username'])
-        },
-    ])
-    app_list.append({'name': 'Blog', 'app_label': 'blog', 'models': blog_models, 'icon': 'newspaper'})
-
-    # Events app
-    events_models = [
-        {
-            'name': 'Events',
-            'object_name': 'Event',
-            'count': Event.objects.count(),
-            'admin_url': reverse('admin:events_event_changelist'),
-            'add_url': reverse('admin:events_event_add'),
-            'icon': 'calendar-event',
-            'fields': ['title', 'date', 'time', 'location', 'organizer'],
-            'items': _get_paginated_items(Event, search_query, page_number, items_per_page, ['title', 'organizer__username'])
-        },
-        {
-            'name': 'Event Registrations',
-            'object_name': 'EventRegistration',
-            'count': EventRegistration.objects.count(),
-            'admin_url': reverse('admin:events_eventregistration_changelist'),
-            'add_url': None,
-            'icon': 'person-plus',
-            'fields': ['event', 'user'],
-            'items': _get_paginated_items(EventRegistration, search_query, page_number, items_per_page, ['event__title', 'user__username'])
-        },
-    ]
-    app_list.append({'name': 'Events', 'app_label': 'events', 'models': events_models, 'icon': 'calendar-event'})
-
-    # Repository app
-    from apps.repository.models import EBookPermission, EBookPermissionRequest
-    repository_models = [
-        {
-            'name': 'Collections',
-            'object_name': 'Collection',
-            'count': Collection.objects.count(),
-            'admin_url': reverse('admin:repository_collection_changelist'),
-            'add_url': reverse('admin:repository_collection_add'),
-            'icon': 'collection',
-            'fields': ['name', 'description', 'curator'],
-            'items': _get_paginated_items(Collection, search_query, page_number, items_per_page, ['name', 'curator__username'])
-        },
-        {
-            'name': 'eBooks',
-            'object_name': 'EBook',
-            'count': EBook.objects.count(),
-            'admin_url': reverse('admin:repository_ebook_changelist'),
-            'add_url': reverse('admin:repository_ebook_add'),
-            'icon': 'file-earmark',
-            'fields': ['title', 'authors', 'upload_date', 'access_level', 'uploaded_by'],
-            'items': _get_paginated_items(EBook, search_query, page_number, items_per_page, ['title', 'uploaded_by__username'])
-        },
-        {
-            'name': 'eBook Permission Requests',
-            'object_name': 'EBookPermissionRequest',
-            'count': EBookPermissionRequest.objects.count(),
-            'admin_url': reverse('repository:review_requests'),
-            'add_url': None,
-            'icon': 'clipboard-check',
-            'fields': ['ebook', 'user', 'status', 'requested_at'],
-            'items': _get_paginated_items(EBookPermissionRequest, search_query, page_number, items_per_page, ['ebook__title', 'user__username'])
-        },
-        {
-            'name': 'eBook Permissions',
-            'object_name': 'EBookPermission',
-            'count': EBookPermission.objects.count(),
-            'admin_url': reverse('admin:repository_ebookpermission_changelist'),
-            'add_url': reverse('admin:repository_ebookpermission_add'),
-            'icon': 'shield-check',
-            'fields': ['ebook', 'user', 'granted', 'granted_by', 'granted_at'],
-            'items': _get_paginated_items(EBookPermission, search_query, page_number, items_per_page, ['ebook__title', 'user__username'])
-        },
+    ))
+
+    # Counts come from a cached snapshot; each model's rows load on demand
+    counts = admin_dashboard_data.snapshot()
+    model_counts = counts['model_counts']
+    app_list = [
+        dict(app, models=[dict(model, count=model_counts.get(model['key'], 0)) for model in app['models']])
+        for app in admin_dashboard_data.tabs()
     ]
-    app_list.append({'name': 'Repository', 'app_label': 'repository', 'models': repository_models, 'icon': 'file-earmark'})
 
-    # Collect data for all modules (limited for performance)
     context = {
         # Welcome and stats
-        'user_count': total_users,
-        'book_count': total_books,
-        'document_count': document_count,
-        'event_count': event_count,
-        'active_users': active_users,
-        'overdue_loans': overdue_loans,
-        'pending_reservations': pending_reservations,
-        'storage_usage': storage_usage,
-        'recent_actions': recent_actions,
+        'user_count': counts['total_users'],
+        'book_count': counts['total_books'],
+        'document_count': counts['document_count'],
+        'event_count': counts['event_count'],
+        'active_users': counts['active_users'],
+        'overdue_loans': counts['overdue_loans'],
+        'pending_reservations': counts['pending_reservations'],
+        'storage_usage': "65%",  # Mock value - could calculate actual storage usage
+        'recent_actions': admin_dashboard_data.recent_actions(),
+        'counts_taken_at': counts['taken_at'],
 
         # User management
         'pending_staff': pending_staff,
-        'recent_users': recent_users,
-        'total_users': total_users,
-        'active_users_count': active_users,
-        'staff_users': staff_users,
-        'faculty_users': faculty_users,
-        'student_users': student_users,
-        'total_books': total_books,
-        'active_loans': active_loans,
+        'total_users': counts['total_users'],
+        'active_users_count': counts['active_users'],
+        'staff_users': counts['staff_users'],
+        'faculty_users': counts['faculty_users'],
+        'student_users': counts['student_users'],
+        'total_books': counts['total_books'],
+        'active_loans': counts['active_loans'],
 
-        # Apps and models with full CRUD data
         'app_list': app_list,
-        'search_query': search_query,
-
-        # Legacy data for backward compatibility
-        'study_rooms': StudyRoom.objects.all()[:20],
-        'study_room_bookings': StudyRoomBooking.objects.order_by('-created_at')[:20],
-        'blog_posts': BlogPost.objects.order_by('-created_at')[:20] if BlogPost else [],
-        'static_pages': StaticPage.objects.all()[:20],
-        'featured_content': FeaturedContent.objects.order_by('-created_at')[:20],
-        'news_items': News.objects.order_by('-created_at')[:20],
-        'authors': Author.objects.order_by('-created_at')[:20],
-        'publishers': Publisher.objects.all()[:20],
-        'faculties': Faculty.objects.all(),
-        'departments': Department.objects.all()[:20],
-        'topics': Topic.objects.all()[:20],
-        'genres': Genre.objects.all(),
-        'books': Book.objects.order_by('-created_at')[:20],
-        'book_copies': BookCopy.objects.order_by('-created_at')[:20],
-        'loans': Loan.objects.order_by('-created_at')[:20],
-        'reservations': Reservation.objects.order_by('-created_at')[:20],
-        'loan_requests': LoanRequest.objects.order_by('-created_at')[:20],
-        'fines': Fine.objects.order_by('-created_at')[:20],
-        'attendance_records': Attendance.objects.order_by('-created_at')[:20],
-        'events': Event.objects.order_by('-created_at')[:20],
-        'event_registrations': EventRegistration.objects.order_by('-created_at')[:20],
-        'collections': Collection.objects.all()[:20],
-        'documents': EBook.objects.order_by('-upload_date')[:20],
     }
     return render(request, 'accounts/admin_dashboard.html', context)
 
 
-def _get_paginated_items(model_class, search_query, page_number, items_per_page, search_fields):
-    """Helper function to get paginated items with search functionality."""
-    from django.core.paginator import Paginator
-    from django.db.models import Q
-
-    queryset = model_class.objects.all()
-
-    # Apply search filter
-    if search_query:
-        q_objects = Q()
-        for field in search_fields:
-            q_objects |= Q(**{f"{field}__icontains": search_query})
-        queryset = queryset.filter(q_objects)
-
-    # Apply ordering
-    if hasattr(model_class, '_meta') and model_class._meta.ordering:
-        queryset = queryset.order_by(*model_class._meta.ordering)
-    else:
-        queryset = queryset.order_by('-id')
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+def admin_dashboard_items(request, app_label, model_name):
+    """One keyset page of a dashboard model tab, as JSON."""
+    found = admin_dashboard_data.get_tab(app_label, model_name)
+    if found is None:
+        return JsonResponse({'error': 'Unknown model'}, status=404)
+    model_class, tab = found
 
-    # Paginate
-    paginator = Paginator(queryset, items_per_page)
     try:
-        page_obj = paginator.page(page_number)
-    except:
-        page_obj = paginator.page(1)
+        cursor = int(request.GET['cursor']) if request.GET.get('cursor') else None
+        page_size = int(request.GET.get('page_size', admin_dashboard_data.PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    page_size = max(1, min(page_size, admin_dashboard_data.MAX_PAGE_SIZE))
+    search = request.GET.get('search', '').strip()
+
+    rows, next_cursor = admin_dashboard_data.page(model_class, tab, search, cursor, page_size)
+    next_url = None
+    if next_cursor is not None:
+        query = request.GET.copy()
+        query['cursor'] = next_cursor
+        next_url = f'{request.path}?{query.urlencode()}'
+    return JsonResponse({'fields': tab.fields, 'results': rows, 'next': next_url})
+
 
-    return page_obj
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+def admin_dashboard_search(request):
+    """Ranked hits across every dashboard model, grouped per model, as JSON."""
+    groups = admin_search.search(request.GET.get('q', '').strip())
+    for group in groups:
+        for hit in group['hits']:
+            hit['snippet'] = highlight(hit['snippet'])
+    return JsonResponse({'groups': groups})
 
 
 @login_required
@@ -1225,15 +695,20 @@ def security_settings_view(request):
 @login_required
 def account_activity_view(request):
     """View account activity and active sessions."""
-    # Get recent activity (simplified - would need actual session tracking)
     from django.contrib.sessions.models import Session
+    from django.core.paginator import Paginator
     from django.utils import timezone
     
     # Get active sessions (simplified - in real app, you'd track sessions better)
     sessions = Session.objects.filter(expire_date__gt=timezone.now())
+
+    # Library activity comes from the user's timeline feed
+    entries = ActivityEntry.objects.filter(user=request.user).order_by('-timestamp', '-id')
+    activity_page = Paginator(entries, 20).get_page(request.GET.get('page'))
     
     context = {
         'sessions': sessions[:10],  # Last 10 sessions
+        'activity_page': activity_page,
         'last_activity': request.user.last_activity,
         'failed_attempts': request.user.failed_login_attempts,
         'locked_until': request.user.locked_until,
@@ -1340,8 +815,8 @@ class StaffDirectoryView(ListView):
 
 def home_view(request):
     """Public home dashboard showing library overview, news, quick search, and promotional content."""
-    # Featured books (most popular based on copies or recent)
-    featured_books = Book.objects.active().prefetch_related('authors', 'genre')[:6]
+    # Featured books: this week's most popular, topped up from the catalogue
+    featured_books = popularity.featured_books(Book.objects.active().prefetch_related('authors', 'genre'))
 
     # Recent blog posts (safe if blog app isn't installed)
     if BlogPost is not None:
@@ -1913,6 +1388,7 @@ def delete_item(request, app_label, model_name, item_id):
 
         # Attempt deletion - let Django handle integrity constraints
         item.delete()
+        admin_dashboard_data.invalidate()
 
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({'success': True, 'message': f'{model_class._meta.verbose_name} "{display_name}" deleted'})
@@ -2060,6 +1536,7 @@ def execute_action(request):
 
         if not all([app_label, model_name, action_name, selected_items]):
             return JsonResponse({'success': False, 'error': 'Missing required parameters'})
+        admin_dashboard_data.invalidate()
 
         # Get the model and admin class
         model_class = django_apps.get_model(app_label, model_name)
@@ -2150,24 +1627,25 @@ def import_data_view(request, app_label, model_name):
     try:
         model_class = django_apps.get_model(app_label, model_name)
 
-        # Get the resource class from the admin
-        if app_label == 'catalog' and model_name == 'Book':
-            from apps.catalog.admin import BookAdmin, BookResource
-            resource_class = BookResource
-        else:
-            # For other models, try to create a basic resource
-            from import_export import resources
-            resource_class = resources.ModelResource
-            resource_class.Meta.model = model_class
-
-        # Create resource instance
-        resource = resource_class()
-
         # Get the uploaded file
         import_file = request.FILES.get('import_file')
         if not import_file:
             return JsonResponse({'success': False, 'error': 'No file uploaded'})
 
+        # Books are streamed through the bulk importer in a single pass
+        if app_label == 'catalog' and model_name == 'Book':
+            if request.POST.get('input_format', 'csv') != 'csv':
+                return JsonResponse({'success': False, 'error': 'Unsupported format'})
+            return _import_books(request, import_file)
+
+        # For other models, try to create a basic resource
+        from import_export import resources
+        resource_class = resources.ModelResource
+        resource_class.Meta.model = model_class
+
+        # Create resource instance
+        resource = resource_class()
+
         # Import the data
         from import_export.results import Result
         from io import StringIO
@@ -2206,6 +1684,56 @@ def import_data_view(request, app_label, model_name):
         return JsonResponse({'success': False, 'error': str(e)})
 
 
+def _import_books(request, import_file):
+    """Stream an uploaded book CSV through the catalog importer."""
+    import io
+    from apps.catalog.importer import BookImporter
+
+    chunks = []
+
+    def progress(result):
+        # Running totals after each committed chunk, so a failed upload shows how far it got
+        chunks.append({
+            'chunk': result.chunks,
+            'rows': result.rows,
+            'new': result.created,
+            'update': result.updated,
+            'skip': result.skipped,
+            'error': result.error_count,
+        })
+
+    stream = io.TextIOWrapper(import_file.file, encoding='utf-8-sig', newline='')
+    importer = BookImporter(update_existing=request.POST.get('skip_existing') != 'on', progress=progress)
+    try:
+        result = importer.run(stream)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'Import stopped after {len(chunks)} chunks: {e}',
+            'chunks': chunks,
+        })
+
+    response = {
+        'success': not result.has_errors,
+        'message': (
+            f'Successfully imported {result.created} new records, updated {result.updated} records '
+            f'in {len(chunks)} chunks.'
+        ),
+        'chunks': chunks,
+        'totals': {
+            'rows': result.rows,
+            'new': result.created,
+            'update': result.updated,
+            'skip': result.skipped,
+            'error': result.error_count,
+        },
+    }
+    if result.has_errors:
+        response['error'] = f'{result.error_count} rows could not be imported'
+        response['details'] = [f'Row {line}: {message}' for line, message in result.errors]
+    return JsonResponse(response)
+
+
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def export_data_view(request, app_label, model_name):
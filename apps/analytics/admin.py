@@ -1,9 +1,10 @@
 from django.contrib import admin
-from django.db.models import Count, Sum, Avg
+from django.db.models import Count, Sum, Avg, Max, Min
 from django.utils import timezone
 from django.urls import reverse
 from django.utils.html import format_html
-from .models import AnalyticsEvent, DailyStats, PopularItem, SystemHealth
+from . import popularity, rollups
+from .models import AnalyticsEvent, DailyStats, PopularItem, PopularItemDay, SystemHealth
 
 
 @admin.register(AnalyticsEvent)
@@ -123,7 +124,7 @@ class DailyStatsAdmin(admin.ModelAdmin):
             'fields': ('total_books', 'available_books', 'checked_out_books')
         }),
         ('Circulation Statistics', {
-            'fields': ('total_loans', 'active_loans', 'overdue_loans', 'returned_today')
+            'fields': ('total_loans', 'new_loans', 'active_loans', 'overdue_loans', 'returned_today')
         }),
         ('Repository Statistics', {
             'fields': ('total_documents', 'document_downloads')
@@ -152,8 +153,8 @@ class DailyStatsAdmin(admin.ModelAdmin):
     def loan_stats(self, obj):
         """Display loan statistics summary."""
         return format_html(
-            'Total: {}<br>Active: {}<br>Overdue: {}<br>Returned: {}',
-            obj.total_loans, obj.active_loans, obj.overdue_loans, obj.returned_today
+            'Total: {}<br>New: {}<br>Active: {}<br>Overdue: {}<br>Returned: {}',
+            obj.total_loans, obj.new_loans, obj.active_loans, obj.overdue_loans, obj.returned_today
         )
     loan_stats.short_description = 'Loans'
 
@@ -173,62 +174,14 @@ class DailyStatsAdmin(admin.ModelAdmin):
     actions = ['recalculate_stats']
 
     def recalculate_stats(self, request, queryset):
-        """Recalculate statistics for selected dates."""
-        from django.apps import apps
-        from django.db.models import Q
-
-        updated = 0
-        for stat in queryset:
-            # Recalculate user stats
-            LibraryUser = apps.get_model('accounts', 'LibraryUser')
-            stat.total_users = LibraryUser.objects.count()
-            stat.active_users = LibraryUser.objects.filter(
-                last_login__date__gte=stat.date - timezone.timedelta(days=30)
-            ).count()
-            stat.new_users = LibraryUser.objects.filter(
-                date_joined__date=stat.date
-            ).count()
-
-            # Recalculate book stats
-            Book = apps.get_model('catalog', 'Book')
-            BookCopy = apps.get_model('catalog', 'BookCopy')
-            stat.total_books = Book.objects.active().count()
-            stat.available_books = BookCopy.objects.filter(status='available').count()
-            stat.checked_out_books = BookCopy.objects.filter(status='checked_out').count()
-
-            # Recalculate loan stats
-            Loan = apps.get_model('circulation', 'Loan')
-            stat.total_loans = Loan.objects.count()
-            stat.active_loans = Loan.objects.filter(status='active').count()
-            stat.overdue_loans = Loan.objects.filter(
-                status='active',
-                due_date__date__lt=stat.date
-            ).count()
-            stat.returned_today = Loan.objects.filter(
-                status='returned',
-                return_date__date=stat.date
-            ).count()
-
-            # Recalculate activity stats
-            stat.page_views = AnalyticsEvent.objects.filter(
-                event_type='page_view',
-                created_at__date=stat.date
-            ).count()
-            stat.searches = AnalyticsEvent.objects.filter(
-                event_type='search',
-                created_at__date=stat.date
-            ).count()
-            stat.logins = AnalyticsEvent.objects.filter(
-                event_type='login',
-                created_at__date=stat.date
-            ).count()
-
-            stat.save()
-            updated += 1
-
+        """Rebuild counters and running totals from the first to the last selected date."""
+        bounds = queryset.aggregate(start=Min('date'), end=Max('date'))
+        if bounds['start'] is None:
+            return
+        rollups.backfill(bounds['start'], bounds['end'])
         self.message_user(
             request,
-            f'Successfully recalculated statistics for {updated} days.'
+            f"Successfully recalculated statistics from {bounds['start']} to {bounds['end']}."
         )
     recalculate_stats.short_description = 'Recalculate selected statistics'
 
@@ -237,14 +190,14 @@ class DailyStatsAdmin(admin.ModelAdmin):
 class PopularItemAdmin(admin.ModelAdmin):
     """Admin interface for PopularItem model."""
     list_display = [
-        'item_type_display', 'item_link', 'total_score',
+        'item_type_display', 'item_link', 'total_score', 'decayed_score',
         'view_count', 'checkout_count', 'search_count', 'last_updated'
     ]
     list_filter = ['item_type', 'last_updated']
     search_fields = [
         'book__title', 'document__title'
     ]
-    readonly_fields = ['id', 'created_at', 'updated_at', 'total_score']
+    readonly_fields = ['id', 'created_at', 'updated_at', 'total_score', 'decayed_score']
     ordering = ['-total_score']
 
     fieldsets = (
@@ -252,7 +205,7 @@ class PopularItemAdmin(admin.ModelAdmin):
             'fields': ('item_type', 'book', 'document')
         }),
         ('Popularity Metrics', {
-            'fields': ('view_count', 'checkout_count', 'search_count', 'total_score')
+            'fields': ('view_count', 'checkout_count', 'search_count', 'total_score', 'decayed_score')
         }),
         ('Metadata', {
             'fields': ('last_updated', 'created_at'),
@@ -284,17 +237,13 @@ class PopularItemAdmin(admin.ModelAdmin):
     actions = ['update_scores', 'reset_scores']
 
     def update_scores(self, request, queryset):
-        """Update popularity scores for selected items."""
-        updated = 0
-        for item in queryset:
-            item.update_score()
-            updated += 1
-
+        """Recompute the decayed score of every item in one pass."""
+        changed = popularity.recompute()
         self.message_user(
             request,
-            f'Successfully updated popularity scores for {updated} items.'
+            f'Successfully recomputed popularity scores ({changed} items changed).'
         )
-    update_scores.short_description = 'Update popularity scores'
+    update_scores.short_description = 'Recompute decayed popularity scores'
 
     def reset_scores(self, request, queryset):
         """Reset popularity scores to zero."""
@@ -302,8 +251,11 @@ class PopularItemAdmin(admin.ModelAdmin):
             view_count=0,
             checkout_count=0,
             search_count=0,
-            total_score=0
+            total_score=0,
+            decayed_score=0
         )
+        PopularItemDay.objects.filter(item__in=queryset).delete()
+        popularity.invalidate()
         self.message_user(
             request,
             f'Successfully reset popularity scores for {updated} items.'
@@ -5,6 +5,8 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.db.models import Count, Sum, Q
 from django.utils import timezone
 from datetime import timedelta
+from config.pagination import KeysetPagination
+from . import ingest, popularity, rollups
 from .models import AnalyticsEvent, DailyStats, PopularItem, SystemHealth
 from .serializers import (
     AnalyticsEventSerializer, DailyStatsSerializer, PopularItemSerializer,
@@ -17,6 +19,7 @@ class AnalyticsEventViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = AnalyticsEvent.objects.all()
     serializer_class = AnalyticsEventSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         queryset = AnalyticsEvent.objects.all()
@@ -57,25 +60,34 @@ class DailyStatsViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 class PopularItemViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet for PopularItem model."""
-    queryset = PopularItem.objects.all()
+    """
+    ViewSet for PopularItem model.
+
+    The list is a cached leaderboard: ``item_type`` (book or document; both
+    when omitted), ``window`` (trending, day, week or month) and ``limit``.
+    """
+    queryset = PopularItem.objects.select_related('book', 'document')
     serializer_class = PopularItemSerializer
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        queryset = PopularItem.objects.all()
-        item_type = self.request.query_params.get('item_type', None)
-        limit = self.request.query_params.get('limit', 10)
-
+    def list(self, request, *args, **kwargs):
+        item_type = request.query_params.get('item_type')
+        window = request.query_params.get('window', 'trending')
         try:
-            limit = int(limit)
+            limit = min(max(int(request.query_params.get('limit', popularity.TOP_K)), 1), popularity.MAX_K)
         except ValueError:
-            limit = 10
+            limit = popularity.TOP_K
 
-        if item_type:
-            queryset = queryset.filter(item_type=item_type)
-
-        return queryset[:limit]
+        try:
+            ranked = [
+                item
+                for kind in ([item_type] if item_type else popularity.OBJECT_FIELDS)
+                for item in popularity.items(kind, window, limit)
+            ]
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        ranked.sort(key=lambda item: item.score, reverse=True)
+        return Response(self.get_serializer(ranked[:limit], many=True).data)
 
 
 class SystemHealthViewSet(viewsets.ReadOnlyModelViewSet):
@@ -110,40 +122,24 @@ def track_event(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # Create the event
-    event = AnalyticsEvent.objects.create(
-        event_type=event_type,
-        user=request.user,
-        session_id=request.session.session_key,
-        ip_address=request.META.get('REMOTE_ADDR'),
-        user_agent=request.META.get('HTTP_USER_AGENT'),
+    if event_type not in ingest.EVENT_TYPES:
+        return Response(
+            {'error': f'Unknown event_type: {event_type}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Queue the event; the ingestion buffer writes it with the next batch
+    queued = ingest.enqueue(ingest.event_from_request(
+        request, event_type,
         page_url=request.data.get('page_url'),
         search_query=request.data.get('search_query'),
         referrer=request.data.get('referrer'),
+        book_id=request.data.get('book_id'),
+        document_id=request.data.get('document_id'),
         metadata=metadata
-    )
-
-    # Associate with book or document if provided
-    if 'book_id' in request.data:
-        from apps.catalog.models import Book
-        try:
-            book = Book.objects.get(id=request.data['book_id'])
-            event.book = book
-            event.save()
-        except Book.DoesNotExist:
-            pass
-
-    if 'document_id' in request.data:
-        from apps.repository.models import Document
-        try:
-            document = Document.objects.get(id=request.data['document_id'])
-            event.document = document
-            event.save()
-        except Document.DoesNotExist:
-            pass
+    ))
 
-    serializer = AnalyticsEventSerializer(event)
-    return Response(serializer.data, status=status.HTTP_201_CREATED)
+    return Response({'event_type': event_type, 'queued': queued}, status=status.HTTP_202_ACCEPTED)
 
 
 @api_view(['GET'])
@@ -163,13 +159,8 @@ def dashboard(request):
     daily_stats = DailyStats.objects.filter(date__gte=date_from).order_by('date')
 
     # Get popular items
-    popular_books = PopularItem.objects.filter(
-        item_type='book'
-    ).order_by('-total_score')[:10]
-
-    popular_documents = PopularItem.objects.filter(
-        item_type='document'
-    ).order_by('-total_score')[:10]
+    popular_books = popularity.items('book')
+    popular_documents = popularity.items('document')
 
     # Get recent events
     recent_events = AnalyticsEvent.objects.all().order_by('-created_at')[:50]
@@ -181,17 +172,14 @@ def dashboard(request):
     from apps.accounts.models import LibraryUser
     from apps.catalog.models import Book
     from apps.circulation.models import Loan
-    from apps.repository.models import Document
+    from apps.repository.models import EBook
 
     total_users = LibraryUser.objects.count()
     total_books = Book.objects.count()
     total_loans = Loan.objects.count()
-    total_documents = Document.objects.count()
-    active_loans = Loan.objects.filter(status='active').count()
-    overdue_loans = Loan.objects.filter(
-        status='active',
-        due_date__date__lt=timezone.now().date()
-    ).count()
+    total_documents = EBook.objects.count()
+    active_loans = Loan.objects.open().count()
+    overdue_loans = Loan.objects.overdue().count()
 
     dashboard_data = {
         'daily_stats': DailyStatsSerializer(daily_stats, many=True).data,
@@ -213,96 +201,11 @@ def dashboard(request):
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
 def update_daily_stats(request):
-    """Update daily statistics (admin only)."""
-    today = timezone.now().date()
-
-    # Calculate statistics
-    from apps.accounts.models import LibraryUser
-    from apps.catalog.models import Book, BookCopy
-    from apps.circulation.models import Loan
-    from apps.repository.models import Document
-
-    total_users = LibraryUser.objects.count()
-    active_users = LibraryUser.objects.filter(
-        last_login__date__gte=today - timedelta(days=30)
-    ).count()
-    new_users = LibraryUser.objects.filter(
-        date_joined__date=today
-    ).count()
-
-    total_books = Book.objects.count()
-    available_books = BookCopy.objects.filter(status='available').count()
-    checked_out_books = BookCopy.objects.filter(status='checked_out').count()
-
-    total_loans = Loan.objects.count()
-    active_loans = Loan.objects.filter(status='active').count()
-    overdue_loans = Loan.objects.filter(
-        status='active',
-        due_date__date__lt=today
-    ).count()
-    returned_today = Loan.objects.filter(
-        status='returned',
-        return_date__date=today
-    ).count()
-
-    total_documents = Document.objects.count()
-    document_downloads = AnalyticsEvent.objects.filter(
-        event_type='download',
-        created_at__date=today
-    ).count()
-
-    page_views = AnalyticsEvent.objects.filter(
-        event_type='page_view',
-        created_at__date=today
-    ).count()
-    searches = AnalyticsEvent.objects.filter(
-        event_type='search',
-        created_at__date=today
-    ).count()
-    logins = AnalyticsEvent.objects.filter(
-        event_type='login',
-        created_at__date=today
-    ).count()
-
-    # Update or create daily stats
-    stats, created = DailyStats.objects.get_or_create(
-        date=today,
-        defaults={
-            'total_users': total_users,
-            'active_users': active_users,
-            'new_users': new_users,
-            'total_books': total_books,
-            'available_books': available_books,
-            'checked_out_books': checked_out_books,
-            'total_loans': total_loans,
-            'active_loans': active_loans,
-            'overdue_loans': overdue_loans,
-            'returned_today': returned_today,
-            'total_documents': total_documents,
-            'document_downloads': document_downloads,
-            'page_views': page_views,
-            'searches': searches,
-            'logins': logins,
-        }
-    )
-
-    if not created:
-        stats.total_users = total_users
-        stats.active_users = active_users
-        stats.new_users = new_users
-        stats.total_books = total_books
-        stats.available_books = available_books
-        stats.checked_out_books = checked_out_books
-        stats.total_loans = total_loans
-        stats.active_loans = active_loans
-        stats.overdue_loans = overdue_loans
-        stats.returned_today = returned_today
-        stats.total_documents = total_documents
-        stats.document_downloads = document_downloads
-        stats.page_views = page_views
-        stats.searches = searches
-        stats.logins = logins
-        stats.save()
+    """Rebuild today's counters and capture its snapshot (admin only)."""
+    today = timezone.localdate()
+    rollups.backfill(today, today)
+    rollups.capture_snapshot(today)
+    stats = DailyStats.objects.get(date=today)
 
     serializer = DailyStatsSerializer(stats)
     return Response(serializer.data, status=status.HTTP_200_OK)
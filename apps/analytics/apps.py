@@ -6,3 +6,6 @@ class AnalyticsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.analytics'
     path = os.path.dirname(os.path.abspath(__file__))
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,339 @@
+"""
+Buffered analytics ingestion.
+
+Request handlers call ``enqueue()``. It appends the event to an in-process
+queue and to an append-only journal segment on local disk, then returns.
+A daemon thread drains the queue with one ``bulk_create`` every
+``BATCH_SIZE`` events or ``FLUSH_INTERVAL_MS`` milliseconds, whichever
+comes first. SQLite therefore sees one short write per batch instead of
+one per request. Once a batch is written its journal segment is deleted.
+Segments left behind by a process that died are replayed, with their
+original timestamps, by the next buffer to start.
+
+Back-pressure: once the queue passes ``HIGH_WATER`` of ``MAX_QUEUE``,
+high-volume events (page views, book views, searches) are kept at
+``SAMPLE_RATE``. When the queue is full they are dropped. Other events
+wait up to ``PUT_TIMEOUT_MS`` for room before they are dropped.
+``stats()`` counts both. The buffer flushes when the process exits.
+
+Live events get their ``created_at`` when their batch is written, so it
+can be up to ``FLUSH_INTERVAL_MS`` late.
+"""
+import atexit
+import json
+import logging
+import os
+import random
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.db import close_old_connections, connection, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import popularity, rollups
+from .models import AnalyticsEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL_MS': 1000,
+    'MAX_QUEUE': 10000,
+    'HIGH_WATER': 0.8,
+    'SAMPLE_RATE': 0.1,
+    'PUT_TIMEOUT_MS': 50,
+    'SPILL_DIR': None,
+    'BACKGROUND': True,
+}
+
+SAMPLED_TYPES = frozenset({'page_view', 'book_view', 'search'})
+EVENT_TYPES = frozenset(event_type for event_type, _ in AnalyticsEvent.EVENT_TYPES)
+FOREIGN_KEYS = ('user_id', 'book_id', 'document_id')
+TEXT_FIELDS = {
+    'session_id': 100, 'ip_address': None, 'user_agent': None,
+    'page_url': 200, 'search_query': 500, 'referrer': 200,
+}
+
+
+def event_from_request(request, event_type, **fields):
+    """Event dict for ``event_type`` with the user, session and client of ``request``."""
+    user = getattr(request, 'user', None)
+    session = getattr(request, 'session', None)
+    event = {
+        'event_type': event_type,
+        'user_id': user.pk if user is not None and user.is_authenticated else None,
+        'session_id': session.session_key if session is not None else '',
+        'ip_address': request.META.get('REMOTE_ADDR'),
+        'user_agent': request.META.get('HTTP_USER_AGENT'),
+    }
+    event.update(fields)
+    return event
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class EventBuffer:
+    """Process-wide event queue flushed in batches; see the module docstring."""
+
+    def __init__(self, **options):
+        self._overrides = options
+        self.configure()
+        self._reset()
+
+    def configure(self):
+        """(Re)read ``settings.ANALYTICS_INGEST``; options passed to the constructor win."""
+        self.options = {**DEFAULTS, **getattr(settings, 'ANALYTICS_INGEST', {}), **self._overrides}
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._wakeup = threading.Condition(self._lock)
+        self._events = deque()
+        self._segment = None
+        self._segment_path = None
+        self._sequence = 0
+        self._thread = None
+        self._stopping = False
+        self.counters = {'enqueued': 0, 'sampled_out': 0, 'dropped': 0, 'written': 0, 'failed': 0}
+
+    # Producer side
+
+    def enqueue(self, event):
+        """
+        Queue one event dict (``AnalyticsEvent`` field values, FKs as ``*_id``).
+
+        Returns False when the event was sampled out or dropped.
+        """
+        if self._pid != os.getpid():
+            # Forked worker: the parent's thread and journal are not ours
+            self._reset()
+        options = self.options
+        limit = options['MAX_QUEUE']
+        event.setdefault('created_at', timezone.now())
+
+        with self._lock:
+            size = len(self._events)
+            if event['event_type'] in SAMPLED_TYPES and size >= limit * options['HIGH_WATER']:
+                if size >= limit or random.random() >= options['SAMPLE_RATE']:
+                    self.counters['sampled_out'] += 1
+                    return False
+            elif size >= limit:
+                self._wakeup.notify()
+                if not self._not_full.wait_for(
+                    lambda: len(self._events) < limit, timeout=options['PUT_TIMEOUT_MS'] / 1000,
+                ):
+                    self.counters['dropped'] += 1
+                    return False
+
+            self._events.append(event)
+            self._journal(event)
+            self.counters['enqueued'] += 1
+            full = len(self._events) >= options['BATCH_SIZE']
+            if options['BACKGROUND']:
+                if self._thread is None:
+                    self._start()
+                elif full:
+                    self._wakeup.notify()
+
+        if full and not options['BACKGROUND']:
+            self.flush()
+        return True
+
+    def _journal(self, event):
+        spill_dir = self.options['SPILL_DIR']
+        if not spill_dir:
+            return
+        try:
+            if self._segment is None:
+                Path(spill_dir).mkdir(parents=True, exist_ok=True)
+                self._segment_path = Path(spill_dir) / f'{self._pid}-{self._sequence}.jsonl'
+                self._sequence += 1
+                self._segment = open(self._segment_path, 'a', buffering=1, encoding='utf-8')
+            self._segment.write(json.dumps(event, cls=DjangoJSONEncoder) + '\n')
+        except OSError:
+            logger.warning('Could not journal analytics event to %s', spill_dir, exc_info=True)
+
+    def _close_segment(self):
+        path = self._segment_path
+        if self._segment is not None:
+            self._segment.close()
+        self._segment = self._segment_path = None
+        return path
+
+    # Consumer side
+
+    def flush(self):
+        """Write everything queued so far. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._events)
+                self._events.clear()
+                segment = self._close_segment()
+                self._not_full.notify_all()
+            if not batch:
+                if segment is not None:
+                    segment.unlink(missing_ok=True)
+                return 0
+            try:
+                written = write(batch, self.options['BATCH_SIZE'])
+            except Exception:
+                logger.exception('Could not write %d analytics events', len(batch))
+                self.counters['failed'] += len(batch)
+                if segment is not None:
+                    # Hand the segment to the next replay instead of losing it
+                    segment.rename(segment.with_name(f'0-{segment.name}'))
+                return 0
+            if segment is not None:
+                segment.unlink(missing_ok=True)
+            self.counters['written'] += written
+            return written
+
+    def replay(self):
+        """Write journal segments left by dead processes. Returns the number of rows written."""
+        spill_dir = self.options['SPILL_DIR']
+        if not spill_dir or not Path(spill_dir).is_dir():
+            return 0
+        total = 0
+        for path in sorted(Path(spill_dir).glob('*.jsonl')):
+            pid = int(path.name.split('-', 1)[0]) if path.name.split('-', 1)[0].isdigit() else 0
+            if pid == self._pid or (pid and _pid_alive(pid)):
+                continue
+            claimed = path.with_suffix('.replay')
+            try:
+                path.rename(claimed)
+            except FileNotFoundError:
+                continue  # another process claimed it first
+            events = []
+            with open(claimed, encoding='utf-8') as segment:
+                for line in segment:
+                    try:
+                        event = json.loads(line)
+                        event['created_at'] = datetime.fromisoformat(event['created_at'])
+                    except (ValueError, KeyError, TypeError):
+                        continue  # the line a crash cut short
+                    events.append(event)
+            try:
+                total += write(events, self.options['BATCH_SIZE'], keep_timestamps=True)
+            except Exception:
+                logger.exception('Could not replay analytics journal %s', claimed)
+                claimed.rename(path)
+                continue
+            claimed.unlink()
+        return total
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='analytics-ingest', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        interval = self.options['FLUSH_INTERVAL_MS'] / 1000
+        try:
+            self.replay()
+        except Exception:
+            logger.exception('Analytics journal replay failed')
+        while True:
+            with self._lock:
+                self._wakeup.wait_for(
+                    lambda: self._stopping or len(self._events) >= self.options['BATCH_SIZE'], timeout=interval,
+                )
+                stopping = self._stopping
+            self.flush()
+            close_old_connections()
+            if stopping:
+                break
+        connection.close()
+
+    def stop(self, timeout=5):
+        """Flush what is queued and stop the flusher thread (registered with ``atexit``)."""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, 'queued': len(self._events)}
+
+
+def _clean(event):
+    """Model kwargs for one event; unknown fields are dropped and text fields fit their columns."""
+    row = {'event_type': event['event_type'], 'metadata': event.get('metadata') or {}}
+    for name in FOREIGN_KEYS:
+        try:
+            row[name] = int(event.get(name) or 0) or None
+        except (TypeError, ValueError):
+            row[name] = None
+    for name, length in TEXT_FIELDS.items():
+        value = event.get(name)
+        if name == 'ip_address':
+            row[name] = value or None
+        else:
+            row[name] = (value or '')[:length] if length else (value or '')
+    return row
+
+
+def write(events, batch_size=DEFAULTS['BATCH_SIZE'], keep_timestamps=False):
+    """
+    Insert ``events`` in one transaction, nulling references to rows deleted meanwhile.
+
+    ``keep_timestamps`` restores each event's own ``created_at``, which
+    ``bulk_create`` overwrites, at the cost of one extra UPDATE. The batch's
+    daily counters and item popularity are bumped in the same transaction.
+    """
+    events = [event for event in events if event.get('event_type') in EVENT_TYPES]
+    rows = [_clean(event) for event in events]
+    if not rows:
+        return 0
+    for name in FOREIGN_KEYS:
+        ids = {row[name] for row in rows if row[name] is not None}
+        if ids:
+            model = AnalyticsEvent._meta.get_field(name[:-3]).related_model
+            existing = set(model._default_manager.filter(pk__in=ids).values_list('pk', flat=True))
+            for row in rows:
+                if row[name] not in existing:
+                    row[name] = None
+
+    objs = [AnalyticsEvent(**row) for row in rows]
+    with transaction.atomic():
+        AnalyticsEvent.objects.bulk_create(objs, batch_size=batch_size)
+        if keep_timestamps:
+            for obj, event in zip(objs, events):
+                obj.created_at = event['created_at']
+            AnalyticsEvent.objects.bulk_update(objs, ['created_at'], batch_size=batch_size)
+        rollups.increment(rollups.event_counts(objs))
+        for day, activity in popularity.event_activity(objs).items():
+            popularity.record(activity, day)
+    return len(objs)
+
+
+buffer = EventBuffer()
+
+
+@receiver(setting_changed)
+def _reconfigure_buffer(setting, **kwargs):
+    if setting == 'ANALYTICS_INGEST':
+        buffer.configure()
+
+
+def enqueue(event):
+    return buffer.enqueue(event)
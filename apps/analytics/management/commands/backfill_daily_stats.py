@@ -0,0 +1,22 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.analytics import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily statistics counters and running totals from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='First day (YYYY-MM-DD); default a year ago')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last day (YYYY-MM-DD); default today')
+
+    def handle(self, *args, **options):
+        end = options['end'] or timezone.localdate()
+        start = options['start'] or end - timedelta(days=365)
+        if start > end:
+            raise CommandError('--start must not be after --end')
+        days = rollups.backfill(start, end)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {days} days of statistics from {start} to {end}'))
@@ -0,0 +1,58 @@
+import tempfile
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from apps.analytics import ingest, tracking
+
+
+def requests(count):
+    factory = RequestFactory(HTTP_HOST='127.0.0.1', HTTP_USER_AGENT='benchmark')
+    built = []
+    for _ in range(count):
+        request = factory.get('/catalog/books/')
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        built.append(request)
+    return built
+
+
+def measure(handler, count):
+    """Mean seconds per request spent in ``handler``, excluding building the requests."""
+    batch = requests(count)
+    started = time.perf_counter()
+    for request in batch:
+        handler(request)
+    return (time.perf_counter() - started) / count
+
+
+class Command(BaseCommand):
+    help = 'Time the page-view middleware per request (events go to a throwaway buffer and journal)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        response = HttpResponse('<html></html>')
+
+        spill_dir = tempfile.TemporaryDirectory()
+        original, ingest.buffer = ingest.buffer, ingest.EventBuffer(
+            BACKGROUND=False, SPILL_DIR=spill_dir.name, BATCH_SIZE=iterations + 2, MAX_QUEUE=iterations + 2,
+        )
+        try:
+            middleware = tracking.PageViewMiddleware(lambda request: response)
+            middleware(requests(1)[0])  # read the tracking flag outside the timed loop
+            baseline = measure(lambda request: response, iterations)
+            tracked = measure(middleware, iterations)
+        finally:
+            ingest.buffer._close_segment()
+            ingest.buffer = original
+            spill_dir.cleanup()
+        self.stdout.write(f'No-op view: {baseline * 1e6:.1f}µs')
+        self.stdout.write(f'With PageViewMiddleware: {tracked * 1e6:.1f}µs')
+        self.stdout.write(self.style.SUCCESS(f'Overhead per request: {(tracked - baseline) * 1e6:.1f}µs'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics.ingest import EventBuffer
+
+
+class Command(BaseCommand):
+    help = 'Write analytics events left in journal segments by stopped or failed processes'
+
+    def handle(self, *args, **options):
+        buffer = EventBuffer(BACKGROUND=False)
+        count = buffer.replay()
+        self.stdout.write(self.style.SUCCESS(f'Replayed {count} analytics events'))
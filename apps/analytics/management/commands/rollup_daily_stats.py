@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics import rollups
+
+
+class Command(BaseCommand):
+    help = "Capture today's point-in-time statistics (run once a day, e.g. from cron)"
+
+    def handle(self, *args, **options):
+        values = rollups.capture_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"Captured snapshot: {values['total_users']} users, {values['active_loans']} active loans, "
+            f"{values['overdue_loans']} overdue"
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics import popularity
+
+
+class Command(BaseCommand):
+    help = 'Recompute decayed popularity scores (run daily, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='First rebuild the per-day activity from recorded events and loans',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rows = popularity.rebuild()
+            self.stdout.write(f'Rebuilt {rows} item-days of activity')
+        changed = popularity.recompute()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed popularity scores; {changed} items changed'))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('catalog', '0004_book_keyset_index'),
+        ('repository', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='analyticsevent',
+            name='analytics_a_created_546677_idx',
+        ),
+        migrations.AddIndex(
+            model_name='analyticsevent',
+            index=models.Index(fields=['created_at', 'id'], name='analytics_a_created_412771_idx'),
+        ),
+    ]
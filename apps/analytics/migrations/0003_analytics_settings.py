@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_analyticsevent_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsSettings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Date and time when the record was created')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Date and time when the record was last updated')),
+                ('enable_tracking', models.BooleanField(default=True, help_text='Record page views, logins and logouts automatically')),
+                ('enable_popular_items', models.BooleanField(default=True, help_text='Calculate and display most popular books and documents')),
+                ('enable_system_health', models.BooleanField(default=True, help_text='Track system performance and error rates')),
+                ('retention_days', models.PositiveIntegerField(default=365, help_text='How long to keep analytics data')),
+                ('daily_stats_update', models.CharField(default='daily', help_text='Daily statistics update frequency', max_length=10)),
+                ('alert_email', models.EmailField(blank=True, help_text='Email address for system alerts and notifications', max_length=254)),
+                ('enable_error_alerts', models.BooleanField(default=True, help_text='Send alerts when system errors occur')),
+                ('enable_performance_alerts', models.BooleanField(default=False, help_text='Send alerts when system performance degrades')),
+                ('performance_threshold', models.FloatField(default=2.0, help_text='Alert when average response time exceeds this many seconds')),
+            ],
+            options={
+                'verbose_name': 'Analytics Settings',
+                'verbose_name_plural': 'Analytics Settings',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_analytics_settings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailystats',
+            name='new_loans',
+            field=models.PositiveIntegerField(default=0, help_text='Loans started on this day'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_dailystats_new_loans'),
+        ('catalog', '0005_book_copy_on_hold'),
+        ('repository', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularItemDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Date and time when the record was created')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Date and time when the record was last updated')),
+                ('date', models.DateField(help_text='Day of the activity')),
+                ('views', models.PositiveIntegerField(default=0, help_text='Views on this day')),
+                ('checkouts', models.PositiveIntegerField(default=0, help_text='Checkouts/downloads on this day')),
+                ('searches', models.PositiveIntegerField(default=0, help_text='Searches on this day')),
+            ],
+            options={
+                'verbose_name': 'Popular Item Day',
+                'verbose_name_plural': 'Popular Item Days',
+            },
+        ),
+        migrations.AddField(
+            model_name='popularitem',
+            name='decayed_score',
+            field=models.FloatField(default=0, help_text='Popularity score with older activity decayed'),
+        ),
+        migrations.AddIndex(
+            model_name='popularitem',
+            index=models.Index(fields=['item_type', '-decayed_score'], name='analytics_p_item_ty_589e11_idx'),
+        ),
+        migrations.AddField(
+            model_name='popularitemday',
+            name='item',
+            field=models.ForeignKey(help_text='Popular item', on_delete=django.db.models.deletion.CASCADE, related_name='days', to='analytics.popularitem'),
+        ),
+        migrations.AddIndex(
+            model_name='popularitemday',
+            index=models.Index(fields=['date'], name='analytics_p_date_f32d5e_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='popularitemday',
+            constraint=models.UniqueConstraint(fields=('item', 'date'), name='unique_popular_item_day'),
+        ),
+    ]
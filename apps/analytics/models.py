@@ -63,7 +63,7 @@ class AnalyticsEvent(BaseModel):
         indexes = [
             models.Index(fields=['event_type', 'created_at']),
             models.Index(fields=['user', 'created_at']),
-            models.Index(fields=['created_at']),
+            models.Index(fields=['created_at', 'id']),
         ]
 
 
@@ -84,6 +84,7 @@ class DailyStats(BaseModel):
 
     # Circulation statistics
     total_loans = models.PositiveIntegerField(default=0, help_text="Total loans")
+    new_loans = models.PositiveIntegerField(default=0, help_text="Loans started on this day")
     active_loans = models.PositiveIntegerField(default=0, help_text="Currently active loans")
     overdue_loans = models.PositiveIntegerField(default=0, help_text="Overdue loans")
     returned_today = models.PositiveIntegerField(default=0, help_text="Books returned today")
@@ -134,6 +135,7 @@ class PopularItem(BaseModel):
     checkout_count = models.PositiveIntegerField(default=0, help_text="Number of checkouts/downloads")
     search_count = models.PositiveIntegerField(default=0, help_text="Number of searches")
     total_score = models.PositiveIntegerField(default=0, help_text="Combined popularity score")
+    decayed_score = models.FloatField(default=0, help_text="Popularity score with older activity decayed")
 
     # Time periods
     last_updated = models.DateTimeField(auto_now=True)
@@ -146,12 +148,32 @@ class PopularItem(BaseModel):
             ('item_type', 'document'),
         ]
         ordering = ['-total_score']
+        indexes = [
+            models.Index(fields=['item_type', '-decayed_score']),
+        ]
+
+
+class PopularItemDay(BaseModel):
+    """One item's activity on one day, feeding the decayed score and the day/week/month leaderboards."""
+
+    item = models.ForeignKey(PopularItem, on_delete=models.CASCADE, related_name='days', help_text="Popular item")
+    date = models.DateField(help_text="Day of the activity")
+    views = models.PositiveIntegerField(default=0, help_text="Views on this day")
+    checkouts = models.PositiveIntegerField(default=0, help_text="Checkouts/downloads on this day")
+    searches = models.PositiveIntegerField(default=0, help_text="Searches on this day")
+
+    class Meta:
+        verbose_name = "Popular Item Day"
+        verbose_name_plural = "Popular Item Days"
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'date'], name='unique_popular_item_day'),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
 
-    def update_score(self):
-        """Update the popularity score based on various metrics."""
-        # Simple scoring algorithm: views * 1 + checkouts * 5 + searches * 2
-        self.total_score = (self.view_count * 1) + (self.checkout_count * 5) + (self.search_count * 2)
-        self.save(update_fields=['total_score', 'last_updated'])
+    def __str__(self):
+        return f"{self.item_id} on {self.date}"
 
 
 class SystemHealth(BaseModel):
@@ -177,3 +199,24 @@ class SystemHealth(BaseModel):
         verbose_name_plural = "System Health"
         ordering = ['-checked_at']
         get_latest_by = 'checked_at'
+
+
+class AnalyticsSettings(BaseModel):
+    """Site-wide analytics configuration edited on the analytics settings page (a single row)."""
+
+    enable_tracking = models.BooleanField(default=True, help_text="Record page views, logins and logouts automatically")
+    enable_popular_items = models.BooleanField(default=True, help_text="Calculate and display most popular books and documents")
+    enable_system_health = models.BooleanField(default=True, help_text="Track system performance and error rates")
+    retention_days = models.PositiveIntegerField(default=365, help_text="How long to keep analytics data")
+    daily_stats_update = models.CharField(max_length=10, default='daily', help_text="Daily statistics update frequency")
+    alert_email = models.EmailField(blank=True, help_text="Email address for system alerts and notifications")
+    enable_error_alerts = models.BooleanField(default=True, help_text="Send alerts when system errors occur")
+    enable_performance_alerts = models.BooleanField(default=False, help_text="Send alerts when system performance degrades")
+    performance_threshold = models.FloatField(default=2.0, help_text="Alert when average response time exceeds this many seconds")
+
+    class Meta:
+        verbose_name = "Analytics Settings"
+        verbose_name_plural = "Analytics Settings"
+
+    def __str__(self):
+        return "Analytics Settings"
@@ -0,0 +1,320 @@
+"""
+Popularity of books and documents.
+
+Views, checkouts (downloads for documents) and searches are counted per
+item with F() upserts. ``PopularItem`` keeps lifetime counts and
+``PopularItemDay`` one row per item and day, so concurrent writers add to
+the same rows without losing updates. The ingestion buffer records a whole
+batch of events in the transaction that writes it; checkouts are recorded
+once their transaction commits.
+
+Activity is worth ``WEIGHTS`` points. ``decayed_score`` halves every
+``HALF_LIFE_DAYS``: recorded activity adds to it immediately, and
+``recompute`` (run by ``update_popularity``) rebuilds every item's score
+from the day rows in one NumPy pass. Day rows past ``HORIZON_DAYS`` no
+longer count and are pruned.
+
+``top`` ranks items for the trending (decayed) leaderboard or the
+day/week/month windows and caches the ranking; ``items`` loads the ranked
+items for display and ``featured_books`` fills the home pages' featured
+shelves. The analytics dashboard, the popular items API and both home
+pages read through them.
+"""
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import partial
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.circulation.models import Loan
+from .models import AnalyticsEvent, PopularItem, PopularItemDay
+
+# Points per view, checkout and search, in ``FIELDS`` order
+FIELDS = ('views', 'checkouts', 'searches')
+WEIGHTS = (1, 5, 2)
+LIFETIME_FIELDS = {'views': 'view_count', 'checkouts': 'checkout_count', 'searches': 'search_count'}
+OBJECT_FIELDS = {'book': 'book_id', 'document': 'document_id'}
+
+HALF_LIFE_DAYS = 7
+HORIZON_DAYS = 90
+WINDOWS = {'day': 1, 'week': 7, 'month': 30}
+LEADERBOARDS = ('trending', *WINDOWS)
+BATCH_SIZE = 500
+TOP_K = 10
+MAX_K = 50
+CACHE_PREFIX = 'analytics_leaderboard'
+CACHE_TIMEOUT = 5 * 60
+VERSION_KEY = 'analytics_leaderboard_version'
+
+
+def points(counts):
+    return sum(weight * counts.get(name, 0) for name, weight in zip(FIELDS, WEIGHTS))
+
+
+# Recording activity
+
+def event_activity(events):
+    """``{date: {(item_type, object_id): {field: n}}}`` for saved ``AnalyticsEvent`` objects."""
+    activity = defaultdict(lambda: defaultdict(Counter))
+    for event in events:
+        day = activity[timezone.localdate(event.created_at)]
+        if event.event_type == 'book_view' and event.book_id:
+            day['book', event.book_id]['views'] += 1
+        elif event.event_type == 'download' and event.document_id:
+            day['document', event.document_id]['checkouts'] += 1
+        elif event.event_type == 'search':
+            if event.book_id:
+                day['book', event.book_id]['searches'] += 1
+            if event.document_id:
+                day['document', event.document_id]['searches'] += 1
+    return activity
+
+
+def _item_ids(keys):
+    """``{(item_type, object_id): PopularItem pk}``, creating missing items."""
+    def load():
+        found = {}
+        for item_type, field in OBJECT_FIELDS.items():
+            ids = [object_id for kind, object_id in keys if kind == item_type]
+            if ids:
+                rows = (
+                    PopularItem.objects.filter(item_type=item_type, **{f'{field}__in': ids})
+                    .order_by().values_list(field, 'pk')
+                )
+                found.update(((item_type, object_id), pk) for object_id, pk in rows)
+        return found
+
+    found = load()
+    missing = [key for key in keys if key not in found]
+    if missing:
+        PopularItem.objects.bulk_create(
+            [PopularItem(item_type=item_type, **{OBJECT_FIELDS[item_type]: object_id}) for item_type, object_id in missing],
+            ignore_conflicts=True,
+        )
+        found = load()
+    return found
+
+
+def record(activity, day=None):
+    """
+    Add ``{(item_type, object_id): {field: n}}`` to the items and their day rows.
+
+    Items with the same increments share one UPDATE, so a batch costs a
+    handful of queries however many items it touches.
+    """
+    activity = {key: counts for key, counts in activity.items() if any(counts.values())}
+    if not activity:
+        return
+    now = timezone.now()
+    day = day or timezone.localdate(now)
+    item_ids = _item_ids(list(activity))
+
+    groups = defaultdict(list)
+    for key, counts in activity.items():
+        groups[tuple(counts.get(name, 0) for name in FIELDS)].append(item_ids[key])
+
+    PopularItemDay.objects.bulk_create(
+        [PopularItemDay(item_id=pk, date=day) for pk in item_ids.values()], ignore_conflicts=True,
+    )
+    for increments, pks in groups.items():
+        counts = dict(zip(FIELDS, increments))
+        score = points(counts)
+        PopularItem.objects.filter(pk__in=pks).update(
+            total_score=F('total_score') + score,
+            decayed_score=F('decayed_score') + score,
+            last_updated=now,
+            updated_at=now,
+            **{LIFETIME_FIELDS[name]: F(LIFETIME_FIELDS[name]) + n for name, n in counts.items() if n},
+        )
+        PopularItemDay.objects.filter(item_id__in=pks, date=day).update(
+            updated_at=now, **{name: F(name) + n for name, n in counts.items() if n},
+        )
+
+
+def record_on_commit(activity):
+    """``record`` after the current transaction commits."""
+    transaction.on_commit(partial(record, activity), robust=True)
+
+
+# Scores
+
+def decay(ages):
+    """Weight of activity ``ages`` days old (an array)."""
+    return np.exp2(-np.asarray(ages, dtype=float) / HALF_LIFE_DAYS)
+
+
+def recompute(today=None):
+    """
+    Rebuild ``decayed_score`` for every item from its day rows.
+
+    Prunes day rows past the horizon and returns the number of items whose
+    score changed. Scores are moved by the difference from the value read,
+    so increments recorded meanwhile survive.
+    """
+    today = today or timezone.localdate()
+    PopularItemDay.objects.filter(date__lte=today - timedelta(days=HORIZON_DAYS)).delete()
+    rows = list(PopularItemDay.objects.filter(date__lte=today).values_list('item_id', 'date', *FIELDS))
+    current = list(PopularItem.objects.order_by('pk').values_list('pk', 'decayed_score'))
+    if not current:
+        return 0
+    pks, old = (np.array(column) for column in zip(*current))
+
+    scores = np.zeros(len(pks))
+    if rows:
+        item_ids, dates, *counts = zip(*rows)
+        ages = (np.datetime64(today, 'D') - np.array(dates, dtype='datetime64[D]')).astype(np.int64)
+        day_points = np.array(WEIGHTS) @ np.array(counts, dtype=np.int64)
+        positions = np.searchsorted(pks, item_ids)
+        scores = np.bincount(positions, weights=day_points * decay(ages), minlength=len(pks))
+    scores = np.round(scores, 4)
+
+    changed = np.flatnonzero(~np.isclose(scores, old))
+    deltas = scores - old
+    for start in range(0, len(changed), BATCH_SIZE):
+        batch = changed[start:start + BATCH_SIZE]
+        PopularItem.objects.filter(pk__in=[int(pks[i]) for i in batch]).update(
+            decayed_score=F('decayed_score') + Case(
+                *(When(pk=int(pks[i]), then=Value(float(deltas[i]))) for i in batch), output_field=FloatField(),
+            ),
+        )
+    invalidate()
+    return len(changed)
+
+
+def rebuild(today=None):
+    """
+    Rebuild the day rows within the horizon from recorded events and loans.
+
+    One ``GROUP BY`` per source; lifetime counts are left alone. Returns the
+    number of day rows written.
+    """
+    today = today or timezone.localdate()
+    since = today - timedelta(days=HORIZON_DAYS - 1)
+    activity = defaultdict(Counter)
+    events = (
+        AnalyticsEvent.objects.filter(created_at__date__gte=since, event_type__in=('book_view', 'download', 'search'))
+        .order_by().annotate(day=TruncDate('created_at')).values('day', 'book_id', 'document_id')
+        .annotate(
+            views=Count('pk', filter=Q(event_type='book_view')),
+            downloads=Count('pk', filter=Q(event_type='download')),
+            searches=Count('pk', filter=Q(event_type='search')),
+        )
+    )
+    for row in events:
+        if row['book_id']:
+            activity[row['day'], 'book', row['book_id']].update(views=row['views'], searches=row['searches'])
+        if row['document_id']:
+            activity[row['day'], 'document', row['document_id']].update(
+                checkouts=row['downloads'], searches=row['searches'],
+            )
+    loans = (
+        Loan.objects.filter(loan_date__date__gte=since).order_by()
+        .annotate(day=TruncDate('loan_date')).values('day', 'book_copy__book_id').annotate(n=Count('pk'))
+    )
+    for row in loans:
+        activity[row['day'], 'book', row['book_copy__book_id']]['checkouts'] += row['n']
+
+    item_ids = _item_ids({(item_type, object_id) for _, item_type, object_id in activity})
+    with transaction.atomic():
+        PopularItemDay.objects.filter(date__gte=since).delete()
+        PopularItemDay.objects.bulk_create(
+            [
+                PopularItemDay(item_id=item_ids[item_type, object_id], date=day, **counts)
+                for (day, item_type, object_id), counts in activity.items()
+            ],
+            batch_size=BATCH_SIZE,
+        )
+    return len(activity)
+
+
+# Leaderboards
+
+def version():
+    value = cache.get(VERSION_KEY)
+    if value is None:
+        # Seeded from the clock so a lost version key never matches stale rankings
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        value = cache.get(VERSION_KEY)
+    return value
+
+
+def invalidate():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def _ranking(item_type, leaderboard, today):
+    field = OBJECT_FIELDS[item_type]
+    if leaderboard == 'trending':
+        rows = (
+            PopularItem.objects.filter(item_type=item_type, decayed_score__gt=0)
+            .order_by('-decayed_score', 'pk').values_list('pk', field, 'decayed_score')
+        )
+    else:
+        score = sum(weight * F(name) for name, weight in zip(FIELDS, WEIGHTS))
+        rows = (
+            PopularItemDay.objects.filter(
+                item__item_type=item_type, date__gt=today - timedelta(days=WINDOWS[leaderboard]), date__lte=today,
+            )
+            .values('item_id', f'item__{field}').annotate(score=Sum(score)).filter(score__gt=0)
+            .order_by('-score', 'item_id').values_list('item_id', f'item__{field}', 'score')
+        )
+    return [(pk, object_id, float(score)) for pk, object_id, score in rows[:MAX_K]]
+
+
+def top(item_type, leaderboard='trending', limit=TOP_K):
+    """
+    ``[(PopularItem pk, book or document pk, score)]`` of the best ``limit`` items, best first.
+
+    Rankings are cached for ``CACHE_TIMEOUT`` seconds and dropped by
+    ``recompute``. Raises ``ValueError`` for an unknown type or leaderboard.
+    """
+    if item_type not in OBJECT_FIELDS:
+        raise ValueError(f'Item type must be one of: {", ".join(OBJECT_FIELDS)}')
+    if leaderboard not in LEADERBOARDS:
+        raise ValueError(f'Leaderboard must be one of: {", ".join(LEADERBOARDS)}')
+    today = timezone.localdate()
+    key = f'{CACHE_PREFIX}:{version()}:{item_type}:{leaderboard}:{today}'
+    ranking = cache.get(key)
+    if ranking is None:
+        ranking = _ranking(item_type, leaderboard, today)
+        cache.set(key, ranking, CACHE_TIMEOUT)
+    return ranking[:limit]
+
+
+def items(item_type, leaderboard='trending', limit=TOP_K):
+    """The ranked ``PopularItem`` objects, each with its leaderboard ``score``, ready for display."""
+    ranking = top(item_type, leaderboard, limit)
+    if not ranking:
+        return []
+    queryset = PopularItem.objects.all()
+    if item_type == 'book':
+        queryset = queryset.select_related('book__genre').prefetch_related('book__authors')
+    else:
+        queryset = queryset.select_related('document__uploaded_by')
+    found = queryset.in_bulk([pk for pk, _, _ in ranking])
+    result = []
+    for pk, _, score in ranking:
+        item = found.get(pk)
+        if item is not None:
+            item.score = score
+            result.append(item)
+    return result
+
+
+def featured_books(queryset, leaderboard='week', limit=6):
+    """The ``limit`` best books of ``queryset`` on ``leaderboard``, topped up from the rest of it."""
+    ranked = [book_id for _, book_id, _ in top('book', leaderboard, limit)]
+    popular = queryset.in_bulk(ranked)
+    books = [popular[book_id] for book_id in ranked if book_id in popular]
+    if len(books) < limit:
+        books += queryset.exclude(pk__in=ranked)[:limit - len(books)]
+    return books
@@ -0,0 +1,240 @@
+"""
+Daily statistics rollups.
+
+``DailyStats`` holds two kinds of numbers:
+
+* counters of things that happened on the day (``COUNTERS``): new users,
+  loans, returns, downloads, page views, searches and logins. They are
+  incremented with F() updates as things happen: the ingestion buffer adds
+  its events in the transaction that writes them, and the circulation
+  services add loans and returns once their transaction commits.
+* point-in-time figures (``SNAPSHOT_FIELDS``), such as books on the shelf
+  or overdue loans. They are captured once per day, when the day's row is
+  first created and by ``rollup_daily_stats``.
+
+``backfill`` rebuilds any date range from the source tables with one
+``GROUP BY date`` query per table, whatever the length of the range.
+Running totals (users, books, loans, documents and open loans) are
+reconstructed from creation and return dates; a lost loan stays open.
+Figures that depend on past state, such as overdue loans, come only from
+snapshots.
+"""
+import time
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.fields.json import KT
+from django.db.models.functions import Cast, Coalesce, TruncDate
+from django.utils import timezone
+
+from apps.accounts.models import LibraryUser
+from apps.catalog.models import Book, BookCopy
+from apps.circulation.models import Loan
+from apps.repository.models import EBook
+from .models import AnalyticsEvent, DailyStats
+
+COUNTERS = (
+    'new_users', 'new_loans', 'returned_today', 'document_downloads', 'page_views', 'searches', 'logins',
+)
+SNAPSHOT_FIELDS = (
+    'total_users', 'active_users', 'total_books', 'available_books', 'checked_out_books',
+    'total_loans', 'active_loans', 'overdue_loans', 'total_documents',
+)
+# Snapshot fields ``backfill`` can rebuild from dates alone
+RUNNING_TOTALS = ('total_users', 'total_books', 'total_loans', 'active_loans', 'total_documents')
+
+EVENT_COUNTERS = {
+    'download': 'document_downloads',
+    'page_view': 'page_views',
+    'search': 'searches',
+    'login': 'logins',
+}
+ACTIVE_USER_DAYS = 30
+# Bumped whenever past days change, so this process's caches of them expire
+VERSION_KEY = 'analytics_daily_stats_version'
+
+
+def version():
+    value = cache.get(VERSION_KEY)
+    if value is None:
+        # Seeded from the clock so a lost version key never matches stale entries
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        value = cache.get(VERSION_KEY)
+    return value
+
+
+def invalidate():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+# Point-in-time snapshot
+
+def snapshot(today=None):
+    """Current totals and states, with one conditional aggregate per table."""
+    today = today or timezone.localdate()
+    values = LibraryUser.objects.aggregate(
+        total_users=Count('pk'),
+        active_users=Count('pk', filter=Q(last_login__date__gte=today - timedelta(days=ACTIVE_USER_DAYS))),
+    )
+    values.update(BookCopy.objects.aggregate(
+        available_books=Count('pk', filter=Q(status='available')),
+        checked_out_books=Count('pk', filter=Q(status='checked_out')),
+    ))
+    values.update(Loan.objects.aggregate(
+        total_loans=Count('pk'),
+        active_loans=Count('pk', filter=Q(status__in=Loan.OPEN_STATUSES)),
+        overdue_loans=Count('pk', filter=Q(status='overdue')),
+    ))
+    values['total_books'] = Book.objects.active().count()
+    values['total_documents'] = EBook.objects.count()
+    return values
+
+
+def capture_snapshot(day=None):
+    """Store the current snapshot on ``day``'s row (today by default)."""
+    day = day or timezone.localdate()
+    values = snapshot(day)
+    if not DailyStats.objects.filter(date=day).update(**values, updated_at=timezone.now()):
+        DailyStats.objects.bulk_create([DailyStats(date=day, **values)], ignore_conflicts=True)
+        DailyStats.objects.filter(date=day).update(**values)
+    return values
+
+
+# Incremental counters
+
+def increment(counts):
+    """
+    Add ``{date: {counter: n}}`` to the day rows with F() updates.
+
+    A missing row is created first; today's row starts from a snapshot.
+    Changes to earlier days (replayed events, backdated signups) bump the
+    version so cached ranges over them expire.
+    """
+    today = timezone.localdate()
+    for day, fields in counts.items():
+        fields = {name: amount for name, amount in fields.items() if amount}
+        if not fields:
+            continue
+        if day < today:
+            invalidate()
+        changes = {name: F(name) + amount for name, amount in fields.items()}
+        if DailyStats.objects.filter(date=day).update(**changes):
+            continue
+        initial = snapshot(day) if day == today else {}
+        DailyStats.objects.bulk_create([DailyStats(date=day, **initial)], ignore_conflicts=True)
+        DailyStats.objects.filter(date=day).update(**changes)
+
+
+def increment_on_commit(day=None, **fields):
+    """``increment`` one day's counters after the current transaction commits."""
+    day = day or timezone.localdate()
+    transaction.on_commit(partial(increment, {day: fields}), robust=True)
+
+
+def event_counts(events):
+    """``{date: {counter: n}}`` for saved ``AnalyticsEvent`` objects; sampled events count 1/rate."""
+    counts = defaultdict(lambda: defaultdict(float))
+    for event in events:
+        counter = EVENT_COUNTERS.get(event.event_type)
+        if counter is None:
+            continue
+        rate = (event.metadata or {}).get('sample_rate') or 1
+        counts[timezone.localdate(event.created_at)][counter] += 1 / rate
+    return {day: {name: round(value) for name, value in fields.items()} for day, fields in counts.items()}
+
+
+# Historical backfill
+
+def _per_day(queryset, field, start, end, **aggregates):
+    """
+    ``{date: {name: value}}`` from one ``GROUP BY date`` over ``queryset``.
+
+    Rows before ``start`` are summed under the day before it, so running
+    totals need no separate count of everything older than the range.
+    """
+    baseline = start - timedelta(days=1)
+    rows = (
+        queryset.filter(**{f'{field}__date__lte': end}).order_by()
+        .annotate(day=TruncDate(field)).values('day').annotate(**aggregates)
+    )
+    totals = defaultdict(lambda: defaultdict(float))
+    for row in rows:
+        day = max(row.pop('day'), baseline)
+        for name, value in row.items():
+            totals[day][name] += value or 0
+    return totals
+
+
+def _running(per_day, name, start, days):
+    total = per_day.get(start - timedelta(days=1), {}).get(name, 0)
+    result = {}
+    for day in days:
+        total += per_day.get(day, {}).get(name, 0)
+        result[day] = total
+    return result
+
+
+def compute_range(start, end):
+    """Counters and running totals for each day from ``start`` to ``end``, from the source tables."""
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    one = Value(1.0)
+    weight = Coalesce(one / Cast(KT('metadata__sample_rate'), FloatField()), one)
+
+    users = _per_day(LibraryUser.objects.all(), 'date_joined', start, end, added=Count('pk'))
+    books = _per_day(Book.objects.active(), 'created_at', start, end, added=Count('pk'))
+    documents = _per_day(EBook.objects.all(), 'upload_date', start, end, added=Count('pk'))
+    loans = _per_day(Loan.objects.all(), 'loan_date', start, end, added=Count('pk'))
+    returns = _per_day(Loan.objects.filter(return_date__isnull=False), 'return_date', start, end, added=Count('pk'))
+    events = _per_day(
+        AnalyticsEvent.objects.filter(created_at__date__gte=start, event_type__in=EVENT_COUNTERS),
+        'created_at', start, end,
+        **{counter: Sum(weight, filter=Q(event_type=event_type)) for event_type, counter in EVENT_COUNTERS.items()},
+    )
+
+    total_users = _running(users, 'added', start, days)
+    total_books = _running(books, 'added', start, days)
+    total_documents = _running(documents, 'added', start, days)
+    total_loans = _running(loans, 'added', start, days)
+    total_returned = _running(returns, 'added', start, days)
+
+    result = {}
+    for day in days:
+        row = {
+            'new_users': users.get(day, {}).get('added', 0),
+            'new_loans': loans.get(day, {}).get('added', 0),
+            'returned_today': returns.get(day, {}).get('added', 0),
+            'total_users': total_users[day],
+            'total_books': total_books[day],
+            'total_documents': total_documents[day],
+            'total_loans': total_loans[day],
+            'active_loans': total_loans[day] - total_returned[day],
+        }
+        for counter in EVENT_COUNTERS.values():
+            row[counter] = events.get(day, {}).get(counter, 0)
+        result[day] = {name: round(value) for name, value in row.items()}
+    return result
+
+
+def backfill(start, end):
+    """
+    Rebuild counters and running totals for ``start``..``end`` in one upsert.
+
+    Snapshot-only fields (active users, copies on the shelf, overdue loans)
+    keep whatever was captured on the day. Returns the number of days written.
+    """
+    values = compute_range(start, end)
+    fields = list(COUNTERS) + list(RUNNING_TOTALS)
+    now = timezone.now()
+    DailyStats.objects.bulk_create(
+        [DailyStats(date=day, updated_at=now, **row) for day, row in values.items()],
+        batch_size=500, update_conflicts=True, unique_fields=['date'], update_fields=fields + ['updated_at'],
+    )
+    invalidate()
+    return len(values)
@@ -28,7 +28,7 @@ class DailyStatsSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'date', 'total_users', 'active_users', 'new_users',
             'total_books', 'available_books', 'checked_out_books',
-            'total_loans', 'active_loans', 'overdue_loans', 'returned_today',
+            'total_loans', 'new_loans', 'active_loans', 'overdue_loans', 'returned_today',
             'total_documents', 'document_downloads', 'page_views', 'searches', 'logins'
         ]
         read_only_fields = ['id']
@@ -39,13 +39,14 @@ class PopularItemSerializer(serializers.ModelSerializer):
     book_title = serializers.CharField(source='book.title', read_only=True)
     document_title = serializers.CharField(source='document.title', read_only=True)
     item_title = serializers.SerializerMethodField()
+    score = serializers.SerializerMethodField()
 
     class Meta:
         model = PopularItem
         fields = [
             'id', 'item_type', 'book', 'book_title', 'document', 'document_title',
             'item_title', 'view_count', 'checkout_count', 'search_count',
-            'total_score', 'last_updated'
+            'total_score', 'decayed_score', 'score', 'last_updated'
         ]
         read_only_fields = ['id', 'last_updated']
 
@@ -56,6 +57,10 @@ class PopularItemSerializer(serializers.ModelSerializer):
             return obj.document.title
         return ""
 
+    def get_score(self, obj):
+        """Leaderboard score when listed from a leaderboard, else the decayed score."""
+        return getattr(obj, 'score', obj.decayed_score)
+
 
 class SystemHealthSerializer(serializers.ModelSerializer):
     """Serializer for SystemHealth model."""
@@ -0,0 +1,32 @@
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.accounts.models import LibraryUser
+from . import rollups, tracking
+from .models import AnalyticsSettings
+
+
+@receiver(user_logged_in)
+def record_login(sender, request, user, **kwargs):
+    if request is not None:
+        tracking.record(request, 'login', user_id=user.pk)
+
+
+@receiver(user_logged_out)
+def record_logout(sender, request, user, **kwargs):
+    if request is not None and user is not None:
+        tracking.record(request, 'logout', user_id=user.pk)
+
+
+@receiver(post_save, sender=AnalyticsSettings)
+@receiver(post_delete, sender=AnalyticsSettings)
+def invalidate_tracking_flag(sender, **kwargs):
+    tracking.invalidate()
+
+
+@receiver(post_save, sender=LibraryUser, dispatch_uid='analytics_count_new_user')
+def count_new_user(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        rollups.increment_on_commit(timezone.localdate(instance.date_joined), new_users=1)
@@ -0,0 +1,472 @@
+import json
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.accounts.models import LibraryUser
+from apps.catalog.models import Book, BookCopy, Publisher
+from apps.circulation import services
+from apps.circulation.models import Loan
+from . import ingest, popularity, rollups, timeseries, tracking
+from .models import AnalyticsEvent, DailyStats, PopularItem, PopularItemDay
+
+DEAD_PID = 2 ** 22 + 1  # above Linux's pid_max, so never a live process
+
+
+class EventBufferTest(TestCase):
+    """Tests for the batched analytics ingestion buffer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = LibraryUser.objects.create_user('reader', password='pass', membership_type='student')
+        cls.book = Book.objects.create(
+            title='Buffered', isbn='9780000000001', publisher=Publisher.objects.create(name='Press'),
+            publication_date=date(2000, 1, 1), pages=100,
+        )
+
+    def spill_dir(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return directory.name
+
+    def buffer(self, **options):
+        return ingest.EventBuffer(**{'BACKGROUND': False, 'SPILL_DIR': None, **options})
+
+    def test_flushes_in_batches(self):
+        buffer = self.buffer(BATCH_SIZE=3)
+        buffer.enqueue({'event_type': 'book_view', 'user_id': self.user.pk, 'book_id': self.book.pk})
+        buffer.enqueue({'event_type': 'book_view', 'book_id': 999999})
+        self.assertFalse(AnalyticsEvent.objects.exists())
+        DailyStats.objects.create(date=timezone.localdate())
+        PopularItem.objects.create(item_type='book', book=self.book)
+
+        # FK checks for the batch, one INSERT, one counter UPDATE, then the
+        # book's popularity: item lookup, day row upsert and two UPDATEs
+        with self.assertNumQueries(10):
+            buffer.enqueue({'event_type': 'search', 'search_query': 'x' * 600})
+        events = AnalyticsEvent.objects.order_by('pk')
+        self.assertEqual([event.book_id for event in events], [self.book.pk, None, None])
+        self.assertEqual(len(events[2].search_query), 500)
+        self.assertEqual(buffer.stats(), {
+            'enqueued': 3, 'sampled_out': 0, 'dropped': 0, 'written': 3, 'failed': 0, 'queued': 0,
+        })
+
+    def test_back_pressure_samples_then_drops(self):
+        buffer = self.buffer(BATCH_SIZE=100, MAX_QUEUE=4, HIGH_WATER=0.5, SAMPLE_RATE=0, PUT_TIMEOUT_MS=0)
+        self.assertTrue(buffer.enqueue({'event_type': 'page_view'}))
+        self.assertTrue(buffer.enqueue({'event_type': 'page_view'}))
+        # Past the high-water mark views are sampled, other events still queue
+        self.assertFalse(buffer.enqueue({'event_type': 'page_view'}))
+        self.assertTrue(buffer.enqueue({'event_type': 'login'}))
+        self.assertTrue(buffer.enqueue({'event_type': 'logout'}))
+        self.assertFalse(buffer.enqueue({'event_type': 'login'}))
+        self.assertEqual(buffer.stats()['sampled_out'], 1)
+        self.assertEqual(buffer.stats()['dropped'], 1)
+
+        self.assertEqual(buffer.flush(), 4)
+        self.assertTrue(buffer.enqueue({'event_type': 'login'}))
+
+    def test_journal_is_replayed_with_original_timestamps(self):
+        spill_dir = self.spill_dir()
+        buffer = self.buffer(BATCH_SIZE=100, SPILL_DIR=spill_dir)
+        when = datetime(2025, 5, 1, 12, tzinfo=dt_timezone.utc)
+        buffer.enqueue({'event_type': 'login', 'user_id': self.user.pk, 'created_at': when})
+        buffer.enqueue({'event_type': 'page_view', 'page_url': 'http://testserver/'})
+
+        # Simulate a crash: the process dies with its segment on disk, and a cut-off line
+        segment = buffer._close_segment()
+        with open(segment, 'a', encoding='utf-8') as journal:
+            journal.write('{"event_type": "log')
+        segment.rename(segment.with_name(f'{DEAD_PID}-0.jsonl'))
+
+        self.assertEqual(self.buffer(SPILL_DIR=spill_dir).replay(), 2)
+        login = AnalyticsEvent.objects.get(event_type='login')
+        self.assertEqual((login.user, login.created_at), (self.user, when))
+        self.assertEqual(list(Path(spill_dir).iterdir()), [])
+
+    def test_flushed_segment_is_removed(self):
+        spill_dir = self.spill_dir()
+        buffer = self.buffer(BATCH_SIZE=100, SPILL_DIR=spill_dir)
+        buffer.enqueue({'event_type': 'login', 'metadata': {'via': 'test'}})
+        [segment] = Path(spill_dir).iterdir()
+        self.assertEqual(json.loads(segment.read_text())['metadata'], {'via': 'test'})
+        buffer.flush()
+        self.assertEqual(list(Path(spill_dir).iterdir()), [])
+
+    def test_settings_changes_reconfigure_the_buffer(self):
+        with override_settings(ANALYTICS_INGEST={'BATCH_SIZE': 7}):
+            self.assertEqual(ingest.buffer.options['BATCH_SIZE'], 7)
+            self.assertEqual(self.buffer(BATCH_SIZE=3).options['BATCH_SIZE'], 3)
+
+    def test_track_event_only_enqueues(self):
+        original, ingest.buffer = ingest.buffer, self.buffer(BATCH_SIZE=100)
+        self.addCleanup(setattr, ingest, 'buffer', original)
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/analytics/track-event/', {'event_type': 'book_view', 'book_id': self.book.pk})
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse([query for query in queries.captured_queries if 'analytics_analyticsevent' in query['sql']])
+        ingest.buffer.flush()
+        self.assertEqual(AnalyticsEvent.objects.get(event_type='book_view').book, self.book)
+        self.assertEqual(self.client.post('/api/analytics/track-event/', {'event_type': 'nope'}).status_code, 400)
+
+
+class TrackingTest(TestCase):
+    """Tests for automatic page-view, login and logout capture."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = LibraryUser.objects.create_user('reader', password='pass', membership_type='student')
+        cls.admin = LibraryUser.objects.create_superuser('admin', 'admin@test.com', 'pass')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        tracking.invalidate()
+        self.addCleanup(tracking.invalidate)
+        original, ingest.buffer = ingest.buffer, ingest.EventBuffer(BACKGROUND=False, SPILL_DIR=None)
+        self.addCleanup(setattr, ingest, 'buffer', original)
+
+    def events(self):
+        ingest.buffer.flush()
+        return list(AnalyticsEvent.objects.order_by('pk').values_list('event_type', 'user_id', 'metadata'))
+
+    def test_page_views_logins_and_logouts(self):
+        self.client.login(username='reader', password='pass')
+        self.client.get('/catalog/')
+        self.client.get('/catalog/api/departments/')  # JSON
+        self.client.get('/api/search/', {'q': 'x'}, HTTP_ACCEPT='text/html')  # API prefix
+        self.client.get('/catalog/no-such-page/')
+        self.client.post('/accounts/logout/')
+        self.assertEqual(self.events(), [
+            ('login', self.user.pk, {}),
+            ('page_view', self.user.pk, {'route': 'catalog:home'}),
+            ('logout', self.user.pk, {}),
+        ])
+
+    @override_settings(ANALYTICS_TRACKING={'SAMPLE_RATES': {'catalog:home': 0, '/catalog/books/': 0.5}})
+    def test_per_route_sampling(self):
+        self.client.get('/catalog/')
+        for _ in range(40):
+            self.client.get('/catalog/books/')
+        events = self.events()
+        self.assertTrue(0 < len(events) < 40)
+        self.assertEqual({metadata['route'] for _, _, metadata in events}, {'catalog:book_list'})
+        self.assertEqual({metadata['sample_rate'] for _, _, metadata in events}, {0.5})
+
+    def test_settings_form_switches_tracking_off(self):
+        self.client.force_login(self.admin)
+        response = self.client.get('/analytics/settings/')
+        self.assertTrue(response.context['form'].initial['enable_tracking'])
+        data = {name: value for name, value in response.context['form'].initial.items() if value not in (False, None)}
+        data.pop('enable_tracking')
+        self.client.post('/analytics/settings/', data)
+        self.assertFalse(tracking.get_settings().enable_tracking)
+
+        ingest.buffer.flush()
+        AnalyticsEvent.objects.all().delete()
+        self.client.get('/catalog/')
+        self.client.logout()
+        self.assertEqual(self.events(), [])
+
+    def test_middleware_only_queues(self):
+        response = HttpResponse('<html></html>')
+        middleware = tracking.PageViewMiddleware(lambda request: response)
+        factory = RequestFactory()
+        batch = []
+        for _ in range(200):
+            request = factory.get('/catalog/books/')
+            request.user = AnonymousUser()
+            batch.append(request)
+        middleware(batch[0])
+
+        # The flag is memoized after the first request: no database or cache reads
+        with self.assertNumQueries(0), mock.patch.object(tracking.cache, 'get') as cache_get:
+            for request in batch[1:]:
+                middleware(request)
+        cache_get.assert_not_called()
+        self.assertEqual(ingest.buffer.stats()['queued'], len(batch))
+
+
+def at(day, hour=12):
+    return datetime(day.year, day.month, day.day, hour, tzinfo=dt_timezone.utc)
+
+
+class RollupTest(TestCase):
+    """Tests for incremental and backfilled daily statistics."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = date(2026, 3, 10)
+        cls.user = LibraryUser.objects.create_user(
+            'reader', password='pass', membership_type='student', date_joined=at(cls.day - timedelta(days=5)),
+        )
+        LibraryUser.objects.create_user('late', password='pass', membership_type='student', date_joined=at(cls.day))
+        cls.book = Book.objects.create(
+            title='Counted', isbn='9780000000003', publisher=Publisher.objects.create(name='Press'),
+            publication_date=date(2000, 1, 1), pages=100,
+        )
+        cls.copies = [
+            BookCopy.objects.create(book=cls.book, barcode=f'R{i}', acquisition_date=date(2020, 1, 1), location='A1')
+            for i in range(3)
+        ]
+        Book.objects.update(created_at=at(cls.day - timedelta(days=30)))
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def loan(self, copy, start, returned=None):
+        return Loan.objects.create(
+            user=self.user, book_copy=copy, loan_date=at(start), due_date=at(start + timedelta(days=14)),
+            return_date=at(returned) if returned else None, status='returned' if returned else 'active',
+        )
+
+    def event(self, day, event_type, **metadata):
+        event = AnalyticsEvent.objects.create(event_type=event_type, metadata=metadata)
+        AnalyticsEvent.objects.filter(pk=event.pk).update(created_at=at(day))
+
+    def test_backfill_rebuilds_past_days(self):
+        day = self.day
+        self.loan(self.copies[0], day - timedelta(days=3), returned=day)
+        self.loan(self.copies[1], day)
+        self.event(day, 'search')
+        self.event(day, 'page_view', sample_rate=0.25)
+        self.event(day - timedelta(days=1), 'login')
+        DailyStats.objects.create(date=day, overdue_loans=4, page_views=99)
+
+        self.assertEqual(rollups.backfill(day - timedelta(days=1), day), 2)
+        before, stats = DailyStats.objects.order_by('date')
+        self.assertEqual(
+            (before.total_users, before.new_users, before.total_loans, before.active_loans, before.logins),
+            (1, 0, 1, 1, 1),
+        )
+        self.assertEqual(
+            (stats.total_users, stats.new_users, stats.new_loans, stats.returned_today, stats.active_loans),
+            (2, 1, 1, 1, 1),
+        )
+        self.assertEqual((stats.searches, stats.page_views, stats.total_books), (1, 4, 1))
+        # Past state cannot be rebuilt, so the captured figure is kept
+        self.assertEqual(stats.overdue_loans, 4)
+
+    def test_backfill_queries_do_not_grow_with_range(self):
+        with CaptureQueriesContext(connection) as week:
+            rollups.backfill(self.day - timedelta(days=6), self.day)
+        with CaptureQueriesContext(connection) as year:
+            rollups.backfill(self.day - timedelta(days=365), self.day)
+        # One GROUP BY per source table; only the upsert is batched by size
+        selects = [[query for query in run if query['sql'].startswith('SELECT')] for run in (week, year)]
+        self.assertEqual(len(selects[0]), len(selects[1]))
+        self.assertEqual(DailyStats.objects.count(), 366)
+
+    def test_circulation_and_ingestion_increment_today(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            loan = services.checkout(self.copies[0], self.user)
+        stats = DailyStats.objects.get(date=timezone.localdate())
+        # The day's row starts from a snapshot taken after the loan
+        self.assertEqual((stats.new_loans, stats.total_loans, stats.checked_out_books), (1, 1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            services.return_loan(loan)
+            services.batch_checkout(self.user, ['R1', 'R2'])
+        ingest.write([{'event_type': 'search'}, {'event_type': 'page_view', 'metadata': {'sample_rate': 0.5}}])
+        stats.refresh_from_db()
+        self.assertEqual((stats.new_loans, stats.returned_today), (3, 1))
+        self.assertEqual((stats.searches, stats.page_views), (1, 2))
+
+    def test_capture_snapshot(self):
+        self.loan(self.copies[0], self.day)
+        Loan.objects.update(status='overdue')
+        rollups.capture_snapshot(self.day)
+        stats = DailyStats.objects.get(date=self.day)
+        self.assertEqual((stats.total_users, stats.total_loans, stats.overdue_loans), (2, 1, 1))
+
+
+class TimeSeriesTest(TestCase):
+    """Tests for the zero-filled dashboard time series."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = LibraryUser.objects.create_superuser('admin', 'admin@test.com', 'pass')
+        # Wednesday 2026-09-30 and Friday 2026-10-02
+        DailyStats.objects.create(date=date(2026, 9, 30), page_views=5, searches=1, total_users=10)
+        DailyStats.objects.create(date=date(2026, 10, 2), page_views=7, total_users=12)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_days_are_zero_filled_from_one_query(self):
+        with self.assertNumQueries(1):
+            data = timeseries.series(date(2026, 9, 29), date(2026, 10, 3), ['page_views', 'searches'])
+        self.assertEqual(data['labels'], ['2026-09-29', '2026-09-30', '2026-10-01', '2026-10-02', '2026-10-03'])
+        self.assertEqual(data['series'], {'page_views': [0, 5, 0, 7, 0], 'searches': [0, 1, 0, 0, 0]})
+        with self.assertNumQueries(0):
+            timeseries.series(date(2026, 9, 29), date(2026, 10, 3), ['page_views', 'searches'])
+
+    def test_week_and_month_buckets(self):
+        metrics = ['page_views', 'total_users']
+        weeks = timeseries.series(date(2026, 9, 20), date(2026, 10, 5), metrics, 'week')
+        self.assertEqual(weeks['labels'], ['2026-09-14', '2026-09-21', '2026-09-28', '2026-10-05'])
+        # Counters add up; point-in-time figures keep the last recorded day
+        self.assertEqual(weeks['series'], {'page_views': [0, 0, 12, 0], 'total_users': [0, 0, 12, 0]})
+        months = timeseries.series(date(2026, 9, 1), date(2026, 10, 31), metrics, 'month')
+        self.assertEqual(months['labels'], ['2026-09-01', '2026-10-01'])
+        self.assertEqual(months['series'], {'page_views': [5, 7], 'total_users': [10, 12]})
+
+    def test_backfill_expires_cached_ranges(self):
+        timeseries.series(date(2026, 9, 30), date(2026, 9, 30), ['new_users'])
+        LibraryUser.objects.filter(pk=self.staff.pk).update(date_joined=at(date(2026, 9, 30)))
+        rollups.backfill(date(2026, 9, 30), date(2026, 9, 30))
+        data = timeseries.series(date(2026, 9, 30), date(2026, 9, 30), ['new_users'])
+        self.assertEqual(data['series'], {'new_users': [1]})
+
+        # Late increments to past days expire cached ranges too
+        rollups.increment({date(2026, 9, 30): {'new_users': 1}})
+        data = timeseries.series(date(2026, 9, 30), date(2026, 9, 30), ['new_users'])
+        self.assertEqual(data['series'], {'new_users': [2]})
+
+    def test_endpoint(self):
+        url = '/analytics/timeseries/'
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.staff)
+        response = self.client.get(url, {
+            'start': '2026-09-30', 'end': '2026-10-02', 'metrics': 'page_views,total_users', 'resolution': 'day',
+        })
+        self.assertEqual(response.json()['series'], {'page_views': [5, 0, 7], 'total_users': [10, 0, 12]})
+        self.assertEqual(self.client.get(url, {'metrics': 'password'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'resolution': 'hour'}).status_code, 400)
+
+    def test_dashboard_queries_do_not_grow_with_range(self):
+        self.client.force_login(self.staff)
+        # Warm the per-process, context and leaderboard caches
+        self.client.get('/analytics/', {'days': 30})
+        self.client.get('/analytics/', {'days': 365})
+        with CaptureQueriesContext(connection) as month:
+            self.assertEqual(self.client.get('/analytics/', {'days': 30}).status_code, 200)
+        with CaptureQueriesContext(connection) as year:
+            self.assertEqual(self.client.get('/analytics/', {'days': 365}).status_code, 200)
+        self.assertEqual(len(month), len(year))
+
+
+class PopularityTest(TestCase):
+    """Tests for popularity counters, decayed scores and leaderboards."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = LibraryUser.objects.create_user('reader', password='pass', membership_type='student')
+        publisher = Publisher.objects.create(name='Press')
+        cls.books = [
+            Book.objects.create(
+                title=f'Popular {i}', isbn=f'978000000010{i}', publisher=publisher,
+                publication_date=date(2000, 1, 1), pages=100,
+            )
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.today = timezone.localdate()
+
+    def views(self, *books):
+        ingest.write([{'event_type': 'book_view', 'book_id': book.pk} for book in books])
+
+    def activity(self, book, days_ago, **counts):
+        popularity.record({('book', book.pk): counts}, self.today - timedelta(days=days_ago))
+
+    def test_counters_are_upserted_in_a_fixed_number_of_queries(self):
+        with CaptureQueriesContext(connection) as one:
+            self.views(self.books[0])
+        with CaptureQueriesContext(connection) as many:
+            self.views(*self.books[1:])
+        self.assertEqual(len(one), len(many))
+
+        self.views(self.books[0], self.books[0])
+        item = PopularItem.objects.get(book=self.books[0])
+        self.assertEqual((item.view_count, item.total_score, item.decayed_score), (3, 3, 3))
+        self.assertEqual(PopularItemDay.objects.get(item=item).views, 3)
+
+    def test_checkouts_are_recorded_after_commit(self):
+        copy = BookCopy.objects.create(book=self.books[0], barcode='P1', acquisition_date=date(2020, 1, 1), location='A1')
+        with self.captureOnCommitCallbacks(execute=True):
+            services.checkout(copy, self.user)
+        item = PopularItem.objects.get(book=self.books[0])
+        self.assertEqual((item.checkout_count, item.total_score), (1, 5))
+
+    def test_recompute_decays_and_prunes(self):
+        self.activity(self.books[0], 0, views=4)
+        self.activity(self.books[0], popularity.HALF_LIFE_DAYS, views=4)
+        self.activity(self.books[1], popularity.HORIZON_DAYS, checkouts=10)
+        self.assertEqual(popularity.recompute(), 2)
+        scores = dict(PopularItem.objects.values_list('book_id', 'decayed_score'))
+        self.assertEqual(scores, {self.books[0].pk: 6.0, self.books[1].pk: 0.0})
+        self.assertEqual(PopularItemDay.objects.count(), 2)
+
+    def test_recompute_keeps_concurrent_increments(self):
+        self.activity(self.books[0], popularity.HALF_LIFE_DAYS, views=4)
+        decay = popularity.decay
+
+        def decay_during_increment(ages):
+            self.activity(self.books[0], 0, views=1)
+            return decay(ages)
+
+        with mock.patch.object(popularity, 'decay', decay_during_increment):
+            popularity.recompute()
+        self.assertEqual(PopularItem.objects.get(book=self.books[0]).decayed_score, 3.0)
+
+    def test_rebuild_from_events_and_loans(self):
+        AnalyticsEvent.objects.create(event_type='book_view', book=self.books[0])
+        AnalyticsEvent.objects.create(event_type='search', book=self.books[0])
+        copy = BookCopy.objects.create(book=self.books[1], barcode='P1', acquisition_date=date(2020, 1, 1), location='A1')
+        Loan.objects.create(user=self.user, book_copy=copy, due_date=timezone.now() + timedelta(days=14))
+        self.assertEqual(popularity.rebuild(), 2)
+        days = {row[0]: row[1:] for row in PopularItemDay.objects.values_list('item__book_id', *popularity.FIELDS)}
+        self.assertEqual(days, {self.books[0].pk: (1, 0, 1), self.books[1].pk: (0, 1, 0)})
+
+    def test_windows_rank_separately_and_are_cached(self):
+        self.activity(self.books[0], 60, checkouts=10)
+        self.activity(self.books[1], 3, views=2)
+        self.activity(self.books[2], 0, views=1)
+        popularity.recompute()
+
+        def ranked(window):
+            return [book_id for _, book_id, _ in popularity.top('book', window)]
+
+        first, second, third = (book.pk for book in self.books[:3])
+        self.assertEqual(ranked('day'), [third])
+        self.assertEqual(ranked('week'), [second, third])
+        self.assertEqual(ranked('month'), [second, third])
+        # 50 points two months ago have decayed below 1 point today
+        self.assertEqual(ranked('trending'), [second, third, first])
+        with self.assertNumQueries(0):
+            popularity.top('book', 'week')
+        with self.assertRaises(ValueError):
+            popularity.top('book', 'year')
+
+    def test_popular_items_endpoint(self):
+        self.activity(self.books[0], 1, views=1)
+        self.activity(self.books[1], 0, views=3)
+        self.client.force_login(self.user)
+        response = self.client.get('/api/analytics/popular-items/', {'item_type': 'book', 'window': 'week'})
+        self.assertEqual([item['book'] for item in response.json()], [self.books[1].pk, self.books[0].pk])
+        self.assertEqual(response.json()[0]['score'], 3)
+        self.assertEqual(self.client.get('/api/analytics/popular-items/', {'window': 'year'}).status_code, 400)
+
+    def test_home_pages_feature_the_weeks_books(self):
+        self.activity(self.books[3], 1, views=1)
+        self.activity(self.books[4], 0, views=3)
+        featured = popularity.featured_books(Book.objects.order_by('pk'), limit=3)
+        self.assertEqual(featured, [self.books[4], self.books[3], self.books[0]])
+        for url in ('/', '/catalog/'):
+            response = self.client.get(url)
+            self.assertEqual(list(response.context['featured_books'])[:2], [self.books[4], self.books[3]])
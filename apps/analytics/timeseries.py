@@ -0,0 +1,94 @@
+"""
+Zero-filled time series over ``DailyStats`` for the dashboard charts.
+
+``series`` reads a date range with one query and lays the rows over a NumPy
+``datetime64[D]`` calendar, so days without a row read as zero instead of
+costing a query each. Days are grouped into weeks (starting Monday) or
+months with array arithmetic. Counters are summed over each bucket;
+point-in-time figures take the bucket's last recorded day.
+
+Results are cached per range, resolution and metrics. A range that
+includes today expires after ``LIVE_TIMEOUT`` seconds because today's
+counters keep moving. Older ranges expire after ``CLOSED_TIMEOUT``, or as
+soon as this process changes a past day (``rollups.invalidate``). With a
+per-process cache, a backfill run from the command line reaches the web
+workers only through that timeout.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import rollups
+from .models import DailyStats
+
+RESOLUTIONS = ('day', 'week', 'month')
+METRICS = rollups.COUNTERS + rollups.SNAPSHOT_FIELDS
+DEFAULT_METRICS = ('page_views', 'searches', 'logins')
+MAX_DAYS = 3660
+LIVE_TIMEOUT = 60
+CLOSED_TIMEOUT = 60 * 60
+CACHE_PREFIX = 'analytics_timeseries'
+
+
+def bucket_starts(days, resolution):
+    """First day of the bucket each of ``days`` (a ``datetime64[D]`` array) falls in."""
+    if resolution == 'week':
+        # Day 0 of the epoch was a Thursday
+        return days - (days.astype(np.int64) + 3) % 7
+    if resolution == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    return days
+
+
+def _compute(start, end, metrics, resolution):
+    rows = list(DailyStats.objects.filter(date__range=(start, end)).order_by().values_list('date', *metrics))
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    values = np.zeros((len(days), len(metrics)), dtype=np.int64)
+    recorded = np.zeros(len(days), dtype=bool)
+    if rows:
+        dates, *columns = zip(*rows)
+        index = (np.array(dates, dtype='datetime64[D]') - days[0]).astype(np.int64)
+        values[index] = np.column_stack(columns)
+        recorded[index] = True
+
+    labels, bucket = np.unique(bucket_starts(days, resolution), return_inverse=True)
+    totals = np.zeros((len(labels), len(metrics)), dtype=np.int64)
+    np.add.at(totals, bucket, values)
+    last = np.full(len(labels), -1)
+    np.maximum.at(last, bucket[recorded], np.flatnonzero(recorded))
+    latest = np.where((last >= 0)[:, None], values[np.maximum(last, 0)], 0)
+    gauges = np.isin(metrics, rollups.SNAPSHOT_FIELDS)
+    totals[:, gauges] = latest[:, gauges]
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'resolution': resolution,
+        'labels': np.datetime_as_string(labels).tolist(),
+        'series': {metric: totals[:, i].tolist() for i, metric in enumerate(metrics)},
+    }
+
+
+def series(start, end, metrics=DEFAULT_METRICS, resolution='day'):
+    """
+    ``{'start', 'end', 'resolution', 'labels', 'series'}`` for ``start``..``end``.
+
+    ``labels`` are ISO dates of each bucket's first day (a week may start
+    before ``start``); ``series`` maps each metric to one int per label.
+    Raises ``ValueError`` for an unknown metric or resolution or a bad range.
+    """
+    metrics = tuple(metrics)
+    unknown = [metric for metric in metrics if metric not in METRICS]
+    if unknown or not metrics:
+        raise ValueError(f"Unknown metrics: {', '.join(unknown) or '(none)'}")
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f'Resolution must be one of: {", ".join(RESOLUTIONS)}')
+    if start > end or (end - start).days >= MAX_DAYS:
+        raise ValueError(f'The range must run forwards and span at most {MAX_DAYS} days')
+
+    key = f"{CACHE_PREFIX}:{rollups.version()}:{start}:{end}:{resolution}:{','.join(metrics)}"
+    result = cache.get(key)
+    if result is None:
+        result = _compute(start, end, metrics, resolution)
+        cache.set(key, result, LIVE_TIMEOUT if end >= timezone.localdate() else CLOSED_TIMEOUT)
+    return result
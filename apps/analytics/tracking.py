@@ -0,0 +1,142 @@
+"""
+Automatic page-view, login and logout capture.
+
+``PageViewMiddleware`` records successful HTML GET responses and the
+receivers in ``signals`` record logins and logouts. Both go through the
+ingestion buffer (``ingest``), so a tracked request pays for a dict and an
+enqueue, never a database write.
+
+Capture is switched on and off by ``AnalyticsSettings.enable_tracking``. The
+flag is cached and memoized in the process for ``ENABLED_TTL`` seconds
+each, so the middleware does not touch the database or the cache on most
+requests, and a change saved through another process takes effect within
+two TTLs. Path exclusions and per-route sampling rates
+come from ``settings.ANALYTICS_TRACKING``. Sampled page views carry
+their rate in ``metadata['sample_rate']`` so counts can be scaled back up.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import LazyObject, empty
+
+from . import ingest
+from .models import AnalyticsSettings
+
+ENABLED_KEY = 'analytics_tracking_enabled'
+ENABLED_TTL = 10
+
+DEFAULTS = {
+    # Path prefixes that are never recorded; STATIC_URL and MEDIA_URL are always added
+    'EXCLUDE_PREFIXES': ('/api/', '/favicon.ico'),
+    # ``{url name or path prefix: rate}``; the most specific path prefix wins
+    'SAMPLE_RATES': {},
+    'DEFAULT_SAMPLE_RATE': 1.0,
+}
+
+_enabled = (0.0, True)
+
+
+def get_settings():
+    """The ``AnalyticsSettings`` row, created with defaults on first use."""
+    return AnalyticsSettings.objects.get_or_create(pk=1)[0]
+
+
+def enabled():
+    """Whether automatic capture is on, re-read at most every ``ENABLED_TTL`` seconds."""
+    global _enabled
+    checked_at, value = _enabled
+    now = time.monotonic()
+    if now - checked_at < ENABLED_TTL:
+        return value
+    value = cache.get(ENABLED_KEY)
+    if value is None:
+        value = AnalyticsSettings.objects.filter(pk=1).values_list('enable_tracking', flat=True).first()
+        value = True if value is None else value
+        cache.set(ENABLED_KEY, value, ENABLED_TTL)
+    _enabled = (now, value)
+    return value
+
+
+def invalidate():
+    global _enabled
+    cache.delete(ENABLED_KEY)
+    _enabled = (0.0, True)
+
+
+def _user_id(request):
+    """The signed-in user's id, without loading the user just for analytics."""
+    user = getattr(request, 'user', None)
+    if user is None or (isinstance(user, LazyObject) and user._wrapped is empty):
+        return None
+    return user.pk if user.is_authenticated else None
+
+
+def record(request, event_type, **fields):
+    """Queue an event for ``request`` if tracking is enabled."""
+    if not enabled():
+        return False
+    event = ingest.event_from_request(request, event_type, **fields)
+    return ingest.enqueue(event)
+
+
+class PageViewMiddleware:
+    """Queue a ``page_view`` event for each successful HTML page served."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        conf = {**DEFAULTS, **getattr(settings, 'ANALYTICS_TRACKING', {})}
+        prefixes = list(conf['EXCLUDE_PREFIXES'])
+        for url in (settings.STATIC_URL, settings.MEDIA_URL):
+            if url:
+                prefixes.append(url if url.startswith('/') else f'/{url}')
+        self.exclude = tuple(prefixes)
+        rates = conf['SAMPLE_RATES']
+        self.route_rates = {name: rate for name, rate in rates.items() if not name.startswith('/')}
+        self.prefix_rates = sorted(
+            ((prefix, rate) for prefix, rate in rates.items() if prefix.startswith('/')),
+            key=lambda item: len(item[0]), reverse=True,
+        )
+        self.default_rate = conf['DEFAULT_SAMPLE_RATE']
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method == 'GET'
+            and response.status_code == 200
+            and response.get('Content-Type', '').startswith('text/html')
+            and not request.path_info.startswith(self.exclude)
+            and enabled()
+        ):
+            self.track(request)
+        return response
+
+    def sample_rate(self, request):
+        match = request.resolver_match
+        if match is not None and match.view_name in self.route_rates:
+            return self.route_rates[match.view_name]
+        for prefix, rate in self.prefix_rates:
+            if request.path_info.startswith(prefix):
+                return rate
+        return self.default_rate
+
+    def track(self, request):
+        rate = self.sample_rate(request)
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return
+        match = request.resolver_match
+        metadata = {'route': match.view_name} if match is not None else {}
+        if rate < 1:
+            metadata['sample_rate'] = rate
+        session = getattr(request, 'session', None)
+        ingest.enqueue({
+            'event_type': 'page_view',
+            'user_id': _user_id(request),
+            'session_id': session.session_key if session is not None else '',
+            'ip_address': request.META.get('REMOTE_ADDR'),
+            'user_agent': request.META.get('HTTP_USER_AGENT'),
+            'page_url': request.build_absolute_uri(),
+            'referrer': request.META.get('HTTP_REFERER'),
+            'metadata': metadata,
+        })
@@ -7,6 +7,7 @@ urlpatterns = [
     # Main dashboard
     path('', views.AnalyticsDashboardView.as_view(), name='dashboard'),
     path('dashboard/', views.AnalyticsDashboardView.as_view(), name='dashboard_alt'),
+    path('timeseries/', views.analytics_timeseries_view, name='timeseries'),
 
     # Reports
     path('reports/', views.analytics_reports_view, name='reports'),
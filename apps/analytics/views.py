@@ -6,10 +6,12 @@ from django.urls import reverse
 from django.views.generic import ListView, DetailView, TemplateView
 from django.db.models import Count, Sum, Q, Avg
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from django.core.paginator import Paginator
+from django.forms.models import model_to_dict
 from django.http import HttpResponseForbidden
 import json
+from . import popularity, timeseries, tracking
 from .models import AnalyticsEvent, DailyStats, PopularItem, SystemHealth
 from .forms import AnalyticsSettingsForm, ReportGenerationForm, DateRangeForm
 
@@ -46,9 +48,11 @@ class AnalyticsDashboardView(TemplateView):
         # Calculate summary statistics
         context.update(self._get_summary_stats(start_date, end_date))
 
-        # Get popular items
-        context['popular_books'] = PopularItem.objects.filter(item_type='book').order_by('-total_score')[:10]
-        context['popular_documents'] = PopularItem.objects.filter(item_type='document').order_by('-total_score')[:10]
+        # Get popular items from the leaderboard matching the period
+        window = leaderboard_window(days)
+        context['popularity_window'] = window
+        context['popular_books'] = popularity.items('book', window)
+        context['popular_documents'] = popularity.items('document', window)
 
         # Get recent events
         context['recent_events'] = AnalyticsEvent.objects.select_related(
@@ -58,8 +62,9 @@ class AnalyticsDashboardView(TemplateView):
         # Get system health
         context['system_health'] = SystemHealth.objects.first()
 
-        # Get user activity data for charts
-        context['chart_data'] = self._get_chart_data(start_date, end_date)
+        # The activity chart fetches its series from ``analytics_timeseries_view``
+        context['resolution'] = chart_resolution(days)
+        context['event_distribution'] = self._get_event_distribution(start_date, end_date)
 
         return context
 
@@ -89,15 +94,12 @@ class AnalyticsDashboardView(TemplateView):
         # Circulation statistics
         from apps.circulation.models import Loan
         total_loans = Loan.objects.count()
-        active_loans = Loan.objects.filter(status='active').count()
-        overdue_loans = Loan.objects.filter(
-            status='active',
-            due_date__date__lt=timezone.now().date()
-        ).count()
+        active_loans = Loan.objects.open().count()
+        overdue_loans = Loan.objects.overdue().count()
 
         # Repository statistics
-        from apps.repository.models import Document
-        total_documents = Document.objects.count()
+        from apps.repository.models import EBook
+        total_documents = EBook.objects.count()
         document_downloads = AnalyticsEvent.objects.filter(
             event_type='download',
             created_at__date__gte=start_date,
@@ -118,53 +120,56 @@ class AnalyticsDashboardView(TemplateView):
             'document_downloads': document_downloads,
         }
 
-    def _get_chart_data(self, start_date, end_date):
-        """Prepare data for charts."""
-        # Daily activity data
-        daily_data = []
-        current_date = start_date
-
-        while current_date <= end_date:
-            day_stats = DailyStats.objects.filter(date=current_date).first()
-
-            if day_stats:
-                daily_data.append({
-                    'date': current_date.strftime('%Y-%m-%d'),
-                    'loans': day_stats.total_loans,
-                    'returns': day_stats.returned_today,
-                    'page_views': day_stats.page_views,
-                    'searches': day_stats.searches,
-                    'logins': day_stats.logins,
-                })
-            else:
-                daily_data.append({
-                    'date': current_date.strftime('%Y-%m-%d'),
-                    'loans': 0,
-                    'returns': 0,
-                    'page_views': 0,
-                    'searches': 0,
-                    'logins': 0,
-                })
-
-            current_date += timedelta(days=1)
-
-        # Event type distribution
+    def _get_event_distribution(self, start_date, end_date):
+        """Event counts per type for the period, most frequent first."""
         event_types = AnalyticsEvent.objects.filter(
             created_at__date__gte=start_date,
             created_at__date__lte=end_date
         ).values('event_type').annotate(count=Count('event_type')).order_by('-count')
 
-        event_distribution = []
-        for event in event_types:
-            event_distribution.append({
-                'type': event['event_type'].replace('_', ' ').title(),
-                'count': event['count']
-            })
+        return [
+            {'type': event['event_type'].replace('_', ' ').title(), 'count': event['count']}
+            for event in event_types
+        ]
 
-        return {
-            'daily_activity': daily_data,
-            'event_distribution': event_distribution,
-        }
+
+def leaderboard_window(days):
+    """Shortest popularity window covering ``days``; trending beyond a month."""
+    for window, length in popularity.WINDOWS.items():
+        if days <= length:
+            return window
+    return 'trending'
+
+
+def chart_resolution(days):
+    """Bucket size that keeps a chart of ``days`` days readable."""
+    if days <= 90:
+        return 'day'
+    return 'week' if days <= 366 else 'month'
+
+
+@login_required
+@user_passes_test(lambda u: u.is_superuser or u.is_staff)
+def analytics_timeseries_view(request):
+    """
+    Zero-filled ``DailyStats`` series as JSON for the dashboard charts.
+
+    Takes ``start`` and ``end`` (ISO dates) or ``days`` back from today,
+    ``resolution`` (day, week or month) and comma-separated ``metrics``.
+    """
+    try:
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+        if request.GET.get('start'):
+            start = date.fromisoformat(request.GET['start'])
+        else:
+            start = end - timedelta(days=int(request.GET.get('days', 30)))
+        metrics = [metric for metric in request.GET.get('metrics', '').split(',') if metric]
+        data = timeseries.series(
+            start, end, metrics or timeseries.DEFAULT_METRICS, request.GET.get('resolution', 'day'),
+        )
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse(data)
 
 
 @login_required
@@ -283,14 +288,17 @@ def event_analytics_view(request):
 @user_passes_test(lambda u: u.is_superuser)
 def analytics_settings_view(request):
     """Analytics settings and configuration."""
+    analytics_settings = tracking.get_settings()
     if request.method == 'POST':
         form = AnalyticsSettingsForm(request.POST)
         if form.is_valid():
-            # Save settings (implement based on your settings model)
+            for name, value in form.cleaned_data.items():
+                setattr(analytics_settings, name, value)
+            analytics_settings.save()
             messages.success(request, 'Analytics settings updated successfully.')
             return redirect('analytics:settings')
     else:
-        form = AnalyticsSettingsForm()
+        form = AnalyticsSettingsForm(initial=model_to_dict(analytics_settings, fields=list(AnalyticsSettingsForm.base_fields)))
 
     context = {
         'form': form,
@@ -372,8 +380,8 @@ def generate_report_data(report_type, start_date, end_date):
             'title': 'Circulation Summary Report',
             'period': f'{start_date} to {end_date}',
             'total_loans': loans.count(),
-            'active_loans': loans.filter(status='active').count(),
-            'overdue_loans': loans.filter(status='active', due_date__date__lt=timezone.now().date()).count(),
+            'active_loans': loans.open().count(),
+            'overdue_loans': loans.overdue().count(),
             'returned_loans': loans.filter(status='returned').count(),
         }
 
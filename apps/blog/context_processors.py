@@ -1,41 +1,57 @@
-from .models import BlogPost
+"""
+Blog sidebar context.
+
+Context processors run on every render, so nothing here touches the
+database up front: ``recent_posts`` is an unevaluated queryset and
+``archive_months`` a callable the template engine invokes only when a
+template reads it. The archive itself is one ``TruncMonth`` aggregate,
+cached for ``ARCHIVE_TIMEOUT`` seconds and cleared when a ``BlogPost`` is
+saved or deleted (see ``signals``) or bulk-updated in the admin. The
+timeout bounds how long other processes keep a stale copy.
+"""
+from functools import cache as memoize
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
 from django.utils import timezone
-from datetime import timedelta
 
-def blog_context(request):
-    context = {}
+from .models import BlogPost
+
+ARCHIVE_KEYS = {False: 'blog_archive_months', True: 'blog_archive_months_staff'}
+ARCHIVE_MONTHS = 6
+ARCHIVE_TIMEOUT = 10 * 60
 
+
+def archive_months(include_drafts=False):
+    """The latest months with posts, as ``{'month', 'date', 'count'}`` dicts, cached."""
+    key = ARCHIVE_KEYS[include_drafts]
+    months = cache.get(key)
+    if months is None:
+        posts = BlogPost.objects.filter(published_date__isnull=False)
+        if not include_drafts:
+            posts = posts.filter(status='published')
+        months = [
+            {'month': row['date'].strftime('%B %Y'), 'date': row['date'], 'count': row['count']}
+            for row in posts.annotate(date=TruncMonth('published_date'))
+            .values('date').annotate(count=Count('pk')).order_by('-date')[:ARCHIVE_MONTHS]
+        ]
+        cache.set(key, months, ARCHIVE_TIMEOUT)
+    return months
+
+
+def invalidate_archive():
+    cache.delete_many(list(ARCHIVE_KEYS.values()))
+
+
+def blog_context(request):
     # Recent published posts for sidebar
     recent_posts = BlogPost.objects.filter(
         status='published',
         published_date__lte=timezone.now()
     ).order_by('-published_date')[:5]
 
-    context['recent_posts'] = recent_posts
-
-    # Archive data (group by month)
-    if request.user.is_staff:
-        posts_for_archive = BlogPost.objects.all()
-    else:
-        posts_for_archive = BlogPost.objects.filter(status='published')
-
-    # Get unique months with posts
-    archive_months = []
-    for post in posts_for_archive:
-        if post.published_date:
-            month = post.published_date.strftime('%B %Y')
-            if month not in [m['month'] for m in archive_months]:
-                archive_months.append({
-                    'month': month,
-                    'date': post.published_date,
-                    'count': posts_for_archive.filter(
-                        published_date__year=post.published_date.year,
-                        published_date__month=post.published_date.month
-                    ).count()
-                })
-
-    # Sort by date descending
-    archive_months.sort(key=lambda x: x['date'], reverse=True)
-    context['archive_months'] = archive_months[:6]
-
-    return context
+    return {
+        'recent_posts': recent_posts,
+        'archive_months': memoize(lambda: archive_months(request.user.is_staff)),
+    }
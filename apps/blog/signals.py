@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .context_processors import invalidate_archive
+from .models import BlogPost
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+def clear_archive_cache(sender, raw=False, **kwargs):
+    """Drop the cached sidebar archive whenever a post changes."""
+    if not raw:
+        invalidate_archive()
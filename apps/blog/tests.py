@@ -1,3 +1,75 @@
-from django.test import TestCase
+from datetime import datetime
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.cache import cache
+from django.db import connection
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.accounts.models import LibraryUser
+from config.bulk_actions import bulk_update_blog_status
+from .context_processors import blog_context
+from .models import BlogPost
+
+
+class BlogContextTest(TestCase):
+    """Tests for the lazy, cached blog sidebar context."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = LibraryUser.objects.create_user('writer', password='pass', membership_type='student')
+        for month, status in ((1, 'published'), (1, 'published'), (3, 'published'), (3, 'draft')):
+            BlogPost.objects.create(
+                title=f'Post {month} {status}', content='...', author=cls.author, status=status,
+                published_date=timezone.make_aware(datetime(2025, month, 10)),
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def context(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return blog_context(request)
+
+    def test_pages_without_sidebar_issue_no_blog_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/catalog/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query['sql'] for query in queries.captured_queries if 'blog_blogpost' in query['sql']])
+
+    def test_archive_is_one_cached_query(self):
+        archive = self.context(self.author)['archive_months']
+        with self.assertNumQueries(1):
+            months = archive()
+            archive()
+        self.assertEqual([(month['month'], month['count']) for month in months],
+                         [('March 2025', 1), ('January 2025', 2)])
+
+        # Staff see drafts; the staff archive is cached separately
+        self.author.is_staff = True
+        with self.assertNumQueries(1):
+            self.assertEqual(self.context(self.author)['archive_months']()[0]['count'], 2)
+
+        # Rendering again is served from the cache until a post changes
+        template = Template('{% for month in archive_months %}{{ month.month }}:{{ month.count }};{% endfor %}')
+        self.author.is_staff = False
+        with self.assertNumQueries(0):
+            self.assertEqual(template.render(Context(self.context(self.author))), 'March 2025:1;January 2025:2;')
+        BlogPost.objects.filter(status='draft').get().delete()
+        BlogPost.objects.create(title='New', content='...', author=self.author, status='published',
+                                published_date=timezone.make_aware(datetime(2025, 3, 20)))
+        self.assertEqual(self.context(self.author)['archive_months']()[0]['count'], 2)
+
+    def test_bulk_status_update_clears_archive(self):
+        self.assertEqual(self.context(self.author)['archive_months']()[0]['count'], 1)
+        request = RequestFactory().post('/', {'apply': '1', 'status': 'published'})
+        request.user = self.author
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        bulk_update_blog_status(admin.site._registry[BlogPost], request, BlogPost.objects.filter(status='draft'))
+        self.assertEqual(self.context(self.author)['archive_months']()[0]['count'], 2)
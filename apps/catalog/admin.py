@@ -11,6 +11,7 @@ from import_export.fields import Field
 from import_export.widgets import ForeignKeyWidget, ManyToManyWidget
 from import_export.forms import ImportForm
 from .models import Author, Publisher, Faculty, Department, Topic, Genre, Book, BookCopy
+from .taxonomy import get_taxonomy
 from .forms import AuthorForm, PublisherForm, FacultyForm, DepartmentForm, TopicForm, GenreForm, BookForm, BookCopyForm
 from config.bulk_actions import (
     bulk_update_book_status, bulk_update_book_condition, bulk_update_book_location,
@@ -50,7 +51,8 @@ class FacultyAdmin(admin.ModelAdmin):
     list_filter = []
 
     def department_count(self, obj):
-        return obj.departments.count()
+        faculty = get_taxonomy().faculties.get(obj.pk)
+        return faculty.child_count if faculty else 0
     department_count.short_description = 'Departments'
 
     def book_count(self, obj):
@@ -63,10 +65,12 @@ class DepartmentAdmin(admin.ModelAdmin):
     form = DepartmentForm
     list_display = ['name', 'code', 'faculty', 'topic_count', 'book_count']
     list_filter = ['faculty']
+    list_select_related = ['faculty']
     search_fields = ['name', 'code']
 
     def topic_count(self, obj):
-        return obj.topics.count()
+        department = get_taxonomy().departments.get(obj.pk)
+        return department.child_count if department else 0
     topic_count.short_description = 'Topics'
 
     def book_count(self, obj):
@@ -79,10 +83,12 @@ class TopicAdmin(admin.ModelAdmin):
     form = TopicForm
     list_display = ['name', 'code', 'department', 'faculty', 'book_count']
     list_filter = ['department__faculty', 'department']
+    list_select_related = ['department']
     search_fields = ['name', 'code']
 
     def faculty(self, obj):
-        return obj.department.faculty if obj.department else None
+        department = get_taxonomy().departments.get(obj.department_id)
+        return department.parent_name if department else None
     faculty.short_description = 'Faculty'
 
     def book_count(self, obj):
@@ -174,36 +180,28 @@ class BookResource(resources.ModelResource):
 class BookAdmin(ImportExportModelAdmin):
     resource_class = BookResource
     form = BookForm
-    list_display = ['title', 'isbn', 'publisher', 'faculty', 'department', 'topic', 'genre', 'publication_date', 'copy_count', 'available_copies']
+    list_display = ['title', 'isbn', 'publisher', 'faculty', 'department', 'topic', 'genre', 'publication_date', 'total_copies', 'available_copies']
     list_filter = ['faculty', 'department', 'topic__department__faculty', 'topic__department', 'topic', 'genre', 'publisher', 'publication_date']
     search_fields = ['title', 'isbn', 'authors__name']
     filter_horizontal = ['authors']
-    readonly_fields = ['copy_count', 'available_copies']
+    readonly_fields = ['total_copies', 'available_copies']
     actions = ['bulk_upload_books']
     change_list_template = 'admin/catalog/book/change_list.html'
 
 
 
-    def copy_count(self, obj):
-        return obj.copies.count()
-    copy_count.short_description = 'Total Copies'
-
-    def available_copies(self, obj):
-        return obj.copies.filter(status='available').count()
-    available_copies.short_description = 'Available Copies'
-
     def get_form(self, request, obj=None, **kwargs):
         form = super().get_form(request, obj, **kwargs)
         # Add JavaScript for dynamic filtering
         if 'faculty' in form.base_fields:
             form.base_fields['faculty'].widget.attrs.update({
                 'onchange': 'filterDepartments(this.value)',
-                'data-url': reverse('admin:catalog_department_changelist')
+                'data-url': reverse('catalog:api_departments')
             })
         if 'department' in form.base_fields:
             form.base_fields['department'].widget.attrs.update({
                 'onchange': 'filterTopics(this.value)',
-                'data-url': reverse('admin:catalog_topic_changelist')
+                'data-url': reverse('catalog:api_topics')
             })
         return form
 
@@ -9,6 +9,7 @@ from .serializers import (
     TopicSerializer, GenreSerializer, BookSerializer, BookCopySerializer,
     BookSearchSerializer
 )
+from . import autocomplete, facets, search
 
 
 class AuthorViewSet(viewsets.ModelViewSet):
@@ -51,48 +52,31 @@ class GenreViewSet(viewsets.ReadOnlyModelViewSet):
 
 class BookViewSet(viewsets.ModelViewSet):
     """ViewSet for Book model."""
-    queryset = Book.objects.all()
+    # Same order as the keyset cursor, so page-number and cursor pages agree
+    queryset = Book.objects.order_by('-created_at', '-id')
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
-        queryset = Book.objects.all()
+        queryset = self.queryset.select_related(
+            'publisher', 'faculty', 'department', 'topic', 'genre'
+        ).prefetch_related('authors')
         search_serializer = BookSearchSerializer(data=self.request.query_params)
         search_serializer.is_valid(raise_exception=False)
 
         if search_serializer.validated_data:
             params = search_serializer.validated_data
 
-            # Enhanced full-text search across multiple fields
-            if params.get('q'):
-                search_term = params['q']
-                queryset = queryset.filter(
-                    Q(title__icontains=search_term) |
-                    Q(description__icontains=search_term) |
-                    Q(authors__name__icontains=search_term) |
-                    Q(isbn__icontains=search_term) |
-                    Q(publisher__name__icontains=search_term) |
-                    Q(genre__name__icontains=search_term) |
-                    Q(faculty__name__icontains=search_term) |
-                    Q(department__name__icontains=search_term) |
-                    Q(language__icontains=search_term)
-                ).distinct()
-
-            # Individual field filters
-            if params.get('author'):
-                queryset = queryset.filter(authors__name__icontains=params['author'])
-
-            if params.get('title'):
-                queryset = queryset.filter(title__icontains=params['title'])
-
-            if params.get('isbn'):
-                queryset = queryset.filter(isbn__icontains=params['isbn'])
-
-            if params.get('genre'):
-                queryset = queryset.filter(genre__name__icontains=params['genre'])
-
-            if params.get('publisher'):
-                queryset = queryset.filter(publisher__name__icontains=params['publisher'])
+            # Ranked full-text search; field filters are scoped to their column
+            fields = {
+                'authors': params.get('author'),
+                'title': params.get('title'),
+                'isbn': params.get('isbn'),
+                'genre': params.get('genre'),
+                'publisher': params.get('publisher'),
+            }
+            if params.get('q') or any(fields.values()):
+                queryset = search.search(queryset, params.get('q', ''), fields)
 
             if params.get('faculty'):
                 queryset = queryset.filter(faculty__name__icontains=params['faculty'])
@@ -104,7 +88,7 @@ class BookViewSet(viewsets.ModelViewSet):
                 queryset = queryset.filter(language__icontains=params['language'])
 
             if params.get('available_only'):
-                queryset = queryset.filter(copies__status='available').distinct()
+                queryset = queryset.filter(available_copies__gt=0)
 
         return queryset
 
@@ -116,6 +100,30 @@ class BookViewSet(viewsets.ModelViewSet):
         serializer = BookCopySerializer(copies, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], url_path='facets')
+    def facet_counts(self, request):
+        """Get facet counts for the list filters (q, faculty, department, topic, genre, author, available_only)."""
+        filters = facets.normalize_filters(request.query_params)
+        try:
+            top_authors = min(int(request.query_params.get('top_authors', facets.TOP_AUTHORS)), 100)
+        except ValueError:
+            top_authors = facets.TOP_AUTHORS
+        return Response(facets.get_facets(filters, top_authors=top_authors))
+
+    @action(detail=False, methods=['get'])
+    def facet_lookup(self, request):
+        """Look up values of one facet dimension whose names contain a term."""
+        dimension = request.query_params.get('dimension', 'author')
+        if dimension not in facets.DIMENSIONS:
+            return Response({'error': 'Unknown facet dimension'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            limit = 20
+        filters = facets.normalize_filters(request.query_params)
+        term = request.query_params.get('term', '')
+        return Response(facets.lookup_facet(filters, dimension, term, limit))
+
     @action(detail=False, methods=['get'])
     def search_suggestions(self, request):
         """Get search suggestions."""
@@ -123,26 +131,12 @@ class BookViewSet(viewsets.ModelViewSet):
         if len(query) < 2:
             return Response([])
 
-        # Get suggestions from various fields
-        suggestions = []
-
-        # Title suggestions
-        titles = Book.objects.filter(
-            title__icontains=query
-        ).values_list('title', flat=True).distinct()[:5]
-        suggestions.extend([{'type': 'title', 'value': title} for title in titles])
-
-        # Author suggestions
-        authors = Author.objects.filter(
-            name__icontains=query
-        ).values_list('name', flat=True).distinct()[:5]
-        suggestions.extend([{'type': 'author', 'value': author} for author in authors])
-
-        # Genre suggestions
-        genres = Genre.objects.filter(
-            name__icontains=query
-        ).values_list('name', flat=True).distinct()[:5]
-        suggestions.extend([{'type': 'genre', 'value': genre} for genre in genres])
+        # Served from the in-memory prefix index
+        labels = {'book': 'title', 'author': 'author', 'genre': 'genre'}
+        suggestions = [
+            {'type': labels[kind], 'value': value}
+            for kind, value in autocomplete.suggest(query, kinds=('book', 'author', 'genre'), limit=5)
+        ]
 
         return Response(suggestions[:10])
 
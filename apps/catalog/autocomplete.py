@@ -0,0 +1,258 @@
+"""
+In-memory prefix index for search suggestions.
+
+Book titles, author names, genre names and eBook titles are folded to
+lowercase ASCII and split into tokens; every token is kept in one sorted
+list of ``(token, kind, pk)`` tuples, so a prefix lookup is a binary search
+plus a short scan, without touching the database. Entries are weighted by
+``PopularItem`` scores and by how often they were searched for.
+
+Each process builds the index once and then applies saves and deletes
+incrementally. Every change bumps a version number in the shared cache and
+is stored there under that version, so other processes replay the changes
+they missed on their next lookup. A process only rebuilds from the database
+when a change has expired from the cache, when it fell more than
+``MAX_CHANGES`` versions behind, or after ``invalidate()``.
+"""
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, namedtuple
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+VERSION_KEY = 'catalog_autocomplete_version'
+CHANGE_KEY = 'catalog_autocomplete_change:{}'
+KINDS = ('book', 'author', 'genre', 'document')
+MAX_AGE = 60 * 60
+MAX_CHANGES = 200
+MAX_SCAN = 5000
+SEARCH_WINDOW_DAYS = 90
+MEMO_SIZE = 2048
+
+Entry = namedtuple('Entry', ['kind', 'pk', 'value', 'folded', 'tokens', 'weight'])
+
+_lock = threading.Lock()
+_index = None
+
+_split = re.compile(r'[^0-9a-z]+').split
+
+
+def fold(text):
+    """Lowercase ``text`` and strip accents and punctuation."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(token for token in _split(text.casefold()) if token)
+
+
+class PrefixIndex:
+    """Sorted token array over weighted suggestion entries."""
+
+    def __init__(self, version, entries=()):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.entries = {}
+        self.keys = []
+        self.memo = {}
+        for entry in entries:
+            self.entries[(entry.kind, entry.pk)] = entry
+            self.keys.extend((token, entry.kind, entry.pk) for token in entry.tokens)
+        self.keys.sort()
+
+    def add(self, kind, pk, value, weight=None):
+        previous = self.remove(kind, pk)
+        if weight is None:
+            weight = previous.weight if previous else 0
+        folded = fold(value)
+        entry = Entry(kind, pk, value, folded, frozenset(folded.split()), weight)
+        self.entries[(kind, pk)] = entry
+        for token in entry.tokens:
+            insort(self.keys, (token, kind, pk))
+        self.memo = {}
+
+    def remove(self, kind, pk):
+        entry = self.entries.pop((kind, pk), None)
+        if entry is not None:
+            for token in entry.tokens:
+                position = bisect_left(self.keys, (token, kind, pk))
+                if position < len(self.keys) and self.keys[position] == (token, kind, pk):
+                    del self.keys[position]
+            self.memo = {}
+        return entry
+
+    def lookup(self, text, kinds=KINDS, limit=5):
+        """Return ``limit`` best ``(kind, value)`` pairs per kind, in ``kinds`` order."""
+        folded = fold(text)
+        if not folded:
+            return []
+        memo_key = (folded, tuple(kinds), limit)
+        result = self.memo.get(memo_key)
+        if result is not None:
+            return result
+
+        words = folded.split()
+        # Scan the most selective word; every other word must prefix some token
+        anchor = max(words, key=len)
+        candidates = {}
+        position = bisect_left(self.keys, (anchor,))
+        end = min(len(self.keys), position + MAX_SCAN)
+        while position < end and self.keys[position][0].startswith(anchor):
+            _, kind, pk = self.keys[position]
+            if kind in kinds:
+                entry = self.entries[(kind, pk)]
+                if all(any(token.startswith(word) for token in entry.tokens) for word in words):
+                    candidates.setdefault(kind, {})[pk] = entry
+            position += 1
+
+        result = []
+        for kind in kinds:
+            ranked = heapq.nsmallest(
+                limit * 2,
+                candidates.get(kind, {}).values(),
+                key=lambda entry: (not entry.folded.startswith(folded), -entry.weight, len(entry.value), entry.value),
+            )
+            seen = set()
+            for entry in ranked:
+                if entry.value not in seen and len(seen) < limit:
+                    seen.add(entry.value)
+                    result.append((kind, entry.value))
+
+        if len(self.memo) >= MEMO_SIZE:
+            self.memo = {}
+        self.memo[memo_key] = result
+        return result
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seeded from the clock so a lost version key never matches a stale index
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _load_entries():
+    from apps.analytics.models import AnalyticsEvent, PopularItem
+    from apps.repository.models import EBook
+    from .models import Author, Book, Genre
+
+    book_scores = dict(
+        PopularItem.objects.filter(item_type='book', book__isnull=False)
+        .values_list('book_id', 'total_score')
+    )
+    document_scores = dict(
+        PopularItem.objects.filter(item_type='document', document__isnull=False)
+        .values_list('document_id', 'total_score')
+    )
+    searches = Counter()
+    since = timezone.now() - timedelta(days=SEARCH_WINDOW_DAYS)
+    for query, count in (
+        AnalyticsEvent.objects.filter(event_type='search', created_at__gte=since)
+        .exclude(search_query='').order_by()
+        .values_list('search_query').annotate(count=Count('id'))
+    ):
+        searches[fold(query)] += count
+
+    books = list(Book.objects.order_by().values_list('pk', 'title', 'genre_id'))
+    author_scores, genre_scores = Counter(), Counter()
+    for pk, _, genre_id in books:
+        if genre_id:
+            genre_scores[genre_id] += book_scores.get(pk, 0)
+    for book_id, author_id in Book.authors.through.objects.values_list('book_id', 'author_id'):
+        author_scores[author_id] += book_scores.get(book_id, 0)
+
+    sources = [
+        ('book', [(pk, title) for pk, title, _ in books], book_scores),
+        ('author', Author.objects.order_by().values_list('pk', 'name'), author_scores),
+        ('genre', Genre.objects.order_by().values_list('pk', 'name'), genre_scores),
+        ('document', EBook.objects.order_by().values_list('pk', 'title'), document_scores),
+    ]
+    for kind, rows, scores in sources:
+        for pk, value in rows:
+            folded = fold(value)
+            weight = scores.get(pk, 0) + searches.get(folded, 0)
+            yield Entry(kind, pk, value, folded, frozenset(folded.split()), weight)
+
+
+def _apply(index, change):
+    action, kind, pk, value = change
+    if action == 'add':
+        index.add(kind, pk, value)
+    else:
+        index.remove(kind, pk)
+
+
+def _catch_up(index, version):
+    """Replay the changes between ``index.version`` and ``version``; False if any are gone."""
+    if not index.version < version <= index.version + MAX_CHANGES:
+        return False
+    keys = [CHANGE_KEY.format(number) for number in range(index.version + 1, version + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) != len(keys):
+        return False
+    for key in keys:
+        _apply(index, changes[key])
+    index.version = version
+    return True
+
+
+def get_index():
+    """Return the current ``PrefixIndex``, catching up or rebuilding it if stale."""
+    global _index
+    version = _current_version()
+    index = _index
+    if index is None or index.version != version or time.monotonic() - index.built_at > MAX_AGE:
+        with _lock:
+            index = _index
+            if index is None or time.monotonic() - index.built_at > MAX_AGE or (
+                index.version != version and not _catch_up(index, version)
+            ):
+                index = _index = PrefixIndex(version, _load_entries())
+    return index
+
+
+def suggest(text, kinds=KINDS, limit=5):
+    """Return up to ``limit`` ``(kind, value)`` suggestions per kind for ``text``."""
+    return get_index().lookup(text, kinds, limit)
+
+
+def _bump(change):
+    with _lock:
+        index = _index
+        current = index is not None and index.version == cache.get(VERSION_KEY)
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            version = time.time_ns()
+            cache.set(VERSION_KEY, version, None)
+        cache.set(CHANGE_KEY.format(version), change, MAX_AGE)
+        if current:
+            _apply(index, change)
+            index.version = version
+
+
+def update(kind, pk, value):
+    """Add or replace one entry, keeping its popularity weight."""
+    _bump(('add', kind, pk, value))
+
+
+def remove(kind, pk):
+    """Drop one entry from the index."""
+    _bump(('remove', kind, pk, None))
+
+
+def invalidate():
+    """Force every process to rebuild its index, refreshing weights."""
+    global _index
+    _index = None
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
@@ -0,0 +1,201 @@
+"""
+Facet counts for the book catalog.
+
+For a set of list filters, each dimension (faculty, department, topic, genre,
+author) is counted with one grouped query over the books matching every
+*other* filter, so a selected value still shows its siblings. Results are
+cached under a hash of the normalized filters and a catalog version that is
+bumped whenever books, copies or taxonomy change.
+"""
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.db.models.functions import Coalesce
+
+from . import search
+from .models import Author, Book, Department, Faculty, Genre, Topic
+from .taxonomy import get_taxonomy
+
+CACHE_TIMEOUT = 60 * 10
+VERSION_KEY = 'book_facets_version'
+TOP_AUTHORS = 10
+
+FILTER_KEYS = ('q', 'faculty', 'department', 'topic', 'genre', 'author', 'available')
+DIMENSIONS = ('faculty', 'department', 'topic', 'genre', 'author')
+
+
+def normalize_filters(params):
+    """Extract list filters from request parameters in a canonical form."""
+    filters = {}
+    query = ' '.join((params.get('q') or '').split())
+    if query:
+        filters['q'] = query
+    for key in ('faculty', 'department', 'topic', 'author'):
+        value = (params.get(key) or '').strip()
+        if value.isdigit():
+            filters[key] = int(value)
+    genre = (params.get('genre') or '').strip()
+    if genre:
+        filters['genre'] = int(genre) if genre.isdigit() else genre
+    if str(params.get('available') or params.get('available_only') or '').lower() in ('1', 'true', 'on', 'yes'):
+        filters['available'] = True
+    return filters
+
+
+def filter_books(queryset, filters, exclude=None):
+    """Apply normalized filters to a Book queryset, skipping ``exclude``."""
+    def wanted(key):
+        return key in filters and key != exclude
+
+    if wanted('q'):
+        queryset = search.search(queryset, filters['q'])
+    if wanted('topic'):
+        queryset = queryset.filter(topic_id=filters['topic'])
+    # Topic descendants come from the taxonomy snapshot, avoiding joins
+    if wanted('faculty'):
+        topic_ids = get_taxonomy().faculty_topic_ids.get(filters['faculty'], frozenset())
+        queryset = queryset.filter(Q(faculty_id=filters['faculty']) | Q(topic_id__in=topic_ids))
+    if wanted('department'):
+        topic_ids = get_taxonomy().department_topic_ids.get(filters['department'], frozenset())
+        queryset = queryset.filter(Q(department_id=filters['department']) | Q(topic_id__in=topic_ids))
+    if wanted('genre'):
+        if isinstance(filters['genre'], int):
+            queryset = queryset.filter(genre_id=filters['genre'])
+        else:
+            queryset = queryset.filter(genre__name=filters['genre'])
+    if wanted('author'):
+        queryset = queryset.filter(authors__id=filters['author'])
+    if wanted('available'):
+        queryset = queryset.filter(available_copies__gt=0)
+    return queryset
+
+
+# Grouping expression and label model for each dimension. Faculty and
+# department fall back to the topic's parents, matching ``filter_books``.
+_GROUPING = {
+    'faculty': (Coalesce('faculty', 'topic__department__faculty'), Faculty),
+    'department': (Coalesce('department', 'topic__department'), Department),
+    'topic': (F('topic'), Topic),
+    'genre': (F('genre'), Genre),
+    'author': (F('authors'), Author),
+}
+
+# Dimensions labelled from the taxonomy snapshot instead of a query
+_TAXONOMY_NODES = {'faculty': 'faculties', 'department': 'departments', 'topic': 'topics'}
+
+
+def _grouped_counts(filters, dimension, limit=None, term=None):
+    key, model = _GROUPING[dimension]
+    queryset = filter_books(Book.objects.all(), filters, exclude=dimension).order_by()
+    rows = (
+        queryset.values(value=key)
+        .annotate(
+            count=Count('pk', distinct=True),
+            available=Count('pk', filter=Q(available_copies__gt=0), distinct=True),
+        )
+        .filter(value__isnull=False)
+        .order_by('-count', 'value')
+    )
+    if term:
+        rows = rows.filter(value__in=model.objects.filter(name__icontains=term).values('pk'))
+    if limit:
+        rows = rows[:limit]
+    rows = list(rows)
+    labels = _labels(dimension, [row['value'] for row in rows])
+    values = []
+    for row in rows:
+        label = labels.get(row['value'], {})
+        values.append({
+            'id': row['value'],
+            'name': label.get('name', ''),
+            'parent_id': label.get('parent_id'),
+            'count': row['count'],
+            'available': row['available'],
+        })
+    return values
+
+
+def _labels(dimension, ids):
+    """Map ids of a dimension to ``{'name', 'parent_id'}``."""
+    nodes = _TAXONOMY_NODES.get(dimension)
+    if nodes:
+        node_map = getattr(get_taxonomy(), nodes)
+        return {
+            pk: {'name': node_map[pk].name, 'parent_id': node_map[pk].parent_id}
+            for pk in ids if pk in node_map
+        }
+    model = _GROUPING[dimension][1]
+    return {
+        pk: {'name': name, 'parent_id': None}
+        for pk, name in model.objects.filter(pk__in=ids).values_list('pk', 'name')
+    }
+
+
+def describe(dimension, pk):
+    """Return ``{'id', 'name'}`` for one value of a dimension, or None."""
+    label = _labels(dimension, [pk]).get(pk)
+    return {'id': pk, 'name': label['name']} if label else None
+
+
+def _signature(filters, *extra):
+    payload = json.dumps([filters, extra], sort_keys=True, default=str)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seeded from the clock so a lost version key never revives old entries
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Invalidate all cached facet counts."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def get_facets(filters, top_authors=TOP_AUTHORS):
+    """
+    Return totals and per-dimension counts for normalized ``filters``.
+
+    Each dimension is a list of ``{'id', 'name', 'parent_id', 'count', 'available'}``
+    ordered by count; authors are limited to the ``top_authors`` largest,
+    with ``author_total`` giving the number of distinct authors.
+    """
+    key = f'book_facets_{_version()}_{_signature(filters, top_authors)}'
+    facets = cache.get(key)
+    if facets is not None:
+        return facets
+
+    totals = filter_books(Book.objects.all(), filters).order_by().aggregate(
+        total=Count('pk', distinct=True),
+        available=Count('pk', filter=Q(available_copies__gt=0), distinct=True),
+        author_total=Count('authors', distinct=True),
+    )
+    facets = dict(totals)
+    for dimension in DIMENSIONS:
+        limit = top_authors if dimension == 'author' else None
+        facets[dimension] = _grouped_counts(filters, dimension, limit=limit)
+    cache.set(key, facets, CACHE_TIMEOUT)
+    return facets
+
+
+def lookup_facet(filters, dimension, term='', limit=20):
+    """Return counts for one dimension whose names contain ``term``."""
+    if dimension not in DIMENSIONS:
+        raise ValueError(f'Unknown facet dimension: {dimension}')
+    term = ' '.join((term or '').split())
+    key = f'book_facet_lookup_{_version()}_{_signature(filters, dimension, term.lower(), limit)}'
+    values = cache.get(key)
+    if values is None:
+        values = _grouped_counts(filters, dimension, limit=limit, term=term)
+        cache.set(key, values, CACHE_TIMEOUT)
+    return values
@@ -0,0 +1,431 @@
+"""
+Streaming CSV import for the book catalog.
+
+Rows are read incrementally and processed in chunks. For each chunk the
+referenced publishers, genres, authors and taxonomy entries are resolved
+through in-memory caches filled with one bulk query per lookup table, the
+missing ones are ``bulk_create``d, and books plus their author links are
+written with a handful of bulk statements inside one transaction. Rows are
+validated in the same pass; invalid rows are reported and skipped without
+affecting the rest of the chunk.
+
+The column names match ``BookResource``, so exported files import as-is.
+"""
+import csv
+import re
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db import DatabaseError, transaction
+from django.utils.dateparse import parse_date
+
+from . import autocomplete, facets, search, taxonomy
+from .models import Author, Book, Department, Faculty, Genre, Publisher, Topic
+
+CHUNK_SIZE = 1000
+MAX_ERRORS = 1000
+
+# Accepted header → canonical column
+COLUMNS = {
+    'title': 'title',
+    'isbn': 'isbn',
+    'authors': 'authors',
+    'publisher__name': 'publisher',
+    'publisher': 'publisher',
+    'faculty__name': 'faculty',
+    'faculty': 'faculty',
+    'department__name': 'department',
+    'department': 'department',
+    'topic__name': 'topic',
+    'topic': 'topic',
+    'genre__name': 'genre',
+    'genre': 'genre',
+    'description': 'description',
+    'publication_date': 'publication_date',
+    'edition': 'edition',
+    'pages': 'pages',
+    'language': 'language',
+}
+BOOK_FIELDS = (
+    'title', 'publisher_id', 'faculty_id', 'department_id', 'topic_id', 'genre_id',
+    'description', 'publication_date', 'edition', 'pages', 'language',
+)
+REQUIRED = ('title', 'isbn', 'publisher', 'publication_date', 'pages')
+
+_isbn_clean = re.compile(r'[\s-]+')
+_isbn_valid = re.compile(r'^(\d{9}[\dX]|\d{13})$')
+
+
+class RowError(ValueError):
+    """A row that cannot be imported."""
+
+
+@dataclass
+class ImportResult:
+    """Running totals of an import."""
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    chunks: int = 0
+    errors: list = field(default_factory=list)
+    error_count: int = 0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+    @property
+    def has_errors(self):
+        return self.error_count > 0
+
+    def summary(self):
+        return (
+            f'{self.created} created, {self.updated} updated, {self.skipped} unchanged, '
+            f'{self.error_count} errors in {self.rows} rows'
+        )
+
+
+def _unique_code(name, length, taken):
+    """Derive an unused code from ``name``, as the admin import does."""
+    base = re.sub(r'[^0-9A-Z]', '', name.upper())[:length] or 'X'
+    code, suffix = base, 1
+    while code in taken:
+        suffix += 1
+        tail = str(suffix)
+        code = base[:length - len(tail)] + tail
+    taken.add(code)
+    return code
+
+
+class BookImporter:
+    """
+    Import books from CSV rows in chunks.
+
+    ``progress`` is called with the ``ImportResult`` after every chunk.
+    With ``update_existing`` false, rows whose ISBN already exists are
+    skipped instead of updated.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE, update_existing=True, progress=None):
+        self.chunk_size = chunk_size
+        self.update_existing = update_existing
+        self.progress = progress
+        self.result = ImportResult()
+        self.seen_isbns = set()
+        self.taxonomy_changed = False
+
+        self._load_lookups()
+
+    def _load_lookups(self):
+        self.publishers = {}
+        self.genres = {}
+        self.authors = {}
+        # Taxonomy tables are small: load them whole
+        self.faculties = dict(Faculty.objects.values_list('name', 'pk'))
+        self.departments = {}
+        self.departments_by_name = {}
+        for pk, name, faculty_id in Department.objects.values_list('pk', 'name', 'faculty_id'):
+            self._remember_department(pk, name, faculty_id)
+        self.topics = {}
+        self.topics_by_name = {}
+        for pk, name, department_id in Topic.objects.values_list('pk', 'name', 'department_id'):
+            self._remember_topic(pk, name, department_id)
+        self.codes = {
+            model: set(model.objects.values_list('code', flat=True))
+            for model in (Faculty, Department, Topic)
+        }
+
+    # Entry points
+
+    def run(self, stream):
+        """Import every row of a CSV text stream and return the result."""
+        reader = csv.DictReader(stream)
+        if not reader.fieldnames:
+            self.result.add_error(0, 'The file is empty.')
+            return self.result
+        headers = {name: COLUMNS.get((name or '').strip().lower()) for name in reader.fieldnames}
+        missing = [column for column in REQUIRED if column not in headers.values()]
+        if missing:
+            self.result.add_error(1, f"Missing columns: {', '.join(missing)}")
+            return self.result
+
+        chunk = []
+        for raw in reader:
+            row = {headers[key]: (value or '').strip() for key, value in raw.items() if headers.get(key)}
+            chunk.append((reader.line_num, row))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+        self.finish()
+        return self.result
+
+    def import_chunk(self, rows):
+        """Validate and write one chunk of ``(line, row)`` pairs."""
+        result = self.result
+        totals = (result.created, result.updated, result.skipped)
+        result.rows += len(rows)
+        result.chunks += 1
+        try:
+            with transaction.atomic():
+                self._write(self._validate(rows))
+        except DatabaseError as exc:
+            # Nothing from this chunk was kept, including new lookup rows
+            result.created, result.updated, result.skipped = totals
+            result.add_error(rows[0][0], f'Chunk ending at line {rows[-1][0]} failed: {exc}')
+            self._load_lookups()
+        if self.progress:
+            self.progress(self.result)
+
+    def finish(self):
+        """Refresh derived caches once the import is done."""
+        facets.invalidate()
+        autocomplete.invalidate()
+        if self.taxonomy_changed:
+            taxonomy.invalidate()
+
+    # Validation
+
+    def _validate(self, rows):
+        valid = []
+        for line, row in rows:
+            try:
+                valid.append((line, self._clean(row)))
+            except RowError as exc:
+                self.result.add_error(line, str(exc))
+        return valid
+
+    def _clean(self, row):
+        for column in REQUIRED:
+            if not row.get(column):
+                raise RowError(f'{column} is required.')
+
+        isbn = _isbn_clean.sub('', row['isbn']).upper()
+        if not _isbn_valid.match(isbn):
+            raise RowError(f"Invalid ISBN '{row['isbn']}'.")
+        if isbn in self.seen_isbns:
+            raise RowError(f'Duplicate ISBN {isbn} in file.')
+        self.seen_isbns.add(isbn)
+
+        value = row['publication_date']
+        try:
+            published = parse_date(value)
+        except ValueError:
+            published = None
+        if published is None and value.isdigit() and len(value) == 4:
+            published = date(int(value), 1, 1)
+        if published is None:
+            raise RowError(f"Invalid publication date '{value}'.")
+
+        try:
+            pages = int(row['pages'])
+        except ValueError:
+            pages = -1
+        if pages < 0:
+            raise RowError(f"Invalid page count '{row['pages']}'.")
+
+        if len(row['title']) > 500:
+            raise RowError('Title is longer than 500 characters.')
+
+        return {
+            'title': row['title'],
+            'isbn': isbn,
+            'authors': [name.strip() for name in row.get('authors', '').split(',') if name.strip()],
+            'publisher': row['publisher'],
+            'faculty': row.get('faculty', ''),
+            'department': row.get('department', ''),
+            'topic': row.get('topic', ''),
+            'genre': row.get('genre', ''),
+            'description': row.get('description', ''),
+            'publication_date': published,
+            'edition': row.get('edition', ''),
+            'pages': pages,
+            'language': row.get('language') or 'English',
+        }
+
+    # Lookups
+
+    @staticmethod
+    def _resolve_names(model, cache, names):
+        """Fill ``cache`` with name → pk for ``names``, creating missing rows."""
+        missing = {name for name in names if name and name not in cache}
+        if not missing:
+            return
+        for pk, name in model.objects.filter(name__in=missing).order_by('pk').values_list('pk', 'name'):
+            cache.setdefault(name, pk)
+        missing -= cache.keys()
+        if missing:
+            for obj in model.objects.bulk_create([model(name=name) for name in sorted(missing)]):
+                cache[obj.name] = obj.pk
+
+    def _remember_department(self, pk, name, faculty_id):
+        self.departments[(faculty_id, name)] = pk
+        self.departments_by_name.setdefault(name, []).append((pk, faculty_id))
+
+    def _remember_topic(self, pk, name, department_id):
+        self.topics[(department_id, name)] = pk
+        self.topics_by_name.setdefault(name, []).append((pk, department_id))
+
+    def _resolve_taxonomy(self, rows):
+        """Resolve faculty, department and topic ids, creating missing nodes."""
+        new_faculties = {row['faculty'] for _, row in rows if row['faculty'] and row['faculty'] not in self.faculties}
+        if new_faculties:
+            created = Faculty.objects.bulk_create([
+                Faculty(name=name, code=_unique_code(name, 10, self.codes[Faculty]))
+                for name in sorted(new_faculties)
+            ])
+            self.faculties.update((obj.name, obj.pk) for obj in created)
+            self.taxonomy_changed = True
+
+        resolved = []
+        new_departments = {}
+        for line, row in rows:
+            try:
+                row['faculty_id'] = self.faculties.get(row['faculty'])
+                row['department_key'] = self._department_key(row)
+            except RowError as exc:
+                self.result.add_error(line, str(exc))
+                continue
+            key = row['department_key']
+            if key and key not in self.departments:
+                new_departments[key] = Department(
+                    name=key[1], faculty_id=key[0],
+                    code=_unique_code(key[1], 10, self.codes[Department]),
+                )
+            resolved.append((line, row))
+        if new_departments:
+            for obj in Department.objects.bulk_create(new_departments.values()):
+                self._remember_department(obj.pk, obj.name, obj.faculty_id)
+            self.taxonomy_changed = True
+
+        rows, resolved = resolved, []
+        new_topics = {}
+        for line, row in rows:
+            row['department_id'] = self.departments.get(row['department_key'])
+            try:
+                row['topic_key'] = self._topic_key(row)
+            except RowError as exc:
+                self.result.add_error(line, str(exc))
+                continue
+            key = row['topic_key']
+            if key and key not in self.topics:
+                new_topics[key] = Topic(
+                    name=key[1], department_id=key[0],
+                    code=_unique_code(key[1], 20, self.codes[Topic]),
+                )
+            resolved.append((line, row))
+        if new_topics:
+            for obj in Topic.objects.bulk_create(new_topics.values()):
+                self._remember_topic(obj.pk, obj.name, obj.department_id)
+            self.taxonomy_changed = True
+
+        for _, row in resolved:
+            row['topic_id'] = self.topics.get(row['topic_key'])
+        return resolved
+
+    def _department_key(self, row):
+        name = row['department']
+        if not name:
+            return None
+        if row['faculty_id']:
+            return (row['faculty_id'], name)
+        matches = self.departments_by_name.get(name, [])
+        if len(matches) == 1:
+            return (matches[0][1], name)
+        if not matches:
+            raise RowError(f"Department '{name}' does not exist; give its faculty to create it.")
+        raise RowError(f"Department '{name}' exists in several faculties; give the faculty.")
+
+    def _topic_key(self, row):
+        name = row['topic']
+        if not name:
+            return None
+        if row['department_id']:
+            return (row['department_id'], name)
+        matches = self.topics_by_name.get(name, [])
+        if len(matches) == 1:
+            return (matches[0][1], name)
+        if not matches:
+            raise RowError(f"Topic '{name}' does not exist; give its department to create it.")
+        raise RowError(f"Topic '{name}' exists in several departments; give the department.")
+
+    # Writing
+
+    def _write(self, rows):
+        if not rows:
+            return
+        rows = self._resolve_taxonomy(rows)
+        self._resolve_names(Publisher, self.publishers, {row['publisher'] for _, row in rows})
+        self._resolve_names(Genre, self.genres, {row['genre'] for _, row in rows})
+        self._resolve_names(Author, self.authors, {name for _, row in rows for name in row['authors']})
+
+        existing = Book.objects.in_bulk([row['isbn'] for _, row in rows], field_name='isbn')
+        current_authors = {}
+        for book_id, author_id in Book.authors.through.objects.filter(
+            book_id__in=[book.pk for book in existing.values()]
+        ).values_list('book_id', 'author_id'):
+            current_authors.setdefault(book_id, set()).add(author_id)
+
+        new_books, new_authors, changed, relink = [], [], [], {}
+        for _, row in rows:
+            values = {
+                'title': row['title'],
+                'publisher_id': self.publishers[row['publisher']],
+                'faculty_id': row['faculty_id'],
+                'department_id': row['department_id'],
+                'topic_id': row['topic_id'],
+                'genre_id': self.genres.get(row['genre']),
+                'description': row['description'],
+                'publication_date': row['publication_date'],
+                'edition': row['edition'],
+                'pages': row['pages'],
+                'language': row['language'],
+            }
+            author_ids = {self.authors[name] for name in row['authors']}
+            book = existing.get(row['isbn'])
+            if book is None:
+                new_books.append(Book(isbn=row['isbn'], **values))
+                new_authors.append(author_ids)
+                continue
+            if not self.update_existing:
+                self.result.skipped += 1
+                continue
+            dirty = any(getattr(book, name) != value for name, value in values.items())
+            if dirty:
+                for name, value in values.items():
+                    setattr(book, name, value)
+                changed.append(book)
+            if author_ids != current_authors.get(book.pk, set()):
+                relink[book.pk] = author_ids
+            if dirty or book.pk in relink:
+                self.result.updated += 1
+            else:
+                self.result.skipped += 1
+
+        Through = Book.authors.through
+        links = []
+        if new_books:
+            Book.objects.bulk_create(new_books)
+            self.result.created += len(new_books)
+            for book, author_ids in zip(new_books, new_authors):
+                links.extend(Through(book_id=book.pk, author_id=author_id) for author_id in author_ids)
+        if changed:
+            Book.objects.bulk_update(changed, BOOK_FIELDS)
+        if relink:
+            Through.objects.filter(book_id__in=list(relink)).delete()
+            for book_id, author_ids in relink.items():
+                links.extend(Through(book_id=book_id, author_id=author_id) for author_id in author_ids)
+        if links:
+            Through.objects.bulk_create(links)
+
+        touched = [book.pk for book in new_books] + [book.pk for book in changed] + list(relink)
+        if touched:
+            search.index_books(set(touched))
+
+
+def import_books(stream, **options):
+    """Import books from a CSV text stream; see ``BookImporter``."""
+    return BookImporter(**options).run(stream)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.catalog.importer import CHUNK_SIZE, BookImporter
+
+
+class Command(BaseCommand):
+    help = 'Stream books from a CSV file into the catalog in bulk chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with BookResource columns')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows written per transaction')
+        parser.add_argument('--skip-existing', action='store_true', help='Leave books with a known ISBN untouched')
+
+    def handle(self, *args, **options):
+        def progress(result):
+            self.stdout.write(f'Chunk {result.chunks}: {result.summary()}')
+
+        importer = BookImporter(
+            chunk_size=options['chunk_size'],
+            update_existing=not options['skip_existing'],
+            progress=progress,
+        )
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+                result = importer.run(stream)
+        except OSError as exc:
+            raise CommandError(f'Cannot read {options["path"]}: {exc}')
+
+        for line, message in result.errors:
+            self.stderr.write(f'Line {line}: {message}')
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'... and {result.error_count - len(result.errors)} more errors')
+
+        style = self.style.WARNING if result.has_errors else self.style.SUCCESS
+        self.stdout.write(style(f'Import finished: {result.summary()}'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.catalog import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for books'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding book search index...')
+        count = search.rebuild_index()
+        if not search.is_available():
+            self.stdout.write(self.style.WARNING('Full-text search requires SQLite with FTS5; using fallback lookups'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} books'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.catalog.models import Book
+
+
+class Command(BaseCommand):
+    help = 'Repair drift in the denormalized Book.total_copies and Book.available_copies counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('book_ids', nargs='*', type=int, help='Only reconcile these books')
+
+    def handle(self, *args, **options):
+        book_ids = options['book_ids'] or None
+        self.stdout.write('Reconciling book copy counters...')
+        repaired = Book.refresh_copy_counts(book_ids)
+        self.stdout.write(self.style.SUCCESS(f'Repaired {repaired} books'))
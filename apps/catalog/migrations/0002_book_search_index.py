@@ -0,0 +1,42 @@
+from django.db import migrations
+
+FTS_TABLE = 'catalog_book_fts'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "title, authors, isbn, description, publisher, genre, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(f"""
+        INSERT INTO {FTS_TABLE} (rowid, title, authors, isbn, description, publisher, genre)
+        SELECT b.id, b.title,
+               COALESCE((SELECT group_concat(a.name, ', ')
+                         FROM catalog_book_authors ba
+                         JOIN catalog_author a ON a.id = ba.author_id
+                         WHERE ba.book_id = b.id), ''),
+               b.isbn, b.description, COALESCE(p.name, ''), COALESCE(g.name, '')
+        FROM catalog_book b
+        LEFT JOIN catalog_publisher p ON p.id = b.publisher_id
+        LEFT JOIN catalog_genre g ON g.id = b.genre_id
+    """)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
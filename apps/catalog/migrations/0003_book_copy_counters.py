@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:35
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def populate_copy_counters(apps, schema_editor):
+    Book = apps.get_model('catalog', 'Book')
+    BookCopy = apps.get_model('catalog', 'BookCopy')
+    copies = BookCopy.objects.filter(book=models.OuterRef('pk')).order_by().values('book')
+    Book.objects.update(
+        total_copies=Coalesce(models.Subquery(copies.annotate(n=models.Count('pk')).values('n')), 0),
+        available_copies=Coalesce(models.Subquery(
+            copies.filter(status='available').annotate(n=models.Count('pk')).values('n')
+        ), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_book_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='available_copies',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of available copies (maintained automatically)'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='total_copies',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of copies (maintained automatically)'),
+        ),
+        migrations.RunPython(populate_copy_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_book_copy_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['created_at', 'id'], name='catalog_boo_created_47a855_idx'),
+        ),
+    ]
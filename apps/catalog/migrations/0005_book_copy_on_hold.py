@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_book_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bookcopy',
+            name='status',
+            field=models.CharField(choices=[('available', 'Available'), ('checked_out', 'Checked Out'), ('on_hold', 'On Hold Shelf'), ('lost', 'Lost'), ('damaged', 'Damaged')], default='available', help_text='Current status of the copy', max_length=20),
+        ),
+    ]
@@ -1,9 +1,11 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 import qrcode
 from io import BytesIO
 from config.models import BaseModel
+from .taxonomy import get_taxonomy
 
 
 class Author(BaseModel):
@@ -51,7 +53,8 @@ class Department(BaseModel):
     faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE, related_name='departments', help_text="Faculty this department belongs to")
 
     def __str__(self):
-        return f"{self.name} ({self.faculty.name})"
+        faculty = get_taxonomy().faculties.get(self.faculty_id)
+        return f"{self.name} ({faculty.name if faculty else self.faculty.name})"
 
     class Meta:
         verbose_name = "Department"
@@ -66,7 +69,8 @@ class Topic(BaseModel):
     department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='topics', help_text="Department this topic belongs to")
 
     def __str__(self):
-        return f"{self.name} ({self.department.name})"
+        department = get_taxonomy().departments.get(self.department_id)
+        return f"{self.name} ({department.name if department else self.department.name})"
 
     class Meta:
         verbose_name = "Topic"
@@ -102,6 +106,8 @@ class Book(BaseModel):
     language = models.CharField(max_length=50, default='English', help_text="Language of the book")
     book_file = models.FileField(upload_to='books/', blank=True, null=True, help_text="Digital book file (PDF, EPUB, etc.)")
     cover_image = models.ImageField(upload_to='book_covers/', blank=True, null=True, help_text="Book cover image")
+    total_copies = models.PositiveIntegerField(default=0, editable=False, help_text="Number of copies (maintained automatically)")
+    available_copies = models.PositiveIntegerField(default=0, editable=False, help_text="Number of available copies (maintained automatically)")
 
     objects = models.Manager()  # Default manager
 
@@ -114,7 +120,36 @@ class Book(BaseModel):
 
     def is_available(self):
         """Check if the book has any available copies."""
-        return self.copies.filter(status='available').exists()
+        return self.available_copies > 0
+
+    @classmethod
+    def refresh_copy_counts(cls, book_ids=None):
+        """
+        Recompute ``total_copies`` and ``available_copies`` from the copies table.
+
+        Only rows whose counters drifted are written. Returns the number of
+        books updated.
+        """
+        copies = BookCopy.objects.filter(book=models.OuterRef('pk')).order_by().values('book')
+        total = copies.annotate(n=models.Count('pk')).values('n')
+        available = copies.filter(status='available').annotate(n=models.Count('pk')).values('n')
+        total = Coalesce(models.Subquery(total), 0)
+        available = Coalesce(models.Subquery(available), 0)
+
+        queryset = cls.objects.all()
+        if book_ids is not None:
+            queryset = queryset.filter(pk__in=list(book_ids))
+        with transaction.atomic():
+            updated = queryset.alias(
+                actual_total=total, actual_available=available
+            ).exclude(
+                total_copies=models.F('actual_total'),
+                available_copies=models.F('actual_available'),
+            ).update(total_copies=total, available_copies=available)
+        if updated:
+            from .facets import invalidate
+            invalidate()
+        return updated
 
     def __str__(self):
         return self.title
@@ -122,6 +157,9 @@ class Book(BaseModel):
     class Meta:
         verbose_name = "Book"
         verbose_name_plural = "Books"
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+        ]
 
 
 class BookCopy(BaseModel):
@@ -135,6 +173,7 @@ class BookCopy(BaseModel):
     STATUS_CHOICES = [
         ('available', 'Available'),
         ('checked_out', 'Checked Out'),
+        ('on_hold', 'On Hold Shelf'),
         ('lost', 'Lost'),
         ('damaged', 'Damaged'),
     ]
@@ -146,11 +185,73 @@ class BookCopy(BaseModel):
     acquisition_date = models.DateField(help_text="Date the copy was acquired")
     location = models.CharField(max_length=100, help_text="Shelf location or storage location")
 
-    class BookCopyManager(models.Manager):
+    class BookCopyQuerySet(models.QuerySet):
+        """Keeps the copy counters on Book in step with bulk writes."""
+
         def available(self):
             return self.filter(status='available')
 
-    objects = BookCopyManager()
+        def _book_ids(self):
+            return set(self.order_by().values_list('book_id', flat=True).distinct())
+
+        def update(self, **kwargs):
+            if not {'status', 'book', 'book_id'} & kwargs.keys():
+                return super().update(**kwargs)
+            with transaction.atomic():
+                book_ids = self._book_ids()
+                rows = super().update(**kwargs)
+                new_book = kwargs.get('book_id', kwargs.get('book'))
+                if new_book is not None:
+                    book_ids.add(getattr(new_book, 'pk', new_book))
+                Book.refresh_copy_counts(book_ids)
+            return rows
+
+        def delete(self):
+            with transaction.atomic():
+                book_ids = self._book_ids()
+                result = super().delete()
+                Book.refresh_copy_counts(book_ids)
+            return result
+
+        def bulk_create(self, objs, *args, **kwargs):
+            with transaction.atomic():
+                created = super().bulk_create(objs, *args, **kwargs)
+                Book.refresh_copy_counts({obj.book_id for obj in created})
+            return created
+
+        def bulk_update(self, objs, fields, *args, **kwargs):
+            if not {'status', 'book'} & set(fields):
+                return super().bulk_update(objs, fields, *args, **kwargs)
+            objs = list(objs)
+            with transaction.atomic():
+                book_ids = self.filter(pk__in=[obj.pk for obj in objs])._book_ids()
+                rows = super().bulk_update(objs, fields, *args, **kwargs)
+                Book.refresh_copy_counts(book_ids | {obj.book_id for obj in objs})
+            return rows
+
+    objects = BookCopyQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded book so moving a copy refreshes both books
+        instance._loaded_book_id = instance.__dict__.get('book_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'status', 'book'} & set(update_fields):
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Book.refresh_copy_counts({self.book_id, getattr(self, '_loaded_book_id', None)} - {None})
+        self._loaded_book_id = self.book_id
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            Book.refresh_copy_counts([self.book_id])
+        return result
 
     def __str__(self):
         return f"{self.book.title} - Copy {self.barcode}"
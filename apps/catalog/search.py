@@ -0,0 +1,242 @@
+"""
+Full-text search for the catalog.
+
+Books are mirrored into an SQLite FTS5 table (``catalog_book_fts``) whose
+rowid is the book id, so a search is a single indexed MATCH joined back to
+``catalog_book`` and ordered by BM25 rank. On other database backends the
+module falls back to the original ``icontains`` lookups.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+FTS_TABLE = 'catalog_book_fts'
+BOOK_TABLE = 'catalog_book'
+
+# Query qualifiers (``author:smith``) mapped to FTS5 columns.
+QUALIFIERS = {
+    'title': 'title',
+    'author': 'authors',
+    'authors': 'authors',
+    'isbn': 'isbn',
+    'publisher': 'publisher',
+    'genre': 'genre',
+    'description': 'description',
+}
+
+# Private-use characters wrap matches in snippets so they survive HTML
+# escaping; ``highlight()`` turns them into <mark> tags.
+MARK_START = '\ue000'
+MARK_END = '\ue001'
+
+CREATE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "title, authors, isbn, description, publisher, genre, "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+POPULATE_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, title, authors, isbn, description, publisher, genre)
+    SELECT b.id, b.title,
+           COALESCE((SELECT group_concat(a.name, ', ')
+                     FROM catalog_book_authors ba
+                     JOIN catalog_author a ON a.id = ba.author_id
+                     WHERE ba.book_id = b.id), ''),
+           b.isbn, b.description, COALESCE(p.name, ''), COALESCE(g.name, '')
+    FROM {BOOK_TABLE} b
+    LEFT JOIN catalog_publisher p ON p.id = b.publisher_id
+    LEFT JOIN catalog_genre g ON g.id = b.genre_id
+"""
+
+# Keeps ``IN (...)`` lists well below SQLite's bound-parameter limit.
+CHUNK_SIZE = 500
+
+_TOKEN_RE = re.compile(r'(\w+):("[^"]*"|\S+)|"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r'\w+')
+
+_available = None
+
+
+def is_available():
+    """Return True when the FTS5 index table exists on the current database."""
+    global _available
+    if _available is None:
+        if connection.vendor != 'sqlite':
+            _available = False
+        else:
+            _available = FTS_TABLE in connection.introspection.table_names()
+    return _available
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def index_books(book_ids):
+    """(Re)index the given books; ids of deleted books are simply dropped."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(book_ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+            cursor.execute(f"{POPULATE_SQL} WHERE b.id IN ({placeholders})", chunk)
+
+
+def remove_books(book_ids):
+    """Drop the given books from the index."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(book_ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+
+
+def rebuild_index():
+    """Rebuild the whole index from the catalog tables. Returns the row count."""
+    if connection.vendor != 'sqlite':
+        return 0
+    global _available
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_SQL)
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(POPULATE_SQL)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}")
+        count = cursor.fetchone()[0]
+    _available = True
+    return count
+
+
+def parse_query(text):
+    """
+    Split a search string into ``(column, words, prefix)`` terms.
+
+    ``column`` is None for unqualified terms. Quoted values are kept together
+    as phrases. The last unqualified term and ISBN terms are prefix matches so
+    the same parser serves type-ahead suggestions.
+    """
+    terms = []
+    for match in _TOKEN_RE.finditer(text or ''):
+        qualifier, value, phrase, bare = match.groups()
+        column = None
+        if qualifier is not None:
+            column = QUALIFIERS.get(qualifier.lower())
+            if column is None:
+                value = f'{qualifier} {value}'
+            raw = value.strip('"')
+        else:
+            raw = phrase if phrase is not None else bare
+
+        if column == 'isbn':
+            words = [re.sub(r'[^0-9Xx]', '', raw)]
+        else:
+            words = _WORD_RE.findall(raw)
+        words = [word for word in words if word]
+        if not words:
+            continue
+
+        if phrase is not None or (value or '').startswith('"'):
+            terms.append((column, [' '.join(words)], column == 'isbn'))
+        else:
+            terms.append((column, words, column == 'isbn'))
+
+    for index in range(len(terms) - 1, -1, -1):
+        column, words, prefix = terms[index]
+        if column is None:
+            terms[index] = (column, words, True)
+            break
+    return terms
+
+
+def field_terms(fields):
+    """Parse ``{column: value}`` filters as prefix terms scoped to each column."""
+    terms = []
+    for column, value in (fields or {}).items():
+        if not value or column not in QUALIFIERS.values():
+            continue
+        if column == 'isbn':
+            words = [re.sub(r'[^0-9Xx]', '', value)]
+        else:
+            words = _WORD_RE.findall(value)
+        words = [word for word in words if word]
+        if words:
+            terms.append((column, words, True))
+    return terms
+
+
+def build_match(terms):
+    """Render parsed terms as an FTS5 MATCH expression (implicit AND)."""
+    parts = []
+    for column, words, prefix in terms:
+        phrases = ['"%s"' % word.replace('"', '""') for word in words]
+        if prefix:
+            phrases[-1] += '*'
+        expression = ' '.join(phrases)
+        if column:
+            expression = f'{column} : ({expression})'
+        parts.append(expression)
+    return ' AND '.join(parts)
+
+
+def _fallback_filter(queryset, terms):
+    lookups = {
+        'title': ['title__icontains'],
+        'authors': ['authors__name__icontains'],
+        'isbn': ['isbn__icontains'],
+        'description': ['description__icontains'],
+        'publisher': ['publisher__name__icontains'],
+        'genre': ['genre__name__icontains'],
+    }
+    default = ['title__icontains', 'authors__name__icontains', 'isbn__icontains', 'description__icontains']
+    for column, words, _prefix in terms:
+        for word in words:
+            condition = Q()
+            for lookup in lookups.get(column, default):
+                condition |= Q(**{lookup: word})
+            queryset = queryset.filter(condition)
+    return queryset.distinct()
+
+
+def search(queryset, text='', fields=None):
+    """
+    Restrict a Book queryset to books matching ``text`` and column ``fields``.
+
+    Results are ordered by relevance and annotated with ``search_rank`` and
+    ``search_snippet`` (pass the latter through ``highlight()``).
+    """
+    terms = parse_query(text) + field_terms(fields)
+    if not terms:
+        return queryset
+    if not is_available():
+        return _fallback_filter(queryset, terms)
+
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {BOOK_TABLE}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[build_match(terms)],
+        select={
+            'search_rank': f'{FTS_TABLE}.rank',
+            'search_snippet': f"snippet({FTS_TABLE}, -1, %s, %s, '…', 16)",
+        },
+        select_params=(MARK_START, MARK_END),
+    ).order_by('search_rank', '-id')
+
+
+def highlight(snippet):
+    """Escape a search snippet and wrap matched terms in <mark> tags."""
+    if not snippet:
+        return ''
+    html = escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+    return mark_safe(html)
+
+
+def strip_marks(snippet):
+    """Return a snippet as plain text, without highlight markers."""
+    return (snippet or '').replace(MARK_START, '').replace(MARK_END, '')
@@ -80,10 +80,10 @@ class BookSerializer(serializers.ModelSerializer):
             'id', 'title', 'isbn', 'authors', 'authors_ids', 'publisher', 'publisher_name',
             'faculty', 'faculty_name', 'department', 'department_name', 'topic', 'topic_name',
             'genre', 'genre_name', 'description', 'publication_date', 'edition', 'pages',
-            'language', 'book_file', 'cover_image', 'qr_code', 'is_available',
-            'created_at', 'updated_at'
+            'language', 'book_file', 'cover_image', 'total_copies', 'available_copies',
+            'is_available', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'qr_code', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'total_copies', 'available_copies', 'created_at', 'updated_at']
 
     def create(self, validated_data):
         authors_ids = validated_data.pop('authors_ids', [])
@@ -112,9 +112,9 @@ class BookCopySerializer(serializers.ModelSerializer):
         fields = [
             'id', 'book', 'book_title', 'book_isbn', 'barcode', 'condition',
             'condition_display', 'status', 'status_display', 'acquisition_date',
-            'location', 'qr_code', 'created_at', 'updated_at'
+            'location', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'qr_code', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
 
 
 class BookSearchSerializer(serializers.Serializer):
@@ -0,0 +1,109 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import autocomplete, facets, search, taxonomy
+from .models import Author, Book, Department, Faculty, Genre, Publisher, Topic
+
+
+@receiver(post_save, sender=Book)
+def index_saved_book(sender, instance, raw=False, **kwargs):
+    """Refresh the search index entry of a saved book."""
+    if not raw:
+        search.index_books([instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+def unindex_deleted_book(sender, instance, **kwargs):
+    """Drop a deleted book from the search index."""
+    search.remove_books([instance.pk])
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def index_book_authors(sender, instance, action, reverse, pk_set, **kwargs):
+    """Reindex books whose author list changed, from either side of the relation."""
+    if action == 'pre_clear' and reverse:
+        instance._search_book_ids = list(instance.books.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            search.index_books([instance.pk])
+        elif action == 'post_clear':
+            search.index_books(getattr(instance, '_search_book_ids', []))
+        else:
+            search.index_books(pk_set or [])
+
+
+def _index_related_books(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_books(instance.books.values_list('pk', flat=True))
+
+
+def _remember_related_books(sender, instance, **kwargs):
+    instance._search_book_ids = list(instance.books.values_list('pk', flat=True))
+
+
+def _index_remembered_books(sender, instance, **kwargs):
+    search.index_books(getattr(instance, '_search_book_ids', []))
+
+
+# Author, publisher and genre names are denormalized into the index, so
+# renaming or deleting one of them refreshes the books that reference it.
+for _model in (Author, Publisher, Genre):
+    post_save.connect(_index_related_books, sender=_model, dispatch_uid=f'search_index_{_model.__name__}_save')
+    pre_delete.connect(_remember_related_books, sender=_model, dispatch_uid=f'search_index_{_model.__name__}_pre_delete')
+    post_delete.connect(_index_remembered_books, sender=_model, dispatch_uid=f'search_index_{_model.__name__}_delete')
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(m2m_changed, sender=Book.authors.through)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Faculty)
+@receiver(post_delete, sender=Faculty)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def invalidate_facets(sender, **kwargs):
+    """Drop cached facet counts when books or their dimensions change."""
+    if not kwargs.get('raw') and kwargs.get('action', 'post_').startswith('post_'):
+        facets.invalidate()
+
+
+@receiver(post_save, sender=Faculty)
+@receiver(post_delete, sender=Faculty)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def invalidate_taxonomy(sender, **kwargs):
+    """Rebuild the taxonomy snapshot after the hierarchy changes."""
+    taxonomy.invalidate()
+    # Again once committed, in case another process rebuilt from the old rows
+    transaction.on_commit(taxonomy.invalidate)
+
+
+_SUGGESTION_FIELDS = {Book: ('book', 'title'), Author: ('author', 'name'), Genre: ('genre', 'name')}
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Genre)
+def index_suggestion(sender, instance, raw=False, **kwargs):
+    """Add a saved book, author or genre to the suggestion index."""
+    if not raw:
+        kind, field = _SUGGESTION_FIELDS[sender]
+        pk, value = instance.pk, getattr(instance, field)
+        transaction.on_commit(lambda: autocomplete.update(kind, pk, value))
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Genre)
+def unindex_suggestion(sender, instance, **kwargs):
+    """Drop a deleted book, author or genre from the suggestion index."""
+    kind, pk = _SUGGESTION_FIELDS[sender][0], instance.pk
+    transaction.on_commit(lambda: autocomplete.remove(kind, pk))
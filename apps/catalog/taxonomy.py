@@ -0,0 +1,179 @@
+"""
+In-process snapshot of the Faculty → Department → Topic hierarchy.
+
+The hierarchy changes a few times per semester but is read on nearly every
+request, so each process keeps an immutable snapshot built with three
+queries. A version number in the shared cache is bumped whenever a faculty,
+department or topic is saved or deleted; each process rebuilds its snapshot
+the next time it sees a newer version.
+"""
+import threading
+import time
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+VERSION_KEY = 'catalog_taxonomy_version'
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+@dataclass(frozen=True)
+class TaxonomyNode:
+    """A faculty, department or topic with its parent and children."""
+    id: int
+    name: str
+    code: str
+    description: str
+    parent_id: int = None
+    parent_name: str = ''
+    children: tuple = ()
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def label(self):
+        """Name qualified by the parent's name, as used by ``__str__``."""
+        return f"{self.name} ({self.parent_name})" if self.parent_id else self.name
+
+    @property
+    def child_count(self):
+        return len(self.children)
+
+    def __str__(self):
+        return self.label
+
+
+class TaxonomySnapshot:
+    """Immutable id → node maps for one version of the hierarchy."""
+
+    def __init__(self, version, faculty_rows, department_rows, topic_rows):
+        self.version = version
+
+        topics_by_department = {}
+        for row in topic_rows:
+            topics_by_department.setdefault(row['department_id'], []).append(row)
+
+        departments_by_faculty = {}
+        for row in department_rows:
+            departments_by_faculty.setdefault(row['faculty_id'], []).append(row)
+
+        faculty_names = {row['id']: row['name'] for row in faculty_rows}
+        department_names = {row['id']: row['name'] for row in department_rows}
+
+        topics = {}
+        for row in topic_rows:
+            topics[row['id']] = TaxonomyNode(
+                row['id'], row['name'], row['code'], row['description'],
+                row['department_id'], department_names.get(row['department_id'], ''),
+            )
+
+        departments = {}
+        for row in department_rows:
+            children = tuple(sorted(
+                (topics[topic['id']] for topic in topics_by_department.get(row['id'], [])),
+                key=lambda node: node.name,
+            ))
+            departments[row['id']] = TaxonomyNode(
+                row['id'], row['name'], row['code'], row['description'],
+                row['faculty_id'], faculty_names.get(row['faculty_id'], ''), children,
+            )
+
+        faculties = {}
+        for row in faculty_rows:
+            children = tuple(sorted(
+                (departments[department['id']] for department in departments_by_faculty.get(row['id'], [])),
+                key=lambda node: node.name,
+            ))
+            faculties[row['id']] = TaxonomyNode(
+                row['id'], row['name'], row['code'], row['description'], children=children,
+            )
+
+        self.faculties = faculties
+        self.departments = departments
+        self.topics = topics
+
+        self.faculty_list = tuple(sorted(faculties.values(), key=lambda node: node.name))
+        self.department_list = tuple(sorted(departments.values(), key=lambda node: (node.parent_name, node.name)))
+        self.topic_list = tuple(sorted(
+            topics.values(),
+            key=lambda node: (departments[node.parent_id].parent_name, node.parent_name, node.name),
+        ))
+
+        # Descendant id sets
+        self.faculty_department_ids = {
+            faculty.id: frozenset(department.id for department in faculty.children)
+            for faculty in faculties.values()
+        }
+        self.faculty_topic_ids = {
+            faculty.id: frozenset(topic.id for department in faculty.children for topic in department.children)
+            for faculty in faculties.values()
+        }
+        self.department_topic_ids = {
+            department.id: frozenset(topic.id for topic in department.children)
+            for department in departments.values()
+        }
+
+    def departments_of(self, faculty_id=None):
+        """Departments of a faculty, or all departments."""
+        if faculty_id is None:
+            return self.department_list
+        faculty = self.faculties.get(faculty_id)
+        return faculty.children if faculty else ()
+
+    def topics_of(self, department_id=None, faculty_id=None):
+        """Topics of a department or faculty, or all topics."""
+        if department_id is not None:
+            department = self.departments.get(department_id)
+            return department.children if department else ()
+        if faculty_id is not None:
+            topic_ids = self.faculty_topic_ids.get(faculty_id, frozenset())
+            return tuple(topic for topic in self.topic_list if topic.id in topic_ids)
+        return self.topic_list
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seeded from the clock so a lost version key never matches a stale snapshot
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _build(version):
+    from .models import Department, Faculty, Topic
+
+    fields = ('id', 'name', 'code', 'description')
+    return TaxonomySnapshot(
+        version,
+        list(Faculty.objects.order_by().values(*fields)),
+        list(Department.objects.order_by().values(*fields, 'faculty_id')),
+        list(Topic.objects.order_by().values(*fields, 'department_id')),
+    )
+
+
+def get_taxonomy():
+    """Return the current ``TaxonomySnapshot``, rebuilding it if stale."""
+    global _snapshot
+    version = _current_version()
+    snapshot = _snapshot
+    if snapshot is None or snapshot.version != version:
+        with _lock:
+            snapshot = _snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = _snapshot = _build(version)
+    return snapshot
+
+
+def invalidate():
+    """Mark every process's snapshot as stale."""
+    global _snapshot
+    _snapshot = None
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
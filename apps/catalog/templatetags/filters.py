@@ -52,3 +52,10 @@ def multiply(value, arg):
 def get_attr(obj, attr):
     """Get an attribute from an object dynamically."""
     return getattr(obj, attr, None)
+
+
+@register.filter
+def search_highlight(snippet):
+    """Render a search snippet with matched terms wrapped in <mark> tags."""
+    from apps.catalog.search import highlight
+    return highlight(snippet)
@@ -1,3 +1,469 @@
+from datetime import date
+from io import StringIO
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from . import autocomplete, facets, importer, search, taxonomy
+from .models import Author, Book, BookCopy, Department, Faculty, Genre, Publisher, Topic
+
+
+class BookSearchIndexTest(TestCase):
+    """Tests for the full-text book search index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.publisher = Publisher.objects.create(name='Northern Press')
+        cls.genre = Genre.objects.create(name='Science')
+        cls.achebe = Author.objects.create(name='Chinua Achebe')
+        cls.soyinka = Author.objects.create(name='Wole Soyinka')
+
+        cls.things = cls.create_book('Things Fall Apart', '9780385474542', 'A classic novel of colonial Nigeria.')
+        cls.things.authors.add(cls.achebe)
+        cls.arrow = cls.create_book('Arrow of God', '9780385014809', 'Ezeulu, chief priest, and the fall of tradition.')
+        cls.arrow.authors.add(cls.achebe)
+        cls.lion = cls.create_book('The Lion and the Jewel', '9780199110834', 'A comedy set in Ilujinle.')
+        cls.lion.authors.add(cls.soyinka)
+
+    @classmethod
+    def create_book(cls, title, isbn, description):
+        return Book.objects.create(
+            title=title,
+            isbn=isbn,
+            description=description,
+            publisher=cls.publisher,
+            genre=cls.genre,
+            publication_date=date(1960, 1, 1),
+            pages=200,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, query, **fields):
+        return [book.title for book in search.search(Book.objects.all(), query, fields)]
+
+    def test_ranks_title_matches(self):
+        self.assertEqual(self.titles('fall')[0], 'Things Fall Apart')
+        self.assertCountEqual(self.titles('fall'), ['Things Fall Apart', 'Arrow of God'])
+
+    def test_prefix_match_on_last_term(self):
+        self.assertEqual(self.titles('lion jew'), ['The Lion and the Jewel'])
+
+    def test_qualifiers(self):
+        self.assertCountEqual(self.titles('author:achebe'), ['Things Fall Apart', 'Arrow of God'])
+        self.assertEqual(self.titles('isbn:978-0199'), ['The Lion and the Jewel'])
+        self.assertEqual(self.titles('', authors='soyinka'), ['The Lion and the Jewel'])
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        book = search.search(Book.objects.all(), 'ilujinle').get()
+        self.assertIn('<mark>Ilujinle</mark>', search.highlight(book.search_snippet))
+
+    def test_index_follows_author_changes(self):
+        self.achebe.name = 'Albert Chinualumogu Achebe'
+        self.achebe.save()
+        self.assertEqual(len(self.titles('author:chinualumogu')), 2)
+
+        self.lion.authors.remove(self.soyinka)
+        self.assertEqual(self.titles('author:soyinka'), [])
+
+    def test_deleted_books_leave_the_index(self):
+        self.arrow.delete()
+        self.assertEqual(self.titles('ezeulu'), [])
+
+    def test_book_list_and_api_use_index(self):
+        response = self.client.get('/catalog/books/', {'q': 'author:achebe'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['paginator'].count, 2)
+
+        response = self.client.get('/api/catalog/books/search_suggestions/', {'q': 'arr'})
+        self.assertEqual(response.json()[0], {'type': 'title', 'value': 'Arrow of God'})
+
+
+class BookCopyCounterTest(TestCase):
+    """Tests for the denormalized copy counters on Book."""
+
+    @classmethod
+    def setUpTestData(cls):
+        publisher = Publisher.objects.create(name='Northern Press')
+        cls.book = Book.objects.create(
+            title='Things Fall Apart', isbn='9780385474542', publisher=publisher,
+            publication_date=date(1958, 1, 1), pages=209,
+        )
+        cls.other = Book.objects.create(
+            title='Arrow of God', isbn='9780385014809', publisher=publisher,
+            publication_date=date(1964, 1, 1), pages=230,
+        )
+
+    def create_copy(self, barcode, book=None, status='available'):
+        return BookCopy.objects.create(
+            book=book or self.book, barcode=barcode, status=status,
+            acquisition_date=date(2020, 1, 1), location='A1',
+        )
+
+    def assertCounts(self, book, total, available):
+        book.refresh_from_db()
+        self.assertEqual((book.total_copies, book.available_copies), (total, available))
+
+    def test_save_and_delete(self):
+        copy = self.create_copy('B1')
+        self.create_copy('B2', status='checked_out')
+        self.assertCounts(self.book, 2, 1)
+        self.assertTrue(self.book.is_available())
+
+        copy.status = 'checked_out'
+        copy.save()
+        self.assertCounts(self.book, 2, 0)
+        self.assertFalse(self.book.is_available())
+
+        copy.delete()
+        self.assertCounts(self.book, 1, 0)
+
+    def test_moving_a_copy_updates_both_books(self):
+        copy = self.create_copy('B1')
+        copy = BookCopy.objects.get(pk=copy.pk)
+        copy.book = self.other
+        copy.save()
+        self.assertCounts(self.book, 0, 0)
+        self.assertCounts(self.other, 1, 1)
+
+    def test_bulk_paths(self):
+        BookCopy.objects.bulk_create([
+            BookCopy(book=self.book, barcode=f'B{i}', acquisition_date=date(2020, 1, 1), location='A1')
+            for i in range(3)
+        ])
+        self.assertCounts(self.book, 3, 3)
+
+        BookCopy.objects.filter(barcode__in=['B0', 'B1']).update(status='lost')
+        self.assertCounts(self.book, 3, 1)
+
+        copies = list(BookCopy.objects.all())
+        for copy in copies:
+            copy.status = 'available'
+        BookCopy.objects.bulk_update(copies, ['status'])
+        self.assertCounts(self.book, 3, 3)
+
+        BookCopy.objects.filter(barcode='B2').delete()
+        self.assertCounts(self.book, 2, 2)
+
+    def test_reconcile_command_repairs_drift(self):
+        self.create_copy('B1')
+        Book.objects.filter(pk=self.book.pk).update(total_copies=7, available_copies=0)
+
+        out = StringIO()
+        call_command('reconcile_copy_counts', stdout=out)
+        self.assertIn('Repaired 1 books', out.getvalue())
+        self.assertCounts(self.book, 1, 1)
+
+
+class BookFacetTest(TestCase):
+    """Tests for the book list facet engine."""
+
+    @classmethod
+    def setUpTestData(cls):
+        publisher = Publisher.objects.create(name='Northern Press')
+        cls.science = Faculty.objects.create(name='Science', code='SCI')
+        cls.arts = Faculty.objects.create(name='Arts', code='ART')
+        cls.physics = Department.objects.create(name='Physics', code='PHY', faculty=cls.science)
+        cls.mechanics = Topic.objects.create(name='Mechanics', code='MEC', department=cls.physics)
+        cls.novel = Genre.objects.create(name='Novel')
+        cls.authors = [Author.objects.create(name=f'Author {i}') for i in range(3)]
+
+        def book(title, isbn, **kwargs):
+            return Book.objects.create(
+                title=title, isbn=isbn, publisher=publisher,
+                publication_date=date(2000, 1, 1), pages=100, **kwargs
+            )
+
+        cls.motion = book('Laws of Motion', '1000000000001', topic=cls.mechanics)
+        cls.motion.authors.add(*cls.authors)
+        cls.waves = book('Waves', '1000000000002', faculty=cls.science, genre=cls.novel)
+        cls.waves.authors.add(cls.authors[0])
+        cls.poems = book('Poems', '1000000000003', faculty=cls.arts, genre=cls.novel)
+        BookCopy.objects.create(book=cls.waves, barcode='W1', acquisition_date=date(2020, 1, 1), location='A1')
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self, values):
+        return {value['name']: (value['count'], value['available']) for value in values}
+
+    def test_counts_per_dimension(self):
+        result = facets.get_facets({})
+        self.assertEqual((result['total'], result['available'], result['author_total']), (3, 1, 3))
+        # Topic parents count towards faculty and department
+        self.assertEqual(self.counts(result['faculty']), {'Science': (2, 1), 'Arts': (1, 0)})
+        self.assertEqual(self.counts(result['department']), {'Physics': (1, 0)})
+        self.assertEqual(self.counts(result['genre']), {'Novel': (2, 1)})
+        self.assertEqual(result['author'][0]['name'], 'Author 0')
+
+    def test_search_filter(self):
+        result = facets.get_facets({'q': 'motion'})
+        self.assertEqual(result['total'], 1)
+        self.assertEqual(result['author_total'], 3)
+
+    def test_own_dimension_is_not_filtered(self):
+        result = facets.get_facets({'faculty': self.science.pk})
+        self.assertEqual(result['total'], 2)
+        self.assertEqual(self.counts(result['faculty']), {'Science': (2, 1), 'Arts': (1, 0)})
+        self.assertEqual(self.counts(result['genre']), {'Novel': (1, 1)})
+
+    def test_cached_until_catalog_changes(self):
+        facets.get_facets({'genre': self.novel.pk})
+        with self.assertNumQueries(0):
+            facets.get_facets(facets.normalize_filters({'genre': str(self.novel.pk), 'page': '2'}))
+
+        self.poems.authors.add(self.authors[2])
+        self.assertEqual(facets.get_facets({})['author'][0]['count'], 2)
+
+    def test_top_authors_and_lookup(self):
+        self.assertEqual(len(facets.get_facets({}, top_authors=1)['author']), 1)
+        self.assertEqual(
+            self.counts(facets.lookup_facet({}, 'author', 'author 2')),
+            {'Author 2': (1, 0)},
+        )
+
+    def test_list_view_and_api(self):
+        response = self.client.get('/catalog/books/', {'faculty': self.science.pk})
+        self.assertEqual(response.context['paginator'].count, 2)
+        self.assertEqual(response.context['selected_faculty']['name'], 'Science')
+
+        response = self.client.get('/api/catalog/books/facets/', {'available_only': 'true'})
+        self.assertEqual(response.json()['total'], 1)
+
+        response = self.client.get('/catalog/api/facets/author/', {'term': 'author 1'})
+        self.assertEqual(response.json()[0]['name'], 'Author 1')
+
+    def test_selected_author_outside_top_is_listed(self):
+        extras = [Author.objects.create(name=f'Extra {i}') for i in range(facets.TOP_AUTHORS)]
+        self.motion.authors.add(*extras)
+        self.waves.authors.add(*extras)
+        response = self.client.get('/catalog/books/', {'author': self.authors[2].pk})
+        self.assertEqual(response.context['authors'][-1], {'id': self.authors[2].pk, 'name': 'Author 2'})
+        self.assertRegex(response.content.decode(), rf'<option value="{self.authors[2].pk}"\s+selected>\s+Author 2\s+</option>')
+
+
+class TaxonomySnapshotTest(TestCase):
+    """Tests for the cached Faculty → Department → Topic snapshot."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.science = Faculty.objects.create(name='Science', code='SCI')
+        cls.physics = Department.objects.create(name='Physics', code='PHY', faculty=cls.science)
+        cls.chemistry = Department.objects.create(name='Chemistry', code='CHM', faculty=cls.science)
+        cls.mechanics = Topic.objects.create(name='Mechanics', code='MEC', department=cls.physics)
+        cls.optics = Topic.objects.create(name='Optics', code='OPT', department=cls.physics)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_maps_and_descendants(self):
+        snapshot = taxonomy.get_taxonomy()
+        faculty = snapshot.faculties[self.science.pk]
+        self.assertEqual([node.name for node in faculty.children], ['Chemistry', 'Physics'])
+        self.assertEqual(snapshot.topics[self.optics.pk].parent_id, self.physics.pk)
+        self.assertEqual(snapshot.faculty_topic_ids[self.science.pk], {self.mechanics.pk, self.optics.pk})
+        self.assertEqual(snapshot.department_topic_ids[self.chemistry.pk], frozenset())
+
+    def test_served_without_queries_until_changed(self):
+        taxonomy.get_taxonomy()
+        topic = Topic.objects.get(pk=self.optics.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(topic), 'Optics (Physics)')
+            self.assertEqual(str(self.physics), 'Physics (Science)')
+            taxonomy.get_taxonomy()
+
+        self.physics.name = 'Applied Physics'
+        self.physics.save()
+        self.assertEqual(str(topic), 'Optics (Applied Physics)')
+
+        self.optics.delete()
+        self.assertNotIn(self.optics.pk, taxonomy.get_taxonomy().topics)
+
+    def test_json_endpoints(self):
+        response = self.client.get('/catalog/api/departments/', {'faculty': self.science.pk})
+        self.assertEqual([row['name'] for row in response.json()], ['Chemistry', 'Physics'])
+
+        response = self.client.get('/catalog/api/topics/', {'department': self.physics.pk})
+        self.assertEqual([row['name'] for row in response.json()], ['Mechanics', 'Optics'])
+
+        response = self.client.get('/catalog/api/topics/', {'department': 'abc'})
+        self.assertEqual(response.json(), [])
+
+
+class AutocompleteIndexTest(TestCase):
+    """Tests for the in-memory suggestion prefix index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from apps.analytics.models import PopularItem
+
+        publisher = Publisher.objects.create(name='Northern Press')
+        cls.genre = Genre.objects.create(name='Poetry')
+        cls.author = Author.objects.create(name='José Saramago')
+
+        def book(title, isbn):
+            return Book.objects.create(
+                title=title, isbn=isbn, publisher=publisher, genre=cls.genre,
+                publication_date=date(2000, 1, 1), pages=100,
+            )
+
+        cls.blindness = book('Blindness', '1000000000001')
+        cls.blindness.authors.add(cls.author)
+        cls.blues = book('Blues People', '1000000000002')
+        cls.blue = book('The Blue Flower', '1000000000003')
+        PopularItem.objects.create(item_type='book', book=cls.blue, total_score=50)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_folding_and_popularity(self):
+        self.assertEqual(autocomplete.fold('  José  SARAMAGO! '), 'jose saramago')
+        self.assertEqual(autocomplete.suggest('saram'), [('author', 'José Saramago')])
+        # Leading matches first, then by weight
+        self.assertEqual(
+            autocomplete.suggest('blu', kinds=('book',)),
+            [('book', 'Blues People'), ('book', 'The Blue Flower')],
+        )
+        self.assertEqual(autocomplete.suggest('flower blu'), [('book', 'The Blue Flower')])
+
+    def test_lookups_do_not_query(self):
+        autocomplete.get_index()
+        with self.assertNumQueries(0):
+            autocomplete.suggest('bl')
+            response = self.client.get('/api/catalog/books/search_suggestions/', {'q': 'poe'})
+        self.assertEqual(response.json(), [{'type': 'genre', 'value': 'Poetry'}])
+
+    def test_incremental_updates(self):
+        autocomplete.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blues.title = 'Bluest Eye'
+            self.blues.save()
+            Author.objects.create(name='Émile Zola')
+            self.blindness.delete()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(autocomplete.suggest('emile'), [('author', 'Émile Zola')])
+            self.assertEqual(
+                autocomplete.suggest('bl', kinds=('book',)),
+                [('book', 'Bluest Eye'), ('book', 'The Blue Flower')],
+            )
+
+    def test_other_processes_replay_changes(self):
+        # Stands in for a second worker that built its index before the saves
+        other = autocomplete.get_index()
+        autocomplete._index = None
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blues.title = 'Bluest Eye'
+            self.blues.save()
+            self.blindness.delete()
+
+        autocomplete._index = other
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                autocomplete.suggest('bl', kinds=('book',)),
+                [('book', 'Bluest Eye'), ('book', 'The Blue Flower')],
+            )
+        self.assertIs(autocomplete._index, other)
+
+        # A change missing from the cache falls back to a rebuild
+        autocomplete.invalidate()
+        autocomplete._index = other
+        autocomplete.get_index()
+        self.assertIsNot(autocomplete._index, other)
+
+
+class BookImportTest(TestCase):
+    """Tests for the streaming CSV book importer."""
+
+    HEADER = 'title,isbn,authors,publisher__name,faculty__name,department__name,topic__name,genre__name,publication_date,pages\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        publisher = Publisher.objects.create(name='Northern Press')
+        cls.existing = Book.objects.create(
+            title='Old Title', isbn='9780385474542', publisher=publisher,
+            publication_date=date(1958, 1, 1), pages=209,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def csv(self, *rows):
+        return StringIO(self.HEADER + ''.join(row + '\n' for row in rows))
+
+    def test_import_creates_updates_and_reports(self):
+        progress = []
+        result = importer.BookImporter(chunk_size=2, progress=lambda r: progress.append(r.rows)).run(self.csv(
+            'Things Fall Apart,978-0385474542,Chinua Achebe,Northern Press,,,,Novel,1958-06-17,209',
+            'Arrow of God,9780385014809,"Chinua Achebe, Ezeulu Press",Heinemann,Arts,Literature,Igbo Novels,Novel,1964,230',
+            'Broken Date,9780000000001,,Heinemann,,,,,1964-13-40,10',
+            'Duplicate,9780385014809,,Heinemann,,,,,1964,10',
+            'Orphan,9780000000002,,Heinemann,,Nowhere,,,1964,10',
+        ))
+
+        self.assertEqual(progress, [2, 4, 5])
+        self.assertEqual((result.created, result.updated, result.error_count), (1, 1, 3))
+        self.assertEqual([line for line, _ in result.errors], [4, 5, 6])
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.title, 'Things Fall Apart')
+        self.assertEqual([author.name for author in self.existing.authors.all()], ['Chinua Achebe'])
+
+        arrow = Book.objects.get(isbn='9780385014809')
+        self.assertEqual(arrow.authors.count(), 2)
+        self.assertEqual(arrow.topic.department.faculty.name, 'Arts')
+        self.assertEqual(Author.objects.filter(name='Chinua Achebe').count(), 1)
+        self.assertEqual(Genre.objects.filter(name='Novel').count(), 1)
+        self.assertEqual([book.title for book in search.search(Book.objects.all(), 'ezeulu')], ['Arrow of God'])
+
+    def test_unchanged_rows_are_skipped(self):
+        row = 'Old Title,9780385474542,,Northern Press,,,,,1958-01-01,209'
+        result = importer.import_books(self.csv(row))
+        self.assertEqual((result.updated, result.skipped), (0, 1))
+
+    def test_queries_do_not_grow_with_rows(self):
+        def run(prefix, count):
+            rows = [
+                f'{prefix} {i},{9780000100000 + i},{prefix} Author {i % 3},{prefix} Press {i % 2},,,,{prefix} Genre {i % 2},2001,100'
+                for i in range(count)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                result = importer.import_books(self.csv(*rows))
+            self.assertEqual(result.created, count)
+            Book.objects.filter(title__startswith=prefix).delete()
+            return len(queries)
+
+        # Within one insert batch the statement count is independent of the row count
+        self.assertEqual(run('Small', 5), run('Large', 50))
+
+    def test_command_and_view(self):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as stream:
+            stream.write(self.HEADER + 'Petals of Blood,9780140188455,Ngugi wa Thiongo,Heinemann,,,,,1977,345\n')
+        self.addCleanup(os.remove, path)
+
+        out = StringIO()
+        call_command('import_books', path, stdout=out)
+        self.assertIn('Import finished: 1 created', out.getvalue())
+
+        admin = get_user_model().objects.create_superuser('admin', 'admin@test.com', 'pass')
+        self.client.force_login(admin)
+        upload = SimpleUploadedFile('books.csv', (self.HEADER + 'Bad,123,,,,,,,,\n').encode('utf-8'))
+        response = self.client.post('/accounts/import-data/catalog/Book/', {'import_file': upload})
+        data = response.json()
+        self.assertFalse(data['success'])
+        self.assertEqual(data['details'], ['Row 2: publisher is required.'])
+        self.assertEqual(data['chunks'], [{'chunk': 1, 'rows': 1, 'new': 0, 'update': 0, 'skip': 0, 'error': 1}])
 
-# Create your tests here.
+        upload = SimpleUploadedFile('books.csv', self.HEADER.encode('utf-8') + b'\xff\xfe\n')
+        data = self.client.post('/accounts/import-data/catalog/Book/', {'import_file': upload}).json()
+        self.assertFalse(data['success'])
+        self.assertTrue(data['error'].startswith('Import stopped after 0 chunks'))
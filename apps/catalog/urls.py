@@ -30,4 +30,5 @@ urlpatterns = [
     # API endpoints for dynamic filtering
     path('api/departments/', views.api_departments, name='api_departments'),
     path('api/topics/', views.api_topics, name='api_topics'),
+    path('api/facets/<str:dimension>/', views.api_facet_lookup, name='api_facet_lookup'),
 ]
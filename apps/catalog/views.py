@@ -6,8 +6,32 @@ from django.db.models import Q, F, Count
 from django.core.paginator import Paginator
 from django.http import JsonResponse, HttpResponse
 from django.utils import timezone
+from apps.analytics import popularity
 from .models import Book, Author, Publisher, Faculty, Department, Topic, Genre, BookCopy
 from .forms import BookForm, FacultyForm, DepartmentForm, TopicForm
+from . import facets
+from .taxonomy import get_taxonomy
+
+
+def _faculty_rows(nodes):
+    """Faculty nodes as template rows with department and book counts (one query)."""
+    nodes = list(nodes)
+    book_counts = dict(
+        Book.objects.filter(faculty_id__in=[node.id for node in nodes])
+        .values('faculty').annotate(count=Count('pk')).values_list('faculty', 'count')
+    )
+    return [
+        {
+            'id': node.id,
+            'pk': node.id,
+            'name': node.name,
+            'code': node.code,
+            'description': node.description,
+            'department_count': node.child_count,
+            'book_count': book_counts.get(node.id, 0),
+        }
+        for node in nodes
+    ]
 
 
 class BookListView(ListView):
@@ -17,74 +41,49 @@ class BookListView(ListView):
     paginate_by = 20
 
     def get_queryset(self):
-        queryset = Book.objects.active().prefetch_related('authors', 'publisher', 'faculty', 'department', 'topic', 'genre')
-        search_query = self.request.GET.get('q')
-        topic_filter = self.request.GET.get('topic')
-        faculty_filter = self.request.GET.get('faculty')
-        department_filter = self.request.GET.get('department')
-        genre_filter = self.request.GET.get('genre')
-        author_filter = self.request.GET.get('author')
-
-        if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(authors__name__icontains=search_query) |
-                Q(isbn__icontains=search_query) |
-                Q(description__icontains=search_query)
-            ).distinct()
-
-        if topic_filter:
-            queryset = queryset.filter(topic_id=topic_filter)
-
-        if faculty_filter:
-            queryset = queryset.filter(
-                Q(faculty_id=faculty_filter) |
-                Q(topic__department__faculty_id=faculty_filter)
-            ).distinct()
-
-        if department_filter:
-            queryset = queryset.filter(
-                Q(department_id=department_filter) |
-                Q(topic__department_id=department_filter)
-            ).distinct()
-
-        if genre_filter:
-            try:
-                genre_id = int(genre_filter)
-                queryset = queryset.filter(genre_id=genre_id)
-            except ValueError:
-                queryset = queryset.filter(genre__name=genre_filter)
-
-        if author_filter:
-            queryset = queryset.filter(authors__id=author_filter)
-
+        queryset = Book.objects.active().select_related(
+            'publisher', 'faculty', 'department', 'topic', 'genre'
+        ).prefetch_related('authors')
+        self.filters = facets.normalize_filters(self.request.GET)
+        queryset = facets.filter_books(queryset, self.filters)
+
+        if 'q' in self.filters:
+            # Ranked by relevance
+            return queryset
         return queryset.order_by('title')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['faculties'] = Faculty.objects.prefetch_related('departments__topics').all()
-        context['departments'] = Department.objects.select_related('faculty').all()
-        context['topics'] = Topic.objects.select_related('department__faculty').all()
-        context['genres'] = Genre.objects.all()
-        context['authors'] = Author.objects.all()
+        book_facets = facets.get_facets(self.filters)
+        context['facets'] = book_facets
+        context['faculties'] = book_facets['faculty']
+        context['departments'] = book_facets['department']
+        context['topics'] = book_facets['topic']
+        context['genres'] = book_facets['genre']
+        context['authors'] = book_facets['author']
         context['search_query'] = self.request.GET.get('q', '')
-        context['selected_topic'] = self.request.GET.get('topic', '')
-        context['selected_faculty'] = self.request.GET.get('faculty', '')
-        context['selected_department'] = self.request.GET.get('department', '')
-        context['selected_genre'] = self.request.GET.get('genre', '')
-        context['selected_author'] = self.request.GET.get('author', '')
-        
-        # Calculate dynamic statistics
-        total_books = Book.objects.active().count()
-        available_books = Book.objects.active().filter(copies__status='available').distinct().count()
-        genres_count = Genre.objects.filter(books__isnull=False).distinct().count()
-        authors_count = Author.objects.filter(books__isnull=False).distinct().count()
-        
-        context['total_books'] = total_books
-        context['available_books'] = available_books
-        context['genres_count'] = genres_count
-        context['authors_count'] = authors_count
-        
+
+        # Selected values as facet entries, looked up when outside the top-N
+        for dimension in facets.DIMENSIONS:
+            selected = self.filters.get(dimension)
+            entry = None
+            if selected is not None:
+                entry = next((item for item in book_facets[dimension] if selected in (item['id'], item['name'])), None)
+                if entry is None and isinstance(selected, int):
+                    entry = facets.describe(dimension, selected)
+            context[f'selected_{dimension}'] = entry
+        # Keep the selected author in the select even when outside the top-N
+        selected_author = context['selected_author']
+        if selected_author is not None and selected_author not in context['authors']:
+            context['authors'] = [*context['authors'], selected_author]
+
+        # Catalog-wide statistics from the unfiltered facets
+        catalog = facets.get_facets({})
+        context['total_books'] = catalog['total']
+        context['available_books'] = catalog['available']
+        context['genres_count'] = len(catalog['genre'])
+        context['authors_count'] = catalog['author_total']
+
         return context
 
 
@@ -95,9 +94,9 @@ class BookDetailView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        book = self.get_object()
-        context['available_copies'] = book.copies.available().count()
-        context['total_copies'] = book.copies.count()
+        book = self.object
+        context['available_copies'] = book.available_copies
+        context['total_copies'] = book.total_copies
         context['is_available'] = book.is_available()
         return context
 
@@ -295,7 +294,12 @@ class FacultyListView(ListView):
     paginate_by = 20
 
     def get_queryset(self):
-        return Faculty.objects.prefetch_related('departments__topics').order_by('name')
+        return list(get_taxonomy().faculty_list)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['faculties'] = _faculty_rows(context['faculties'])
+        return context
 
 
 class FacultyDetailView(DetailView):
@@ -407,19 +411,22 @@ class TopicDetailView(DetailView):
 def home_view(request):
     """Catalog home page showing faculties, departments, and featured books."""
     # Prioritize faculty/department hierarchy as the primary navigation
-    faculties = Faculty.objects.prefetch_related('departments__topics').order_by('name')
-    departments = Department.objects.select_related('faculty').prefetch_related('topics').order_by('faculty__name', 'name')[:12]  # Show more departments
-    topics = Topic.objects.select_related('department__faculty').order_by('department__faculty__name', 'department__name', 'name')[:8]
-
-    # Get featured books with faculty/department context
-    featured_books = Book.objects.active().prefetch_related('authors', 'faculty', 'department', 'topic', 'genre')[:6]
+    taxonomy = get_taxonomy()
+    faculties = _faculty_rows(taxonomy.faculty_list[:6])
+    departments = taxonomy.department_list[:12]  # Show more departments
+    topics = taxonomy.topic_list[:8]
+
+    # Featured books: this week's most popular, topped up from the catalogue
+    featured_books = popularity.featured_books(
+        Book.objects.active().prefetch_related('authors', 'faculty', 'department', 'topic', 'genre'),
+    )
     recent_books = Book.objects.active().order_by('-created_at').prefetch_related('faculty', 'department', 'topic')[:6]
 
     # Statistics for the home page
     total_books = Book.objects.active().count()
-    total_faculties = faculties.count()
-    total_departments = Department.objects.count()
-    total_topics = Topic.objects.count()
+    total_faculties = len(taxonomy.faculties)
+    total_departments = len(taxonomy.departments)
+    total_topics = len(taxonomy.topics)
 
     context = {
         'faculties': faculties,
@@ -515,24 +522,41 @@ def admin_topic_create(request):
     return render(request, 'admin/catalog/topic/create.html', context)
 
 
+def _id_param(request, name):
+    value = request.GET.get(name, '')
+    return int(value) if value.isdigit() else None
+
+
 def api_departments(request):
     """API endpoint to get departments, optionally filtered by faculty."""
-    faculty_id = request.GET.get('faculty')
-    if faculty_id:
-        departments = Department.objects.filter(faculty_id=faculty_id).values('id', 'name')
-    else:
-        departments = Department.objects.values('id', 'name')
-    return JsonResponse(list(departments), safe=False)
+    faculty_id = _id_param(request, 'faculty')
+    if request.GET.get('faculty') and faculty_id is None:
+        return JsonResponse([], safe=False)
+    departments = get_taxonomy().departments_of(faculty_id)
+    return JsonResponse([{'id': node.id, 'name': node.name} for node in departments], safe=False)
 
 
 def api_topics(request):
-    """API endpoint to get topics, optionally filtered by department."""
-    department_id = request.GET.get('department')
-    if department_id:
-        topics = Topic.objects.filter(department_id=department_id).values('id', 'name')
-    else:
-        topics = Topic.objects.values('id', 'name')
-    return JsonResponse(list(topics), safe=False)
+    """API endpoint to get topics, optionally filtered by department or faculty."""
+    department_id = _id_param(request, 'department')
+    faculty_id = _id_param(request, 'faculty')
+    if (request.GET.get('department') and department_id is None) or (request.GET.get('faculty') and faculty_id is None):
+        return JsonResponse([], safe=False)
+    topics = get_taxonomy().topics_of(department_id=department_id, faculty_id=faculty_id)
+    return JsonResponse([{'id': node.id, 'name': node.name} for node in topics], safe=False)
+
+
+def api_facet_lookup(request, dimension):
+    """API endpoint to look up facet values matching a term under the current book filters."""
+    if dimension not in facets.DIMENSIONS:
+        return JsonResponse({'error': 'Unknown facet'}, status=404)
+    try:
+        limit = min(int(request.GET.get('limit', 20)), 100)
+    except ValueError:
+        limit = 20
+    filters = facets.normalize_filters(request.GET)
+    values = facets.lookup_facet(filters, dimension, request.GET.get('term', ''), limit)
+    return JsonResponse(values, safe=False)
 
 
 def download_book_qr(request, book_id):
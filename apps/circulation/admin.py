@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils import timezone
-from .models import Loan, Reservation, Fine, LoanRequest, Attendance
+from .models import Loan, Reservation, Fine, FinePolicy, LoanRequest, Attendance, SweepRun
 from config.bulk_actions import (
     bulk_update_loan_status, bulk_extend_loans, bulk_calculate_fines,
     bulk_process_reservations, bulk_checkout_visitors
@@ -15,33 +15,39 @@ class LoanAdmin(admin.ModelAdmin):
     actions = ['process_return', bulk_update_loan_status, bulk_extend_loans, bulk_calculate_fines]
 
     def process_return(self, request, queryset):
+        from .services import CirculationError, return_loan
         updated = 0
-        for loan in queryset:
-            loan.status = 'returned'
-            loan.return_date = timezone.now()
-            loan.book_copy.status = 'available'
-            loan.book_copy.save()
-            loan.save()
-            updated += 1
+        for loan_id in queryset.filter(status__in=['active', 'overdue']).values_list('pk', flat=True):
+            try:
+                return_loan(loan_id)
+                updated += 1
+            except CirculationError:
+                pass
         self.message_user(request, f'{updated} loans processed as returned.')
     process_return.short_description = 'Process return for selected loans'
 
 
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
-    list_display = ['user', 'book', 'reservation_date', 'status']
+    list_display = ['user', 'book', 'reservation_date', 'status', 'position', 'book_copy']
     list_filter = ['status', 'reservation_date']
+    raw_id_fields = ['book_copy']
     search_fields = ['user__username', 'book__title']
     actions = [bulk_process_reservations]
 
 
 @admin.register(Fine)
 class FineAdmin(admin.ModelAdmin):
-    list_display = ['loan', 'amount', 'reason', 'status', 'paid_date']
-    list_filter = ['status']
+    list_display = ['loan', 'amount', 'reason', 'fine_type', 'status', 'paid_date']
+    list_filter = ['status', 'fine_type']
     search_fields = ['loan__user__username', 'reason']
 
 
+@admin.register(FinePolicy)
+class FinePolicyAdmin(admin.ModelAdmin):
+    list_display = ['membership_type', 'daily_rate', 'grace_days', 'max_amount']
+
+
 @admin.register(LoanRequest)
 class LoanRequestAdmin(admin.ModelAdmin):
     list_display = ['user', 'book_copy', 'request_date', 'status', 'expiry_date']
@@ -83,3 +89,10 @@ class AttendanceAdmin(admin.ModelAdmin):
             updated += 1
         self.message_user(request, f'{updated} visitors checked out successfully.')
     check_out_visitors.short_description = 'Check out selected visitors'
+
+
+@admin.register(SweepRun)
+class SweepRunAdmin(admin.ModelAdmin):
+    list_display = ['started_at', 'finished_at', 'completed', 'overdue_loans', 'expired_requests', 'expired_reservations']
+    list_filter = ['completed']
+    readonly_fields = ['started_at', 'finished_at', 'completed', 'overdue_loans', 'expired_requests', 'expired_reservations', 'changes']
@@ -1,12 +1,18 @@
-from rest_framework import viewsets, status
+from rest_framework import generics, viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import BasePermission, IsAuthenticated
+from django.core.cache import cache
+from django.db.models import Q
 from django.utils import timezone
+from config.pagination import KeysetPagination
+from . import services
 from .models import Loan, Reservation, LoanRequest, Fine, Attendance
 from .serializers import (
     LoanSerializer, ReservationSerializer, LoanRequestSerializer,
-    FineSerializer, AttendanceSerializer, CheckoutSerializer, ReturnSerializer
+    FineSerializer, AttendanceSerializer, CheckoutSerializer, ReturnSerializer,
+    BatchCheckoutSerializer, BatchReturnSerializer
 )
 
 
@@ -30,11 +36,7 @@ class LoanViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(status=status_filter)
 
         if overdue_only:
-            today = timezone.now().date()
-            queryset = queryset.filter(
-                status='active',
-                due_date__date__lt=today
-            )
+            queryset = queryset.filter(status='overdue')
 
         return queryset
 
@@ -80,7 +82,7 @@ class ReservationViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = Reservation.objects.all()
+        queryset = Reservation.objects.with_queue_position().select_related('user', 'book', 'book_copy')
         user = self.request.user
 
         # Regular users can only see their own reservations
@@ -258,33 +260,27 @@ def checkout_book(request):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        from .models import BookCopy, Loan
-        try:
-            book_copy = BookCopy.objects.get(id=book_copy_id)
-
-            # Create loan
-            loan = Loan.objects.create(
-                user_id=user_id,
-                book_copy=book_copy
+        from apps.accounts.models import LibraryUser
+        user = LibraryUser.objects.filter(pk=user_id).first()
+        if user is None:
+            return Response(
+                {'error': 'User not found'},
+                status=status.HTTP_404_NOT_FOUND
             )
-            loan.due_date = loan.calculate_due_date()
-            loan.save()
-
-            # Update book copy status
-            book_copy.status = 'checked_out'
-            book_copy.save()
-
-            return Response({
-                'message': 'Book checked out successfully',
-                'loan': LoanSerializer(loan).data
-            }, status=status.HTTP_201_CREATED)
 
-        except BookCopy.DoesNotExist:
+        try:
+            loan = services.checkout(book_copy_id, user)
+        except services.CirculationError as e:
             return Response(
-                {'error': 'Book copy not found'},
-                status=status.HTTP_404_NOT_FOUND
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
+        return Response({
+            'message': 'Book checked out successfully',
+            'loan': LoanSerializer(loan).data
+        }, status=status.HTTP_201_CREATED)
+
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -296,35 +292,215 @@ def return_book(request):
     if serializer.is_valid():
         loan_id = serializer.validated_data['loan_id']
 
-        from .models import Loan
+        loan = Loan.objects.filter(pk=loan_id).only('user_id').first()
+        if loan is None:
+            return Response(
+                {'error': 'Loan not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Check permissions
+        if loan.user_id != request.user.id and not request.user.is_staff:
+            return Response(
+                {'error': 'You can only return your own books'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
         try:
-            loan = Loan.objects.get(id=loan_id)
+            loan = services.return_loan(loan_id)
+        except services.CirculationError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-            # Check permissions
-            if loan.user != request.user and not request.user.is_staff:
-                return Response(
-                    {'error': 'You can only return your own books'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
+        return Response({
+            'message': 'Book returned successfully',
+            'loan': LoanSerializer(loan).data
+        })
 
-            # Update loan
-            loan.return_date = timezone.now()
-            loan.status = 'returned'
-            loan.save()
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            # Update book copy status
-            loan.book_copy.status = 'available'
-            loan.book_copy.save()
 
-            return Response({
-                'message': 'Book returned successfully',
-                'loan': LoanSerializer(loan).data
-            })
+IDEMPOTENCY_TIMEOUT = 60 * 60 * 24
+
+
+def _idempotent(request, scope, handler):
+    """
+    Run ``handler`` once per ``Idempotency-Key`` header.
+
+    The first response for a key is stored and replayed for retries with
+    the same key; a retry that arrives while the first request is still
+    running gets 409.
+    """
+    key = request.headers.get('Idempotency-Key')
+    if not key and isinstance(request.data, dict):
+        key = request.data.get('idempotency_key')
+    if not key:
+        return handler()
 
-        except Loan.DoesNotExist:
+    cache_key = f'circulation_idempotency_{scope}_{request.user.pk}_{key}'
+    if not cache.add(cache_key, 'pending', IDEMPOTENCY_TIMEOUT):
+        stored = cache.get(cache_key)
+        if stored == 'pending':
             return Response(
-                {'error': 'Loan not found'},
+                {'error': 'A request with this idempotency key is in progress'},
+                status=status.HTTP_409_CONFLICT
+            )
+        if stored is not None:
+            response = Response(stored['data'], status=stored['status'])
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+    try:
+        response = handler()
+    except Exception:
+        cache.delete(cache_key)
+        raise
+    if response.status_code < 500:
+        cache.set(cache_key, {'data': response.data, 'status': response.status_code}, IDEMPOTENCY_TIMEOUT)
+    else:
+        cache.delete(cache_key)
+    return response
+
+
+def _batch_response(results, action_name):
+    succeeded = sum(1 for result in results if result['success'])
+    return Response({
+        action_name: succeeded,
+        'failed': len(results) - succeeded,
+        'results': results,
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_checkout(request):
+    """Checkout several copies, by barcode, to one patron (staff only)."""
+    if not request.user.is_staff:
+        return Response(
+            {'error': 'Only staff can use the circulation desk'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    def handle():
+        serializer = BatchCheckoutSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        from apps.accounts.models import LibraryUser
+        user = LibraryUser.objects.filter(pk=serializer.validated_data['user_id'], is_active=True).first()
+        if user is None:
+            return Response(
+                {'error': 'User not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        try:
+            results = services.batch_checkout(user, serializer.validated_data['barcodes'])
+        except services.CirculationError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_409_CONFLICT
+            )
+        return _batch_response(results, 'checked_out')
 
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    return _idempotent(request, 'checkout', handle)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_return(request):
+    """Check in several copies by barcode (staff only)."""
+    if not request.user.is_staff:
+        return Response(
+            {'error': 'Only staff can use the circulation desk'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    def handle():
+        serializer = BatchReturnSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            results = services.batch_return(serializer.validated_data['barcodes'])
+        except services.CirculationError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_409_CONFLICT
+            )
+        return _batch_response(results, 'returned')
+
+    return _idempotent(request, 'return', handle)
+
+
+class IsCirculationStaff(BasePermission):
+    """Staff accounts and members of the Staff group, as on the desk pages."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and (
+            user.is_staff or user.groups.filter(name='Staff').exists()
+        ))
+
+
+class StaffQueueView(generics.ListAPIView):
+    """
+    Circulation work queues for the staff dashboard.
+
+    Each queue is keyset-paginated on an indexed ``(date, id)`` key, so any
+    page costs the same however long the queue is. ``?q=`` filters by
+    patron, barcode or title.
+    """
+    permission_classes = [IsAuthenticated, IsCirculationStaff]
+    pagination_class = KeysetPagination
+    queues = {
+        'loans': (
+            lambda: Loan.objects.open().select_related('user', 'book_copy__book'),
+            LoanSerializer, ('due_date', 'id'),
+        ),
+        'overdue': (
+            lambda: Loan.objects.overdue().select_related('user', 'book_copy__book'),
+            LoanSerializer, ('due_date', 'id'),
+        ),
+        'requests': (
+            lambda: LoanRequest.objects.filter(status='pending').select_related('user', 'book_copy__book'),
+            LoanRequestSerializer, ('request_date', 'id'),
+        ),
+        'reservations': (
+            lambda: Reservation.objects.filter(status__in=('active', 'ready'))
+            .with_queue_position().select_related('user', 'book', 'book_copy'),
+            ReservationSerializer, ('reservation_date', 'id'),
+        ),
+        'returns': (
+            lambda: Loan.objects.returned_today().select_related('user', 'book_copy__book'),
+            LoanSerializer, ('-return_date', '-id'),
+        ),
+    }
+    search_fields = {
+        Loan: ('user__username', 'book_copy__barcode', 'book_copy__book__title'),
+        LoanRequest: ('user__username', 'book_copy__barcode', 'book_copy__book__title'),
+        Reservation: ('user__username', 'book__title'),
+    }
+
+    def get_queue(self):
+        try:
+            return self.queues[self.kwargs['queue']]
+        except KeyError:
+            raise NotFound('Unknown queue')
+
+    @property
+    def keyset_ordering(self):
+        return self.get_queue()[2]
+
+    def get_serializer_class(self):
+        return self.get_queue()[1]
+
+    def get_queryset(self):
+        queryset = self.get_queue()[0]()
+        search = self.request.query_params.get('q', '').strip()
+        if search:
+            condition = Q()
+            for field in self.search_fields[queryset.model]:
+                condition |= Q(**{f'{field}__icontains': search})
+            queryset = queryset.filter(condition)
+        return queryset
@@ -0,0 +1,151 @@
+"""
+Overdue fine policies and batch accrual.
+
+Each membership type has a ``FinePolicy`` with a daily rate, grace days and
+an optional cap; types without one are charged ``DEFAULT_POLICY``. Amounts
+are computed in integer cents over NumPy arrays, so the nightly accrual of
+every overdue loan and a single desk return share the same arithmetic.
+
+A loan has at most one ``overdue`` fine. ``accrue`` keeps the unpaid ones
+up to date with one read and a few bulk writes per chunk of loans, and the
+return paths settle the final amount through the same upsert.
+"""
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import summary
+from .models import Fine, FinePolicy, Loan
+
+POLICY_CACHE_KEY = 'circulation_fine_policies'
+ACCRUAL_CHUNK = 5000
+
+# Amounts in cents; a cap of -1 means uncapped
+Policy = namedtuple('Policy', ['rate', 'grace_days', 'cap'])
+DEFAULT_POLICY = Policy(100, 0, -1)
+
+
+def _cents(amount):
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+def _amount(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def get_policies():
+    """Return ``{membership_type: Policy}`` from the cache or the database."""
+    policies = cache.get(POLICY_CACHE_KEY)
+    if policies is None:
+        policies = {
+            policy.membership_type: Policy(
+                _cents(policy.daily_rate),
+                policy.grace_days,
+                -1 if policy.max_amount is None else _cents(policy.max_amount),
+            )
+            for policy in FinePolicy.objects.all()
+        }
+        cache.set(POLICY_CACHE_KEY, policies, None)
+    return policies
+
+
+def invalidate_policies():
+    cache.delete(POLICY_CACHE_KEY)
+
+
+def days_overdue(due_dates, now):
+    """Whole days each due date lies before ``now``'s date, as an array."""
+    due = np.fromiter((due.date().toordinal() for due in due_dates), dtype=np.int64, count=len(due_dates))
+    return np.maximum(now.date().toordinal() - due, 0)
+
+
+def compute(days, membership_types, policies=None):
+    """Return the fine in cents for each ``(days, membership_type)`` pair."""
+    policies = get_policies() if policies is None else policies
+    days = np.asarray(days, dtype=np.int64)
+    if not len(days):
+        return days
+    types, inverse = np.unique(np.asarray(membership_types, dtype=str), return_inverse=True)
+    table = np.array([policies.get(kind, DEFAULT_POLICY) for kind in types], dtype=np.int64)
+    rate, grace, cap = table[inverse.reshape(-1)].T
+    cents = np.maximum(days - grace, 0) * rate
+    return np.where(cap >= 0, np.minimum(cents, cap), cents)
+
+
+def _upsert(rows, now):
+    """
+    Write the overdue fines for ``(loan_id, due_date, membership_type, user_id)`` rows.
+
+    Paid and waived fines are left alone. Returns ``(fines, created, updated)``
+    where ``fines`` maps each charged loan id to its amount.
+    """
+    loan_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    days = days_overdue([row[1] for row in rows], now)
+    cents = compute(days, [row[2] for row in rows])
+    charged = np.flatnonzero(cents > 0)
+    if not len(charged):
+        return {}, 0, 0
+
+    charges = {int(loan_ids[i]): (int(days[i]), _amount(cents[i])) for i in charged}
+    existing = {
+        fine.loan_id: fine
+        for fine in Fine.objects.filter(loan_id__in=list(charges), fine_type='overdue').order_by()
+    }
+    created, updated = [], defaultdict(list)
+    for loan_id, (count, amount) in charges.items():
+        reason = f'Overdue: {count} days'
+        fine = existing.get(loan_id)
+        if fine is None:
+            created.append(Fine(loan_id=loan_id, amount=amount, reason=reason, fine_type='overdue'))
+        elif fine.status == 'unpaid' and (fine.amount != amount or fine.reason != reason):
+            updated[(amount, reason)].append(fine.pk)
+    if created or updated:
+        summary.invalidate(row[3] for row in rows)
+    # A concurrent run may have charged the same loan; its row wins
+    Fine.objects.bulk_create(created, ignore_conflicts=True)
+    # Amounts only vary with days and policy, so one UPDATE per distinct value
+    for (amount, reason), fine_ids in updated.items():
+        Fine.objects.filter(pk__in=fine_ids).update(amount=amount, reason=reason, updated_at=now)
+    updated_count = sum(len(fine_ids) for fine_ids in updated.values())
+    return {loan_id: amount for loan_id, (_, amount) in charges.items()}, len(created), updated_count
+
+
+def settle(loans, now=None):
+    """Charge the final overdue fines of returned ``loans``; returns ``{loan_id: amount}``."""
+    now = now or timezone.now()
+    rows = [(loan.pk, loan.due_date, loan.user.membership_type, loan.user_id) for loan in loans]
+    return _upsert(rows, now)[0]
+
+
+def accrue(now=None, loans=None, chunk_size=ACCRUAL_CHUNK):
+    """
+    Bring the overdue fines of every open loan past its due date up to date.
+
+    ``loans`` narrows the run to a ``Loan`` queryset. Loans are read in
+    primary key order, ``chunk_size`` at a time, as plain value rows.
+    Returns a dict with the ``loans`` seen and fines ``created``/``updated``.
+    """
+    now = now or timezone.now()
+    queryset = (Loan.objects.all() if loans is None else loans).open().filter(due_date__lt=now)
+    totals = {'loans': 0, 'created': 0, 'updated': 0}
+    last = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last).order_by('pk')
+            .values_list('pk', 'due_date', 'user__membership_type', 'user_id')[:chunk_size]
+        )
+        if not rows:
+            break
+        with transaction.atomic():
+            _, created, updated = _upsert(rows, now)
+        totals['loans'] += len(rows)
+        totals['created'] += created
+        totals['updated'] += updated
+        last = rows[-1][0]
+        if len(rows) < chunk_size:
+            break
+    return totals
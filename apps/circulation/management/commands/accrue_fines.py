@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.circulation.fines import ACCRUAL_CHUNK, accrue
+
+
+class Command(BaseCommand):
+    help = 'Bring the overdue fines of all open loans up to date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=ACCRUAL_CHUNK, help='Loans processed per batch')
+
+    def handle(self, *args, **options):
+        totals = accrue(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Accrued fines for {totals['loans']} overdue loans: "
+            f"{totals['created']} created, {totals['updated']} updated"
+        ))
@@ -0,0 +1,70 @@
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.accounts.models import LibraryUser
+from apps.catalog.models import Book, BookCopy, Publisher
+from apps.circulation import fines
+from apps.circulation.models import Loan
+
+
+class Command(BaseCommand):
+    help = 'Time fine accrual over synthetic overdue loans (all writes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loans', type=int, default=100000, help='Number of overdue loans to generate')
+        parser.add_argument('--chunk-size', type=int, default=fines.ACCRUAL_CHUNK, help='Loans processed per batch')
+
+    def timed(self, label, func):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{label}: {elapsed:.3f}s')
+        return result
+
+    def handle(self, *args, **options):
+        count, chunk_size = options['loans'], options['chunk_size']
+        now = timezone.now()
+        kinds = [kind for kind, _ in LibraryUser.MEMBERSHIP_CHOICES]
+
+        days = np.random.default_rng(0).integers(1, 60, size=count)
+        types = np.array(kinds)[np.arange(count) % len(kinds)]
+        self.timed(f'compute() over {count} loans', lambda: fines.compute(days, types))
+
+        with transaction.atomic():
+            publisher = Publisher.objects.create(name='Benchmark Press')
+            book = Book.objects.bulk_create([Book(
+                title='Benchmark', isbn='9780000000000', publisher=publisher,
+                publication_date=date(2000, 1, 1), pages=1,
+            )])[0]
+            copy = BookCopy.objects.bulk_create([BookCopy(
+                book=book, barcode='BENCH-0', acquisition_date=date(2000, 1, 1), location='-',
+            )])[0]
+            users = LibraryUser.objects.bulk_create([
+                LibraryUser(username=f'benchmark-{kind}', membership_type=kind) for kind in kinds
+            ])
+            self.timed(f'Creating {count} overdue loans', lambda: Loan.objects.bulk_create(
+                (
+                    Loan(
+                        user=users[i % len(users)], book_copy=copy, status='overdue',
+                        loan_date=now - timedelta(days=90), due_date=now - timedelta(days=int(days[i])),
+                    )
+                    for i in range(count)
+                ),
+                batch_size=5000,
+            ))
+
+            totals = self.timed('accrue() creating fines', lambda: fines.accrue(now, chunk_size=chunk_size))
+            self.stdout.write(f'  {totals}')
+            totals = self.timed(
+                'accrue() a day later, updating fines',
+                lambda: fines.accrue(now + timedelta(days=1), chunk_size=chunk_size),
+            )
+            self.stdout.write(f'  {totals}')
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished; generated rows were rolled back'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.circulation.services import SWEEP_BATCH, sweep
+
+
+class Command(BaseCommand):
+    help = 'Mark overdue loans and expire stale loan requests and reservations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--time-budget', type=float, default=None, help='Stop after this many seconds')
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH, help='Rows changed per UPDATE')
+
+    def handle(self, *args, **options):
+        run = sweep(time_budget=options['time_budget'], batch_size=options['batch_size'])
+        summary = (
+            f'{run.overdue_loans} loans overdue, {run.expired_requests} requests expired, '
+            f'{run.expired_reservations} reservations expired'
+        )
+        if run.completed:
+            self.stdout.write(self.style.SUCCESS(f'Sweep finished: {summary}'))
+        else:
+            self.stdout.write(self.style.WARNING(f'Sweep stopped at its time budget: {summary}'))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_book_keyset_index'),
+        ('circulation', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['created_at', 'id'], name='circulation_created_1508e7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='circulation_user_id_8774d2_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_book_keyset_index'),
+        ('circulation', '0002_loan_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SweepRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Date and time when the record was created')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Date and time when the record was last updated')),
+                ('started_at', models.DateTimeField(help_text='Reference time of the sweep')),
+                ('finished_at', models.DateTimeField(blank=True, help_text='When the sweep finished', null=True)),
+                ('completed', models.BooleanField(default=False, help_text='False if the time budget ran out before all work was done')),
+                ('overdue_loans', models.PositiveIntegerField(default=0, help_text='Loans marked overdue')),
+                ('expired_requests', models.PositiveIntegerField(default=0, help_text='Loan requests expired')),
+                ('expired_reservations', models.PositiveIntegerField(default=0, help_text='Reservations expired')),
+                ('changes', models.JSONField(default=dict, help_text='Ids changed by each step (truncated)')),
+            ],
+            options={
+                'verbose_name': 'Sweep Run',
+                'verbose_name_plural': 'Sweep Runs',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['status', 'due_date'], name='circulation_status_6d4b4e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanrequest',
+            index=models.Index(fields=['status', 'expiry_date'], name='circulation_status_88d84f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'expiry_date'], name='circulation_status_77e8b8_idx'),
+        ),
+    ]
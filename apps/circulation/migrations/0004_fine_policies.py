@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:58
+
+from django.db import migrations, models
+
+
+def tag_overdue_fines(apps, schema_editor):
+    Fine = apps.get_model('circulation', 'Fine')
+    Fine.objects.filter(reason__startswith='Overdue').update(fine_type='overdue')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('circulation', '0003_circulation_sweep'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinePolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Date and time when the record was created')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Date and time when the record was last updated')),
+                ('membership_type', models.CharField(choices=[('student', 'Student'), ('staff', 'Staff'), ('public', 'Public')], help_text='Membership type the policy applies to', max_length=20, unique=True)),
+                ('daily_rate', models.DecimalField(decimal_places=2, default=1, help_text='Amount charged per overdue day', max_digits=6)),
+                ('grace_days', models.PositiveIntegerField(default=0, help_text='Overdue days that are not charged')),
+                ('max_amount', models.DecimalField(blank=True, decimal_places=2, help_text='Cap on the fine for one loan (blank for no cap)', max_digits=8, null=True)),
+            ],
+            options={
+                'verbose_name': 'Fine Policy',
+                'verbose_name_plural': 'Fine Policies',
+                'ordering': ['membership_type'],
+            },
+        ),
+        migrations.AddField(
+            model_name='fine',
+            name='fine_type',
+            field=models.CharField(choices=[('overdue', 'Overdue'), ('other', 'Other')], default='other', help_text='Overdue fines are kept up to date by the accrual job', max_length=20),
+        ),
+        migrations.RunPython(tag_overdue_fines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def number_existing_reservations(apps, schema_editor):
+    Reservation = apps.get_model('circulation', 'Reservation')
+    # Ids grow with creation time, so they already give a FIFO order
+    Reservation.objects.update(position=models.F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_book_copy_on_hold'),
+        ('circulation', '0004_fine_policies'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='book_copy',
+            field=models.ForeignKey(blank=True, help_text='Copy held on the shelf for this reservation', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='holds', to='catalog.bookcopy'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='position',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, help_text="Place in the book's hold queue (lower is served first)", null=True),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='expiry_date',
+            field=models.DateTimeField(help_text='Date the reservation expires, or the hold-shelf deadline once ready'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('ready', 'Ready for Pickup'), ('fulfilled', 'Fulfilled'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], default='active', help_text='Current status of the reservation', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['book', 'status', 'position'], name='circulation_book_id_46f127_idx'),
+        ),
+        migrations.RunPython(number_existing_reservations, migrations.RunPython.noop),
+    ]
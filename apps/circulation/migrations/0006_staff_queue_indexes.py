@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_book_copy_on_hold'),
+        ('circulation', '0005_reservation_hold_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['status', 'return_date'], name='circulation_status_5578e3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanrequest',
+            index=models.Index(fields=['status', 'request_date'], name='circulation_status_75a8bd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'reservation_date'], name='circulation_status_46a522_idx'),
+        ),
+    ]
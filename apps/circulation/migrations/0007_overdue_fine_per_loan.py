@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:52
+
+from django.db import migrations, models
+
+
+def retype_duplicate_overdue_fines(apps, schema_editor):
+    Fine = apps.get_model('circulation', 'Fine')
+    # Keep the first overdue fine of each loan; later duplicates become 'other'
+    # so no payment record is lost
+    first = Fine.objects.filter(fine_type='overdue').values('loan').annotate(first=models.Min('id')).values('first')
+    Fine.objects.filter(fine_type='overdue').exclude(id__in=first).update(fine_type='other')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('circulation', '0006_staff_queue_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(retype_duplicate_overdue_fines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='fine',
+            constraint=models.UniqueConstraint(condition=models.Q(('fine_type', 'overdue')), fields=('loan',), name='unique_overdue_fine_per_loan'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from datetime import timedelta
 from config.models import BaseModel
@@ -21,6 +21,22 @@ class Loan(BaseModel):
     return_date = models.DateTimeField(null=True, blank=True, help_text="Date the book was actually returned")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active', help_text="Current status of the loan")
 
+    # Loans whose copy is still out; overdue ones are flagged by the nightly sweep
+    OPEN_STATUSES = ('active', 'overdue')
+
+    class LoanQuerySet(models.QuerySet):
+        def open(self):
+            return self.filter(status__in=Loan.OPEN_STATUSES)
+
+        def overdue(self):
+            return self.filter(status='overdue')
+
+        def returned_today(self):
+            start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+            return self.filter(status='returned', return_date__gte=start)
+
+    objects = LoanQuerySet.as_manager()
+
     def calculate_due_date(self):
         """Calculate due date based on user membership type."""
         loan_periods = {
@@ -39,11 +55,18 @@ class Loan(BaseModel):
         verbose_name = "Loan"
         verbose_name_plural = "Loans"
         ordering = ['-loan_date']
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['user', 'created_at', 'id']),
+            models.Index(fields=['status', 'due_date']),
+            models.Index(fields=['status', 'return_date']),
+        ]
 
 
 class Reservation(BaseModel):
     STATUS_CHOICES = [
         ('active', 'Active'),
+        ('ready', 'Ready for Pickup'),
         ('fulfilled', 'Fulfilled'),
         ('cancelled', 'Cancelled'),
         ('expired', 'Expired'),
@@ -52,8 +75,45 @@ class Reservation(BaseModel):
     user = models.ForeignKey(LibraryUser, on_delete=models.CASCADE, related_name='reservations', help_text="User who made the reservation")
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='reservations', help_text="The book being reserved")
     reservation_date = models.DateTimeField(default=timezone.now, help_text="Date the reservation was made")
-    expiry_date = models.DateTimeField(help_text="Date the reservation expires")
+    expiry_date = models.DateTimeField(help_text="Date the reservation expires, or the hold-shelf deadline once ready")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active', help_text="Current status of the reservation")
+    position = models.PositiveBigIntegerField(null=True, blank=True, editable=False, help_text="Place in the book's hold queue (lower is served first)")
+    book_copy = models.ForeignKey(BookCopy, on_delete=models.SET_NULL, null=True, blank=True, related_name='holds', help_text="Copy held on the shelf for this reservation")
+
+    class ReservationQuerySet(models.QuerySet):
+        def queue(self, book):
+            """Waiting reservations for ``book`` in the order they are served."""
+            return self.filter(book=book, status='active').order_by('position', 'pk')
+
+        def with_queue_position(self):
+            """Annotate ``queue_position`` (1 for the head) on waiting reservations."""
+            ahead = Reservation.objects.filter(
+                book=models.OuterRef('book'), status='active', position__lt=models.OuterRef('position'),
+            ).order_by().values('book').annotate(count=models.Count('pk')).values('count')
+            return self.annotate(queue_position=models.Case(
+                models.When(status='active', then=models.functions.Coalesce(models.Subquery(ahead), 0) + 1),
+                default=None,
+                output_field=models.IntegerField(),
+            ))
+
+    objects = ReservationQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        if self.position is not None:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            # Join the back of the book's queue; the book row lock makes
+            # concurrent reservations take distinct positions
+            list(Book.objects.select_for_update().filter(pk=self.book_id).values_list('pk'))
+            last = Reservation.objects.filter(book_id=self.book_id).aggregate(last=models.Max('position'))['last']
+            self.position = (last or 0) + 1
+            super().save(*args, **kwargs)
+
+    def get_queue_position(self):
+        """Place in the queue (1 for the head), or None if not waiting."""
+        if self.status != 'active':
+            return None
+        return Reservation.objects.filter(book_id=self.book_id, status='active', position__lt=self.position).count() + 1
 
     def __str__(self):
         return f"{self.user.username} - {self.book.title}"
@@ -62,6 +122,11 @@ class Reservation(BaseModel):
         verbose_name = "Reservation"
         verbose_name_plural = "Reservations"
         ordering = ['-reservation_date']
+        indexes = [
+            models.Index(fields=['status', 'expiry_date']),
+            models.Index(fields=['status', 'reservation_date']),
+            models.Index(fields=['book', 'status', 'position']),
+        ]
 
 
 class LoanRequest(BaseModel):
@@ -90,27 +155,22 @@ class LoanRequest(BaseModel):
 
     def approve(self, approved_by):
         """Approve the loan request and create the actual loan."""
+        from .services import checkout
+
         if self.status != 'pending':
             raise ValueError("Only pending requests can be approved")
 
-        # Create the loan
-        loan = Loan.objects.create(
-            user=self.user,
-            book_copy=self.book_copy,
-            due_date=timezone.now() + timedelta(days=14)  # Default, will be recalculated
-        )
-        loan.due_date = loan.calculate_due_date()
-        loan.save()
-
-        # Update book copy status
-        self.book_copy.status = 'checked_out'
-        self.book_copy.save()
-
-        # Update request status
-        self.status = 'approved'
-        self.approval_date = timezone.now()
-        self.save()
-
+        now = timezone.now()
+        with transaction.atomic():
+            # Claim the request first so it cannot be approved twice
+            claimed = LoanRequest.objects.filter(pk=self.pk, status='pending').update(
+                status='approved', approval_date=now, updated_at=now
+            )
+            if not claimed:
+                raise ValueError("Only pending requests can be approved")
+            loan = checkout(self.book_copy_id, self.user, now=now)
+
+        self.status, self.approval_date, self.updated_at = 'approved', now, now
         return loan
 
     def reject(self, reason=""):
@@ -139,6 +199,26 @@ class LoanRequest(BaseModel):
         verbose_name = "Loan Request"
         verbose_name_plural = "Loan Requests"
         ordering = ['-request_date']
+        indexes = [
+            models.Index(fields=['status', 'expiry_date']),
+            models.Index(fields=['status', 'request_date']),
+        ]
+
+
+class FinePolicy(BaseModel):
+    """Overdue fine terms for one membership type."""
+    membership_type = models.CharField(max_length=20, choices=LibraryUser.MEMBERSHIP_CHOICES, unique=True, help_text="Membership type the policy applies to")
+    daily_rate = models.DecimalField(max_digits=6, decimal_places=2, default=1, help_text="Amount charged per overdue day")
+    grace_days = models.PositiveIntegerField(default=0, help_text="Overdue days that are not charged")
+    max_amount = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, help_text="Cap on the fine for one loan (blank for no cap)")
+
+    def __str__(self):
+        return f"{self.get_membership_type_display()}: {self.daily_rate}/day"
+
+    class Meta:
+        verbose_name = "Fine Policy"
+        verbose_name_plural = "Fine Policies"
+        ordering = ['membership_type']
 
 
 class Fine(BaseModel):
@@ -147,12 +227,17 @@ class Fine(BaseModel):
         ('paid', 'Paid'),
         ('waived', 'Waived'),
     ]
+    TYPE_CHOICES = [
+        ('overdue', 'Overdue'),
+        ('other', 'Other'),
+    ]
 
     loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='fines', help_text="The loan this fine is associated with")
     amount = models.DecimalField(max_digits=8, decimal_places=2, help_text="Amount of the fine")
     reason = models.CharField(max_length=200, help_text="Reason for the fine")
     paid_date = models.DateTimeField(null=True, blank=True, help_text="Date the fine was paid")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='unpaid', help_text="Current status of the fine")
+    fine_type = models.CharField(max_length=20, choices=TYPE_CHOICES, default='other', help_text="Overdue fines are kept up to date by the accrual job")
 
     def __str__(self):
         return f"Fine for {self.loan} - {self.amount}"
@@ -161,6 +246,11 @@ class Fine(BaseModel):
         verbose_name = "Fine"
         verbose_name_plural = "Fines"
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['loan'], condition=models.Q(fine_type='overdue'), name='unique_overdue_fine_per_loan',
+            ),
+        ]
 
 
 class Attendance(BaseModel):
@@ -203,3 +293,22 @@ class Attendance(BaseModel):
         verbose_name = "Attendance"
         verbose_name_plural = "Attendances"
         ordering = ['-check_in']
+
+
+class SweepRun(BaseModel):
+    """One run of the circulation sweep and what it changed."""
+    started_at = models.DateTimeField(help_text="Reference time of the sweep")
+    finished_at = models.DateTimeField(null=True, blank=True, help_text="When the sweep finished")
+    completed = models.BooleanField(default=False, help_text="False if the time budget ran out before all work was done")
+    overdue_loans = models.PositiveIntegerField(default=0, help_text="Loans marked overdue")
+    expired_requests = models.PositiveIntegerField(default=0, help_text="Loan requests expired")
+    expired_reservations = models.PositiveIntegerField(default=0, help_text="Reservations expired")
+    changes = models.JSONField(default=dict, help_text="Ids changed by each step (truncated)")
+
+    def __str__(self):
+        return f"Sweep {self.started_at:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        verbose_name = "Sweep Run"
+        verbose_name_plural = "Sweep Runs"
+        ordering = ['-started_at']
@@ -22,7 +22,7 @@ class LoanSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def get_days_overdue(self, obj):
-        if obj.status == 'active' and obj.due_date:
+        if obj.status in Loan.OPEN_STATUSES and obj.due_date:
             from django.utils import timezone
             today = timezone.now().date()
             if today > obj.due_date.date():
@@ -45,15 +45,23 @@ class ReservationSerializer(serializers.ModelSerializer):
     book_title = serializers.CharField(source='book.title', read_only=True)
     book_isbn = serializers.CharField(source='book.isbn', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
+    queue_position = serializers.SerializerMethodField()
+    book_copy_barcode = serializers.CharField(source='book_copy.barcode', read_only=True, default=None)
 
     class Meta:
         model = Reservation
         fields = [
             'id', 'user', 'user_name', 'user_username', 'book', 'book_title', 'book_isbn',
             'reservation_date', 'expiry_date', 'status', 'status_display',
-            'created_at', 'updated_at'
+            'queue_position', 'book_copy', 'book_copy_barcode', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'user', 'book_copy', 'created_at', 'updated_at']
+
+    def get_queue_position(self, obj):
+        # Annotated by ReservationViewSet; computed for freshly created rows
+        if hasattr(obj, 'queue_position'):
+            return obj.queue_position
+        return obj.get_queue_position()
 
 
 class LoanRequestSerializer(serializers.ModelSerializer):
@@ -138,7 +146,22 @@ class ReturnSerializer(serializers.Serializer):
     def validate_loan_id(self, value):
         from .models import Loan
         try:
-            loan = Loan.objects.get(id=value, status='active')
+            loan = Loan.objects.open().get(id=value)
             return value
         except Loan.DoesNotExist:
             raise serializers.ValidationError("Active loan not found.")
+
+
+class BatchCheckoutSerializer(serializers.Serializer):
+    """Serializer for checking out several copies to one patron."""
+    user_id = serializers.IntegerField(required=True)
+    barcodes = serializers.ListField(
+        child=serializers.CharField(max_length=50), allow_empty=False, max_length=500
+    )
+
+
+class BatchReturnSerializer(serializers.Serializer):
+    """Serializer for checking in several copies."""
+    barcodes = serializers.ListField(
+        child=serializers.CharField(max_length=50), allow_empty=False, max_length=500
+    )
@@ -0,0 +1,367 @@
+"""
+Checkout and return of book copies.
+
+Every circulation entry point (staff views, the REST API, loan request
+approval and the admin) goes through these functions. Each operation runs
+in one transaction: the copy row is locked with ``select_for_update`` and
+claimed with a conditional UPDATE, so two desks can never lend the same
+copy, and the loan is written once with its due date already computed.
+Loans and returns are added to the day's analytics counters, and checkouts
+to book popularity, after commit.
+
+Returned copies go to the head of their book's hold queue first: the
+reservation becomes ready with a hold-shelf deadline, the copy waits on
+the shelf for that patron, and they are emailed once the return commits.
+
+``sweep`` is the periodic job that moves loans, loan requests and
+reservations past their dates into their overdue or expired states.
+"""
+import logging
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from apps.accounts import activity
+from apps.analytics import popularity, rollups
+from apps.catalog.models import BookCopy
+from . import fines, summary
+from .models import Fine, Loan, LoanRequest, Reservation, SweepRun
+
+MAX_BATCH = 500
+HOLD_SHELF_DAYS = 3
+SWEEP_BATCH = 1000
+SWEEP_RECORDED_IDS = 1000
+
+
+logger = logging.getLogger(__name__)
+
+
+class CirculationError(ValueError):
+    """A checkout or return that cannot be performed."""
+
+
+def notify_hold_ready(reservation_ids):
+    """Email each patron whose reservation is waiting on the hold shelf."""
+    for reservation in Reservation.objects.filter(pk__in=reservation_ids, status='ready').select_related('user', 'book', 'book_copy'):
+        if not reservation.user.email:
+            continue
+        try:
+            send_mail(
+                subject=f"Your reserved book is ready: {reservation.book.title}",
+                message=f"Dear {reservation.user.get_full_name() or reservation.user.username},\n\n"
+                        f"\"{reservation.book.title}\" (copy {reservation.book_copy.barcode}) is waiting for you "
+                        f"at the circulation desk until {reservation.expiry_date:%B %d, %Y}.\n\n"
+                        f"Best regards,\nRamat Library",
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[reservation.user.email],
+                fail_silently=False,
+            )
+        except Exception:
+            logger.exception('Could not send hold notice for reservation %s', reservation.pk)
+
+
+def _shelve(copies, now):
+    """
+    Put returned ``copies`` back into circulation inside the caller's transaction.
+
+    Each copy is assigned to the next waiting reservation for its book and
+    kept on the hold shelf; copies nobody is waiting for become available.
+    The queue heads are read with one indexed query per distinct book.
+    """
+    by_book = defaultdict(list)
+    for copy in copies:
+        by_book[copy.book_id].append(copy)
+
+    held, free = [], []
+    for book_id, book_copies in by_book.items():
+        heads = list(Reservation.objects.select_for_update().queue(book_id)[:len(book_copies)])
+        for index, copy in enumerate(book_copies):
+            reservation = heads[index] if index < len(heads) else None
+            # The conditional update skips a reservation cancelled meanwhile
+            if reservation is not None and Reservation.objects.filter(pk=reservation.pk, status='active').update(
+                status='ready', book_copy=copy, expiry_date=now + timedelta(days=HOLD_SHELF_DAYS), updated_at=now,
+            ):
+                held.append((copy, reservation))
+            else:
+                free.append(copy)
+
+    if held:
+        BookCopy.objects.filter(pk__in=[copy.pk for copy, _ in held]).update(status='on_hold')
+        summary.invalidate([reservation.user_id for _, reservation in held])
+        reservation_ids = [reservation.pk for _, reservation in held]
+        transaction.on_commit(lambda: notify_hold_ready(reservation_ids))
+    if free:
+        BookCopy.objects.filter(pk__in=[copy.pk for copy in free]).update(status='available')
+    for copy, _ in held:
+        copy.status = 'on_hold'
+    for copy in free:
+        copy.status = 'available'
+
+
+def checkout(book_copy, user, now=None):
+    """
+    Lend ``book_copy`` (an instance or pk) to ``user`` and return the new loan.
+
+    A copy on the hold shelf can only go to the patron it is held for, and
+    fulfils their reservation. Raises ``CirculationError`` if the copy is
+    not available or the user has unpaid fines.
+    """
+    now = now or timezone.now()
+    copy_id = getattr(book_copy, 'pk', book_copy)
+    with transaction.atomic():
+        try:
+            copy = BookCopy.objects.select_for_update().select_related('book').get(pk=copy_id)
+        except BookCopy.DoesNotExist:
+            raise CirculationError('Book copy not found.')
+        hold = None
+        if copy.status == 'on_hold':
+            hold = Reservation.objects.filter(book_copy=copy, status='ready', user=user).first()
+            if hold is None:
+                raise CirculationError('Book copy is on hold for another patron.')
+        elif copy.status != 'available':
+            raise CirculationError('Book copy not available.')
+        if Fine.objects.filter(loan__user=user, status='unpaid').exists():
+            raise CirculationError('User has unpaid fines. Cannot checkout book.')
+
+        # The conditional update also guards databases without row locks
+        if not BookCopy.objects.filter(pk=copy.pk, status=copy.status).update(status='checked_out'):
+            raise CirculationError('Book copy not available.')
+        copy.status = 'checked_out'
+        if hold is not None:
+            Reservation.objects.filter(pk=hold.pk).update(status='fulfilled', updated_at=now)
+            hold.status = 'fulfilled'
+            activity.record([activity.reservation_closed(hold, copy.book.title, now)])
+
+        loan = Loan(user=user, book_copy=copy, loan_date=now)
+        loan.due_date = loan.calculate_due_date()
+        loan.save(force_insert=True)
+        rollups.increment_on_commit(timezone.localdate(now), new_loans=1)
+        popularity.record_on_commit({('book', copy.book_id): {'checkouts': 1}})
+    return loan
+
+
+def return_loan(loan, now=None):
+    """
+    Close an active or overdue ``loan`` (an instance or pk) and free its copy.
+
+    An overdue return settles its fine under the borrower's fine policy in
+    the same transaction. Returns the
+    updated loan; raises ``CirculationError`` if it is not on loan.
+    """
+    now = now or timezone.now()
+    loan_id = getattr(loan, 'pk', loan)
+    with transaction.atomic():
+        try:
+            loan = Loan.objects.select_for_update().select_related('user', 'book_copy__book').get(pk=loan_id)
+        except Loan.DoesNotExist:
+            raise CirculationError('Loan not found.')
+        if loan.status not in ('active', 'overdue'):
+            raise CirculationError('Loan is not active.')
+
+        if not Loan.objects.filter(pk=loan.pk, status=loan.status).update(status='returned', return_date=now, updated_at=now):
+            raise CirculationError('Loan is not active.')
+        loan.status, loan.return_date = 'returned', now
+
+        _shelve([loan.book_copy], now)
+        fines.settle([loan], now)
+        summary.invalidate([loan.user_id])
+        activity.record([activity.loan_returned(loan, loan.book_copy.book.title)])
+        rollups.increment_on_commit(timezone.localdate(now), returned_today=1)
+    return loan
+
+
+def _unique_barcodes(barcodes):
+    """Strip barcodes and drop repeated scans, keeping request order."""
+    return list(dict.fromkeys(str(barcode).strip() for barcode in barcodes if str(barcode).strip()))
+
+
+def batch_checkout(user, barcodes, now=None):
+    """
+    Lend the copies with the given barcodes to ``user`` in one transaction.
+
+    Copies are resolved and locked with one query and validated in memory;
+    the valid ones are claimed with a single UPDATE and their loans are
+    inserted with one ``bulk_create``. Returns one result dict per distinct
+    barcode, in request order.
+    """
+    if len(barcodes) > MAX_BATCH:
+        raise CirculationError(f'At most {MAX_BATCH} barcodes per batch.')
+    now = now or timezone.now()
+    results = {}
+    barcodes = _unique_barcodes(barcodes)
+
+    with transaction.atomic():
+        if Fine.objects.filter(loan__user=user, status='unpaid').exists():
+            error = 'User has unpaid fines. Cannot checkout book.'
+            return [{'barcode': barcode, 'success': False, 'error': error} for barcode in barcodes]
+
+        copies = {
+            copy.barcode: copy
+            for copy in BookCopy.objects.select_for_update(of=('self',)).select_related('book').filter(barcode__in=barcodes)
+        }
+        on_hold = [copy.pk for copy in copies.values() if copy.status == 'on_hold']
+        holds = {
+            hold.book_copy_id: hold
+            for hold in Reservation.objects.filter(book_copy__in=on_hold, status='ready', user=user)
+        } if on_hold else {}
+        loans = []
+        for barcode in barcodes:
+            copy = copies.get(barcode)
+            if copy is None:
+                results[barcode] = {'barcode': barcode, 'success': False, 'error': 'Book copy not found.'}
+            elif copy.status == 'on_hold' and copy.pk not in holds:
+                results[barcode] = {'barcode': barcode, 'success': False, 'error': 'Book copy is on hold for another patron.'}
+            elif copy.status not in ('available', 'on_hold'):
+                results[barcode] = {'barcode': barcode, 'success': False, 'error': 'Book copy not available.'}
+            else:
+                loan = Loan(user=user, book_copy=copy, loan_date=now)
+                loan.due_date = loan.calculate_due_date()
+                loans.append(loan)
+
+        if loans:
+            copy_ids = [loan.book_copy_id for loan in loans]
+            claimed = BookCopy.objects.filter(pk__in=copy_ids, status__in=('available', 'on_hold')).update(status='checked_out')
+            if claimed != len(copy_ids):
+                # Only possible without row locks: let the desk retry the batch
+                raise CirculationError('Some copies changed during checkout; retry the batch.')
+            if holds:
+                Reservation.objects.filter(pk__in=[hold.pk for hold in holds.values()]).update(status='fulfilled', updated_at=now)
+                for hold in holds.values():
+                    hold.status = 'fulfilled'
+                activity.record(
+                    activity.reservation_closed(holds[copy.pk], copy.book.title, now)
+                    for copy in copies.values() if copy.pk in holds
+                )
+            Loan.objects.bulk_create(loans)
+            summary.invalidate([user.pk])
+            rollups.increment_on_commit(timezone.localdate(now), new_loans=len(loans))
+            popularity.record_on_commit({
+                ('book', book_id): {'checkouts': n}
+                for book_id, n in Counter(loan.book_copy.book_id for loan in loans).items()
+            })
+            for loan in loans:
+                loan.book_copy.status = 'checked_out'
+                results[loan.book_copy.barcode] = {
+                    'barcode': loan.book_copy.barcode,
+                    'success': True,
+                    'loan_id': loan.pk,
+                    'due_date': loan.due_date,
+                }
+    return [results[barcode] for barcode in barcodes]
+
+
+def batch_return(barcodes, now=None):
+    """
+    Check in the copies with the given barcodes in one transaction.
+
+    Open loans are resolved and locked with one query; loans and copies are
+    closed with one UPDATE each and overdue fines settled in one bulk
+    upsert. Returns one result dict per distinct barcode, in
+    request order.
+    """
+    if len(barcodes) > MAX_BATCH:
+        raise CirculationError(f'At most {MAX_BATCH} barcodes per batch.')
+    now = now or timezone.now()
+    results = {}
+    barcodes = _unique_barcodes(barcodes)
+
+    with transaction.atomic():
+        loans = {
+            loan.book_copy.barcode: loan
+            for loan in Loan.objects.select_for_update()
+            .filter(book_copy__barcode__in=barcodes, status__in=['active', 'overdue'])
+            .select_related('book_copy__book', 'user')
+        }
+        if loans:
+            closed = Loan.objects.filter(
+                pk__in=[loan.pk for loan in loans.values()], status__in=['active', 'overdue']
+            ).update(status='returned', return_date=now, updated_at=now)
+            if closed != len(loans):
+                raise CirculationError('Some loans changed during check-in; retry the batch.')
+            _shelve([loan.book_copy for loan in loans.values()], now)
+            summary.invalidate([loan.user_id for loan in loans.values()])
+            for loan in loans.values():
+                loan.status, loan.return_date = 'returned', now
+            activity.record(activity.loan_returned(loan, loan.book_copy.book.title) for loan in loans.values())
+            rollups.increment_on_commit(timezone.localdate(now), returned_today=len(loans))
+        charged = fines.settle(loans.values(), now)
+
+    for barcode in barcodes:
+        loan = loans.get(barcode)
+        if loan is None:
+            results[barcode] = {'barcode': barcode, 'success': False, 'error': 'No active loan for this copy.'}
+        else:
+            results[barcode] = {'barcode': barcode, 'success': True, 'loan_id': loan.pk, 'fine': charged.get(loan.pk)}
+    return [results[barcode] for barcode in barcodes]
+
+
+def _release_holds(reservation_ids, now):
+    """Pass the copies held for expired reservations on to the next in line."""
+    copies = list(BookCopy.objects.filter(holds__in=reservation_ids, status='on_hold'))
+    if copies:
+        _shelve(copies, now)
+
+
+def _sweep_steps(now):
+    """``(name, queryset, new_status, after)`` for each state change the sweep makes."""
+    return [
+        ('overdue_loans', Loan.objects.filter(status='active', due_date__lt=now), 'overdue', None),
+        ('expired_requests', LoanRequest.objects.filter(status='pending', expiry_date__lt=now), 'expired', None),
+        (
+            'expired_reservations',
+            Reservation.objects.filter(status__in=('active', 'ready'), expiry_date__lt=now),
+            'expired',
+            _release_holds,
+        ),
+    ]
+
+
+def sweep(now=None, time_budget=None, batch_size=SWEEP_BATCH):
+    """
+    Mark overdue loans and expire stale loan requests and reservations.
+
+    Each step selects up to ``batch_size`` matching ids through the
+    ``(status, date)`` indexes and flips them with one conditional UPDATE,
+    so a run costs a few queries per batch rather than one per row. Copies
+    held for expired reservations pass to the next patron in line. When
+    ``time_budget`` seconds run out the sweep stops between batches; the
+    next run picks up where it left off. Returns the recorded ``SweepRun``.
+    """
+    now = now or timezone.now()
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
+    run = SweepRun(started_at=now, changes={})
+
+    completed = True
+    for name, queryset, new_status, after in _sweep_steps(now):
+        changed = run.changes.setdefault(name, [])
+        count = 0
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                completed = False
+                break
+            with transaction.atomic():
+                rows = list(queryset.order_by('pk').values_list('pk', 'user_id')[:batch_size])
+                if not rows:
+                    break
+                ids = [pk for pk, _ in rows]
+                # Re-checking the status keeps rows changed meanwhile untouched
+                count += queryset.filter(pk__in=ids).update(status=new_status, updated_at=timezone.now())
+                if after is not None:
+                    after(ids, now)
+                summary.invalidate([user_id for _, user_id in rows])
+            changed.extend(ids[:SWEEP_RECORDED_IDS - len(changed)])
+            if len(rows) < batch_size:
+                break
+        setattr(run, name, count)
+        if not completed:
+            break
+
+    run.completed = completed
+    run.finished_at = timezone.now()
+    run.save()
+    return run
@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import fines, summary
+from .models import Fine, FinePolicy, Loan, LoanRequest, Reservation
+
+
+@receiver(post_save, sender=FinePolicy)
+@receiver(post_delete, sender=FinePolicy)
+def invalidate_fine_policies(sender, **kwargs):
+    """Drop the cached fine policies once a change is committed."""
+    transaction.on_commit(fines.invalidate_policies)
+
+
+@receiver(post_save, sender=Loan)
+@receiver(post_delete, sender=Loan)
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+@receiver(post_save, sender=LoanRequest)
+@receiver(post_delete, sender=LoanRequest)
+def invalidate_user_summary(sender, instance, raw=False, **kwargs):
+    """Drop the dashboard summary of the user owning a changed row."""
+    if not raw:
+        summary.invalidate([instance.user_id])
+
+
+@receiver(post_save, sender=Fine)
+@receiver(post_delete, sender=Fine)
+def invalidate_fined_user_summary(sender, instance, raw=False, **kwargs):
+    """Drop the dashboard summary of the user a changed fine belongs to."""
+    if not raw:
+        user_id = Loan.objects.filter(pk=instance.loan_id).values_list('user_id', flat=True).first()
+        summary.invalidate([user_id])
@@ -0,0 +1,97 @@
+"""
+Per-user circulation summary.
+
+Every count the patron dashboards and the ``library_counts`` context
+processor show for the signed-in user comes from one conditional-aggregate
+query per table (loans, reservations, loan requests and fines). The result
+is cached per user until one of that user's rows changes: model signals
+cover ordinary saves and deletes, and the bulk paths in ``services`` and
+``fines`` call ``invalidate`` with the users they touched.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import Fine, Loan, LoanRequest, Reservation
+
+CACHE_TIMEOUT = 60 * 60
+
+
+@dataclass(frozen=True)
+class UserSummary:
+    date: object
+    total_loans: int = 0
+    current_loans: int = 0
+    overdue_loans: int = 0
+    returned_loans: int = 0
+    loans_this_month: int = 0
+    loans_this_year: int = 0
+    waiting_reservations: int = 0
+    ready_reservations: int = 0
+    pending_requests: int = 0
+    unpaid_fines: int = 0
+    unpaid_total: Decimal = Decimal('0.00')
+
+    @property
+    def active_reservations(self):
+        return self.waiting_reservations + self.ready_reservations
+
+    @property
+    def notifications(self):
+        """Reservations, overdue loans and unpaid fines needing attention."""
+        return self.active_reservations + self.overdue_loans + self.unpaid_fines
+
+
+def _key(user_id):
+    return f'circulation_summary_{user_id}'
+
+
+def compute(user, today=None):
+    """Build the summary of ``user`` (an instance or pk) from the database."""
+    user_id = getattr(user, 'pk', user)
+    today = today or timezone.localdate()
+    month_start = today.replace(day=1)
+    loans = Loan.objects.filter(user_id=user_id).aggregate(
+        total_loans=Count('pk'),
+        current_loans=Count('pk', filter=Q(status__in=Loan.OPEN_STATUSES)),
+        overdue_loans=Count('pk', filter=Q(status='overdue')),
+        returned_loans=Count('pk', filter=Q(status='returned')),
+        loans_this_month=Count('pk', filter=Q(loan_date__date__gte=month_start)),
+        loans_this_year=Count('pk', filter=Q(loan_date__date__gte=month_start.replace(month=1))),
+    )
+    reservations = Reservation.objects.filter(user_id=user_id).aggregate(
+        waiting_reservations=Count('pk', filter=Q(status='active')),
+        ready_reservations=Count('pk', filter=Q(status='ready')),
+    )
+    requests = LoanRequest.objects.filter(user_id=user_id).aggregate(
+        pending_requests=Count('pk', filter=Q(status='pending')),
+    )
+    fines = Fine.objects.filter(loan__user_id=user_id, status='unpaid').aggregate(
+        unpaid_fines=Count('pk'),
+        unpaid_total=Sum('amount'),
+    )
+    fines['unpaid_total'] = fines['unpaid_total'] or Decimal('0.00')
+    return UserSummary(date=today, **loans, **reservations, **requests, **fines)
+
+
+def get(user):
+    """Return the cached summary of ``user``, recomputing it when stale."""
+    user_id = getattr(user, 'pk', user)
+    today = timezone.localdate()
+    summary = cache.get(_key(user_id))
+    # Month and year counts roll over at midnight
+    if summary is None or summary.date != today:
+        summary = compute(user_id, today)
+        cache.set(_key(user_id), summary, CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate(user_ids):
+    """Drop the summaries of ``user_ids`` once the current transaction commits."""
+    keys = [_key(user_id) for user_id in set(user_ids) if user_id is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -1,3 +1,521 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.accounts.models import LibraryUser
+from apps.catalog.models import Book, BookCopy, Publisher
+from config.bulk_actions import bulk_update_loan_status
+from . import fines, services, summary
+from .models import Fine, FinePolicy, Loan, LoanRequest, Reservation, SweepRun
+
+
+def create_copy(barcode='C1'):
+    publisher = Publisher.objects.create(name='Northern Press')
+    book = Book.objects.create(
+        title='Things Fall Apart', isbn=f'978{barcode:0>10}'[:13], publisher=publisher,
+        publication_date=date(1958, 1, 1), pages=209,
+    )
+    return BookCopy.objects.create(
+        book=book, barcode=barcode, acquisition_date=date(2020, 1, 1), location='A1',
+    )
+
+
+class CirculationServiceTest(TestCase):
+    """Tests for the checkout/return service."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.copy = create_copy()
+        cls.student = LibraryUser.objects.create_user('student', password='pass', membership_type='student')
+        cls.staff = LibraryUser.objects.create_user('desk', password='pass', is_staff=True, is_superuser=True)
+
+    def assertAvailable(self, available):
+        self.copy.book.refresh_from_db()
+        self.assertEqual(self.copy.book.available_copies, 1 if available else 0)
+
+    def test_checkout_and_return(self):
+        now = timezone.now()
+        # Lock, fine check, claim with counter refresh, insert (plus savepoints)
+        with self.assertNumQueries(12):
+            loan = services.checkout(self.copy.pk, self.student, now=now)
+        self.assertEqual(loan.due_date, now + timedelta(days=14))
+        self.assertAvailable(False)
+
+        with self.assertRaisesMessage(services.CirculationError, 'not available'):
+            services.checkout(self.copy.pk, self.staff)
+
+        returned = services.return_loan(loan.pk, now=now + timedelta(days=17))
+        self.assertEqual(returned.status, 'returned')
+        self.assertEqual(Fine.objects.get(loan=loan).amount, 3)
+        self.assertAvailable(True)
+
+        with self.assertRaisesMessage(services.CirculationError, 'not active'):
+            services.return_loan(loan.pk)
+
+    def test_unpaid_fines_block_checkout(self):
+        loan = services.checkout(self.copy.pk, self.student)
+        services.return_loan(loan, now=loan.due_date + timedelta(days=2))
+        with self.assertRaisesMessage(services.CirculationError, 'unpaid fines'):
+            services.checkout(self.copy.pk, self.student)
+        self.assertAvailable(True)
+
+    def test_entry_points(self):
+        request = LoanRequest.objects.create(user=self.student, book_copy=self.copy)
+        loan = request.approve(self.staff)
+        self.assertEqual(LoanRequest.objects.get(pk=request.pk).status, 'approved')
+        with self.assertRaises(ValueError):
+            LoanRequest.objects.get(pk=request.pk).approve(self.staff)
+
+        self.client.force_login(self.student)
+        response = self.client.post('/api/circulation/return/', {'loan_id': loan.pk})
+        self.assertEqual(response.json()['loan']['status'], 'returned')
+
+        response = self.client.post('/api/circulation/checkout/', {'book_copy_id': self.copy.pk, 'user_id': self.student.pk})
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post('/api/circulation/checkout/', {'book_copy_id': self.copy.pk, 'user_id': self.student.pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Loan.objects.filter(status='active').count(), 1)
+
+    def test_overdue_loan_cannot_be_renewed(self):
+        loan = services.checkout(self.copy.pk, self.staff, now=timezone.now() - timedelta(days=20))
+        Loan.objects.filter(pk=loan.pk).update(status='overdue')
+        self.client.force_login(self.staff)
+        response = self.client.post(f'/circulation/renew/{loan.pk}/', follow=True)
+        self.assertContains(response, 'Cannot renew overdue loan.')
+        self.assertEqual(Loan.objects.get(pk=loan.pk).due_date, loan.due_date)
+
+
+class BatchDeskTest(TestCase):
+    """Tests for the multi-barcode desk endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        first = create_copy('C1')
+        cls.copies = [first] + [
+            BookCopy.objects.create(book=first.book, barcode=f'C{i}', acquisition_date=date(2020, 1, 1), location='A1')
+            for i in range(2, 5)
+        ]
+        BookCopy.objects.filter(barcode='C4').update(status='lost')
+        cls.patron = LibraryUser.objects.create_user('patron', password='pass', membership_type='student')
+        cls.desk = LibraryUser.objects.create_superuser('desk', 'desk@test.com', 'pass')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.desk)
+
+    def post(self, url, data, key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(url, data, content_type='application/json', **headers)
+
+    def test_batch_checkout_and_return(self):
+        now = timezone.now()
+        # Fine check, lock, claim with counter refresh, insert: independent of batch size
+        with self.assertNumQueries(12):
+            results = services.batch_checkout(self.patron, ['C1', 'C2', 'C2', 'C4', 'X9'], now=now)
+        self.assertEqual(
+            [(r['barcode'], r['success']) for r in results],
+            [('C1', True), ('C2', True), ('C4', False), ('X9', False)],
+        )
+        self.assertEqual(results[0]['due_date'], now + timedelta(days=14))
+        self.copies[0].book.refresh_from_db()
+        self.assertEqual(self.copies[0].book.available_copies, 1)
+
+        Loan.objects.filter(book_copy__barcode='C2').update(due_date=now - timedelta(days=2))
+        results = services.batch_return(['C1', 'C2', 'C3'], now=now)
+        self.assertEqual([r['success'] for r in results], [True, True, False])
+        self.assertEqual(results[1]['fine'], 2)
+        self.assertEqual(Fine.objects.count(), 1)
+        self.assertEqual(Loan.objects.filter(status='returned').count(), 2)
+        self.copies[0].book.refresh_from_db()
+        self.assertEqual(self.copies[0].book.available_copies, 3)
+
+    def test_idempotent_retries(self):
+        payload = {'user_id': self.patron.pk, 'barcodes': ['C1', 'C3']}
+        first = self.post('/api/circulation/batch/checkout/', payload, key='scan-1')
+        self.assertEqual(first.json()['checked_out'], 2)
+
+        retry = self.post('/api/circulation/batch/checkout/', payload, key='scan-1')
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Loan.objects.count(), 2)
+
+        fresh = self.post('/api/circulation/batch/checkout/', payload, key='scan-2')
+        self.assertEqual(fresh.json()['failed'], 2)
+
+        response = self.post('/api/circulation/batch/return/', {'barcodes': ['C1', 'C3']}, key='scan-3')
+        self.assertEqual(response.json()['returned'], 2)
+
+        # Non-object bodies are rejected by the serializer rather than crashing
+        response = self.post('/api/circulation/batch/return/', ['C1'])
+        self.assertEqual(response.status_code, 400)
+
+    def test_staff_only(self):
+        self.client.force_login(self.patron)
+        response = self.post('/api/circulation/batch/return/', {'barcodes': ['C1']})
+        self.assertEqual(response.status_code, 403)
+
+
+class FineAccrualTest(TestCase):
+    """Tests for fine policies and batch accrual."""
+
+    @classmethod
+    def setUpTestData(cls):
+        first = create_copy('C1')
+        cls.copies = [first] + [
+            BookCopy.objects.create(book=first.book, barcode=f'C{i}', acquisition_date=date(2020, 1, 1), location='A1')
+            for i in range(2, 5)
+        ]
+        cls.student = LibraryUser.objects.create_user('student', password='pass', membership_type='student')
+        cls.public = LibraryUser.objects.create_user('public', password='pass', membership_type='public')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            FinePolicy.objects.create(membership_type='student', daily_rate='2.50', grace_days=2, max_amount='10.00')
+
+    def test_compute(self):
+        cents = fines.compute([1, 3, 10, 0, 4], ['student', 'student', 'student', 'public', 'public'])
+        # Grace days, rate, cap; public falls back to the default policy
+        self.assertEqual(cents.tolist(), [0, 250, 1000, 0, 400])
+
+    def test_accrue_and_return(self):
+        now = timezone.now()
+        loans = [
+            services.checkout(self.copies[0], self.student, now=now - timedelta(days=17)),  # 3 days late
+            services.checkout(self.copies[1], self.public, now=now - timedelta(days=10)),   # 3 days late
+            services.checkout(self.copies[2], self.public, now=now - timedelta(days=12)),   # 5 days late, paid
+            services.checkout(self.copies[3], self.student, now=now),                       # not due
+        ]
+        Fine.objects.create(loan=loans[2], amount=1, reason='Overdue: 1 days', fine_type='overdue', status='paid')
+
+        fines.get_policies()
+        # Loans, existing fines, insert (plus savepoints)
+        with self.assertNumQueries(5):
+            totals = fines.accrue(now)
+        self.assertEqual(totals, {'loans': 3, 'created': 2, 'updated': 0})
+        self.assertEqual(
+            dict(Fine.objects.filter(fine_type='overdue').values_list('loan_id', 'amount')),
+            {loans[0].pk: Decimal('2.50'), loans[1].pk: 3, loans[2].pk: 1},
+        )
+
+        totals = fines.accrue(now + timedelta(days=1))
+        self.assertEqual(totals, {'loans': 3, 'created': 0, 'updated': 2})
+
+        # Returns settle the accrued fine instead of adding another
+        services.return_loan(loans[0], now=now + timedelta(days=5))
+        results = services.batch_return(['C2'], now=now + timedelta(days=1))
+        self.assertEqual(results[0]['fine'], 4)
+        self.assertEqual(Fine.objects.get(loan=loans[0]).amount, 10)
+        self.assertEqual(Fine.objects.filter(loan=loans[1]).count(), 1)
+        self.assertEqual(Fine.objects.get(loan=loans[2]).amount, 1)
+
+    def test_one_overdue_fine_per_loan(self):
+        now = timezone.now()
+        loan = services.checkout(self.copies[0], self.student, now=now - timedelta(days=17))
+        Fine.objects.create(loan=loan, amount=1, reason='Damaged cover')
+        Fine.objects.create(loan=loan, amount=2, reason='Overdue: 2 days', fine_type='overdue')
+        with transaction.atomic(), self.assertRaises(IntegrityError):
+            Fine.objects.create(loan=loan, amount=2, reason='Overdue: 2 days', fine_type='overdue')
+
+        # A run that missed the concurrent insert skips the loan instead of failing
+        with mock.patch.object(Fine.objects, 'filter', return_value=Fine.objects.none()):
+            fines.accrue(now)
+        self.assertEqual(Fine.objects.filter(loan=loan, fine_type='overdue').count(), 1)
+
+
+class HoldQueueTest(TestCase):
+    """Tests for the reservation hold queue."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.copy = create_copy('C1')
+        cls.borrower, cls.first, cls.second = [
+            LibraryUser.objects.create_user(name, f'{name}@test.com', 'pass', membership_type='student')
+            for name in ('borrower', 'first', 'second')
+        ]
+
+    def reserve(self, user):
+        return Reservation.objects.create(user=user, book=self.copy.book, expiry_date=timezone.now() + timedelta(days=7))
+
+    def test_return_allocates_to_head_of_queue(self):
+        now = timezone.now()
+        loan = services.checkout(self.copy, self.borrower, now=now)
+        first, second = self.reserve(self.first), self.reserve(self.second)
+        self.assertEqual([first.get_queue_position(), second.get_queue_position()], [1, 2])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            services.return_loan(loan, now=now)
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.book_copy_id), ('ready', self.copy.pk))
+        self.assertEqual(first.expiry_date, now + timedelta(days=services.HOLD_SHELF_DAYS))
+        self.assertEqual(BookCopy.objects.get(pk=self.copy.pk).status, 'on_hold')
+        self.assertEqual(second.get_queue_position(), 1)
+        self.assertEqual([message.to for message in mail.outbox], [['first@test.com']])
+
+        with self.assertRaisesMessage(services.CirculationError, 'on hold for another patron'):
+            services.checkout(self.copy, self.second)
+        services.checkout(self.copy, self.first)
+        self.assertEqual(Reservation.objects.get(pk=first.pk).status, 'fulfilled')
+
+    def test_expired_hold_passes_to_next_in_line(self):
+        services.checkout(self.copy, self.borrower)
+        first, second = self.reserve(self.first), self.reserve(self.second)
+        services.batch_return([self.copy.barcode])
+
+        later = timezone.now() + timedelta(days=services.HOLD_SHELF_DAYS + 1)
+        services.sweep(now=later)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('expired', 'ready'))
+        self.assertEqual(second.book_copy_id, self.copy.pk)
+
+        # Nobody left in the queue: the copy goes back on the shelf
+        services.sweep(now=later + timedelta(days=services.HOLD_SHELF_DAYS + 1))
+        self.assertEqual(Reservation.objects.get(pk=second.pk).status, 'expired')
+        self.assertEqual(BookCopy.objects.get(pk=self.copy.pk).status, 'available')
+
+    def test_api_exposes_queue_position(self):
+        services.checkout(self.copy, self.borrower)
+        self.reserve(self.first)
+        self.client.force_login(self.second)
+        response = self.client.post('/api/circulation/reservations/', {
+            'book': self.copy.book.pk, 'expiry_date': (timezone.now() + timedelta(days=7)).isoformat(),
+        })
+        self.assertEqual(response.json()['queue_position'], 2)
+        # Session, user, page count, one page with positions annotated
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/circulation/reservations/')
+        self.assertEqual([row['queue_position'] for row in response.json()['results']], [2])
+
+
+class UserSummaryTest(TestCase):
+    """Tests for the cached per-user dashboard summary."""
+
+    @classmethod
+    def setUpTestData(cls):
+        first = create_copy('C1')
+        cls.copies = [first, BookCopy.objects.create(book=first.book, barcode='C2', acquisition_date=date(2020, 1, 1), location='A1')]
+        cls.patron = LibraryUser.objects.create_user('patron', password='pass', membership_type='student')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_counts_and_invalidation(self):
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            loan = services.checkout(self.copies[0], self.patron, now=now - timedelta(days=20))
+            services.checkout(self.copies[1], self.patron, now=now)
+            services.sweep(now=now)
+
+        # One query per table, then served from the cache
+        with self.assertNumQueries(4):
+            result = summary.get(self.patron)
+        with self.assertNumQueries(0):
+            self.assertEqual(summary.get(self.patron), result)
+        self.assertEqual((result.current_loans, result.overdue_loans, result.loans_this_year), (2, 1, result.total_loans))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            services.return_loan(loan, now=now)
+        result = summary.get(self.patron)
+        self.assertEqual((result.current_loans, result.overdue_loans, result.returned_loans), (1, 0, 1))
+        self.assertEqual((result.unpaid_fines, result.unpaid_total), (1, 6))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Fine.objects.filter(loan=loan).get().delete()
+        self.assertEqual(summary.get(self.patron).unpaid_fines, 0)
+
+    def test_admin_status_update_invalidates_after_writing(self):
+        loan = services.checkout(self.copies[0], self.patron)
+        request = RequestFactory().post('/', {'apply': '1', 'status': 'returned'})
+        request.user = self.patron
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        seen = []
+        with mock.patch.object(summary, 'invalidate', side_effect=lambda user_ids: seen.append(
+            (list(user_ids), Loan.objects.get(pk=loan.pk).status),
+        )):
+            bulk_update_loan_status(admin.site._registry[Loan], request, Loan.objects.filter(pk=loan.pk))
+        self.assertEqual(seen, [([self.patron.pk], 'returned')])
+
+    def test_dashboards_read_summary(self):
+        LoanRequest.objects.create(user=self.patron, book_copy=self.copies[0])
+        self.client.force_login(self.patron)
+        response = self.client.get('/circulation/dashboard/')
+        self.assertEqual(response.context['summary'].pending_requests, 1)
+        self.assertEqual(response.context['user_pending_requests'](), 1)
+
+
+class StaffQueueTest(TestCase):
+    """Tests for the paginated staff work queues."""
+
+    @classmethod
+    def setUpTestData(cls):
+        first = create_copy('C1')
+        cls.copies = [first] + [
+            BookCopy.objects.create(book=first.book, barcode=f'C{i}', acquisition_date=date(2020, 1, 1), location='A1')
+            for i in range(2, 6)
+        ]
+        cls.patron = LibraryUser.objects.create_user('patron', password='pass', membership_type='student')
+        cls.desk = LibraryUser.objects.create_superuser('desk', 'desk@test.com', 'pass')
+        now = timezone.now()
+        for i, copy in enumerate(cls.copies):
+            services.checkout(copy, cls.patron, now=now - timedelta(days=i * 5))
+        services.sweep(now=now)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_queues_are_keyset_paginated(self):
+        self.client.force_login(self.desk)
+        response = self.client.get('/api/circulation/queues/loans/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        barcodes = [row['book_copy_barcode'] for row in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            barcodes += [row['book_copy_barcode'] for row in response.data['results']]
+        # Earliest due date first
+        self.assertEqual(barcodes, ['C5', 'C4', 'C3', 'C2', 'C1'])
+
+        response = self.client.get('/api/circulation/queues/overdue/', {'q': 'c5'})
+        self.assertEqual([row['book_copy_barcode'] for row in response.data['results']], ['C5'])
+        self.assertEqual(self.client.get('/api/circulation/queues/unknown/').status_code, 404)
+
+    def test_returns_queue_matches_badge(self):
+        now = timezone.now()
+        services.return_loan(Loan.objects.get(book_copy=self.copies[0]), now=now - timedelta(days=2))
+        services.return_loan(Loan.objects.get(book_copy=self.copies[1]), now=now)
+        self.client.force_login(self.desk)
+        response = self.client.get('/circulation/staff-dashboard/')
+        self.assertEqual(response.context['counts']['returned_today'], 1)
+        response = self.client.get('/api/circulation/queues/returns/')
+        self.assertEqual([row['book_copy_barcode'] for row in response.data['results']], ['C2'])
+
+    def test_queues_require_staff(self):
+        self.client.force_login(self.patron)
+        self.assertEqual(self.client.get('/api/circulation/queues/loans/').status_code, 403)
+
+    def test_dashboard_counts_are_aggregates(self):
+        self.client.force_login(self.desk)
+        self.client.get('/circulation/staff-dashboard/')
+        with CaptureQueriesContext(connection) as before:
+            response = self.client.get('/circulation/staff-dashboard/')
+        counts = response.context['counts']
+        self.assertEqual((counts['open_loans'], counts['overdue_loans'], counts['pending_requests']), (5, 2, 0))
+
+        # Longer queues cost no extra queries on the initial render
+        for copy in self.copies:
+            LoanRequest.objects.create(user=self.patron, book_copy=copy)
+        services.return_loan(Loan.objects.open().first())
+        with self.assertNumQueries(len(before)):
+            response = self.client.get('/circulation/staff-dashboard/')
+        counts = response.context['counts']
+        self.assertEqual((counts['open_loans'], counts['returned_today'], counts['pending_requests']), (4, 1, 5))
+
+
+class SweepTest(TestCase):
+    """Tests for the overdue/expiry sweep."""
+
+    @classmethod
+    def setUpTestData(cls):
+        first = create_copy('C1')
+        cls.copies = [first] + [
+            BookCopy.objects.create(book=first.book, barcode=f'C{i}', acquisition_date=date(2020, 1, 1), location='A1')
+            for i in range(2, 6)
+        ]
+        cls.patron = LibraryUser.objects.create_user('patron', password='pass', membership_type='student')
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.loans = [services.checkout(copy, self.patron, now=self.now) for copy in self.copies]
+        Loan.objects.filter(pk__in=[loan.pk for loan in self.loans[:3]]).update(due_date=self.now - timedelta(days=1))
+        self.request = LoanRequest.objects.create(user=self.patron, book_copy=self.copies[0])
+        LoanRequest.objects.filter(pk=self.request.pk).update(expiry_date=self.now - timedelta(hours=1))
+        self.reservation = Reservation.objects.create(
+            user=self.patron, book=self.copies[0].book, expiry_date=self.now - timedelta(days=1),
+        )
+
+    def test_sweep_marks_and_expires_in_batches(self):
+        run = services.sweep(now=self.now, batch_size=2)
+        self.assertTrue(run.completed)
+        self.assertEqual((run.overdue_loans, run.expired_requests, run.expired_reservations), (3, 1, 1))
+        self.assertEqual(sorted(run.changes['overdue_loans']), [loan.pk for loan in self.loans[:3]])
+        self.assertEqual(Loan.objects.overdue().count(), 3)
+        self.assertEqual(Loan.objects.open().count(), 5)
+        self.assertEqual(LoanRequest.objects.get(pk=self.request.pk).status, 'expired')
+        self.assertEqual(Reservation.objects.get(pk=self.reservation.pk).status, 'expired')
+
+        # Nothing left: one select per step
+        with self.assertNumQueries(3 * 3 + 1):
+            run = services.sweep(now=self.now)
+        self.assertEqual(run.overdue_loans, 0)
+        self.assertEqual(SweepRun.objects.count(), 2)
+
+    def test_time_budget_and_overdue_returns(self):
+        run = services.sweep(now=self.now, time_budget=0)
+        self.assertFalse(run.completed)
+        self.assertEqual(Loan.objects.overdue().count(), 0)
+
+        call_command('sweep_circulation', stdout=StringIO())
+        loan = services.return_loan(self.loans[0], now=self.now + timedelta(days=1))
+        self.assertEqual(loan.status, 'returned')
+        self.assertEqual(Fine.objects.get(loan=loan).amount, 2)
+
+
+class ConcurrentCheckoutTest(TransactionTestCase):
+    """Many desks lending the same copy at once."""
+
+    THREADS = 8
+
+    def test_one_copy_is_lent_once(self):
+        copy = create_copy()
+        users = [
+            LibraryUser.objects.create(username=f'patron{i}')
+            for i in range(self.THREADS)
+        ]
+        barrier = threading.Barrier(self.THREADS)
+        outcomes = []
+
+        def attempt(user):
+            try:
+                barrier.wait()
+                for _ in range(20):
+                    try:
+                        services.checkout(copy.pk, user)
+                        outcomes.append('loan')
+                    except services.CirculationError:
+                        outcomes.append('refused')
+                    except DatabaseError:
+                        # Lock contention on databases without row locks: retry like a desk would
+                        time.sleep(0.05)
+                        continue
+                    break
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes.count('loan'), 1)
+        self.assertEqual(len(outcomes), self.THREADS)
+        self.assertEqual(Loan.objects.count(), 1)
+        copy.book.refresh_from_db()
+        self.assertEqual(copy.book.available_copies, 0)
@@ -4,6 +4,7 @@ from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Q, Count
 from datetime import timedelta, datetime
+from . import services, summary
 from .models import Loan, Reservation, Fine, LoanRequest, Attendance
 from apps.catalog.models import Book, BookCopy
 from apps.accounts.models import LibraryUser, StudyRoom, StudyRoomBooking
@@ -24,45 +25,65 @@ def circulation_home(request):
 @login_required
 @user_passes_test(is_staff_user)
 def staff_dashboard(request):
-    pending_loans = Loan.objects.filter(status='active').select_related('user', 'book_copy__book')
-    pending_reservations = Reservation.objects.filter(status='active').select_related('user', 'book')
-    pending_borrow_requests = LoanRequest.objects.filter(status='pending').select_related('user', 'book_copy__book')
-    overdue_loans = Loan.objects.filter(status='active', due_date__lt=timezone.now()).select_related('user', 'book_copy__book')
-    recent_returns = Loan.objects.filter(status='returned').order_by('-return_date')[:10]
-
-    # Attendance stats
-    today = timezone.now().date()
-    active_attendances = Attendance.objects.filter(status='active')
-    today_attendances = Attendance.objects.filter(check_in__date=today)
-
+    # The work queues themselves are loaded page by page from the staff queue API
+    counts = _desk_counts()
     context = {
-        'pending_loans': pending_loans,
-        'pending_reservations': pending_reservations,
-        'pending_borrow_requests': pending_borrow_requests,
-        'overdue_loans': overdue_loans,
-        'recent_returns': recent_returns,
-        'active_attendances': active_attendances,
-        'today_attendances': today_attendances,
+        'counts': counts,
+        'queue_tabs': [
+            ('overdue', 'Overdue', counts['overdue_loans']),
+            ('requests', 'Borrow Requests', counts['pending_requests']),
+            ('reservations', 'Reservations', counts['waiting_reservations'] + counts['ready_reservations']),
+            ('loans', 'Open Loans', counts['open_loans']),
+            ('returns', 'Recent Returns', counts['returned_today']),
+        ],
     }
     return render(request, 'circulation/staff_dashboard.html', context)
 
 
+def _desk_counts():
+    """Headline counts for the staff dashboard, one conditional aggregate per table."""
+    today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    counts = Loan.objects.filter(
+        Q(status__in=Loan.OPEN_STATUSES) | Q(status='returned', return_date__gte=today)
+    ).aggregate(
+        open_loans=Count('pk', filter=Q(status__in=Loan.OPEN_STATUSES)),
+        overdue_loans=Count('pk', filter=Q(status='overdue')),
+        returned_today=Count('pk', filter=Q(status='returned')),
+    )
+    counts.update(Reservation.objects.filter(status__in=('active', 'ready')).aggregate(
+        waiting_reservations=Count('pk', filter=Q(status='active')),
+        ready_reservations=Count('pk', filter=Q(status='ready')),
+    ))
+    counts['pending_requests'] = LoanRequest.objects.filter(status='pending').count()
+    counts.update(Attendance.objects.filter(Q(status='active') | Q(check_in__gte=today)).aggregate(
+        active_visitors=Count('pk', filter=Q(status='active')),
+        today_visitors=Count('pk', filter=Q(check_in__gte=today)),
+    ))
+    return counts
+
+
 @login_required
 def patron_dashboard(request):
     user = request.user
-    current_loans = Loan.objects.filter(user=user, status='active').select_related('book_copy__book')
-    active_reservations = Reservation.objects.filter(user=user, status='active').select_related('book')
+    current_loans = Loan.objects.open().filter(user=user).select_related('book_copy__book')
+    active_reservations = (
+        Reservation.objects.filter(user=user, status__in=('active', 'ready'))
+        .with_queue_position().select_related('book', 'book_copy')
+    )
     pending_borrow_requests = LoanRequest.objects.filter(user=user, status='pending').select_related('book_copy__book')
-    loan_history = Loan.objects.filter(user=user).exclude(status='active').order_by('-return_date')[:10]
+    loan_history = Loan.objects.filter(user=user).exclude(status__in=Loan.OPEN_STATUSES).order_by('-return_date')[:10]
     unpaid_fines = Fine.objects.filter(loan__user=user, status='unpaid')
+    user_summary = summary.get(user)
 
     context = {
+        'summary': user_summary,
         'current_loans': current_loans,
         'active_reservations': active_reservations,
         'pending_borrow_requests': pending_borrow_requests,
         'loan_history': loan_history,
         'unpaid_fines': unpaid_fines,
-        'total_fines': sum(fine.amount for fine in unpaid_fines),
+        'total_fines': user_summary.unpaid_total,
+        'now': timezone.now(),
     }
     return render(request, 'circulation/patron_dashboard.html', context)
 
@@ -74,33 +95,13 @@ def checkout_book(request):
         book_copy_id = request.POST.get('book_copy_id')
         user_id = request.POST.get('user_id')
 
+        user = get_object_or_404(LibraryUser, id=user_id)
         try:
-            book_copy = BookCopy.objects.get(id=book_copy_id, status='available')
-            user = get_object_or_404(LibraryUser, id=user_id)
-
-            # Check if user has unpaid fines
-            if Fine.objects.filter(loan__user=user, status='unpaid').exists():
-                messages.error(request, 'User has unpaid fines. Cannot checkout book.')
-                return redirect('circulation:checkout')
-
-            # Create loan
-            loan = Loan.objects.create(
-                user=user,
-                book_copy=book_copy,
-                due_date=timezone.now() + timedelta(days=14)  # Default 14 days, will be recalculated
-            )
-            loan.due_date = loan.calculate_due_date()
-            loan.save()
-
-            # Update book copy status
-            book_copy.status = 'checked_out'
-            book_copy.save()
-
-            messages.success(request, f'Book "{book_copy.book.title}" checked out to {user.get_full_name()}.')
+            loan = services.checkout(book_copy_id, user)
+            messages.success(request, f'Book "{loan.book_copy.book.title}" checked out to {user.get_full_name()}.')
             return redirect('circulation:staff_dashboard')
-
-        except BookCopy.DoesNotExist:
-            messages.error(request, 'Book copy not available.')
+        except services.CirculationError as e:
+            messages.error(request, str(e))
         except Exception as e:
             messages.error(request, f'Error during checkout: {str(e)}')
 
@@ -118,34 +119,15 @@ def return_book(request):
         loan_id = request.POST.get('loan_id')
 
         try:
-            loan = Loan.objects.get(id=loan_id, status='active')
-            loan.return_date = timezone.now()
-            loan.status = 'returned'
-            loan.save()
-
-            # Update book copy status
-            loan.book_copy.status = 'available'
-            loan.book_copy.save()
-
-            # Check for overdue and create fine if needed
-            if loan.due_date < timezone.now():
-                days_overdue = (timezone.now().date() - loan.due_date.date()).days
-                fine_amount = days_overdue * 1.00  # $1 per day
-                Fine.objects.create(
-                    loan=loan,
-                    amount=fine_amount,
-                    reason=f'Overdue return: {days_overdue} days'
-                )
-
+            loan = services.return_loan(loan_id)
             messages.success(request, f'Book "{loan.book_copy.book.title}" returned successfully.')
             return redirect('circulation:staff_dashboard')
-
-        except Loan.DoesNotExist:
-            messages.error(request, 'Loan not found.')
+        except services.CirculationError as e:
+            messages.error(request, str(e))
         except Exception as e:
             messages.error(request, f'Error during return: {str(e)}')
 
-    active_loans = Loan.objects.filter(status='active').select_related('user', 'book_copy__book')[:50]
+    active_loans = Loan.objects.open().select_related('user', 'book_copy__book')[:50]
     context = {
         'active_loans': active_loans,
     }
@@ -159,7 +141,7 @@ def reserve_book(request, book_id):
     user = request.user
 
     # Check if user already has an active reservation for this book
-    if Reservation.objects.filter(user=user, book=book, status='active').exists():
+    if Reservation.objects.filter(user=user, book=book, status__in=('active', 'ready')).exists():
         messages.warning(request, 'You already have an active reservation for this book.')
         return redirect('catalog:book_detail', pk=book_id)
 
@@ -182,7 +164,7 @@ def reserve_book(request, book_id):
 @login_required
 @permission_required('circulation.change_loan')
 def renew_loan(request, loan_id):
-    loan = get_object_or_404(Loan, id=loan_id, user=request.user, status='active')
+    loan = get_object_or_404(Loan.objects.open(), id=loan_id, user=request.user)
 
     # Check if renewal is allowed (not overdue, within renewal limit)
     if loan.due_date < timezone.now():
@@ -223,7 +205,7 @@ def borrow_book(request, book_id):
         return redirect('circulation:patron_dashboard')
 
     # Check if user already has an active loan for this book
-    if Loan.objects.filter(user=user, book_copy__book=book, status='active').exists():
+    if Loan.objects.open().filter(user=user, book_copy__book=book).exists():
         messages.warning(request, 'You already have this book on loan.')
         return redirect('catalog:book_detail', pk=book_id)
 
@@ -307,8 +289,8 @@ def analytics_dashboard(request):
     # Basic metrics
     total_books = Book.objects.active().count()
     total_users = LibraryUser.objects.count()
-    active_loans = Loan.objects.filter(status='active').count()
-    overdue_loans = Loan.objects.filter(status='active', due_date__lt=timezone.now()).count()
+    active_loans = Loan.objects.open().count()
+    overdue_loans = Loan.objects.overdue().count()
     total_fines = Fine.objects.filter(status='unpaid').count()
 
     # Recent activity (last 30 days)
@@ -1,9 +1,10 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, IsAdminUser
 from django.db.models import Q
 from .models import Collection, EBook, EBookPermissionRequest, EBookPermission
+from . import entitlements
 from .serializers import (
     CollectionSerializer, EBookSerializer, EBookPermissionRequestSerializer,
     EBookPermissionSerializer, EBookSearchSerializer
@@ -74,19 +75,7 @@ class EBookViewSet(viewsets.ModelViewSet):
                 queryset = queryset.filter(upload_date__date__lte=params['date_to'])
 
         # Filter by user access permissions for non-open documents
-        if user.is_authenticated:
-            # Users can see open documents and documents they have permission to access
-            accessible_docs = Q(access_level='open') | Q(
-                access_level__in=['restricted', 'embargo', 'private'],
-                permissions__user=user,
-                permissions__granted=True
-            )
-            queryset = queryset.filter(accessible_docs).distinct()
-        else:
-            # Anonymous users can only see open documents
-            queryset = queryset.filter(access_level='open')
-
-        return queryset
+        return queryset.accessible_to(user)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def download(self, request, pk=None):
@@ -100,27 +89,13 @@ class EBookViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Track the download event
-        from apps.analytics.models import AnalyticsEvent
-        AnalyticsEvent.objects.create(
-            event_type='download',
-            user=request.user,
-            document=ebook,
-            session_id=request.session.session_key,
-            ip_address=request.META.get('REMOTE_ADDR'),
-            user_agent=request.META.get('HTTP_USER_AGENT'),
+        # Track the download event; its batch also updates the document's popularity
+        from apps.analytics import ingest
+        ingest.enqueue(ingest.event_from_request(
+            request, 'download',
+            document_id=ebook.pk,
             page_url=request.META.get('HTTP_REFERER'),
-        )
-
-        # Update popularity score
-        from apps.analytics.models import PopularItem
-        popular_item, created = PopularItem.objects.get_or_create(
-            item_type='document',
-            document=ebook,
-            defaults={'checkout_count': 0, 'view_count': 0, 'search_count': 0}
-        )
-        popular_item.checkout_count += 1
-        popular_item.update_score()
+        ))
 
         return Response({
             'message': 'Download recorded',
@@ -200,19 +175,15 @@ def global_search(request):
         })
 
     # Search books
+    from apps.catalog import search
     from apps.catalog.models import Book
     from apps.catalog.serializers import BookSerializer
 
-    books_queryset = Book.objects.filter(
-        Q(title__icontains=query) |
-        Q(description__icontains=query) |
-        Q(authors__name__icontains=query) |
-        Q(isbn__icontains=query) |
-        Q(publisher__name__icontains=query) |
-        Q(genre__name__icontains=query)
-    ).distinct()[:limit//2]
+    books_queryset = list(search.search(Book.objects.all(), query)[:limit//2])
 
     books_data = BookSerializer(books_queryset, many=True, context={'request': request}).data
+    for book, data in zip(books_queryset, books_data):
+        data['snippet'] = str(search.highlight(getattr(book, 'search_snippet', '')))
 
     # Search documents (respecting access permissions)
     documents_queryset = EBook.objects.filter(
@@ -224,30 +195,18 @@ def global_search(request):
 
     # Apply access filtering
     user = request.user
-    if user.is_authenticated:
-        accessible_docs = Q(access_level='open') | Q(
-            access_level__in=['restricted', 'embargo', 'private'],
-            permissions__user=user,
-            permissions__granted=True
-        )
-        documents_queryset = documents_queryset.filter(accessible_docs).distinct()
-    else:
-        documents_queryset = documents_queryset.filter(access_level='open')
+    documents_queryset = documents_queryset.accessible_to(user)
 
     documents_queryset = documents_queryset[:limit//2]
     documents_data = EBookSerializer(documents_queryset, many=True, context={'request': request}).data
 
     # Track search event
-    from apps.analytics.models import AnalyticsEvent
-    AnalyticsEvent.objects.create(
-        event_type='search',
-        user=user if user.is_authenticated else None,
-        session_id=request.session.session_key,
-        ip_address=request.META.get('REMOTE_ADDR'),
-        user_agent=request.META.get('HTTP_USER_AGENT'),
+    from apps.analytics import ingest
+    ingest.enqueue(ingest.event_from_request(
+        request, 'search',
         search_query=query,
         metadata={'results_count': len(books_data) + len(documents_data)}
-    )
+    ))
 
     return Response({
         'query': query,
@@ -267,26 +226,18 @@ def search_suggestions(request):
     if len(query) < 2:
         return Response([])
 
-    suggestions = []
-
-    # Book title suggestions
-    from apps.catalog.models import Book
-    book_titles = Book.objects.filter(
-        title__icontains=query
-    ).values_list('title', flat=True).distinct()[:5]
-    suggestions.extend([{'type': 'book', 'value': title} for title in book_titles])
-
-    # Author suggestions
-    from apps.catalog.models import Author
-    authors = Author.objects.filter(
-        name__icontains=query
-    ).values_list('name', flat=True).distinct()[:5]
-    suggestions.extend([{'type': 'author', 'value': author} for author in authors])
-
-    # Document title suggestions
-    document_titles = EBook.objects.filter(
-        title__icontains=query
-    ).values_list('title', flat=True).distinct()[:5]
-    suggestions.extend([{'type': 'document', 'value': title} for title in document_titles])
+    # Served from the in-memory prefix index
+    from apps.catalog import autocomplete
+    suggestions = [
+        {'type': kind, 'value': value}
+        for kind, value in autocomplete.suggest(query, kinds=('book', 'author', 'document'), limit=5)
+    ]
 
     return Response(suggestions[:10])
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def entitlement_cache_stats(request):
+    """Get hit/miss counters of the eBook entitlement cache."""
+    return Response(entitlements.stats())
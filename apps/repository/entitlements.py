@@ -0,0 +1,99 @@
+"""
+Cached per-user eBook entitlements.
+
+A user's Staff-group membership and the set of eBook ids they are granted
+are cached under a versioned key. Saving or deleting an ``EBookPermission``
+or changing the user's groups bumps the user's version once the change
+commits, so stale entries are never read and simply expire. Access checks then become a set lookup.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+
+CACHE_TIMEOUT = 60 * 60
+STAFF_GROUP = 'Staff'
+
+Entitlements = namedtuple('Entitlements', ['is_staff_member', 'granted'])
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _version_key(user_id):
+    return f'ebook_entitlements_version_{user_id}'
+
+
+def _new_version():
+    # Seeded from the clock so an evicted version key never resurrects
+    # entries cached under an older version.
+    return time.time_ns()
+
+
+def _get_version(user_id):
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def _load(user_id):
+    from django.contrib.auth.models import Group
+    from .models import EBookPermission
+
+    is_staff_member = Group.objects.filter(name=STAFF_GROUP, user=user_id).exists()
+    granted = frozenset(
+        EBookPermission.objects.filter(user=user_id, granted=True)
+        .values_list('ebook_id', flat=True)
+    ) if is_staff_member else frozenset()
+    return Entitlements(is_staff_member, granted)
+
+
+def get_entitlements(user):
+    """Return the cached ``Entitlements`` for an authenticated user."""
+    key = f'ebook_entitlements_{user.pk}_v{_get_version(user.pk)}'
+    entitlements = cache.get(key)
+    if entitlements is None:
+        _record('misses')
+        entitlements = _load(user.pk)
+        cache.set(key, entitlements, CACHE_TIMEOUT)
+    else:
+        _record('hits')
+    return entitlements
+
+
+def invalidate(*user_ids):
+    """Bump the entitlement version of the given users."""
+    for user_id in user_ids:
+        key = _version_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+
+
+def stats():
+    """Return process-wide hit/miss counters and the hit ratio."""
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+    }
+
+
+def reset_stats():
+    """Reset the hit/miss counters."""
+    with _stats_lock:
+        _stats['hits'] = 0
+        _stats['misses'] = 0
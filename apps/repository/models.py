@@ -1,6 +1,7 @@
 from django.db import models
 from config.models import BaseModel
 from apps.accounts.models import LibraryUser
+from .entitlements import get_entitlements
 
 
 class Collection(BaseModel):
@@ -58,6 +59,31 @@ class EBook(BaseModel):
         help_text="User who uploaded the eBook"
     )
 
+    class EBookQuerySet(models.QuerySet):
+        def accessible_to(self, user):
+            """
+            Restrict to eBooks the user may access, as a single SQL filter.
+
+            Mirrors ``can_user_access``: open eBooks for everyone, everything
+            for superusers, and granted eBooks for members of the Staff group.
+            """
+            open_access = models.Q(access_level='open')
+            if not user or not user.is_authenticated:
+                return self.filter(open_access)
+            if user.is_superuser:
+                return self.all()
+
+            from django.contrib.auth.models import Group
+            is_staff_member = models.Exists(Group.objects.filter(name='Staff', user=user.pk))
+            is_granted = models.Exists(EBookPermission.objects.filter(
+                ebook=models.OuterRef('pk'),
+                user=user.pk,
+                granted=True
+            ))
+            return self.filter(open_access | (is_staff_member & is_granted))
+
+    objects = EBookQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
@@ -74,12 +100,9 @@ class EBook(BaseModel):
             return True
 
         # Staff with granted permission can access
-        if user.groups.filter(name='Staff').exists():
-            return EBookPermission.objects.filter(
-                ebook=self,
-                user=user,
-                granted=True
-            ).exists()
+        entitlements = get_entitlements(user)
+        if entitlements.is_staff_member:
+            return self.pk in entitlements.granted
 
         return False
 
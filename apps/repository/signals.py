@@ -0,0 +1,52 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts.models import LibraryUser
+from apps.catalog import autocomplete
+from . import entitlements
+from .models import EBook, EBookPermission
+
+
+def _invalidate_on_commit(*user_ids):
+    # After commit, so a reader cannot cache the old rows under the new version
+    if user_ids:
+        transaction.on_commit(partial(entitlements.invalidate, *user_ids), robust=True)
+
+
+@receiver(post_save, sender=EBookPermission)
+@receiver(post_delete, sender=EBookPermission)
+def invalidate_permission_entitlements(sender, instance, **kwargs):
+    """Drop the cached entitlements of the user whose permission changed."""
+    _invalidate_on_commit(instance.user_id)
+
+
+@receiver(m2m_changed, sender=LibraryUser.groups.through)
+def invalidate_group_entitlements(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop cached entitlements when group membership changes, from either side."""
+    if action == 'pre_clear' and reverse:
+        instance._entitlement_user_ids = list(instance.user_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            _invalidate_on_commit(instance.pk)
+        elif action == 'post_clear':
+            _invalidate_on_commit(*getattr(instance, '_entitlement_user_ids', []))
+        else:
+            _invalidate_on_commit(*(pk_set or []))
+
+
+@receiver(post_save, sender=EBook)
+def index_ebook_suggestion(sender, instance, raw=False, **kwargs):
+    """Add a saved eBook title to the suggestion index."""
+    if not raw:
+        pk, title = instance.pk, instance.title
+        transaction.on_commit(lambda: autocomplete.update('document', pk, title))
+
+
+@receiver(post_delete, sender=EBook)
+def unindex_ebook_suggestion(sender, instance, **kwargs):
+    """Drop a deleted eBook from the suggestion index."""
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.remove('document', pk))
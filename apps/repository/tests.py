@@ -1,3 +1,136 @@
-from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser, Group
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
 
-# Create your tests here.
+from apps.accounts.models import LibraryUser
+from . import entitlements
+from .models import Collection, EBook, EBookPermission
+from .views import CollectionDetailView, EBookDetailView, EBookListView
+
+
+class EBookAccessTest(TestCase):
+    """Tests for set-based eBook access filtering."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff_group, _ = Group.objects.get_or_create(name='Staff')
+        cls.admin = LibraryUser.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        cls.staff = LibraryUser.objects.create_user('staff', 'staff@example.com', 'pass')
+        cls.staff.groups.add(cls.staff_group)
+        cls.patron = LibraryUser.objects.create_user('patron', 'patron@example.com', 'pass')
+
+        cls.collection = Collection.objects.create(name='Theses')
+        cls.open = cls.create_ebook('Open', 'open', '10.1/open')
+        cls.granted = cls.create_ebook('Granted', 'restricted', '10.1/granted')
+        cls.revoked = cls.create_ebook('Revoked', 'private', '10.1/revoked')
+        cls.hidden = cls.create_ebook('Hidden', 'embargo', '10.1/hidden')
+
+        EBookPermission.objects.create(ebook=cls.granted, user=cls.staff, granted=True)
+        EBookPermission.objects.create(ebook=cls.revoked, user=cls.staff, granted=False)
+        # A grant without Staff membership does not give access
+        EBookPermission.objects.create(ebook=cls.granted, user=cls.patron, granted=True)
+
+    @classmethod
+    def create_ebook(cls, title, access_level, doi):
+        return EBook.objects.create(
+            title=title, authors='A. Author', file='repository/test.pdf',
+            access_level=access_level, doi=doi, collection=cls.collection,
+            uploaded_by=cls.admin,
+        )
+
+    def test_accessible_to_matches_can_user_access(self):
+        for user in (AnonymousUser(), self.patron, self.staff, self.admin):
+            expected = {ebook.pk for ebook in EBook.objects.all() if ebook.can_user_access(user)}
+            with self.assertNumQueries(1):
+                actual = set(EBook.objects.accessible_to(user).values_list('pk', flat=True))
+            self.assertEqual(actual, expected, user)
+
+    def test_staff_sees_open_and_granted(self):
+        titles = set(EBook.objects.accessible_to(self.staff).values_list('title', flat=True))
+        self.assertEqual(titles, {'Open', 'Granted'})
+
+    def test_views_use_accessible_queryset(self):
+        request = RequestFactory().get('/repository/')
+        request.user = self.staff
+
+        view = EBookListView()
+        view.setup(request)
+        self.assertEqual(view.get_queryset().count(), 2)
+
+        view = EBookDetailView()
+        view.setup(request, pk=self.hidden.pk)
+        self.assertFalse(view.get_queryset().filter(pk=self.hidden.pk).exists())
+
+        view = CollectionDetailView()
+        view.setup(request, pk=self.collection.pk)
+        view.object = self.collection
+        self.assertEqual(len(view.get_context_data()['ebooks']), 2)
+
+
+class EBookEntitlementCacheTest(TestCase):
+    """Tests for the cached per-user eBook entitlements."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff_group, _ = Group.objects.get_or_create(name='Staff')
+        cls.admin = LibraryUser.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        cls.user = LibraryUser.objects.create_user('staff', 'staff@example.com', 'pass')
+        cls.ebook = EBook.objects.create(
+            title='Restricted', authors='A. Author', file='repository/test.pdf',
+            access_level='restricted', doi='10.1/restricted', uploaded_by=cls.admin,
+        )
+
+    def setUp(self):
+        cache.clear()
+        entitlements.reset_stats()
+
+    def test_repeated_checks_hit_the_cache(self):
+        self.user.groups.add(self.staff_group)
+        EBookPermission.objects.create(ebook=self.ebook, user=self.user, granted=True)
+
+        self.assertTrue(self.ebook.can_user_access(self.user))
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                self.assertTrue(self.ebook.can_user_access(self.user))
+        self.assertEqual(entitlements.stats()['misses'], 1)
+        self.assertEqual(entitlements.stats()['hits'], 10)
+
+    def test_permission_changes_invalidate(self):
+        self.user.groups.add(self.staff_group)
+        self.assertFalse(self.ebook.can_user_access(self.user))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            permission = EBookPermission.objects.create(ebook=self.ebook, user=self.user, granted=True)
+        self.assertTrue(self.ebook.can_user_access(self.user))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            permission.granted = False
+            permission.save()
+        self.assertFalse(self.ebook.can_user_access(self.user))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            permission.delete()
+        self.assertFalse(self.ebook.can_user_access(self.user))
+
+    def test_version_is_bumped_after_commit(self):
+        self.user.groups.add(self.staff_group)
+        self.assertFalse(self.ebook.can_user_access(self.user))
+        version = entitlements._get_version(self.user.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            EBookPermission.objects.create(ebook=self.ebook, user=self.user, granted=True)
+            self.assertEqual(entitlements._get_version(self.user.pk), version)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(self.ebook.can_user_access(self.user))
+
+    def test_group_changes_invalidate(self):
+        EBookPermission.objects.create(ebook=self.ebook, user=self.user, granted=True)
+        self.assertFalse(self.ebook.can_user_access(self.user))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff_group.user_set.add(self.user)
+        self.assertTrue(self.ebook.can_user_access(self.user))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff_group.user_set.clear()
+        self.assertFalse(self.ebook.can_user_access(self.user))
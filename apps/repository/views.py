@@ -20,16 +20,7 @@ class EBookListView(ListView):
 
     def get_queryset(self):
         # Only show ebooks the user can access
-        user = self.request.user
-        queryset = EBook.objects.all()
-
-        # Filter by access permissions
-        accessible_ebooks = []
-        for ebook in queryset:
-            if ebook.can_user_access(user):
-                accessible_ebooks.append(ebook.pk)
-
-        queryset = queryset.filter(pk__in=accessible_ebooks)
+        queryset = EBook.objects.accessible_to(self.request.user).select_related('collection')
 
         search_query = self.request.GET.get('q')
         collection_filter = self.request.GET.get('collection')
@@ -61,16 +52,7 @@ class EBookDetailView(DetailView):
 
     def get_queryset(self):
         # Only show ebooks the user can access
-        user = self.request.user
-        queryset = EBook.objects.all()
-
-        # Filter by access permissions
-        accessible_ebooks = []
-        for ebook in queryset:
-            if ebook.can_user_access(user):
-                accessible_ebooks.append(ebook.pk)
-
-        return queryset.filter(pk__in=accessible_ebooks)
+        return EBook.objects.accessible_to(self.request.user)
 
 
 @login_required
@@ -149,17 +131,8 @@ class CollectionDetailView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        collection = self.get_object()
-        user = self.request.user
-
         # Filter ebooks the user can access
-        all_ebooks = collection.ebooks.all()
-        accessible_ebooks = []
-        for ebook in all_ebooks:
-            if ebook.can_user_access(user):
-                accessible_ebooks.append(ebook)
-
-        context['ebooks'] = accessible_ebooks
+        context['ebooks'] = self.object.ebooks.accessible_to(self.request.user)
         return context
 
 
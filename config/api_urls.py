@@ -12,7 +12,7 @@ from apps.catalog.api import (
 )
 from apps.circulation.api import (
     LoanViewSet, ReservationViewSet, LoanRequestViewSet, FineViewSet,
-    AttendanceViewSet, checkout_book, return_book
+    AttendanceViewSet, StaffQueueView, checkout_book, return_book, batch_checkout, batch_return
 )
 from apps.analytics.api import (
     AnalyticsEventViewSet, DailyStatsViewSet, PopularItemViewSet,
@@ -20,7 +20,8 @@ from apps.analytics.api import (
 )
 from apps.repository.api import (
     CollectionViewSet, EBookViewSet, EBookPermissionRequestViewSet,
-    EBookPermissionViewSet, global_search, search_suggestions
+    EBookPermissionViewSet, global_search, search_suggestions,
+    entitlement_cache_stats
 )
 
 # Create routers
@@ -68,6 +69,9 @@ urlpatterns = [
     # Circulation actions
     path('circulation/checkout/', checkout_book, name='api-checkout'),
     path('circulation/return/', return_book, name='api-return'),
+    path('circulation/batch/checkout/', batch_checkout, name='api-batch-checkout'),
+    path('circulation/batch/return/', batch_return, name='api-batch-return'),
+    path('circulation/queues/<str:queue>/', StaffQueueView.as_view(), name='api-staff-queue'),
 
     # Analytics endpoints
     path('analytics/track-event/', track_event, name='api-track-event'),
@@ -78,6 +82,9 @@ urlpatterns = [
     path('search/', global_search, name='api-global-search'),
     path('search/suggestions/', search_suggestions, name='api-search-suggestions'),
 
+    # Repository endpoints
+    path('repository/entitlement-stats/', entitlement_cache_stats, name='api-entitlement-stats'),
+
     # Router URLs
     path('accounts/', include(accounts_router.urls)),
     path('catalog/', include(catalog_router.urls)),
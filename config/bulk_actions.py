@@ -15,6 +15,7 @@ from django.db.models import Q
 # Import all models
 from apps.accounts.models import LibraryUser, StudyRoom, StudyRoomBooking
 from apps.catalog.models import Author, Publisher, Faculty, Department, Topic, Genre, Book, BookCopy
+from apps.circulation import summary as circulation_summary
 from apps.circulation.models import Loan, Reservation, Fine, LoanRequest, Attendance
 from apps.events.models import Event, EventRegistration
 from apps.repository.models import Collection, EBook, EBookPermission
@@ -321,7 +322,10 @@ def bulk_update_loan_status(modeladmin, request, queryset):
     if 'apply' in request.POST:
         status = request.POST.get('status')
         if status:
+            user_ids = list(queryset.values_list('user_id', flat=True))
             updated = queryset.update(status=status)
+            # After the UPDATE, so a concurrent request cannot re-cache the old counts
+            circulation_summary.invalidate(user_ids)
             modeladmin.message_user(
                 request, 
                 f"Successfully updated status for {updated} loans.",
@@ -350,8 +354,11 @@ def bulk_extend_loans(modeladmin, request, queryset):
             days = int(days)
             if days > 0:
                 updated = 0
-                for loan in queryset.filter(status='active'):
+                now = timezone.now()
+                for loan in queryset.filter(status__in=Loan.OPEN_STATUSES):
                     loan.due_date = loan.due_date + timezone.timedelta(days=days)
+                    if loan.due_date > now:
+                        loan.status = 'active'
                     loan.save()
                     updated += 1
                 
@@ -379,42 +386,15 @@ bulk_extend_loans.short_description = "Extend selected loans"
 
 def bulk_calculate_fines(modeladmin, request, queryset):
     """Calculate fines for selected loans."""
-    updated = 0
-    errors = []
-    
-    for loan in queryset.filter(status='overdue'):
-        try:
-            # Calculate fine based on overdue days
-            overdue_days = (timezone.now().date() - loan.due_date).days
-            fine_amount = overdue_days * 100  # 100 naira per day
-            
-            fine, created = Fine.objects.get_or_create(
-                loan=loan,
-                defaults={
-                    'amount': fine_amount,
-                    'reason': f'Overdue by {overdue_days} days',
-                    'status': 'pending'
-                }
-            )
-            
-            if not created:
-                fine.amount = fine_amount
-                fine.save()
-            
-            updated += 1
-        except Exception as e:
-            errors.append(f"Error processing loan {loan.id}: {str(e)}")
-    
-    if updated > 0:
-        modeladmin.message_user(
-            request, 
-            f"Successfully calculated fines for {updated} loans.",
-            messages.SUCCESS
-        )
-    
-    if errors:
-        for error in errors:
-            modeladmin.message_user(request, error, messages.ERROR)
+    from apps.circulation import fines
+
+    totals = fines.accrue(loans=queryset)
+    modeladmin.message_user(
+        request,
+        f"Calculated fines for {totals['loans']} overdue loans "
+        f"({totals['created']} created, {totals['updated']} updated).",
+        messages.SUCCESS
+    )
 bulk_calculate_fines.short_description = "Calculate fines for selected loans"
 
 
@@ -426,7 +406,10 @@ def bulk_process_reservations(modeladmin, request, queryset):
     if 'apply' in request.POST:
         status = request.POST.get('status')
         if status:
+            user_ids = list(queryset.values_list('user_id', flat=True))
             updated = queryset.update(status=status)
+            # After the UPDATE, so a concurrent request cannot re-cache the old counts
+            circulation_summary.invalidate(user_ids)
             modeladmin.message_user(
                 request, 
                 f"Successfully updated status for {updated} reservations.",
@@ -515,11 +498,14 @@ def bulk_update_blog_status(modeladmin, request, queryset):
     """Update status for selected blog posts."""
     from django import forms
     from django.shortcuts import render, redirect
+    from apps.blog.context_processors import invalidate_archive
     
     if 'apply' in request.POST:
         status = request.POST.get('status')
         if status:
             updated = queryset.update(status=status)
+            # update() sends no signals, so clear the sidebar archive here
+            invalidate_archive()
             modeladmin.message_user(
                 request, 
                 f"Successfully updated status for {updated} blog posts.",
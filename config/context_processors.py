@@ -1,22 +1,33 @@
+from functools import cache as memoize, partial
+
 from django.contrib.auth.models import ContentType
-from django.db.models import Count, Sum
+from django.db.models import Count
 from django.core.cache import cache
 from apps.accounts.models import LibraryUser
 from apps.catalog.models import Book, BookCopy, Faculty, Department, Topic
 from apps.repository.models import EBook
 from apps.events.models import Event
-from apps.circulation.models import Loan, Reservation, Fine
+from apps.circulation import summary as circulation_summary
+from apps.circulation.models import Loan, Reservation
 from django.utils import timezone
 
 
-def library_counts(request):
-    """Context processor for library-wide statistics and counts."""
-    context = {}
-    
+def _lazy_items(loader, keys):
+    """
+    Expose ``loader()[key]`` for each key as a zero-argument callable.
+
+    Templates call callables when they resolve a variable, so ``loader``
+    runs at most once per render and only if a template reads one of the keys.
+    """
+    loader = memoize(loader)
+    return {key: partial(lambda key: loader()[key], key) for key in keys}
+
+
+def _library_stats():
     # Cache key for library statistics
     cache_key = 'library_stats'
     stats = cache.get(cache_key)
-    
+
     if not stats:
         # Calculate statistics with optimized queries
         stats = {
@@ -26,62 +37,66 @@ def library_counts(request):
             'total_faculties': Faculty.objects.count(),
             'total_departments': Department.objects.count(),
             'total_topics': Topic.objects.count(),
-            'active_loans': Loan.objects.filter(status='active').count(),
-            'overdue_loans': Loan.objects.filter(status='active', due_date__lt=timezone.now()).count(),
+            'active_loans': Loan.objects.open().count(),
+            'overdue_loans': Loan.objects.overdue().count(),
             'pending_reservations': Reservation.objects.filter(status='active').count(),
             'total_events': Event.objects.filter(date__gte=timezone.now().date()).count(),
         }
-        
+
         # Cache for 5 minutes to improve performance
         cache.set(cache_key, stats, 300)
-    
-    context.update(stats)
-    
+    return stats
+
+
+LIBRARY_STATS = (
+    'total_users', 'total_books', 'total_documents', 'total_faculties', 'total_departments',
+    'total_topics', 'active_loans', 'overdue_loans', 'pending_reservations', 'total_events',
+)
+USER_SUMMARY_FIELDS = {
+    'user_current_loans': 'current_loans',
+    'user_overdue_loans': 'overdue_loans',
+    'user_active_reservations': 'active_reservations',
+    'user_pending_requests': 'pending_requests',
+    'user_unpaid_fines': 'unpaid_total',
+}
+
+
+def library_counts(request):
+    """Context processor for library-wide statistics and counts, computed on first use."""
+    context = _lazy_items(_library_stats, LIBRARY_STATS)
+
     # Add user-specific counts if authenticated
     if request.user.is_authenticated:
-        user_stats = cache.get(f'user_stats_{request.user.id}')
-        
-        if not user_stats:
-            user_stats = {
-                'user_current_loans': request.user.loans.filter(status='active').count(),
-                'user_overdue_loans': request.user.loans.filter(
-                    status='active', 
-                    due_date__lt=timezone.now()
-                ).count(),
-                'user_active_reservations': request.user.reservations.filter(status='active').count(),
-                'user_pending_requests': request.user.loan_requests.filter(status='pending').count(),
-                'user_unpaid_fines': Fine.objects.filter(
-                    loan__user=request.user, 
-                    status='unpaid'
-                ).aggregate(total=Sum('amount'))['total'] or 0,
-            }
-            
-            # Cache user stats for 2 minutes
-            cache.set(f'user_stats_{request.user.id}', user_stats, 120)
-        
-        context.update(user_stats)
-    
+        def user_counts():
+            summary = circulation_summary.get(request.user)
+            return {key: getattr(summary, name) for key, name in USER_SUMMARY_FIELDS.items()}
+        context.update(_lazy_items(user_counts, USER_SUMMARY_FIELDS))
+
     return context
 
 
+def _admin_stats():
+    return {
+        'user_count': LibraryUser.objects.count(),
+        'book_count': Book.objects.count(),
+        'document_count': EBook.objects.count(),
+        'event_count': Event.objects.filter(date__gte=timezone.now().date()).count(),
+        'active_users': LibraryUser.objects.filter(is_active=True).count(),
+        'overdue_loans': Loan.objects.overdue().count(),
+        'pending_reservations': Reservation.objects.filter(status='active').count(),
+    }
+
+
 def admin_context(request):
     """Custom context processor for admin panel."""
     context = {}
 
     if request.user.is_staff and request.path.startswith('/admin/'):
         # Get statistics
-        context.update({
-            'user_count': LibraryUser.objects.count(),
-            'book_count': Book.objects.count(),
-            'document_count': EBook.objects.count(),
-            'event_count': Event.objects.filter(date__gte=timezone.now().date()).count(),
-            'active_users': LibraryUser.objects.filter(is_active=True).count(),
-            'overdue_loans': Loan.objects.filter(
-                status='active',
-                due_date__lt=timezone.now()
-            ).count(),
-            'pending_reservations': Reservation.objects.filter(status='active').count(),
-        })
+        context.update(_lazy_items(_admin_stats, (
+            'user_count', 'book_count', 'document_count', 'event_count',
+            'active_users', 'overdue_loans', 'pending_reservations',
+        )))
 
         # Customize app list with icons
         app_icons = {
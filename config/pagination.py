@@ -0,0 +1,190 @@
+"""
+Pagination classes for the REST API.
+
+``StandardPagination`` is the project default: page-number pagination,
+switching to ``KeysetPagination`` when a request passes ``?cursor=`` or
+``?paginate=cursor``. Viewsets can also opt in permanently with
+``pagination_class = KeysetPagination``.
+
+Keyset pagination orders by a stable key (``-created_at, -id`` by default),
+encodes the last row's key in an opaque cursor and filters with a
+lexicographic comparison on that key. There is no COUNT and no OFFSET, so
+with a matching composite index every page costs the same as the first.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Opaque-cursor pagination over a stable ordering, without counts."""
+    page_size = api_settings.PAGE_SIZE or 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, view):
+        """Key fields; a view may override them with ``keyset_ordering``."""
+        return tuple(getattr(view, 'keyset_ordering', None) or self.ordering)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.key_fields = self.get_ordering(view)
+        self.base_url = request.build_absolute_uri()
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor.get('r'))
+        ordering = self.key_fields
+        if reverse:
+            ordering = tuple(self._flip(field) for field in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(ordering, cursor['v'], queryset.model))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not reverse else cursor is not None
+        self.has_previous = cursor is not None if not reverse else has_more
+        self.first = rows[0] if rows else None
+        self.last = rows[-1] if rows else None
+        if not rows and cursor:
+            # Paged past the end or start: keep the cursor so callers can step back
+            self.has_next = self.has_previous = False
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.last, False))
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.first, True))
+
+    # Cursor encoding
+
+    def encode_cursor(self, row, reverse):
+        values = []
+        for field in self.key_fields:
+            value = getattr(row, field.lstrip('-'))
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        payload = {'v': values}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            payload = json.loads(raw.decode('utf-8'))
+            if not isinstance(payload, dict) or len(payload.get('v', ())) != len(self.key_fields):
+                raise ValueError
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return payload
+
+    # Keyset filtering
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def _after(self, ordering, raw_values, model):
+        """Q for rows strictly after ``raw_values`` in ``ordering``."""
+        names = [field.lstrip('-') for field in ordering]
+        try:
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(names, raw_values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        for index, field in enumerate(ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{names[index]}__{lookup}': values[index]})
+            for previous in range(index):
+                step &= Q(**{names[previous]: values[previous]})
+            condition |= step
+        return condition
+
+
+class StandardPagination(PageNumberPagination):
+    """Page-number pagination that switches to keyset mode on request."""
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request):
+        return (
+            KeysetPagination.cursor_query_param in request.query_params
+            or request.query_params.get('paginate') == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_previous_link()
+        return super().get_previous_link()
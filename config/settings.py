@@ -65,6 +65,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "apps.analytics.tracking.PageViewMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -149,6 +150,10 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Tests run with a temporary MEDIA_ROOT and synchronous analytics ingestion
+# (config/testing.py)
+TEST_RUNNER = "config.testing.TestRunner"
+
 # Email configuration
 # https://docs.djangoproject.com/en/5.2/topics/email/
 
@@ -200,7 +205,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'config.pagination.StandardPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'rest_framework.filters.SearchFilter',
@@ -224,3 +229,26 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+
+# Buffered analytics ingestion (apps/analytics/ingest.py). The test runner
+# (config/testing.py) turns off the background writer and the journal.
+ANALYTICS_INGEST = {
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL_MS': 1000,
+    'MAX_QUEUE': 10000,
+    'HIGH_WATER': 0.8,
+    'SAMPLE_RATE': 0.1,
+    'PUT_TIMEOUT_MS': 50,
+    'SPILL_DIR': BASE_DIR / 'var' / 'analytics',
+    'BACKGROUND': True,
+}
+
+# Automatic page-view capture (apps/analytics/tracking.py). SAMPLE_RATES maps
+# URL names or path prefixes to the fraction of page views recorded.
+ANALYTICS_TRACKING = {
+    'EXCLUDE_PREFIXES': ('/api/', '/admin/jsi18n/', '/favicon.ico'),
+    'SAMPLE_RATES': {
+        '/admin/': 0.25,
+    },
+    'DEFAULT_SAMPLE_RATE': 1.0,
+}
@@ -0,0 +1,92 @@
+"""
+Tests for keyset (cursor) pagination of the REST API.
+"""
+import warnings
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.paginator import UnorderedObjectListWarning
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.analytics.models import AnalyticsEvent
+from apps.catalog.models import Book, Publisher
+
+
+class KeysetPaginationTestCase(TestCase):
+    """Test case for cursor pagination."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser(
+            username='admin', email='admin@test.com', password='pass'
+        )
+        events = AnalyticsEvent.objects.bulk_create([
+            AnalyticsEvent(event_type='page_view', page_url=f'http://testserver/{i}/')
+            for i in range(5)
+        ])
+        # Identical timestamps for some rows: ties are broken by id
+        now = timezone.now()
+        AnalyticsEvent.objects.filter(pk__in=[e.pk for e in events[:3]]).update(created_at=now)
+        AnalyticsEvent.objects.filter(pk__in=[e.pk for e in events[3:]]).update(
+            created_at=now - timezone.timedelta(hours=1)
+        )
+        cls.expected = list(
+            AnalyticsEvent.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+        publisher = Publisher.objects.create(name='Northern Press')
+        for i in range(3):
+            Book.objects.create(
+                title=f'Book {i}', isbn=f'100000000000{i}', publisher=publisher,
+                publication_date=date(2000, 1, 1), pages=100,
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def walk(self, url, params):
+        ids, pages = [], 0
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertNotIn('count', data)
+            ids.extend(row['id'] for row in data['results'])
+            pages += 1
+            if not data['next']:
+                return ids, pages, data
+            response = self.client.get(data['next'])
+
+    def test_events_use_cursor_by_default(self):
+        ids, pages, last = self.walk('/api/analytics/events/', {'page_size': 2})
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(pages, 3)
+
+        # Stepping back from the last page returns the previous one
+        previous = self.client.get(last['previous']).json()
+        self.assertEqual([row['id'] for row in previous['results']], self.expected[2:4])
+
+    def test_deep_page_is_a_single_query(self):
+        first = self.client.get('/api/analytics/events/', {'page_size': 2}).json()
+        # Session, user, page
+        with self.assertNumQueries(3):
+            self.client.get(first['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/analytics/events/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_opt_in_by_query_parameter(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UnorderedObjectListWarning)
+            response = self.client.get('/api/catalog/books/', {'page_size': 2})
+        self.assertEqual(response.json()['count'], 3)
+        self.assertEqual(
+            [row['id'] for row in response.json()['results']],
+            list(Book.objects.order_by('-created_at', '-id').values_list('id', flat=True)[:2]),
+        )
+
+        ids, pages, _ = self.walk('/api/catalog/books/', {'paginate': 'cursor', 'page_size': 2})
+        self.assertEqual(ids, list(Book.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+        self.assertEqual(pages, 2)
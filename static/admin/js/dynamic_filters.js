@@ -7,11 +7,13 @@ function filterDepartments(facultyId) {
 
     // Clear current options except the first (empty) one
     departmentSelect.innerHTML = '<option value="">---------</option>';
-    topicSelect.innerHTML = '<option value="">---------</option>';
+    if (topicSelect) topicSelect.innerHTML = '<option value="">---------</option>';
 
     if (facultyId) {
         // Fetch departments for the selected faculty
-        fetch(`/admin/catalog/department/?faculty=${facultyId}`)
+        const facultySelect = document.querySelector('select[name="faculty"]');
+        const url = (facultySelect && facultySelect.dataset.url) || '/catalog/api/departments/';
+        fetch(`${url}?faculty=${encodeURIComponent(facultyId)}`)
             .then(response => response.json())
             .then(data => {
                 data.forEach(dept => {
@@ -35,7 +37,9 @@ function filterTopics(departmentId) {
 
     if (departmentId) {
         // Fetch topics for the selected department
-        fetch(`/admin/catalog/topic/?department=${departmentId}`)
+        const departmentSelect = document.querySelector('select[name="department"]');
+        const url = (departmentSelect && departmentSelect.dataset.url) || '/catalog/api/topics/';
+        fetch(`${url}?department=${encodeURIComponent(departmentId)}`)
             .then(response => response.json())
             .then(data => {
                 data.forEach(topic => {